@@ -1,81 +1,120 @@
 from flask import Flask
 from dotenv import load_dotenv
+import importlib
 import os
 
 load_dotenv()
 
 from config import Config  # noqa: E402  (load_dotenv needs to run first)
 from extensions import db, login_manager  # noqa: E402  (load_dotenv needs to run first)
-
-
-def create_app() -> Flask:
-    """Application factory for the ERP platform."""
+from modules import resolve as resolve_modules  # noqa: E402
+from startup import StartupProfile  # noqa: E402
+
+
+def _extensions(app: Flask) -> list[str]:
+    """Инфраструктурные модули (у каждого install(app)) в порядке установки — только нужные этому конфигу."""
+    config = app.config
+    names = []
+    if config.get("DB_READONLY_ROUTING", True):
+        names.append("db_routing")          # движок чтения для отчётов/выгрузок (@read_only)
+    if config.get("METRICS_ENABLED", True):
+        names.append("db_metrics")          # SQL на запрос, /metrics
+    if config.get("TEMPLATE_CACHE_DIR") != "off":
+        names.append("template_cache")      # байткод шаблонов на диске — до первого обращения к app.jinja_env
+    names.append("static_assets")           # /assets/ — статика с отпечатком, gzip/br (asset_url в base.html)
+    names.append("uploads")                 # /media/ — фото по хэшу с долгим кэшем (карточки запчастей — ядро)
+    if config.get("PAGE_CACHE", True):
+        names.append("page_cache")          # кэш страниц-списков, 304 по ETag
+    if config.get("API_ENABLED", True):
+        names.append("rest_api")            # /api/v1 — JSON API ресурсов модулей
+    if config.get("CHANGE_FEED", True):
+        names.append("change_feed")         # /changes — лента изменений для живых экранов
+    names.append("health")                  # /healthz, /readyz — для балансировщика и systemd
+    return names
+
+
+def create_app(overrides: dict | None = None) -> Flask:
+    """Application factory for the ERP platform.
+
+    ``overrides`` are applied on top of :class:`Config` before extensions are
+    initialised (tests and benchmarks use it to point at their own database).
+    """
 
     app = Flask(__name__)
     app.config.from_object(Config)
-
-    # init extensions
-    db.init_app(app)
-    login_manager.init_app(app)
-    login_manager.login_view = "main.login"
-
-    # blueprints
-    from modules.spare_parts import bp as spare_parts_bp
-    from modules.maintenance import bp as maintenance_bp
-    from modules.tooling import bp as tooling_bp
-
-    app.register_blueprint(spare_parts_bp)
-    app.register_blueprint(maintenance_bp)
-    app.register_blueprint(tooling_bp)
-
-    from ui_routes import ui
-    app.register_blueprint(ui)  # домашняя "/"
+    if overrides:
+        app.config.update(overrides)
+    if app.config.get("TRUSTED_PROXIES"):
+        # за nginx remote_addr — адрес прокси: берём клиента из X-Forwarded-For (ограничение входа по IP, логи)
+        from werkzeug.middleware.proxy_fix import ProxyFix
+        n = int(app.config["TRUSTED_PROXIES"])
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=n, x_proto=n, x_host=n)
+
+    # STARTUP_PROFILE=1 — время каждого шага старта (см. startup.py)
+    profile = StartupProfile(app.config.get("STARTUP_PROFILE", False))
+
+    # только модули из ENABLED_MODULES (+ их зависимости); выключенные даже не импортируются
+    enabled = resolve_modules(app.config.get("ENABLED_MODULES"))
+    app.config["ENABLED_MODULES"] = tuple(enabled)
+
+    # init extensions: инфраструктурные модули импортируются, только если включены (см. _extensions)
+    with profile.step("extensions"):
+        import db_profile
+        db_profile.configure(app)       # движки создаются в init_app — опции нужны до него
+        db.init_app(app)
+        db_profile.install_hooks(app)
+        for name in _extensions(app):
+            importlib.import_module(name).install(app)
+        login_manager.init_app(app)
+        login_manager.login_view = "main.login"
+
+    # blueprints включённых модулей
+    for name in enabled:
+        with profile.step(f"module {name}"):
+            module = importlib.import_module(f"modules.{name}")  # models + routes модуля
+            app.register_blueprint(module.bp)
+            if app.config.get("API_ENABLED", True):
+                importlib.import_module(f"modules.{name}.api")   # ресурсы /api/v1 модуля
+
+    with profile.step("ui"):
+        from ui_routes import ui
+        app.register_blueprint(ui)  # домашняя "/"
 
     # DB
     with app.app_context():
-        # Важно: модели должны быть импортированы до create_all()
-        from modules.spare_parts import models as spare_parts_models  # noqa: F401
-        from modules.maintenance import models as maintenance_models  # noqa: F401
-        from modules.tooling import models as tooling_models  # noqa: F401
-
-        db.create_all()
-
-    # uploads dir
-    os.makedirs(app.config.get("UPLOAD_FOLDER", "uploads"), exist_ok=True)
-
-    # --- доступы в шаблоны Jinja ---
-    from permissions import (
-        can_equipment_create,
-        can_equipment_edit,
-        can_equipment_delete,
-        can_tpl_create,
-        can_tpl_edit,
-        can_tpl_delete,
-        can_plan_create,
-        can_plan_edit,
-        can_plan_delete,
-        can_run_scheduler,
-        can_wo_fill,
-        can_wo_reopen,
-        can_wo_create_quick,
-        can_wo_delete,
-    )
-
+        # вместо create_all(): одна строка schema_version на базу, миграции — только если схема отстала
+        if app.config.get("SCHEMA_CHECK_ON_START", True):  # migrate.py управляет схемой сам
+            with profile.step("schema check"):
+                import migrations
+                migrations.ensure_schema(app)
+
+        if "tooling" in enabled:
+            with profile.step("tooling ingest"):
+                from modules.tooling import ingest
+                ingest.init_app(app)
+
+    # --- доступы и включённые модули в шаблоны Jinja ---
     @app.context_processor
     def inject_perms():
+        import permissions  # первый рендер, а не старт воркера
+
         return dict(
-            can_equipment_create=can_equipment_create,
-            can_equipment_edit=can_equipment_edit,
-            can_equipment_delete=can_equipment_delete,
-            can_tpl_create=can_tpl_create, can_tpl_edit=can_tpl_edit, can_tpl_delete=can_tpl_delete,
-            can_plan_create=can_plan_create, can_plan_edit=can_plan_edit, can_plan_delete=can_plan_delete,
-            can_run_scheduler=can_run_scheduler,
-            can_wo_fill=can_wo_fill, can_wo_reopen=can_wo_reopen, can_wo_create_quick=can_wo_create_quick,
-            can_wo_delete=can_wo_delete,
+            module_enabled=lambda name: name in enabled,
+            caps=permissions.capabilities(),  # права пользователя — один раз на рендер, в циклах 'x' in caps
+            **permissions.TEMPLATE_HELPERS,
         )
 
+    # все шаблоны — сразу, а не на первых запросах (мастер gunicorn: воркеры наследуют их через fork)
+    if app.config.get("TEMPLATE_WARMUP", "auto") not in (False, "0"):
+        import template_cache
+        if template_cache.warmup_enabled(app):
+            with profile.step("templates"):
+                template_cache.warm_up(app)
+
+    profile.finish(app)
     return app
 
 if __name__ == "__main__":
+    # сервер разработки; в цеху — python serve.py (gunicorn, см. run.sh)
     app = create_app()
-    app.run(debug=True)
+    app.run(debug=os.getenv("FLASK_DEBUG") == "1", threaded=True)
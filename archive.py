@@ -0,0 +1,347 @@
+# archive.py
+# -*- coding: utf-8 -*-
+"""
+Архив старых данных: события оснастки и закрытые Work Orders.
+
+- archive_old_rows()  — переносит строки старше горизонта (ARCHIVE_HORIZON_DAYS) в годовые архивные таблицы;
+- tool_events()       — история BATCH; архив подмешивается (UNION ALL) только если диапазон дат его задевает;
+                        с before/limit — окно истории (последние N событий и курсор на более старые);
+- tool_event_counts() — число событий BATCH по action (GROUP BY в SQL), с архивом или без;
+- find_workorder()    — чтение WO, который уже уехал в архив.
+
+Где лежит архив:
+- SQLite с файловой базой → отдельный файл на год <ARCHIVE_DIR>/<база>_<год>.db, подключается через ATTACH
+  под схемой archive_<год> (имена таблиц внутри те же: archive_2023.tooling_events).
+  SQLite позволяет не больше 10 ATTACH на соединение: одновременно подключается не больше ATTACH_LIMIT лет,
+  лишние годовые файлы отключаются (DETACH), а чтение многолетней истории идёт пачками по ATTACH_LIMIT лет;
+- PostgreSQL / SQLite in-memory → таблицы <table>_archive_<год> в той же базе.
+
+Что переносится:
+- tooling_events — всё старше горизонта, КРОМЕ последнего события каждого BATCH
+  (по нему last_aggregate() считает текущий статус);
+- workorders (+ их workorder_items) — закрытые (done/rejected) по closed_at; WO с вложениями остаются в горячей таблице.
+
+В режиме WAL коммит, задевающий основной и годовой файл, не атомарен между файлами: если процесс упал между
+ними, строки остаются и в горячей таблице, и в архиве. Поэтому вставка в архив идемпотентна (NOT EXISTS по id) —
+следующий запуск просто дочищает горячую таблицу.
+
+Горячие таблицы после архивации остаются маленькими и помещаются в page cache.
+"""
+
+import os
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from typing import Iterable, Optional
+
+import sqlalchemy as sa
+from flask import current_app
+
+from extensions import db
+from keyset import older_than
+from models import ArchiveWatermark
+
+BATCH_SIZE = 5000
+ATTACH_LIMIT = 9   # SQLITE_MAX_ATTACHED по умолчанию 10; одно место — про запас
+CLOSED_WO_STATUSES = ("done", "rejected")
+
+# Индексы внутри архивных таблиц — только под чтение истории
+_ARCHIVE_INDEXES = {
+    "tooling_events": [("tool_id", "happened_at")],
+    "workorders": [("equipment_id", "closed_at")],
+    "workorder_items": [("workorder_id",)],
+}
+
+# Отдельные метаданные: архивные таблицы не должны попадать в db.create_all()
+_archive_meta = sa.MetaData()
+
+
+# ----------------------------- ГДЕ ЛЕЖИТ АРХИВ ----------------------------- #
+def _uses_attached_files(engine) -> bool:
+    return engine.dialect.name == "sqlite" and engine.url.database not in (None, "", ":memory:")
+
+
+def _schema(year: int) -> str:
+    return f"archive_{year}"
+
+
+def _archive_file(year: int) -> str:
+    main_db = db.engine.url.database
+    folder = current_app.config.get("ARCHIVE_DIR") or os.path.join(os.path.dirname(os.path.abspath(main_db)), "archive")
+    os.makedirs(folder, exist_ok=True)
+    stem = os.path.splitext(os.path.basename(main_db))[0]
+    return os.path.join(folder, f"{stem}_{year}.db")
+
+
+def archive_table(hot: sa.Table, year: int) -> sa.Table:
+    """Таблица-двойник `hot` за год `year` (без FK и дефолтов — архив только читают)."""
+    if _uses_attached_files(db.engine):
+        name, schema = hot.name, _schema(year)
+    else:
+        name, schema = f"{hot.name}_archive_{year}", None
+
+    key = f"{schema}.{name}" if schema else name
+    if key in _archive_meta.tables:
+        return _archive_meta.tables[key]
+
+    cols = [sa.Column(c.name, c.type, primary_key=c.primary_key, autoincrement=False) for c in hot.columns]
+    table = sa.Table(name, _archive_meta, *cols, schema=schema)
+    for n, idx_cols in enumerate(_ARCHIVE_INDEXES.get(hot.name, []), start=1):
+        sa.Index(f"idx_{name}_{n}", *(table.c[c] for c in idx_cols))
+    return table
+
+
+def _attach(conn, years: Iterable[int]) -> None:
+    """
+    ATTACH годовых файлов на текущее соединение (только SQLite; вызывать ДО любых INSERT/DELETE).
+    Не больше ATTACH_LIMIT лет за раз; ранее подключённые годы, которые сейчас не нужны, отключаются.
+    """
+    if not _uses_attached_files(conn.engine):
+        return
+    wanted = {_schema(y): y for y in years}
+    if len(wanted) > ATTACH_LIMIT:
+        raise ValueError(f"{len(wanted)} archive years requested, at most {ATTACH_LIMIT} can be attached at once")
+    attached = {row[1] for row in conn.exec_driver_sql("PRAGMA database_list") if row[1].startswith("archive_")}
+    for schema in attached - wanted.keys():
+        conn.exec_driver_sql(f"DETACH DATABASE {schema}")
+    for schema, year in wanted.items():
+        if schema not in attached:
+            conn.exec_driver_sql(f"ATTACH DATABASE ? AS {schema}", (_archive_file(year),))
+
+
+def _year_chunks(years: list[int]) -> list[list[int]]:
+    """Годы пачками, каждую можно подключить целиком (для PostgreSQL/in-memory — одной пачкой)."""
+    if not years or not _uses_attached_files(db.engine):
+        return [years]
+    return [years[i:i + ATTACH_LIMIT] for i in range(0, len(years), ATTACH_LIMIT)]
+
+
+def _copy_missing(arch: sa.Table, src: sa.Table, cond) -> int:
+    """INSERT … SELECT строк src под cond, которых ещё нет в архиве (по id) — повтор после сбоя ничего не ломает."""
+    done = arch.alias("archived")   # в годовом файле таблица называется так же, как горячая
+    already = sa.exists().where(done.c.id == src.c.id)
+    res = db.session.execute(arch.insert().from_select(
+        [c.name for c in src.columns], sa.select(*src.columns).where(cond, ~already)))
+    return res.rowcount or 0
+
+
+# ------------------------------- ПЕРЕНОС ------------------------------------ #
+def _move(hot: sa.Table, date_col, cond, children=()) -> dict:
+    """
+    Переносит строки `hot`, подходящие под `cond`, в архив года `date_col`.
+    children — [(дочерняя таблица, имя FK-колонки)]: их строки уезжают в архив того же года вместе с родителем.
+    Пачками по BATCH_SIZE, коммит после каждой пачки — длинных блокировок нет.
+    """
+    moved = {hot.name: 0, **{child.name: 0 for child, _ in children}}
+    year_col = sa.extract("year", date_col)
+    years = sorted(int(y) for (y,) in db.session.execute(sa.select(sa.distinct(year_col)).where(cond)) if y)
+    if not years:
+        return moved
+
+    for year in years:
+        _attach(db.session.connection(), [year])
+        conn = db.session.connection()
+        archive_table(hot, year).create(conn, checkfirst=True)
+        for child, _ in children:
+            archive_table(child, year).create(conn, checkfirst=True)
+        db.session.commit()
+
+        arch = archive_table(hot, year)
+        year_cond = sa.and_(cond, date_col >= datetime(year, 1, 1), date_col < datetime(year + 1, 1, 1))
+        while True:
+            # после commit сессия может взять другое соединение из пула — ATTACH проверяем заново
+            _attach(db.session.connection(), [year])
+            ids = [r[0] for r in db.session.execute(
+                sa.select(hot.c.id).where(year_cond).order_by(hot.c.id).limit(BATCH_SIZE))]
+            if not ids:
+                break
+            for child, fk_name in children:
+                fk = child.c[fk_name]
+                moved[child.name] += _copy_missing(archive_table(child, year), child, fk.in_(ids))
+                db.session.execute(child.delete().where(fk.in_(ids)))
+            _copy_missing(arch, hot, hot.c.id.in_(ids))
+            db.session.execute(hot.delete().where(hot.c.id.in_(ids)))
+            db.session.commit()
+            moved[hot.name] += len(ids)
+    return moved | {"_years": years}
+
+
+def _bump_watermark(table_name: str, cutoff: datetime, years: list[int]) -> None:
+    wm = db.session.get(ArchiveWatermark, table_name)
+    if wm is None:
+        wm = ArchiveWatermark(table_name=table_name, archived_before=cutoff, years="")
+        db.session.add(wm)
+    wm.archived_before = max(wm.archived_before, cutoff)
+    wm.years = ",".join(str(y) for y in sorted(set(wm.year_list) | set(years)))
+    db.session.commit()
+
+
+def archive_tooling_events(cutoff: datetime) -> int:
+    from modules.tooling.models import ToolingEvent
+
+    ev = ToolingEvent.__table__
+    later = ev.alias("later")
+    has_later = sa.exists().where(
+        later.c.tool_id == ev.c.tool_id,
+        sa.or_(later.c.happened_at > ev.c.happened_at,
+               sa.and_(later.c.happened_at == ev.c.happened_at, later.c.id > ev.c.id)),
+    )
+    moved = _move(ev, ev.c.happened_at, sa.and_(ev.c.happened_at < cutoff, has_later))
+    if moved.get("_years"):
+        _bump_watermark(ev.name, cutoff, moved["_years"])
+    return moved[ev.name]
+
+
+def archive_workorders(cutoff: datetime) -> tuple[int, int]:
+    from modules.maintenance.models import WorkOrder, WorkOrderAttachment, WorkOrderItem
+
+    wo = WorkOrder.__table__
+    att = WorkOrderAttachment.__table__
+    items = WorkOrderItem.__table__
+    cond = sa.and_(
+        wo.c.status.in_(CLOSED_WO_STATUSES),
+        wo.c.closed_at.isnot(None),
+        wo.c.closed_at < cutoff,
+        ~sa.exists().where(att.c.workorder_id == wo.c.id),
+    )
+    moved = _move(wo, wo.c.closed_at, cond, children=[(items, "workorder_id")])
+    if moved.get("_years"):
+        _bump_watermark(wo.name, cutoff, moved["_years"])
+    return moved[wo.name], moved[items.name]
+
+
+def archive_old_rows(horizon_days: Optional[int] = None, now: Optional[datetime] = None) -> dict:
+    """Переносит в архив всё старше горизонта. Возвращает число перенесённых строк по таблицам."""
+    if horizon_days is None:
+        horizon_days = current_app.config.get("ARCHIVE_HORIZON_DAYS", 730)
+    cutoff = (now or datetime.utcnow()) - timedelta(days=horizon_days)
+
+    events = archive_tooling_events(cutoff)
+    workorders, items = archive_workorders(cutoff)
+    return {"tooling_events": events, "workorders": workorders, "workorder_items": items}
+
+
+# ------------------------------- ЧТЕНИЕ ------------------------------------- #
+def archived_before(table_name: str) -> Optional[datetime]:
+    """Граница архива: всё, что новее, гарантированно лежит в горячей таблице."""
+    wm = db.session.get(ArchiveWatermark, table_name)
+    return wm.archived_before if wm and wm.years else None
+
+
+def _years_needed(table_name: str, date_from: Optional[datetime], date_to: Optional[datetime]) -> list[int]:
+    wm = db.session.get(ArchiveWatermark, table_name)
+    if wm is None or not wm.years:
+        return []
+    if date_from is not None and date_from >= wm.archived_before:
+        return []
+    lo = date_from.year if date_from else 0
+    hi = min(date_to.year if date_to else 9999, wm.archived_before.year)
+    return [y for y in wm.year_list if lo <= y <= hi]
+
+
+def tool_events(tool_id: int, date_from: Optional[datetime] = None, date_to: Optional[datetime] = None,
+                newest_first: bool = True, include_archive: bool = True,
+                before: Optional[tuple] = None, limit: Optional[int] = None) -> list:
+    """
+    События BATCH за [date_from, date_to) — строки (Row) с теми же полями, что у ToolingEvent.
+    Горячая таблица читается всегда; годовые архивы — только если include_archive
+    и диапазон заходит за границу архива.
+    before=(happened_at, id) и limit — окно истории (keyset.py): limit событий старше курсора,
+    каждая таблица отдаёт не больше limit строк по индексу (tool_id, happened_at, id).
+    """
+    from modules.tooling.models import ToolingEvent
+
+    ev = ToolingEvent.__table__
+
+    def _order(cols):
+        if newest_first:
+            return cols.happened_at.desc(), cols.id.desc()
+        return cols.happened_at.asc(), cols.id.asc()
+
+    def _select(table):
+        stmt = sa.select(*table.columns).where(table.c.tool_id == tool_id)
+        if date_from is not None:
+            stmt = stmt.where(table.c.happened_at >= date_from)
+        if date_to is not None:
+            stmt = stmt.where(table.c.happened_at < date_to)
+        if before is not None:
+            stmt = stmt.where(older_than(table.c.happened_at, table.c.id, before))
+        return stmt
+
+    def _member(table):
+        stmt = _select(table)
+        if limit is None:
+            return stmt
+        sub = stmt.order_by(*_order(table.c)).limit(limit).subquery()
+        return sa.select(*sub.c)
+
+    def _run(tables):
+        if len(tables) == 1:
+            src = tables[0]
+            stmt = _select(src)
+        else:
+            src = sa.union_all(*(_member(t) for t in tables)).subquery()
+            stmt = sa.select(*src.c)
+        stmt = stmt.order_by(*_order(src.c))
+        if limit is not None:
+            stmt = stmt.limit(limit)
+        return db.session.execute(stmt).all()
+
+    years = _years_needed(ev.name, date_from, date_to) if include_archive else []
+    chunks = _year_chunks(years)
+    rows = []
+    for n, chunk in enumerate(chunks):
+        _attach(db.session.connection(), chunk)
+        rows += _run(([ev] if n == 0 else []) + [archive_table(ev, y) for y in chunk])
+    if len(chunks) > 1:
+        # больше ATTACH_LIMIT лет — пачки читались отдельно, сливаем их здесь
+        rows.sort(key=lambda r: (r.happened_at, r.id), reverse=newest_first)
+        rows = rows[:limit] if limit is not None else rows
+    return rows
+
+
+def tool_event_counts(tool_id: int, include_archive: bool = False) -> dict[str, int]:
+    """Число событий BATCH по action — GROUP BY по индексу (tool_id, action), без чтения самих событий."""
+    from modules.tooling.models import ToolingEvent
+
+    ev = ToolingEvent.__table__
+    years = _years_needed(ev.name, None, None) if include_archive else []
+
+    counts: dict[str, int] = {}
+    for n, chunk in enumerate(_year_chunks(years)):
+        _attach(db.session.connection(), chunk)
+        for table in ([ev] if n == 0 else []) + [archive_table(ev, y) for y in chunk]:
+            stmt = (sa.select(table.c.action, sa.func.count())
+                    .where(table.c.tool_id == tool_id).group_by(table.c.action))
+            for action, k in db.session.execute(stmt):
+                counts[action] = counts.get(action, 0) + k
+    return counts
+
+
+def find_workorder(wid: int):
+    """WO из архива в форме, пригодной для workorder_view.html (или None, если такого нет)."""
+    from modules.maintenance.models import ChecklistItem, ChecklistTemplate, Equipment, WorkOrder, WorkOrderItem
+
+    wm = db.session.get(ArchiveWatermark, WorkOrder.__tablename__)
+    if wm is None or not wm.years:
+        return None
+
+    wo_tbl, items_tbl = WorkOrder.__table__, WorkOrderItem.__table__
+    for year in reversed(wm.year_list):
+        _attach(db.session.connection(), [year])
+        arch = archive_table(wo_tbl, year)
+        row = db.session.execute(sa.select(arch).where(arch.c.id == wid)).first()
+        if row is None:
+            continue
+        arch_items = archive_table(items_tbl, year)
+        item_rows = db.session.execute(
+            sa.select(arch_items).where(arch_items.c.workorder_id == wid).order_by(arch_items.c.id)).all()
+        checklist = {ci.id: ci for ci in ChecklistItem.query.filter(
+            ChecklistItem.id.in_([r.checklist_item_id for r in item_rows])).all()}
+        return SimpleNamespace(
+            **row._mapping,
+            archived=True,
+            equipment=db.session.get(Equipment, row.equipment_id),
+            template=db.session.get(ChecklistTemplate, row.template_id),
+            items=[SimpleNamespace(**r._mapping, checklist_item=checklist.get(r.checklist_item_id)) for r in item_rows],
+        )
+    return None
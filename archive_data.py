@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+"""
+archive_data.py — перенос старых событий оснастки и закрытых WO в архив (см. archive.py).
+
+Режимы:
+- python archive_data.py                     → горизонт из конфига (ARCHIVE_HORIZON_DAYS, по умолчанию 730 дней)
+- python archive_data.py --horizon-days 365  → всё старше года
+
+Безопасно запускать по cron: переносит пачками, повторный запуск ничего не дублирует.
+"""
+
+import argparse
+
+from app import create_app
+import archive
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Archive old tooling events and closed work orders")
+    parser.add_argument("--horizon-days", type=int, default=None,
+                        help="архивировать строки старше N дней (по умолчанию ARCHIVE_HORIZON_DAYS)")
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        moved = archive.archive_old_rows(horizon_days=args.horizon_days)
+    for table, count in moved.items():
+        print(f"→ {table}: перенесено {count}")
+    print("✔ Готово.")
+
+
+if __name__ == "__main__":
+    main()
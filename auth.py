@@ -0,0 +1,265 @@
+# -*- coding: utf-8 -*-
+"""
+Вход и текущий пользователь без лишних походов в БД.
+
+- Кэш принципалов (id, username, role) по id: load_user() берёт пользователя отсюда, а не
+  SELECT из users на каждом запросе. Время жизни — USER_CACHE_TTL секунд (0 — кэш выключен).
+  Изменение/удаление User сбрасывает запись в этом процессе сразу после commit,
+  остальные воркеры увидят изменение не позже чем через TTL.
+- Ограничение попыток входа: после LOGIN_MAX_FAILURES неудач за LOGIN_WINDOW_SECONDS по имени
+  пользователя вход закрыт до конца окна. У IP свой, намного больший предел LOGIN_MAX_FAILURES_PER_IP
+  (0 — без него): за одним адресом стоят общие терминалы цеха, а за прокси без TRUSTED_PROXIES — вообще все.
+  Хранилище — память процесса (LOGIN_THROTTLE_BACKEND=memory) или общий для воркеров SQLite-файл
+  (sqlite, LOGIN_THROTTLE_DB).
+- Стоимость хэша: PASSWORD_HASH_METHOD (формат werkzeug, например scrypt:32768:8:1 или pbkdf2:sha256:600000).
+  Пароль со старым методом перехэшируется при успешном входе. Для несуществующего имени
+  всё равно считается хэш — время ответа не выдаёт, есть ли такой пользователь.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing, contextmanager
+from functools import lru_cache
+
+from flask import current_app, has_app_context
+from flask_login import UserMixin
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from extensions import db
+from models import User
+
+DEFAULT_HASH_METHOD = "scrypt:32768:8:1"
+
+
+class Principal(UserMixin):
+    """Текущий пользователь без ORM-объекта и пароля."""
+
+    __slots__ = ("id", "username", "role")
+
+    def __init__(self, id: int, username: str, role: str):  # noqa: A002 — как у модели
+        self.id = id
+        self.username = username
+        self.role = role
+
+    def __repr__(self) -> str:  # pragma: no cover - debug helper
+        return f"<Principal {self.username} ({self.role})>"
+
+
+# ------------------------------ кэш принципалов ------------------------------ #
+class PrincipalCache:
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._items: dict[int, tuple[float, Principal]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int):
+        hit = self._items.get(user_id)
+        if hit is not None and hit[0] > time.monotonic():
+            return hit[1]
+        return None
+
+    def put(self, principal: Principal) -> None:
+        if self.ttl > 0:
+            with self._lock:
+                self._items[principal.id] = (time.monotonic() + self.ttl, principal)
+
+    def invalidate(self, user_ids=None) -> None:
+        with self._lock:
+            if user_ids is None:
+                self._items.clear()
+            for uid in user_ids or ():
+                self._items.pop(uid, None)
+
+
+def principal_cache() -> PrincipalCache:
+    cache = current_app.extensions.get("auth_principals")
+    if cache is None:
+        cache = current_app.extensions["auth_principals"] = PrincipalCache(
+            float(current_app.config.get("USER_CACHE_TTL", 60)))
+    return cache
+
+
+def load_principal(user_id: int):
+    """Principal по id: из кэша или одним SELECT (без пароля). None — пользователя нет."""
+    cache = principal_cache()
+    principal = cache.get(user_id)
+    if principal is None:
+        row = db.session.execute(select(User.id, User.username, User.role).where(User.id == user_id)).first()
+        if row is None:
+            return None
+        principal = Principal(row.id, row.username, row.role)
+        cache.put(principal)
+    return principal
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_changed_users(session, flush_context):
+    for obj in (*session.dirty, *session.deleted):
+        if isinstance(obj, User):
+            session.info.setdefault("changed_user_ids", set()).add(obj.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_principals(session):
+    ids = session.info.pop("changed_user_ids", None)
+    if ids and has_app_context() and "auth_principals" in current_app.extensions:
+        current_app.extensions["auth_principals"].invalidate(ids)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_changed_users(session):
+    session.info.pop("changed_user_ids", None)
+
+
+# ------------------------------ пароли ------------------------------ #
+def hash_method() -> str:
+    return current_app.config.get("PASSWORD_HASH_METHOD") or DEFAULT_HASH_METHOD
+
+
+def hash_password(password: str) -> str:
+    return generate_password_hash(password, method=hash_method())
+
+
+@lru_cache(maxsize=8)
+def _dummy_hash(method: str) -> str:
+    return generate_password_hash("not-a-password", method=method)
+
+
+def _hashed_with(pwhash: str, method: str) -> bool:
+    """Хэш сделан методом ``method`` (scrypt:n:r:p / pbkdf2:sha256:iterations)?"""
+    return pwhash.split("$", 1)[0] == method
+
+
+def authenticate(username: str, password: str):
+    """User при верном пароле, иначе None. Пароль со старым методом хэша перехэшируется (commit)."""
+    user = User.query.filter_by(username=username).first()
+    method = hash_method()
+    if user is None:
+        check_password_hash(_dummy_hash(method), password)  # то же время ответа, что и для существующего имени
+        return None
+    if not check_password_hash(user.password, password):
+        return None
+    if not _hashed_with(user.password, method):
+        user.password = generate_password_hash(password, method=method)
+        db.session.commit()
+    return user
+
+
+# ------------------------------ ограничение входа ------------------------------ #
+class MemoryThrottle:
+    """Неудачные попытки в памяти процесса: ключ -> отметки времени в окне."""
+
+    def __init__(self, max_failures: int, window: float, max_failures_per_ip: int = 0):
+        self.max_failures = max_failures
+        self.max_failures_per_ip = max_failures_per_ip
+        self.window = window
+        self._failures: dict[str, list[float]] = {}
+        self._lock = threading.Lock()
+
+    def limit(self, key: str) -> int:
+        """Предел неудач для ключа (0 — ключ не ограничивает)."""
+        return self.max_failures_per_ip if key.startswith("ip:") else self.max_failures
+
+    def _recent(self, key: str, now: float) -> list[float]:
+        stamps = [t for t in self._failures.get(key, ()) if t > now - self.window]
+        if stamps:
+            self._failures[key] = stamps
+        else:
+            self._failures.pop(key, None)
+        return stamps
+
+    def retry_after(self, *keys: str) -> float:
+        """Сколько секунд ждать до следующей попытки (0 — можно)."""
+        if self.max_failures <= 0:  # ограничение выключено
+            return 0.0
+        now = time.time()
+        wait = 0.0
+        with self._lock:
+            for key in keys:
+                limit = self.limit(key)
+                stamps = self._recent(key, now)
+                if limit > 0 and len(stamps) >= limit:
+                    wait = max(wait, stamps[-limit] + self.window - now)
+        return wait
+
+    def failure(self, *keys: str) -> None:
+        now = time.time()
+        with self._lock:
+            if len(self._failures) > 10_000:  # перебор случайных имён/адресов не должен съесть память
+                for key in list(self._failures):
+                    self._recent(key, now)
+            for key in keys:
+                self._failures.setdefault(key, []).append(now)
+
+    def reset(self, key: str) -> None:
+        with self._lock:
+            self._failures.pop(key, None)
+
+
+class SqliteThrottle(MemoryThrottle):
+    """То же, но в SQLite-файле — общее для всех воркеров хоста."""
+
+    def __init__(self, max_failures: int, window: float, path: str, max_failures_per_ip: int = 0):
+        super().__init__(max_failures, window, max_failures_per_ip)
+        self.path = path
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS login_failures (key TEXT NOT NULL, at REAL NOT NULL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_login_failures_key ON login_failures (key, at)")
+
+    @contextmanager
+    def _connect(self):
+        with closing(sqlite3.connect(self.path, timeout=5)) as conn, conn:  # commit и close
+            yield conn
+
+    def retry_after(self, *keys: str) -> float:
+        if self.max_failures <= 0:
+            return 0.0
+        now = time.time()
+        wait = 0.0
+        with self._connect() as conn:
+            for key in keys:
+                limit = self.limit(key)
+                if limit <= 0:
+                    continue
+                stamps = [r[0] for r in conn.execute(
+                    "SELECT at FROM login_failures WHERE key = ? AND at > ? ORDER BY at DESC LIMIT ?",
+                    (key, now - self.window, limit))]
+                if len(stamps) >= limit:
+                    wait = max(wait, stamps[-1] + self.window - now)
+        return wait
+
+    def failure(self, *keys: str) -> None:
+        now = time.time()
+        with self._connect() as conn:
+            conn.executemany("INSERT INTO login_failures (key, at) VALUES (?, ?)", [(k, now) for k in keys])
+            conn.execute("DELETE FROM login_failures WHERE at <= ?", (now - self.window,))
+
+    def reset(self, key: str) -> None:
+        with self._connect() as conn:
+            conn.execute("DELETE FROM login_failures WHERE key = ?", (key,))
+
+
+def login_throttle():
+    throttle = current_app.extensions.get("auth_throttle")
+    if throttle is None:
+        cfg = current_app.config
+        max_failures, window = int(cfg.get("LOGIN_MAX_FAILURES", 5)), float(cfg.get("LOGIN_WINDOW_SECONDS", 300))
+        per_ip = int(cfg.get("LOGIN_MAX_FAILURES_PER_IP", 100))
+        if (cfg.get("LOGIN_THROTTLE_BACKEND") or "memory").lower() == "sqlite":
+            path = cfg.get("LOGIN_THROTTLE_DB") or os.path.join(current_app.instance_path, "login_throttle.db")
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            throttle = SqliteThrottle(max_failures, window, path, per_ip)
+        else:
+            throttle = MemoryThrottle(max_failures, window, per_ip)
+        current_app.extensions["auth_throttle"] = throttle
+    return throttle
+
+
+def throttle_keys(username: str, remote_addr: str | None) -> tuple[str, str]:
+    """Ключи имени и адреса. remote_addr — адрес клиента, только если прокси учтён (TRUSTED_PROXIES)."""
+    return f"user:{username.strip().lower()}", f"ip:{remote_addr or '-'}"
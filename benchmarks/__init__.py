@@ -0,0 +1 @@
+"""Benchmarks and performance checks (run as ``python -m benchmarks.<name>``)."""
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""
+bench_cold_start.py — цена проверки схемы при старте воркера: db.create_all() против schema_version.
+
+Готовит SQLite-файл (схема по миграциям), затем --runs раз для каждого варианта:
+новое соединение (dispose пула) + create_all() (как было) / migrations.ensure_schema() (как стало).
+Отдельно — полное время create_app() на уже готовой базе и «холодный» старт процесса
+(как новый воркер gunicorn: интерпретатор + импорт + create_app) для разных ENABLED_MODULES.
+
+Запуск:
+    python -m benchmarks.bench_cold_start
+    DATABASE_URI=postgresql://... python -m benchmarks.bench_cold_start --runs 50
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+def _measure(fn, runs: int) -> float:
+    samples = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(samples)
+
+
+def _statements(fn) -> int:
+    """Сколько SQL-запросов (round-trip к БД) делает fn."""
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    count = 0
+
+    def _inc(*_args):
+        nonlocal count
+        count += 1
+
+    event.listen(Engine, "before_cursor_execute", _inc)
+    try:
+        fn()
+    finally:
+        event.remove(Engine, "before_cursor_execute", _inc)
+    return count
+
+
+MODULE_SETS = ("spare_parts", "spare_parts,maintenance", "spare_parts,maintenance,tooling")
+
+
+def _cold_process(overrides: dict, modules: str) -> float:
+    """Время (мс) нового процесса: импорт app + create_app() с заданными модулями."""
+    code = ("import time; t0 = time.perf_counter(); from app import create_app; "
+            f"create_app({{**{overrides!r}, 'ENABLED_MODULES': {modules!r}}}); "
+            "print((time.perf_counter() - t0) * 1000)")
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Worker cold start: create_all() vs schema_version check")
+    parser.add_argument("--runs", type=int, default=30)
+    parser.add_argument("--processes", type=int, default=5, help="холодных процессов на набор модулей")
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="bench_cold_")
+    overrides = {"TOOLING_INGEST_WORKER": "off"}
+    if not os.getenv("DATABASE_URI"):
+        overrides["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        overrides["SQLALCHEMY_BINDS"] = {"tooling_queue": f"sqlite:///{os.path.join(tmp, 'queue.db')}"}
+
+    from app import create_app
+    from extensions import db
+    import migrations
+
+    create_app(overrides)  # первая загрузка: миграции применяются здесь
+    app = create_app({**overrides, "SCHEMA_CHECK_ON_START": False})
+
+    with app.app_context():
+        def _fresh():
+            for engine in db.engines.values():
+                engine.dispose()
+
+        def legacy():
+            _fresh()
+            db.create_all()
+
+        def versioned():
+            _fresh()
+            migrations.ensure_schema(app)
+
+        t_legacy, q_legacy = _measure(legacy, args.runs), _statements(legacy)
+        t_versioned, q_versioned = _measure(versioned, args.runs), _statements(versioned)
+
+    t_app = _measure(lambda: create_app(overrides), args.runs)
+
+    print(f"create_all() per boot:         {t_legacy:8.2f} ms, {q_legacy} SQL statements (median of {args.runs})")
+    print(f"schema_version check per boot: {t_versioned:8.2f} ms, {q_versioned} SQL statements")
+    print(f"create_app() total:            {t_app:8.2f} ms")
+
+    print(f"\ncold worker process (import + create_app, median of {args.processes}):")
+    for modules in MODULE_SETS:
+        t_cold = statistics.median(_cold_process(overrides, modules) for _ in range(args.processes))
+        print(f"  ENABLED_MODULES={modules:<34}{t_cold:8.1f} ms")
+    print("per-step breakdown: STARTUP_PROFILE=1 python -c 'from app import create_app; create_app()'")
+
+
+if __name__ == "__main__":
+    main()
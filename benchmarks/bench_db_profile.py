@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+"""
+bench_db_profile.py — конкурентные чтение/запись: DB_PROFILE=default против production.
+
+Для каждого профиля: свежая SQLite-база во временном файле, сев (инструменты + события),
+затем N процессов-писателей (INSERT события + commit, как POST /tooling/event) и
+M процессов-читателей (список BATCH # с последним событием + история одного инструмента)
+работают --seconds секунд. Процессы — как воркеры gunicorn: у каждого своё приложение и пул.
+
+Запуск:
+    python -m benchmarks.bench_db_profile
+    python -m benchmarks.bench_db_profile --writers 4 --readers 8 --seconds 10
+"""
+
+import argparse
+import multiprocessing as mp
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+PROFILES = ("default", "production")
+
+
+def _app(path: str, profile: str):
+    from app import create_app
+    return create_app({"SQLALCHEMY_DATABASE_URI": f"sqlite:///{path}",
+                       "SQLALCHEMY_BINDS": {"tooling_queue": f"sqlite:///{path}.queue"},
+                       "DB_PROFILE": profile,
+                       "TOOLING_INGEST_WORKER": "off"})
+
+
+def _prepare(path: str, profile: str, tools: int, events: int) -> None:
+    from benchmarks.bench_tooling_query_plans import _seed
+    from extensions import db
+    app = _app(path, profile)
+    with app.app_context():
+        _seed(db, tools=tools, machines=20, events=events)
+        db.session.commit()
+
+
+def _worker(kind: str, path: str, profile: str, tools: int, seconds: float, start, out) -> None:
+    from datetime import datetime
+
+    from sqlalchemy import select
+    from sqlalchemy.exc import OperationalError
+
+    from extensions import db
+    from modules.tooling.models import ToolingEvent
+    from modules.tooling.repositories import tool_snapshots
+
+    app = _app(path, profile)
+    rnd = random.Random(os.getpid())
+    ops = errors = 0
+    latencies = []
+    with app.app_context():
+        start.wait()
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            t0 = time.perf_counter()
+            try:
+                if kind == "writer":
+                    tool_id = rnd.randint(1, tools)
+                    db.session.add(ToolingEvent(tool_id=tool_id, batch_no=f"IH-{tool_id:05d}", action="WASH",
+                                                happened_at=datetime.utcnow(), user_name="bench"))
+                    db.session.commit()
+                else:
+                    tool_snapshots()
+                    db.session.execute(select(ToolingEvent.id).where(ToolingEvent.tool_id == rnd.randint(1, tools))
+                                       .order_by(ToolingEvent.happened_at.desc()).limit(50)).all()
+                    db.session.rollback()  # закрыть транзакцию чтения, как в конце запроса
+                ops += 1
+                latencies.append(time.perf_counter() - t0)
+            except OperationalError:  # database is locked
+                db.session.rollback()
+                errors += 1
+    latencies.sort()
+    p95 = latencies[int(len(latencies) * 0.95)] if latencies else 0.0
+    out.put((kind, ops, errors, p95))
+
+
+def run_profile(profile: str, args) -> dict:
+    tmp = tempfile.mkdtemp(prefix=f"bench_db_{profile}_")
+    path = os.path.join(tmp, "bench.db")
+    _prepare(path, profile, args.tools, args.events)
+    ctx = mp.get_context("spawn")
+
+    start, out = ctx.Event(), ctx.Queue()
+    procs = [ctx.Process(target=_worker, args=(kind, path, profile, args.tools, args.seconds, start, out))
+             for kind in ["writer"] * args.writers + ["reader"] * args.readers]
+    for p in procs:
+        p.start()
+    time.sleep(args.warmup)  # импорт и создание приложений в дочерних процессах
+    start.set()
+    results = [out.get() for _ in procs]
+    for p in procs:
+        p.join()
+    shutil.rmtree(tmp, ignore_errors=True)
+
+    summary = {"profile": profile}
+    for kind in ("writer", "reader"):
+        rows = [r for r in results if r[0] == kind]
+        summary[f"{kind}_ops_s"] = sum(r[1] for r in rows) / args.seconds
+        summary[f"{kind}_errors"] = sum(r[2] for r in rows)
+        summary[f"{kind}_p95_ms"] = max((r[3] for r in rows), default=0.0) * 1000
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent read/write throughput per DB profile")
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--tools", type=int, default=500)
+    parser.add_argument("--events", type=int, default=50_000)
+    parser.add_argument("--warmup", type=float, default=3.0, help="пауза на старт процессов, с")
+    args = parser.parse_args()
+
+    rows = [run_profile(p, args) for p in PROFILES]
+    print(f"{'profile':<12}{'writes/s':>10}{'w p95 ms':>10}{'w locked':>10}"
+          f"{'reads/s':>10}{'r p95 ms':>10}{'r locked':>10}")
+    for r in rows:
+        print(f"{r['profile']:<12}{r['writer_ops_s']:>10.1f}{r['writer_p95_ms']:>10.1f}{r['writer_errors']:>10}"
+              f"{r['reader_ops_s']:>10.1f}{r['reader_p95_ms']:>10.1f}{r['reader_errors']:>10}")
+
+
+if __name__ == "__main__":
+    main()
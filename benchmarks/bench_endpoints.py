@@ -0,0 +1,350 @@
+# -*- coding: utf-8 -*-
+"""
+bench_endpoints.py — все маршруты приложения на «заводских» объёмах данных.
+
+Объёмы (--scale 1.0): 100k запчастей, 2k единиц оборудования, 10k планов ТО, 500k Work Orders
+(seed_maintenance.seed_bulk), 5k BATCH и 1M событий оснастки (seed_tooling.seed_bulk).
+Засеянная база (SQLite-файл) переиспользуется между запусками, пока не изменились объёмы.
+
+Каждый GET-маршрут всех blueprint'ов (параметры пути — id из засеянных данных) и горячая запись
+POST /tooling/event гоняются --repeat раз (но не дольше --max-seconds на маршрут) в двух режимах:
+- client — Flask test client в этом процессе;
+- wsgi   — локальный WSGI-сервер werkzeug + http.client (сокет, заголовки, cookie).
+Пропускаются: разрушающие POST (delete/reopen/run), logout, маршруты без данных (очередь событий)
+и поток /changes/stream (SSE не завершается до CHANGE_FEED_STREAM_SECONDS); /changes — с wait=0;
+GET /maintenance/form (QR) создаёт WO на каждый вызов — как на линии.
+
+Отчёт — JSON: p50/p95/p99/max мс, SQL-выражений на запрос (максимум), пик RSS процесса после маршрута.
+С базовой линией (--baseline, по умолчанию benchmarks/baselines/bench_endpoints_s<scale>.json, если есть)
+запуск падает с кодом 1, если маршрут стал медленнее (p95 > база * (1 + --tolerance) + --slack-ms),
+делает больше SQL-выражений, сменил код ответа или пик RSS вырос больше допуска.
+
+Запуск:
+    python -m benchmarks.bench_endpoints --scale 0.1                       # сравнить с сохранённой базой
+    python -m benchmarks.bench_endpoints --scale 0.1 --save-baseline       # записать новую базу
+    python -m benchmarks.bench_endpoints --mode client --routes tooling --out /tmp/endpoints.json
+"""
+
+import argparse
+import http.client
+import json
+import os
+import platform
+import re
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+try:  # пик RSS (на Windows модуля нет — колонка будет пустой)
+    import resource
+except ImportError:  # pragma: no cover
+    resource = None
+
+BASELINE_DIR = os.path.join(ROOT, "benchmarks", "baselines")
+VOLUMES = {"parts": 100_000, "equipment": 2_000, "plans": 10_000, "workorders": 500_000,
+           "tools": 5_000, "events": 1_000_000}
+BENCH_USER, BENCH_PASSWORD = "bench", "bench"
+
+SKIP = {
+    "static",
+    "main.logout",                    # завершает сессию бенчмарка
+    "tooling.api_events_status",      # нужен id события в очереди
+    "changes_stream",                 # SSE держит соединение CHANGE_FEED_STREAM_SECONDS (300 с)
+}
+QUERY = {  # параметры строки запроса (поиски; форма по QR — создаёт WO на каждый вызов, как на линии)
+    "main.search": lambda s: {"query": f"Part {s['part_id']}"},
+    "tooling.tooling_search": lambda s: {"q": s["batch_no"][:-1]},
+    "tooling.api_autocomplete": lambda s: {"q": s["batch_no"][:5]},
+    "maintenance.form_qr": lambda s: {"eq": "BM-0001", "tpl": "TPL-001"},
+    "changes_poll": lambda s: {"wait": 0},   # long-poll без ожидания — мерим чтение ленты, а не таймаут
+}
+WRITES = [  # (метка, endpoint, форма) — горячие записи, не разрушающие данные
+    ("POST /tooling/event WASH", "tooling.tooling_event",
+     lambda s: {"batch_no": f"IH-{s['tool_id']:05d}", "action": "WASH", "shift": "A"}),
+]
+
+
+# ------------------------------ данные ------------------------------ #
+def _volumes(scale: float) -> dict:
+    return {k: max(int(v * scale), 1) for k, v in VOLUMES.items()}
+
+
+def _overrides(path: str) -> dict:
+    return {"SQLALCHEMY_DATABASE_URI": f"sqlite:///{path}",
+            "SQLALCHEMY_BINDS": {"tooling_queue": f"sqlite:///{path}.queue"},
+            "TOOLING_INGEST_WORKER": "off",       # записи применяются в запросе, без фонового потока
+            "METRICS_ENABLED": False}
+
+
+def prepare_db(path: str, volumes: dict, reseed: bool = False) -> None:
+    """Засеять базу (или оставить готовую, если объёмы совпадают — см. <path>.json)."""
+    marker = f"{path}.json"
+    if not reseed and os.path.exists(path) and os.path.exists(marker):
+        with open(marker, encoding="utf-8") as f:
+            if json.load(f) == volumes:
+                return
+    for p in (path, f"{path}.queue", marker):
+        if os.path.exists(p):
+            os.remove(p)
+
+    from sqlalchemy import text
+    from werkzeug.security import generate_password_hash
+
+    from app import create_app
+    from extensions import db
+    from models import User
+    import seed_maintenance
+    import seed_tooling
+
+    app = create_app(_overrides(path))
+    t0 = time.perf_counter()
+    with app.app_context():
+        seed_maintenance.seed_bulk(volumes["parts"], volumes["equipment"], volumes["plans"], volumes["workorders"])
+        seed_tooling.seed_bulk(volumes["tools"], volumes["events"])
+        db.session.add(User(username=BENCH_USER, password=generate_password_hash(BENCH_PASSWORD), role="root"))
+        db.session.commit()
+        db.session.execute(text("ANALYZE"))
+        db.session.commit()
+    print(f"seeded {volumes} in {time.perf_counter() - t0:.1f}s", file=sys.stderr)
+    with open(marker, "w", encoding="utf-8") as f:
+        json.dump(volumes, f)
+
+
+def _samples(volumes: dict) -> dict:
+    """Значения параметров пути — «средние» строки засеянных данных."""
+    return {
+        "part_id": volumes["parts"] // 2 or 1,
+        "eid": volumes["equipment"] // 2 or 1,
+        "tid": 1,
+        "pid": volumes["plans"] // 2 or 1,
+        "wid": volumes["workorders"],          # свежий WO (с заполненным чек-листом)
+        "tool_id": volumes["tools"] // 2 or 1,
+        "batch_no": f"IH-{volumes['tools'] // 2 or 1:05d}",
+        "kind": "reasons",
+        "index": 0,
+    }
+
+
+def build_requests(app, volumes: dict, pattern: str | None = None) -> list[tuple[str, str, str, dict | None]]:
+    """[(метка, метод, url, форма)] для всех GET-маршрутов и горячих записей."""
+    samples = _samples(volumes)
+    out = []
+    with app.test_request_context():
+        from flask import url_for
+
+        for rule in app.url_map.iter_rules():
+            if rule.endpoint in SKIP or "GET" not in rule.methods:
+                continue
+            if any(arg not in samples for arg in rule.arguments):
+                continue
+            args = {a: samples[a] for a in rule.arguments}
+            query = QUERY[rule.endpoint](samples) if rule.endpoint in QUERY else {}
+            url = url_for(rule.endpoint, **args, **query)
+            out.append((f"GET {rule.rule}", "GET", url, None))
+        for label, endpoint, form in WRITES:
+            out.append((label, "POST", url_for(endpoint), form(samples)))
+    if pattern:
+        out = [r for r in out if re.search(pattern, r[0])]
+    return out
+
+
+# ------------------------------ клиенты ------------------------------ #
+class _ClientDriver:
+    """Flask test client (cookie хранит сам)."""
+
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method: str, url: str, form: dict | None):
+        resp = self.client.open(url, method=method, data=form)
+        resp.get_data()
+        resp.close()
+        return resp.status_code
+
+    def close(self):
+        pass
+
+
+class _WsgiDriver:
+    """Локальный WSGI-сервер в потоке и http.client с простейшей банкой cookie."""
+
+    def __init__(self, app):
+        from werkzeug.serving import WSGIRequestHandler, make_server
+
+        class _QuietHandler(WSGIRequestHandler):
+            def log_request(self, *args, **kwargs):
+                pass
+
+        self.server = make_server("127.0.0.1", 0, app, threaded=False, request_handler=_QuietHandler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.cookies: dict[str, str] = {}
+
+    def request(self, method: str, url: str, form: dict | None):
+        from urllib.parse import urlencode
+
+        conn = http.client.HTTPConnection("127.0.0.1", self.server.server_port, timeout=600)
+        headers = {"Cookie": "; ".join(f"{k}={v}" for k, v in self.cookies.items())}
+        body = None
+        if form is not None:
+            body = urlencode(form)
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+        conn.request(method, url, body=body, headers=headers)
+        resp = conn.getresponse()
+        resp.read()
+        for header in resp.headers.get_all("Set-Cookie") or []:
+            name, _, value = header.split(";", 1)[0].partition("=")
+            self.cookies[name.strip()] = value
+        conn.close()
+        return resp.status
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+DRIVERS = {"client": _ClientDriver, "wsgi": _WsgiDriver}
+
+
+def _peak_rss_mb() -> float | None:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)  # macOS — байты, Linux — КиБ
+
+
+def _percentile(sorted_ms: list[float], p: float) -> float:
+    return sorted_ms[min(int(len(sorted_ms) * p), len(sorted_ms) - 1)]
+
+
+def run_mode(app, mode: str, requests: list, repeat: int, max_seconds: float) -> dict:
+    from db_metrics import count_queries
+
+    driver = DRIVERS[mode](app)
+    results = {}
+    try:
+        status = driver.request("POST", "/parts/login", {"username": BENCH_USER, "password": BENCH_PASSWORD})
+        if status not in (302, 303):
+            raise RuntimeError(f"login failed ({status}): run with --reseed")
+        for label, method, url, form in requests:
+            driver.request(method, url, form)  # прогрев: шаблоны, кэши, page cache
+            latencies, queries = [], 0
+            deadline = time.perf_counter() + max_seconds
+            while len(latencies) < repeat and (not latencies or time.perf_counter() < deadline):
+                with count_queries() as counter:
+                    t0 = time.perf_counter()
+                    status = driver.request(method, url, form)
+                    latencies.append((time.perf_counter() - t0) * 1000)
+                queries = max(queries, counter.count)
+            latencies.sort()
+            results[label] = {
+                "url": url, "status": status, "n": len(latencies),
+                "p50_ms": round(statistics.median(latencies), 2),
+                "p95_ms": round(_percentile(latencies, 0.95), 2),
+                "p99_ms": round(_percentile(latencies, 0.99), 2),
+                "max_ms": round(latencies[-1], 2),
+                "queries": queries,
+                "rss_peak_mb": _peak_rss_mb(),
+            }
+            print(f"[{mode}] {label:<55}{results[label]['p95_ms']:>10.1f} ms p95 {queries:>6} q  {status}",
+                  file=sys.stderr)
+    finally:
+        driver.close()
+    return results
+
+
+# ------------------------------ база сравнения ------------------------------ #
+def compare(report: dict, baseline: dict, tolerance: float, slack_ms: float) -> list[str]:
+    """Список регрессий относительно базы (пустой — всё в порядке)."""
+    if baseline["meta"]["volumes"] != report["meta"]["volumes"]:
+        raise SystemExit(f"baseline volumes {baseline['meta']['volumes']} != run volumes {report['meta']['volumes']}")
+    problems = []
+    for mode, routes in report["results"].items():
+        for label, cur in routes.items():
+            base = baseline["results"].get(mode, {}).get(label)
+            if base is None:
+                continue
+            where = f"[{mode}] {label}"
+            if cur["status"] != base["status"]:
+                problems.append(f"{where}: status {base['status']} -> {cur['status']}")
+            if cur["queries"] > base["queries"]:
+                problems.append(f"{where}: {base['queries']} -> {cur['queries']} SQL statements per request")
+            limit = base["p95_ms"] * (1 + tolerance) + slack_ms
+            if cur["p95_ms"] > limit:
+                problems.append(f"{where}: p95 {base['p95_ms']:.1f} -> {cur['p95_ms']:.1f} ms (limit {limit:.1f})")
+    cur_rss, base_rss = report.get("peak_rss_mb"), baseline.get("peak_rss_mb")
+    if cur_rss and base_rss and cur_rss > base_rss * (1 + tolerance):
+        problems.append(f"peak RSS {base_rss} -> {cur_rss} MB")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latency / SQL / memory of every route on seeded volumes")
+    parser.add_argument("--scale", type=float, default=1.0, help="множитель объёмов (0.1 — в 10 раз меньше)")
+    parser.add_argument("--db", help="файл засеянной базы (по умолчанию во временном каталоге, переиспользуется)")
+    parser.add_argument("--reseed", action="store_true", help="засеять базу заново")
+    parser.add_argument("--mode", choices=["client", "wsgi", "both"], default="both")
+    parser.add_argument("--routes", help="регулярное выражение по метке маршрута («GET /tooling/…»)")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--max-seconds", type=float, default=10.0, help="не дольше N секунд на маршрут")
+    parser.add_argument("--out", help="куда записать JSON-отчёт (по умолчанию stdout)")
+    parser.add_argument("--baseline", help="JSON базовой линии для сравнения")
+    parser.add_argument("--save-baseline", nargs="?", const="", default=None,
+                        help="записать отчёт как базовую линию (путь по умолчанию — benchmarks/baselines/)")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="допустимый рост p95 / RSS (доля)")
+    parser.add_argument("--slack-ms", type=float, default=5.0, help="абсолютный допуск p95, мс")
+    args = parser.parse_args()
+
+    volumes = _volumes(args.scale)
+    path = args.db or os.path.join(tempfile.gettempdir(), f"erp_bench_endpoints_s{args.scale:g}.db")
+    prepare_db(path, volumes, args.reseed)
+
+    from app import create_app
+    app = create_app(_overrides(path))
+    requests = build_requests(app, volumes, args.routes)
+    modes = ["client", "wsgi"] if args.mode == "both" else [args.mode]
+
+    report = {
+        "meta": {"scale": args.scale, "volumes": volumes, "repeat": args.repeat,
+                 "python": platform.python_version(), "sqlite": sqlite3.sqlite_version,
+                 "machine": platform.machine(), "date": datetime.utcnow().isoformat(timespec="seconds")},
+        "results": {mode: run_mode(app, mode, requests, args.repeat, args.max_seconds) for mode in modes},
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    default_baseline = os.path.join(BASELINE_DIR, f"bench_endpoints_s{args.scale:g}.json")
+    if args.save_baseline is not None:
+        target = args.save_baseline or default_baseline
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(target, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+        print(f"baseline saved: {target}", file=sys.stderr)
+        return
+
+    baseline_path = args.baseline or (default_baseline if os.path.exists(default_baseline) else None)
+    if baseline_path:
+        with open(baseline_path, encoding="utf-8") as f:
+            problems = compare(report, json.load(f), args.tolerance, args.slack_ms)
+        for p in problems:
+            print(f"REGRESSION {p}", file=sys.stderr)
+        print(f"{len(problems)} regressions vs {baseline_path}", file=sys.stderr)
+        if problems:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
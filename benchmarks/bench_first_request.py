@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""
+bench_first_request.py — первые запросы нового воркера: компиляция шаблонов Jinja против template_cache.py.
+
+Для каждого режима --processes раз запускается новый процесс (как воркер после деплоя или max_requests):
+create_app(), вход, затем по одному GET на каждый --urls по порядку и ещё раз — уже прогретый.
+Режимы:
+- compile  — TEMPLATE_CACHE_DIR=off, без прогрева: каждый шаблон компилируется на своём первом запросе (как было);
+- bytecode — байткод на диске (наполнен build_templates.py), без прогрева: первый рендер читает готовый байткод;
+- warm-up  — байткод + прогрев всех шаблонов в create_app() (так работает мастер serve.py перед fork).
+Отчёт: старт create_app() и первый запрос по каждому маршруту, мс (медиана), в скобках — тот же запрос повторно.
+
+Запуск:
+    python -m benchmarks.bench_first_request --scale 0.01
+    python -m benchmarks.bench_first_request --processes 9 --urls /parts/,/maintenance/equipment
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from benchmarks.bench_endpoints import BENCH_PASSWORD, BENCH_USER, _overrides, _volumes, prepare_db  # noqa: E402
+
+URLS = ("/,/parts/,/parts/part/1,/parts/add,/parts/import,/maintenance/equipment,/maintenance/equipment/1,"
+        "/maintenance/plans,/maintenance/workorders?status=open,/tooling/,/tooling/report/installed")
+
+_CHILD = """
+import json, sys, time
+t0 = time.perf_counter()
+from app import create_app
+app = create_app(json.loads(sys.argv[1]))
+startup = (time.perf_counter() - t0) * 1000
+client = app.test_client()
+client.post("/parts/login", data={"username": sys.argv[3], "password": sys.argv[4]})
+first, again = {}, {}
+for url in sys.argv[2].split(","):
+    t0 = time.perf_counter()
+    status = client.get(url).status_code
+    first[url] = (time.perf_counter() - t0) * 1000
+    t0 = time.perf_counter()
+    client.get(url)
+    again[url] = (time.perf_counter() - t0) * 1000
+    if status != 200:
+        first[url] = again[url] = float("nan")
+print(json.dumps({"startup": startup, "first": first, "again": again}))
+"""
+
+
+def _run(overrides: dict, urls: str) -> dict:
+    out = subprocess.run([sys.executable, "-c", _CHILD, json.dumps(overrides), urls, BENCH_USER, BENCH_PASSWORD],
+                         cwd=ROOT, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="First-request latency of a fresh worker: Jinja compile vs bytecode cache")
+    parser.add_argument("--scale", type=float, default=0.01, help="объёмы данных (см. bench_endpoints)")
+    parser.add_argument("--db", help="файл засеянной базы (по умолчанию во временном каталоге, переиспользуется)")
+    parser.add_argument("--processes", type=int, default=5, help="новых процессов на режим (медиана)")
+    parser.add_argument("--urls", default=URLS)
+    args = parser.parse_args()
+
+    path = args.db or os.path.join(tempfile.gettempdir(), f"erp_bench_endpoints_s{args.scale:g}.db")
+    prepare_db(path, _volumes(args.scale))
+    base = {**_overrides(path), "PAGE_CACHE": False}
+    cache = tempfile.mkdtemp(prefix="bench_jinja_")
+    modes = {
+        "compile": {"TEMPLATE_CACHE_DIR": "off", "TEMPLATE_WARMUP": False},
+        "bytecode": {"TEMPLATE_CACHE_DIR": cache, "TEMPLATE_WARMUP": False},
+        "warm-up": {"TEMPLATE_CACHE_DIR": cache, "TEMPLATE_WARMUP": True},
+    }
+    _run({**base, **modes["warm-up"]}, "/")   # наполнить байткод, как build_templates.py
+
+    results = {}
+    for name, extra in modes.items():
+        runs = [_run({**base, **extra}, args.urls) for _ in range(args.processes)]
+        results[name] = {
+            "startup": statistics.median(r["startup"] for r in runs),
+            "first": {u: statistics.median(r["first"][u] for r in runs) for u in runs[0]["first"]},
+            "again": {u: statistics.median(r["again"][u] for r in runs) for u in runs[0]["again"]},
+        }
+
+    print(f"{'route':<38}" + "".join(f"{name:>20}" for name in modes))
+    print(f"{'create_app()':<38}" + "".join(f"{results[n]['startup']:>20.1f}" for n in modes))
+    for url in args.urls.split(","):
+        print(f"{url:<38}" + "".join(f"{results[n]['first'][url]:>11.1f} ({results[n]['again'][url]:>5.1f})"
+                                     for n in modes))
+    totals = {n: sum(results[n]["first"].values()) for n in modes}
+    print(f"{'sum of first requests':<38}" + "".join(f"{totals[n]:>20.1f}" for n in modes))
+
+
+if __name__ == "__main__":
+    main()
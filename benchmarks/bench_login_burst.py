@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""
+bench_login_burst.py — начало смены: сотни операторов входят за пару минут.
+
+Для каждого метода хэша (PASSWORD_HASH_METHOD) — свежая SQLite-база с --users пользователями,
+затем --threads потоков (у каждого свой test client) входят всеми пользователями по кругу:
+входов в секунду, p50/p95 входа. После входа каждый клиент делает --requests запросов страницы
+с USER_CACHE_TTL=0 (SELECT users на каждый запрос, как было) и с кэшем принципалов.
+
+Запуск:
+    python -m benchmarks.bench_login_burst
+    python -m benchmarks.bench_login_burst --users 500 --threads 16 --methods scrypt:32768:8:1,pbkdf2:sha256:600000
+"""
+
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+METHODS = "scrypt:32768:8:1,pbkdf2:sha256:600000,pbkdf2:sha256:100000"
+PASSWORD = "shift-start"
+
+
+def _app(path: str, method: str, cache_ttl: float):
+    from app import create_app
+    return create_app({"SQLALCHEMY_DATABASE_URI": f"sqlite:///{path}",
+                       "SQLALCHEMY_BINDS": {"tooling_queue": f"sqlite:///{path}.queue"},
+                       "TOOLING_INGEST_WORKER": "off", "METRICS_ENABLED": False,
+                       "PASSWORD_HASH_METHOD": method, "USER_CACHE_TTL": cache_ttl,
+                       "LOGIN_MAX_FAILURES": 0})
+
+
+def _seed(app, users: int, method: str) -> None:
+    from werkzeug.security import generate_password_hash
+
+    from extensions import db
+    from models import User
+
+    pwhash = generate_password_hash(PASSWORD, method=method)  # один хэш на всех: сев не должен идти минутами
+    with app.app_context():
+        db.session.execute(User.__table__.insert(),
+                           [{"username": f"op{i:04d}", "password": pwhash, "role": "user"} for i in range(users)])
+        db.session.commit()
+
+
+def _burst(app, users: int, threads: int, requests: int):
+    """Все входы потоками; затем по requests GET на клиента. Возвращает (входов/с, p50, p95, мс/запрос)."""
+    clients = [app.test_client() for _ in range(threads)]
+    latencies, lock = [], threading.Lock()
+
+    def _login(n, client):
+        for i in range(n, users, threads):
+            t0 = time.perf_counter()
+            resp = client.post("/parts/login", data={"username": f"op{i:04d}", "password": PASSWORD})
+            assert resp.status_code == 302, resp.status_code
+            with lock:
+                latencies.append((time.perf_counter() - t0) * 1000)
+
+    def _browse(client):
+        for _ in range(requests):
+            client.get("/parts/")
+
+    t0 = time.perf_counter()
+    workers = [threading.Thread(target=_login, args=(n, c)) for n, c in enumerate(clients)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    login_seconds = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    workers = [threading.Thread(target=_browse, args=(c,)) for c in clients]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    browse_ms = (time.perf_counter() - t0) * 1000 / max(threads * requests, 1)
+
+    latencies.sort()
+    return (users / login_seconds, statistics.median(latencies),
+            latencies[int(len(latencies) * 0.95)], browse_ms)
+
+
+def _user_selects(app, requests: int) -> int:
+    """SELECT из users на requests запросов одного вошедшего клиента."""
+    from db_metrics import count_queries
+
+    client = app.test_client()
+    client.post("/parts/login", data={"username": "op0000", "password": PASSWORD})
+    with count_queries() as counter:
+        for _ in range(requests):
+            client.get("/parts/")
+    return sum("FROM users" in s for s in counter.statements)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Login burst per password hash method, user cache on/off")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=20, help="запросов страницы на клиента после входа")
+    parser.add_argument("--methods", default=METHODS)
+    args = parser.parse_args()
+
+    print(f"{'method':<26}{'cache':>7}{'logins/s':>10}{'p50 ms':>9}{'p95 ms':>9}{'req ms':>8}{'user SELECTs':>14}")
+    for method in args.methods.split(","):
+        tmp = tempfile.mkdtemp(prefix="bench_login_")
+        path = os.path.join(tmp, "bench.db")
+        _seed(_app(path, method, 0), args.users, method)
+        for ttl in (0, 60):
+            app = _app(path, method, ttl)
+            rate, p50, p95, req_ms = _burst(app, args.users, args.threads, args.requests)
+            selects = _user_selects(app, args.requests)
+            print(f"{method:<26}{'on' if ttl else 'off':>7}{rate:>10.1f}{p50:>9.1f}{p95:>9.1f}{req_ms:>8.2f}"
+                  f"{selects:>9} / {args.requests}")
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""
+bench_reorder.py — ночной пересчёт точек заказа (modules/spare_parts/reorder.py) на больших объёмах.
+
+Сев во временный файл SQLite: --parts запчастей, по 1–3 места хранения с остатком, --issues выдач
+за полгода (журнал stock_transactions), --machines единиц оборудования с BOM по 20 позиций
+и планом ТО на каждую; план берёт один из 50 шаблонов ТО по 5 запчастей (plan_parts).
+Затем reorder.recalculate() + commit, как в reorder_parts.py.
+Отчёт: время сева, время расчёта (цель — меньше минуты на 100k запчастей), строк, к заказу.
+
+Запуск:
+    python -m benchmarks.bench_reorder
+    python -m benchmarks.bench_reorder --parts 100000 --issues 1000000 --machines 2000
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+FREQUENCIES = ("daily", "weekly", "monthly", "quarterly", "yearly")
+TEMPLATES = 50
+
+
+def _seed(db, parts: int, issues: int, machines: int) -> None:
+    from sqlalchemy import insert
+
+    from modules.maintenance import services
+    from modules.maintenance.models import (ChecklistTemplate, ChecklistTemplateParts, Equipment, EquipmentParts,
+                                            MaintenancePlan)
+    from modules.spare_parts.models import Part, StockBalance, StockTransaction
+
+    rnd = random.Random(42)
+    now, today = datetime.utcnow(), date.today()
+    db.session.execute(insert(Part), [{"id": i, "sap_code": f"S{i:07d}", "name": "part"} for i in range(1, parts + 1)])
+    balances = {}
+    for i in range(1, parts + 1):
+        for loc in rnd.sample(("W1", "W2", "W3"), rnd.randint(1, 3)):
+            balances[(i, loc)] = rnd.randint(0, 50)
+    db.session.execute(insert(StockBalance), [{"part_id": p, "location": loc, "on_hand": q, "version": 1}
+                                              for (p, loc), q in balances.items()])
+    keys = list(balances)
+    for start in range(0, issues, 50_000):
+        db.session.execute(insert(StockTransaction), [
+            {"part_id": p, "location": loc, "kind": "issue", "quantity": -rnd.randint(1, 4), "balance_after": 0,
+             "created_at": now - timedelta(minutes=rnd.randint(0, 180 * 24 * 60))}
+            for p, loc in (rnd.choice(keys) for _ in range(min(50_000, issues - start)))])
+
+    db.session.execute(insert(ChecklistTemplate), [{"id": t, "code": f"PM-{t}", "name_en": "PM", "name_ru": "ТО"}
+                                                   for t in range(1, TEMPLATES + 1)])
+    db.session.execute(ChecklistTemplateParts.insert(), [
+        {"template_id": t, "part_id": p, "quantity": rnd.randint(1, 4)}
+        for t in range(1, TEMPLATES + 1) for p in rnd.sample(range(1, parts + 1), min(5, parts))])
+    db.session.execute(insert(Equipment), [{"id": m, "code": f"M-{m:05d}", "name": "machine"}
+                                           for m in range(1, machines + 1)])
+    db.session.execute(insert(MaintenancePlan), [
+        {"equipment_id": m, "template_id": rnd.randint(1, TEMPLATES), "frequency": rnd.choice(FREQUENCIES),
+         "next_due_date": today + timedelta(days=rnd.randint(-10, 120))} for m in range(1, machines + 1)])
+    services.fill_plan_parts(range(1, machines + 1))
+    db.session.execute(EquipmentParts.insert(), [
+        {"equipment_id": m, "part_id": p, "quantity": rnd.randint(1, 4)}
+        for m in range(1, machines + 1) for p in rnd.sample(range(1, parts + 1), min(20, parts))])
+    db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Nightly reorder-point recalculation over a large catalogue")
+    parser.add_argument("--parts", type=int, default=100_000)
+    parser.add_argument("--issues", type=int, default=500_000, help="выдач в журнале за полгода")
+    parser.add_argument("--machines", type=int, default=2_000)
+    args = parser.parse_args()
+
+    from app import create_app
+    from extensions import db
+    from modules.spare_parts import reorder
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "reorder.db")
+        app = create_app({"SQLALCHEMY_DATABASE_URI": f"sqlite:///{path}",
+                          "SQLALCHEMY_BINDS": {"tooling_queue": f"sqlite:///{path}.queue"},
+                          "TOOLING_INGEST_WORKER": "off"})
+        with app.app_context():
+            t0 = time.perf_counter()
+            _seed(db, args.parts, args.issues, args.machines)
+            seeded = time.perf_counter() - t0
+
+            t0 = time.perf_counter()
+            result = reorder.recalculate()
+            db.session.commit()
+            elapsed = time.perf_counter() - t0
+            db.engine.dispose()
+
+    print(f"seed {seeded:.1f} s; parts={args.parts} issues={args.issues} machines={args.machines}")
+    print(f"recalculate + commit: {elapsed:.2f} s; rows={result['parts']} to_order={result['to_order']}")
+
+
+if __name__ == "__main__":
+    main()
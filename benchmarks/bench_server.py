@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+"""
+bench_server.py — нагрузка на настоящий HTTP-сервер: `flask run` против serve.py (gunicorn, gthread).
+
+Оба сервера запускаются отдельными процессами на одной засеянной базе (bench_endpoints.prepare_db,
+--scale), ждут готовности по GET /readyz. Затем --clients потоков (у каждого своё keep-alive соединение
+и своя сессия после входа) --seconds секунд ходят по --urls по кругу.
+Отчёт: запросов в секунду, p50/p95/p99 мс, ошибки (не 200 или обрыв соединения).
+
+Запуск:
+    python -m benchmarks.bench_server --scale 0.01
+    python -m benchmarks.bench_server --clients 32 --seconds 30 --workers 4 --threads 8
+"""
+
+import argparse
+import http.client
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import urlencode
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from benchmarks.bench_endpoints import BENCH_PASSWORD, BENCH_USER, _percentile, _volumes, prepare_db  # noqa: E402
+
+URLS = "/parts/,/maintenance/equipment,/tooling/,/tooling/report/installed"
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _env(path: str) -> dict:
+    return {**os.environ, "DATABASE_URI": f"sqlite:///{path}", "TOOLING_QUEUE_URI": f"sqlite:///{path}.queue",
+            "TOOLING_INGEST_WORKER": "off", "METRICS_ENABLED": "0", "SECRET_KEY": "bench-server",
+            "FLASK_DEBUG": "0", "PYTHONUNBUFFERED": "1"}
+
+
+def _commands(port: int, args) -> dict:
+    return {
+        "flask run": [sys.executable, "-m", "flask", "--app", "app", "run", "--host", "127.0.0.1",
+                      "--port", str(port), "--no-reload"],
+        "serve.py": [sys.executable, "serve.py", "--host", "127.0.0.1", "--port", str(port),
+                     "--workers", str(args.workers), "--threads", str(args.threads)],
+    }
+
+
+def _wait_ready(port: int, proc: subprocess.Popen, timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"server exited with code {proc.returncode}")
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=2)
+            conn.request("GET", "/readyz")
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError("server did not become ready")
+
+
+class _Client:
+    """Одно keep-alive соединение с банкой cookie; обрыв — переподключиться."""
+
+    def __init__(self, port: int):
+        self.port = port
+        self.conn = None
+        self.cookies: dict[str, str] = {}
+
+    def request(self, method: str, url: str, form: dict | None = None) -> int:
+        headers = {"Cookie": "; ".join(f"{k}={v}" for k, v in self.cookies.items())}
+        body = None
+        if form is not None:
+            body = urlencode(form)
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+        for attempt in (1, 2):
+            if self.conn is None:
+                self.conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=60)
+            try:
+                self.conn.request(method, url, body=body, headers=headers)
+                resp = self.conn.getresponse()
+                resp.read()
+                break
+            except (OSError, http.client.HTTPException):
+                self.conn.close()
+                self.conn = None
+                if attempt == 2:
+                    raise
+        for header in resp.headers.get_all("Set-Cookie") or []:
+            name, _, value = header.split(";", 1)[0].partition("=")
+            self.cookies[name.strip()] = value
+        if resp.will_close:
+            self.conn.close()
+            self.conn = None
+        return resp.status
+
+
+def load(port: int, urls: list[str], clients: int, seconds: float) -> dict:
+    latencies, errors, lock = [], [0], threading.Lock()
+    window = {}
+
+    def _go():   # все клиенты вошли — отсчёт пошёл
+        window["start"] = time.perf_counter()
+        window["end"] = window["start"] + seconds
+
+    start = threading.Barrier(clients + 1, action=_go)
+
+    def _worker(n: int):
+        client = _Client(port)
+        client.request("POST", "/parts/login", {"username": BENCH_USER, "password": BENCH_PASSWORD})
+        start.wait()
+        local, failed, i = [], 0, n
+        while time.perf_counter() < window["end"]:
+            t0 = time.perf_counter()
+            try:
+                ok = client.request("GET", urls[i % len(urls)]) == 200
+            except (OSError, http.client.HTTPException):
+                ok = False
+            local.append((time.perf_counter() - t0) * 1000)
+            failed += not ok
+            i += 1
+        with lock:
+            latencies.extend(local)
+            errors[0] += failed
+
+    threads = [threading.Thread(target=_worker, args=(n,)) for n in range(clients)]
+    for t in threads:
+        t.start()
+    start.wait()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - window["start"]
+    latencies.sort()
+    return {"requests": len(latencies), "rps": len(latencies) / elapsed, "errors": errors[0],
+            "p50": statistics.median(latencies), "p95": _percentile(latencies, 0.95),
+            "p99": _percentile(latencies, 0.99)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Throughput of flask run vs serve.py (gunicorn) under concurrent clients")
+    parser.add_argument("--scale", type=float, default=0.01, help="объёмы данных (см. bench_endpoints)")
+    parser.add_argument("--db", help="файл засеянной базы (по умолчанию во временном каталоге, переиспользуется)")
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=15.0)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--urls", default=URLS)
+    parser.add_argument("--servers", default="flask run,serve.py")
+    args = parser.parse_args()
+
+    path = args.db or os.path.join(tempfile.gettempdir(), f"erp_bench_endpoints_s{args.scale:g}.db")
+    prepare_db(path, _volumes(args.scale))
+    urls = args.urls.split(",")
+
+    print(f"{'server':<12}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'errors':>8}")
+    for name in args.servers.split(","):
+        port = _free_port()
+        proc = subprocess.Popen(_commands(port, args)[name], cwd=ROOT, env=_env(path),
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            _wait_ready(port, proc)
+            r = load(port, urls, args.clients, args.seconds)
+        finally:
+            proc.terminate()
+            proc.wait(timeout=30)
+        print(f"{name:<12}{r['rps']:>9.1f}{r['p50']:>9.1f}{r['p95']:>9.1f}{r['p99']:>9.1f}{r['errors']:>8}")
+
+
+if __name__ == "__main__":
+    main()
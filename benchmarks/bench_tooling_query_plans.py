@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+"""
+bench_tooling_query_plans.py — проверка планов горячих запросов tooling_events.
+
+Сеет базу на N событий (по умолчанию 1 000 000), прогоняет
+EXPLAIN QUERY PLAN (SQLite) / EXPLAIN (PostgreSQL) для каждого горячего запроса
+и завершается с кодом 1, если хоть один из них ушёл в полный скан таблицы
+или сортирует результат во временном B-tree вместо индекса.
+
+Запуск:
+    python -m benchmarks.bench_tooling_query_plans                 # SQLite во временном файле
+    python -m benchmarks.bench_tooling_query_plans --events 200000
+    DATABASE_URI=postgresql://... python -m benchmarks.bench_tooling_query_plans --keep
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+def _seed(db, tools: int, machines: int, events: int) -> None:
+    """Быстрый сев: Core INSERT пачками, без ORM-объектов (seed_tooling.seed_bulk)."""
+    import seed_tooling
+    seed_tooling.seed_bulk(tools=tools, events=events, machines=machines)
+
+
+def _hot_queries():
+    """Горячие запросы ровно в том виде, в каком их строят роуты/модели."""
+    from sqlalchemy import desc
+    from modules.tooling.models import Tooling, ToolingEvent
+
+    since = datetime.utcnow() - timedelta(days=30)
+    until = datetime.utcnow()
+    return {
+        "last_event": (ToolingEvent.query.filter_by(tool_id=17)
+                       .order_by(ToolingEvent.happened_at.desc(), ToolingEvent.id.desc())
+                       .limit(1)),
+        "tooling_detail": (ToolingEvent.query.filter_by(tool_id=17)
+                           .order_by(ToolingEvent.happened_at.desc(), ToolingEvent.id.desc())),
+        "export_tool_events": (ToolingEvent.query.filter_by(tool_id=17)
+                               .order_by(ToolingEvent.happened_at.asc(), ToolingEvent.id.asc())),
+        "machine_time_range": (ToolingEvent.query
+                               .filter(ToolingEvent.machine_id == 3,
+                                       ToolingEvent.happened_at >= since,
+                                       ToolingEvent.happened_at < until)
+                               .order_by(ToolingEvent.happened_at.asc())),
+        "action_time_range": (ToolingEvent.query
+                              .filter(ToolingEvent.action == "INSTALL",
+                                      ToolingEvent.happened_at >= since)
+                              .order_by(desc(ToolingEvent.happened_at))),
+        "tool_code_lookup": Tooling.query.filter_by(tool_code="IH-00017").limit(1),
+    }
+
+
+def _plan(db, query) -> list[str]:
+    engine = db.engine
+    sql = str(query.statement.compile(dialect=engine.dialect, compile_kwargs={"literal_binds": True}))
+    with engine.connect() as conn:
+        if engine.dialect.name == "sqlite":
+            return [row[-1] for row in conn.exec_driver_sql("EXPLAIN QUERY PLAN " + sql)]
+        return [row[0] for row in conn.exec_driver_sql("EXPLAIN " + sql)]
+
+
+def _problems(dialect: str, plan: list[str]) -> list[str]:
+    bad = []
+    for line in plan:
+        if dialect == "sqlite":
+            # "SCAN t" / "SCAN t USING INDEX ..." — полный проход; "SEARCH t USING INDEX" — то, что нужно
+            if line.startswith("SCAN ") and ("tooling_events" in line or "tooling" in line.split()):
+                bad.append(line)
+            if "USE TEMP B-TREE" in line:
+                bad.append(line)
+        elif "Seq Scan" in line or ("Sort" in line and "Sort Key" not in line and "Incremental" not in line):
+            bad.append(line.strip())
+    return bad
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="EXPLAIN hot tooling_events queries on a seeded database")
+    parser.add_argument("--events", type=int, default=1_000_000, help="сколько событий насеять (default: 1M)")
+    parser.add_argument("--tools", type=int, default=5_000)
+    parser.add_argument("--machines", type=int, default=40)
+    parser.add_argument("--keep", action="store_true", help="не удалять временную SQLite-базу")
+    args = parser.parse_args()
+
+    tmp_path = None
+    if not os.getenv("DATABASE_URI"):
+        fd, tmp_path = tempfile.mkstemp(prefix="bench_tooling_", suffix=".db")
+        os.close(fd)
+        os.environ["DATABASE_URI"] = f"sqlite:///{tmp_path}"
+
+    from app import create_app
+    from extensions import db
+
+    app = create_app()
+    failed = False
+    try:
+        with app.app_context():
+            t0 = time.perf_counter()
+            _seed(db, args.tools, args.machines, args.events)
+            with db.engine.begin() as conn:
+                conn.exec_driver_sql("ANALYZE")
+            print(f"seeded {args.events} events in {time.perf_counter() - t0:.1f}s "
+                  f"({db.engine.dialect.name})")
+
+            for name, query in _hot_queries().items():
+                plan = _plan(db, query)
+                bad = _problems(db.engine.dialect.name, plan)
+                t0 = time.perf_counter()
+                query.all()
+                ms = (time.perf_counter() - t0) * 1000
+                status = "FAIL" if bad else "ok"
+                print(f"[{status}] {name:<20} {ms:8.2f} ms")
+                for line in plan:
+                    print(f"         {line}")
+                failed = failed or bool(bad)
+    finally:
+        if tmp_path and not args.keep:
+            os.unlink(tmp_path)
+        elif tmp_path:
+            print(f"database kept: {tmp_path}")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
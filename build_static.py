@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+"""
+build_static.py — статика к деплою: имена с отпечатком и сжатые варианты (см. static_assets.py).
+
+Режимы:
+- python build_static.py          → сжать gzip/br всё, что ещё не сжато, в STATIC_BUILD_DIR и показать манифест
+- python build_static.py --clean  → сначала удалить STATIC_BUILD_DIR (например, после смены уровня сжатия)
+
+То же самое делает первый стартующий воркер; заранее — чтобы воркеры не сжимали файлы на старте.
+"""
+
+import argparse
+import os
+import shutil
+
+from app import create_app
+import static_assets
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fingerprint and precompress static assets")
+    parser.add_argument("--clean", action="store_true", help="удалить готовые сжатые файлы перед сборкой")
+    args = parser.parse_args()
+
+    app = create_app({"SCHEMA_CHECK_ON_START": False, "TOOLING_INGEST_WORKER": "off"})
+    out = static_assets.build_dir(app)
+    if args.clean and os.path.isdir(out):
+        shutil.rmtree(out)
+        print(f"→ удалено {out}")
+
+    manifest = static_assets.build(app.static_folder, out, precompress=True)
+    for rel, asset in sorted(manifest.by_source.items()):
+        sizes = ", ".join(f"{enc} {os.path.getsize(path)} B" for enc, path in asset.variants.items())
+        print(f"→ {rel} -> {asset.name} ({os.path.getsize(asset.source)} B{'; ' + sizes if sizes else ''})")
+    print(f"✔ Готово: {len(manifest.by_source)} файлов, сжатые варианты в {out}")
+
+
+if __name__ == "__main__":
+    main()
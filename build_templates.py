@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+"""
+build_templates.py — шаблоны Jinja к деплою: байткод всех шаблонов в TEMPLATE_CACHE_DIR (см. template_cache.py).
+
+Режимы:
+- python build_templates.py          → скомпилировать все шаблоны, которых ещё нет в кэше (или которые изменились)
+- python build_templates.py --clean  → сначала очистить кэш (например, после обновления Jinja)
+
+То же самое делает первый рендер каждого шаблона; заранее — чтобы первые запросы воркеров не компилировали.
+"""
+
+import argparse
+import os
+import time
+
+from app import create_app
+import template_cache
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompile Jinja templates into the shared bytecode cache")
+    parser.add_argument("--clean", action="store_true", help="удалить готовый байткод перед сборкой")
+    args = parser.parse_args()
+
+    app = create_app({"SCHEMA_CHECK_ON_START": False, "TOOLING_INGEST_WORKER": "off", "TEMPLATE_WARMUP": False})
+    path = template_cache.cache_dir(app)
+    if path is None:
+        print("✖ TEMPLATE_CACHE_DIR=off — кэшировать некуда.")
+        return
+    if args.clean:
+        app.jinja_env.bytecode_cache.clear()
+        print(f"→ очищено {path}")
+
+    t0 = time.perf_counter()
+    count = template_cache.warm_up(app)
+    elapsed = (time.perf_counter() - t0) * 1000
+    files = len([f for f in os.listdir(path) if f.endswith(".cache")])
+    print(f"✔ Готово: {count} шаблонов за {elapsed:.0f} мс, в {path} файлов байткода: {files}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,355 @@
+# -*- coding: utf-8 -*-
+"""
+Лента изменений для живых экранов цеха: одно соединение на экран вместо опроса тяжёлых отчётов.
+
+- Журнал: вставки/изменения/удаления строк FEED_TABLES (события и установки оснастки, WO) пишутся
+  в change_log в той же транзакции (after_flush). Клиент помнит последний увиденный seq.
+- seq выдаётся при flush, а не при commit. На SQLite писатель один, и порядок seq совпадает с порядком
+  коммитов. На PostgreSQL строка 11 может стать видна раньше строки 10, и курсор «seq > 10» пропустил бы
+  строку 10. Поэтому хаб двигает курсор только по непрерывному ряду seq. На дырке он ждёт
+  CHANGE_FEED_SETTLE_SECONDS (по умолчанию 5 с; на SQLite 0): не закоммиченная к тому времени строка
+  считается откатившейся (откат тоже оставляет дырку в последовательности). Транзакция, которая
+  коммитится дольше этого окна после flush, может быть пропущена.
+- Хаб процесса (ChangeHub): ОДИН фоновый поток на воркер раз в CHANGE_FEED_POLL секунд читает новые записи
+  журнала (SELECT по первичному ключу) в кольцевой буфер последних CHANGE_FEED_BUFFER изменений.
+  Commit в этом же процессе будит поток сразу. Ждущие клиенты SQL не выполняют вовсе: сколько бы экранов
+  ни было открыто, без изменений база получает один короткий запрос в секунду на воркер.
+  Клиент отстал дальше буфера — дочитывает из журнала; отстал дальше CHANGE_FEED_RETENTION_HOURS
+  (старые записи удаляются) — получает reset и перезагружает экран целиком.
+- GET /changes/stream?tables=workorders&since=<seq> — Server-Sent Events (event: change, id: seq);
+  EventSource сам переподключается с Last-Event-ID. Соединение закрывается через CHANGE_FEED_STREAM_SECONDS,
+  чтобы не держать воркер вечно (браузер тут же откроет новое).
+- GET /changes?since=<seq>&wait=25 — long-poll для клиентов без EventSource: ответ сразу, как только
+  есть изменения, иначе пустой через wait секунд; "last" — курсор для следующего запроса.
+- Каждое SSE-соединение занимает поток воркера: под gunicorn — воркеры gthread (см. run.sh).
+"""
+
+import json
+import logging
+import threading
+import time
+from collections import deque
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import NamedTuple, Optional
+
+import sqlalchemy as sa
+from flask import Response, current_app, has_app_context, jsonify, request, stream_with_context, url_for
+from flask_login import login_required
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from extensions import db
+from models import ChangeLogEntry
+
+log = logging.getLogger(__name__)
+
+_EXT_KEY = "change_feed"
+_INFO_KEY = "change_feed_written"
+FEED_TABLES = frozenset({"tooling_events", "tooling_mounts", "workorders"})
+_log = ChangeLogEntry.__table__
+
+
+class Change(NamedTuple):
+    seq: int
+    table: str
+    row_id: int
+    op: str
+    changed_at: datetime
+    data: Optional[str]       # JSON строки как есть — в ответ без повторной сериализации
+
+    def as_json(self) -> dict:
+        return {"seq": self.seq, "table": self.table, "id": self.row_id, "op": self.op,
+                "at": self.changed_at.isoformat(), "row": json.loads(self.data) if self.data else None}
+
+
+class Batch(NamedTuple):
+    items: list               # изменения после since (с учётом фильтра таблиц)
+    last: int                 # курсор для следующего запроса
+    reset: bool = False       # since старше журнала — экран нужно перечитать целиком
+
+
+# ------------------------------ запись в журнал ------------------------------ #
+def _jsonable(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    return value
+
+
+def _row_json(obj) -> str:
+    state = sa.inspect(obj)
+    loaded = state.dict   # только загруженные поля: внутри flush никаких ленивых SELECT
+    return json.dumps({a.key: _jsonable(loaded[a.key]) for a in state.mapper.column_attrs if a.key in loaded})
+
+
+@event.listens_for(Session, "after_flush")
+def _record_changes(session, flush_context):
+    now = datetime.utcnow()
+    rows = []
+    for op, objects in (("insert", session.new), ("update", session.dirty), ("delete", session.deleted)):
+        for obj in objects:
+            table = getattr(type(obj), "__tablename__", None)
+            if table not in FEED_TABLES:
+                continue
+            if op == "update" and not session.is_modified(obj, include_collections=False):
+                continue
+            rows.append({"table_name": table, "row_id": obj.id, "op": op, "changed_at": now,
+                         "data": None if op == "delete" else _row_json(obj)})
+    if rows:
+        session.connection(bind_arguments={"mapper": ChangeLogEntry.__mapper__}).execute(_log.insert(), rows)
+        session.info[_INFO_KEY] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _wake_hub(session):
+    if session.info.pop(_INFO_KEY, False) and has_app_context():
+        hub = current_app.extensions.get(_EXT_KEY)
+        if hub is not None:
+            hub.wake()
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_changes(session):
+    session.info.pop(_INFO_KEY, None)
+
+
+# ------------------------------ хаб процесса ------------------------------ #
+def _read(after: int, limit: int, tables=None, upto: Optional[int] = None) -> list[Change]:
+    stmt = (sa.select(_log.c.seq, _log.c.table_name, _log.c.row_id, _log.c.op, _log.c.changed_at, _log.c.data)
+            .where(_log.c.seq > after).order_by(_log.c.seq).limit(limit))
+    if upto is not None:
+        stmt = stmt.where(_log.c.seq <= upto)
+    if tables:
+        stmt = stmt.where(_log.c.table_name.in_(tables))
+    return [Change(*r) for r in db.session.execute(stmt)]
+
+
+class ChangeHub:
+    """Буфер последних изменений процесса и ожидание новых (Condition), один поток чтения журнала."""
+
+    def __init__(self, app):
+        cfg = app.config
+        self.app = app
+        self.poll_interval = float(cfg.get("CHANGE_FEED_POLL", 1.0))   # 0 — без потока, читает сам ждущий
+        self.batch = int(cfg.get("CHANGE_FEED_BATCH", 500))
+        self.retention = timedelta(hours=float(cfg.get("CHANGE_FEED_RETENTION_HOURS", 72)))
+        settle = cfg.get("CHANGE_FEED_SETTLE_SECONDS")
+        if settle is None:   # SQLite коммитит строго по порядку seq — ждать дырок незачем
+            settle = 0 if sa.engine.make_url(cfg["SQLALCHEMY_DATABASE_URI"]).get_backend_name() == "sqlite" else 5
+        self.settle = timedelta(seconds=float(settle))
+        self.buffer: deque[Change] = deque(maxlen=int(cfg.get("CHANGE_FEED_BUFFER", 1000)))
+        self.last_seq: Optional[int] = None      # последний прочитанный seq (None — ещё не читали)
+        self._cond = threading.Condition()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._trimmed_at = 0.0
+
+    # ---- чтение журнала ----
+    def _in_app(self):
+        return has_app_context() and current_app._get_current_object() is self.app
+
+    def start_seq(self) -> int:
+        """Курсор старта: конец журнала, кроме последних settle секунд (там ещё могут быть дырки)."""
+        stmt = sa.select(sa.func.max(_log.c.seq))
+        if self.settle:
+            stmt = stmt.where(_log.c.changed_at < datetime.utcnow() - self.settle)
+        return db.session.execute(stmt).scalar() or 0
+
+    def _settled(self, fresh: list[Change]) -> list[Change]:
+        """Начало fresh без дырок в seq. Дырка моложе settle — чужая транзакция ещё не закоммичена: ждём."""
+        cutoff = datetime.utcnow() - self.settle
+        expected = self.last_seq + 1
+        for i, change in enumerate(fresh):
+            if change.seq != expected and change.changed_at > cutoff:
+                return fresh[:i]
+            expected = change.seq + 1
+        return fresh
+
+    def poll(self) -> int:
+        """Дочитать новые записи журнала в буфер; разбудить ждущих. Возвращает число новых."""
+        if not self._in_app():
+            with self.app.app_context():
+                return self.poll()
+        if self.last_seq is None:
+            # старт: историю не грузим, только запоминаем, где журнал сейчас
+            self.last_seq = self.start_seq()
+        total = 0
+        while True:
+            fresh = _read(self.last_seq, self.batch)
+            ready = self._settled(fresh)
+            if not ready:
+                break
+            with self._cond:
+                self.buffer.extend(ready)
+                self.last_seq = ready[-1].seq
+                self._cond.notify_all()
+            total += len(ready)
+            if len(ready) < self.batch:
+                break
+        return total
+
+    def trim(self) -> int:
+        """Удалить записи журнала старше CHANGE_FEED_RETENTION_HOURS."""
+        res = db.session.execute(_log.delete().where(_log.c.changed_at < datetime.utcnow() - self.retention))
+        db.session.commit()
+        return res.rowcount
+
+    def _run(self):
+        while True:
+            with self.app.app_context():
+                try:
+                    self.poll()
+                    if time.monotonic() - self._trimmed_at > 3600:
+                        self._trimmed_at = time.monotonic()
+                        self.trim()
+                except Exception:  # noqa: BLE001 — поток ленты не должен умирать
+                    log.exception("change feed: poll failed")
+                finally:
+                    db.session.remove()
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+
+    def start(self) -> None:
+        if self.poll_interval <= 0 or self._thread is not None:
+            return
+        with self._cond:
+            if self._thread is None:
+                if self.last_seq is None:
+                    self.poll()   # курсор — до ответа первому клиенту
+                self._thread = threading.Thread(target=self._run, name="change-feed", daemon=True)
+                self._thread.start()
+
+    def wake(self) -> None:
+        """Commit в этом процессе: прочитать журнал сейчас, не дожидаясь интервала."""
+        if self._thread is not None:
+            self._wakeup.set()
+        else:
+            with self._cond:
+                self._cond.notify_all()
+
+    # ---- ожидание ----
+    def _buffered(self, since: int, tables) -> Optional[list[Change]]:
+        """Изменения после since из буфера; None — буфер не покрывает since (клиент отстал)."""
+        if since >= self.last_seq:
+            return []
+        if not self.buffer or self.buffer[0].seq > since + 1:
+            return None
+        return [c for c in self.buffer if c.seq > since and (not tables or c.table in tables)]
+
+    def _catch_up(self, since: int, tables) -> Batch:
+        """Клиент отстал дальше буфера: дочитать из журнала или сказать reset, если журнал уже обрезан."""
+        oldest = db.session.execute(sa.select(sa.func.min(_log.c.seq))).scalar()
+        if (oldest is None and since < self.last_seq) or (oldest is not None and oldest > since + 1):
+            return Batch([], self.last_seq, reset=True)
+        items = _read(since, self.batch, tables, upto=self.last_seq)   # не дальше проверенного хабом курсора
+        if len(items) == self.batch:       # остальное — следующим запросом
+            return Batch(items, items[-1].seq)
+        return Batch(items, max(since, self.last_seq, items[-1].seq if items else 0))
+
+    def wait(self, since: Optional[int], tables=None, timeout: float = 0.0) -> Batch:
+        """Изменения после since; нет — ждать до timeout секунд. since=None — только текущий курсор."""
+        self.start()
+        if self._thread is None:
+            self.poll()   # режим без потока (CHANGE_FEED_POLL=0): читает сам ждущий
+        if since is None:
+            return Batch([], self.last_seq)
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._cond:
+                items = self._buffered(since, tables)
+                if items is None:
+                    break
+                if items:
+                    return Batch(items, self.last_seq)
+                since = max(since, self.last_seq)   # были изменения, но не в нужных таблицах
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return Batch([], since)
+                self._cond.wait(remaining)
+            if self._thread is None:
+                self.poll()
+        if not self._in_app():
+            with self.app.app_context():
+                return self._catch_up(since, tables)
+        return self._catch_up(since, tables)
+
+
+def hub() -> ChangeHub:
+    return current_app.extensions[_EXT_KEY]
+
+
+def last_seq() -> int:
+    """Текущий конец журнала: из памяти, если поток хаба уже работает, иначе один SELECT (см. start_seq)."""
+    feed = hub()
+    if feed._thread is not None and feed.last_seq is not None:
+        return feed.last_seq
+    return feed.start_seq()
+
+
+# ------------------------------ HTTP ------------------------------ #
+def _tables() -> Optional[frozenset]:
+    raw = request.args.get("tables")
+    if not raw:
+        return None
+    return frozenset(t.strip() for t in raw.split(",") if t.strip()) & FEED_TABLES
+
+
+def _since() -> Optional[int]:
+    raw = request.headers.get("Last-Event-ID") or request.args.get("since")
+    try:
+        return int(raw) if raw not in (None, "") else None
+    except ValueError:
+        return None
+
+
+@login_required
+def changes_poll():
+    """Long-poll: ?since=<seq>&wait=<сек>&tables=a,b."""
+    cfg = current_app.config
+    wait = min(max(request.args.get("wait", 0, type=float), 0), float(cfg.get("CHANGE_FEED_MAX_WAIT", 25)))
+    batch = hub().wait(_since(), _tables(), wait)
+    return jsonify(ok=True, items=[c.as_json() for c in batch.items], last=batch.last, reset=batch.reset)
+
+
+@login_required
+def changes_stream():
+    """SSE: event: change (id — seq), event: reset; комментарий-пинг раз в CHANGE_FEED_HEARTBEAT секунд."""
+    cfg = current_app.config
+    feed, tables = hub(), _tables()
+    since = _since()
+    heartbeat = float(cfg.get("CHANGE_FEED_HEARTBEAT", 15))
+    deadline = time.monotonic() + float(cfg.get("CHANGE_FEED_STREAM_SECONDS", 300))
+
+    def events():
+        cursor = since if since is not None else feed.wait(None).last
+        yield "retry: 3000\n\n"
+        while time.monotonic() < deadline:
+            batch = feed.wait(cursor, tables, min(heartbeat, max(deadline - time.monotonic(), 0)))
+            if batch.reset:
+                yield "event: reset\ndata: {}\n\n"
+                return
+            for c in batch.items:
+                yield f"id: {c.seq}\nevent: change\ndata: {json.dumps(c.as_json())}\n\n"
+            if not batch.items:
+                yield ": ping\n\n"
+            cursor = batch.last
+
+    resp = Response(stream_with_context(events()), mimetype="text/event-stream")
+    resp.headers["Cache-Control"] = "no-cache"
+    resp.headers["X-Accel-Buffering"] = "no"   # nginx: не буферизовать поток
+    return resp
+
+
+def stream_url(tables: str) -> str:
+    """URL потока для шаблона: начинается с текущего seq — изменения после рендера страницы."""
+    return url_for("changes_stream", tables=tables, since=last_seq())
+
+
+def install(app) -> None:
+    """Хаб ленты (поток стартует при первом клиенте), /changes и /changes/stream, stream_url() в шаблонах."""
+    app.extensions[_EXT_KEY] = ChangeHub(app)
+    app.add_url_rule("/changes", "changes_poll", changes_poll)
+    app.add_url_rule("/changes/stream", "changes_stream", changes_stream)
+    app.add_template_global(stream_url, "change_stream_url")
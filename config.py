@@ -4,4 +4,122 @@ class Config:
     SECRET_KEY = os.getenv('SECRET_KEY', 'dev_secret_key')
     SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URI', 'sqlite:///parts.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # Профиль подключения к БД (см. db_profile.py): production — WAL/PRAGMA для SQLite, пул и таймауты
+    # для PostgreSQL; default — как у драйвера. SQLALCHEMY_ENGINE_OPTIONS из конфига имеют приоритет.
+    DB_PROFILE = os.getenv('DB_PROFILE', 'production')
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '10'))
+    DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', '20'))
+    DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', '1800'))            # с
+    SQLITE_BUSY_TIMEOUT_MS = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', '5000'))
+    SQLITE_SYNCHRONOUS = os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL')        # в WAL NORMAL не теряет целостность
+    SQLITE_CACHE_SIZE_KB = int(os.getenv('SQLITE_CACHE_SIZE_KB', '65536'))  # page cache на соединение
+    SQLITE_MMAP_SIZE_MB = int(os.getenv('SQLITE_MMAP_SIZE_MB', '256'))
+    PG_STATEMENT_TIMEOUT_MS = int(os.getenv('PG_STATEMENT_TIMEOUT_MS', '30000'))
+    PG_IDLE_TX_TIMEOUT_MS = int(os.getenv('PG_IDLE_TX_TIMEOUT_MS', '60000'))
+
+    # Отчёты и выгрузки (@read_only, см. db_routing.py) читают с реплики. Без DATABASE_READONLY_URI
+    # для SQLite-файла берётся тот же файл в режиме mode=ro отдельным пулом.
+    DB_READONLY_ROUTING = os.getenv('DB_READONLY_ROUTING', '1') == '1'
+    DATABASE_READONLY_URI = os.getenv('DATABASE_READONLY_URI')
+    READ_YOUR_WRITES_SECONDS = float(os.getenv('READ_YOUR_WRITES_SECONDS', '5'))  # после записи — с основной
+    # Схема БД: при старте догонять версию миграциями автоматически (иначе — python migrate.py вручную)
+    AUTO_MIGRATE = os.getenv('AUTO_MIGRATE', '1') == '1'
+    # Модули приложения: выключенные не импортируются и не регистрируются (spare_parts — ядро, всегда включён)
+    ENABLED_MODULES = os.getenv('ENABLED_MODULES', 'spare_parts,maintenance,tooling')
+    # Профиль старта: время и число импортов на каждый шаг create_app() — в stderr (см. startup.py)
+    STARTUP_PROFILE = os.getenv('STARTUP_PROFILE', '0') == '1'
+    # Счётчики SQL по endpoint'ам (см. db_metrics.py): /metrics в формате Prometheus, медленные выражения — в лог
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', '1') == '1'
+    METRICS_TOKEN = os.getenv('METRICS_TOKEN')                       # Authorization: Bearer <token>; без него — только root
+    METRICS_SLOWEST = int(os.getenv('METRICS_SLOWEST', '5'))         # самых медленных выражений на endpoint
+    SLOW_QUERY_MS = float(os.getenv('SLOW_QUERY_MS', '200'))
+    SERVER_TIMING = os.getenv('SERVER_TIMING', '0') == '1'           # заголовок Server-Timing в ответах
+    # Вход (см. auth.py): кэш текущего пользователя, ограничение неудачных попыток, стоимость хэша пароля
+    USER_CACHE_TTL = float(os.getenv('USER_CACHE_TTL', '60'))                # с; 0 — без кэша
+    LOGIN_MAX_FAILURES = int(os.getenv('LOGIN_MAX_FAILURES', '5'))            # 0 — без ограничения
+    LOGIN_MAX_FAILURES_PER_IP = int(os.getenv('LOGIN_MAX_FAILURES_PER_IP', '100'))  # общие терминалы, NAT; 0 — без
+    LOGIN_WINDOW_SECONDS = float(os.getenv('LOGIN_WINDOW_SECONDS', '300'))
+    LOGIN_THROTTLE_BACKEND = os.getenv('LOGIN_THROTTLE_BACKEND', 'memory')   # memory | sqlite (общий для воркеров)
+    LOGIN_THROTTLE_DB = os.getenv('LOGIN_THROTTLE_DB')                       # по умолчанию instance/login_throttle.db
+    TRUSTED_PROXIES = int(os.getenv('TRUSTED_PROXIES', '0'))                 # прокси перед приложением (nginx — 1)
+    PASSWORD_HASH_METHOD = os.getenv('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')  # или pbkdf2:sha256:600000
     UPLOAD_FOLDER = os.getenv('UPLOAD_FOLDER', os.path.join('static', 'uploads'))
+    # Фото (см. uploads.py): файлы по хэшу содержимого, миниатюры и WebP — в фоновом пуле (нужен Pillow)
+    UPLOAD_CHUNK_SIZE = int(os.getenv('UPLOAD_CHUNK_SIZE', str(64 * 1024)))       # байт на чтение при записи на диск
+    UPLOAD_THUMB_SIZE = int(os.getenv('UPLOAD_THUMB_SIZE', '160'))                 # px, большая сторона миниатюры
+    UPLOAD_WORKERS = int(os.getenv('UPLOAD_WORKERS', '2'))                         # 0 — варианты сразу в запросе
+    UPLOAD_CACHE_MAX_AGE = int(os.getenv('UPLOAD_CACHE_MAX_AGE', str(365 * 24 * 3600)))  # /media/ для имён по хэшу
+    # Статика (см. static_assets.py): имена с отпечатком под /assets/, gzip/br заранее, отдача через прокси
+    STATIC_MAX_AGE = int(os.getenv('STATIC_MAX_AGE', str(365 * 24 * 3600)))
+    STATIC_PRECOMPRESS = os.getenv('STATIC_PRECOMPRESS', '1') == '1'
+    STATIC_BUILD_DIR = os.getenv('STATIC_BUILD_DIR')             # по умолчанию instance/static_build
+    STATIC_SENDFILE = os.getenv('STATIC_SENDFILE', '')           # '' | x-sendfile | x-accel
+    STATIC_ACCEL_PREFIX = os.getenv('STATIC_ACCEL_PREFIX', '/_protected')   # internal location в nginx
+    STATIC_ACCEL_ROOT = os.getenv('STATIC_ACCEL_ROOT')           # на что указывает alias; по умолчанию корень приложения
+
+    # Карточки станка и BATCH: сколько последних WO/событий показывать сразу (остальное — подгрузкой, keyset.py)
+    HISTORY_PAGE_SIZE = int(os.getenv('HISTORY_PAGE_SIZE', '50'))
+
+    # Кэш страниц-списков (page_cache.py): ключ — URL + права роли, устаревание — по счётчикам таблиц
+    PAGE_CACHE = os.getenv('PAGE_CACHE', '1') == '1'
+    PAGE_CACHE_SIZE = int(os.getenv('PAGE_CACHE_SIZE', '256'))             # страниц в LRU процесса
+    PAGE_CACHE_BACKEND = os.getenv('PAGE_CACHE_BACKEND', 'memory')         # memory | sqlite (общий для воркеров)
+    PAGE_CACHE_DB = os.getenv('PAGE_CACHE_DB')                             # по умолчанию instance/page_cache.db
+
+    # JSON API /api/v1 (rest_api.py): строк на страницу по умолчанию и предел для limit / ids / items
+    API_ENABLED = os.getenv('API_ENABLED', '1') == '1'                   # 0 — ни маршрутов, ни modules/*/api.py
+    API_PAGE_SIZE = int(os.getenv('API_PAGE_SIZE', '100'))
+    API_MAX_PAGE = int(os.getenv('API_MAX_PAGE', '500'))
+
+    # Лента изменений для живых экранов (change_feed.py): /changes/stream (SSE) и /changes (long-poll)
+    CHANGE_FEED = os.getenv('CHANGE_FEED', '1') == '1'                                # 0 — журнал не пишется, экраны без live
+    CHANGE_FEED_POLL = float(os.getenv('CHANGE_FEED_POLL', '1.0'))                    # сек; 0 — без фонового потока
+    CHANGE_FEED_BUFFER = int(os.getenv('CHANGE_FEED_BUFFER', '1000'))                 # последних изменений в памяти
+    CHANGE_FEED_RETENTION_HOURS = float(os.getenv('CHANGE_FEED_RETENTION_HOURS', '72'))
+    CHANGE_FEED_SETTLE_SECONDS = os.getenv('CHANGE_FEED_SETTLE_SECONDS')              # дырка в seq, сек; SQLite 0, иначе 5
+    CHANGE_FEED_MAX_WAIT = float(os.getenv('CHANGE_FEED_MAX_WAIT', '25'))             # предел ?wait= у long-poll
+    CHANGE_FEED_HEARTBEAT = float(os.getenv('CHANGE_FEED_HEARTBEAT', '15'))
+    CHANGE_FEED_STREAM_SECONDS = float(os.getenv('CHANGE_FEED_STREAM_SECONDS', '300'))  # потом браузер переподключится
+
+    # Продакшн-сервер (serve.py, gunicorn): процессы x потоки, перезапуск воркера после N запросов
+    SERVER_WORKERS = int(os.getenv('SERVER_WORKERS', str(min(2 * (os.cpu_count() or 1) + 1, 8))))
+    SERVER_THREADS = int(os.getenv('SERVER_THREADS', '8'))                  # потоки воркера; SSE держит один
+    SERVER_MAX_REQUESTS = int(os.getenv('SERVER_MAX_REQUESTS', '2000'))     # 0 — не перезапускать
+    SERVER_MAX_REQUESTS_JITTER = int(os.getenv('SERVER_MAX_REQUESTS_JITTER', '200'))
+    SERVER_TIMEOUT = int(os.getenv('SERVER_TIMEOUT', '60'))                 # с: зависший воркер перезапускается
+    SERVER_GRACEFUL_TIMEOUT = int(os.getenv('SERVER_GRACEFUL_TIMEOUT', '30'))  # с на доработку при HUP/остановке
+    SERVER_KEEPALIVE = int(os.getenv('SERVER_KEEPALIVE', '5'))
+    SERVER_ACCESS_LOG = os.getenv('SERVER_ACCESS_LOG')                      # "-" — в stdout
+
+    # Шаблоны Jinja (template_cache.py): байткод на диске, общий для воркеров; прогрев всех шаблонов при старте
+    TEMPLATE_CACHE_DIR = os.getenv('TEMPLATE_CACHE_DIR')                    # по умолчанию instance/jinja_cache; off — без диска
+    TEMPLATE_WARMUP = os.getenv('TEMPLATE_WARMUP', 'auto')                  # auto — в мастере serve.py | 1 | 0
+
+    # Точки заказа запчастей (modules/spare_parts/reorder.py, ночной reorder_parts.py): дни расхода
+    REORDER_HISTORY_DAYS = int(os.getenv('REORDER_HISTORY_DAYS', '180'))    # окно истории выдач
+    REORDER_LEAD_TIME_DAYS = int(os.getenv('REORDER_LEAD_TIME_DAYS', '30'))  # от заказа до прихода
+    REORDER_REVIEW_DAYS = int(os.getenv('REORDER_REVIEW_DAYS', '30'))        # заказ покрывает ещё столько дней
+    REORDER_SAFETY_DAYS = int(os.getenv('REORDER_SAFETY_DAYS', '14'))        # страховой запас
+
+    # Архив: строки старше горизонта переносятся в годовые архивные таблицы (см. archive.py).
+    # ARCHIVE_DIR — куда класть файлы архива для SQLite (по умолчанию рядом с базой, подпапка archive/)
+    ARCHIVE_HORIZON_DAYS = int(os.getenv('ARCHIVE_HORIZON_DAYS', '730'))
+    ARCHIVE_DIR = os.getenv('ARCHIVE_DIR')
+
+    # Автодополнение BATCH #: полная перестройка in-process индекса не реже чем раз в N секунд
+    # (свои записи воркер видит сразу, чужие — после перестройки)
+    TOOLING_INDEX_TTL = float(os.getenv('TOOLING_INDEX_TTL', '30'))
+
+    # Справочники формы Tooling (причины, смены, роли, список BM#): как часто воркер сверяет версию в БД
+    REFERENCE_CACHE_TTL = float(os.getenv('REFERENCE_CACHE_TTL', '15'))
+
+    # Очередь событий Tooling (см. modules/tooling/ingest.py): отдельная база, по умолчанию SQLite-файл
+    # (WAL включает профиль DB_PROFILE=production)
+    SQLALCHEMY_BINDS = {'tooling_queue': os.getenv('TOOLING_QUEUE_URI', 'sqlite:///tooling_queue.db')}
+    # thread — писатель в веб-процессе (один на хост, файловая блокировка); external — ingest_worker.py; off — без очереди
+    TOOLING_INGEST_WORKER = os.getenv('TOOLING_INGEST_WORKER', 'thread')
+    TOOLING_ASYNC_ACTIONS = tuple(os.getenv('TOOLING_ASYNC_ACTIONS', 'WASH,POLISH,INSPECT,MARK_READY').split(','))
+    TOOLING_INGEST_BATCH = int(os.getenv('TOOLING_INGEST_BATCH', '200'))   # событий на одну транзакцию
+    TOOLING_INGEST_IDLE = float(os.getenv('TOOLING_INGEST_IDLE', '1.0'))   # пауза писателя при пустой очереди, с
+    TOOLING_INGEST_WAIT = float(os.getenv('TOOLING_INGEST_WAIT', '2.0'))   # сколько список ждёт своё событие, с
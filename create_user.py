@@ -1,7 +1,8 @@
 from app import create_app
+from auth import hash_password
 from extensions import db
 from models import User
-from werkzeug.security import generate_password_hash
+from permissions import ROLES
 
 app = create_app()
 
@@ -15,7 +16,7 @@ def create_user(username, password, role):
 
         user = User(
             username=username,
-            password=generate_password_hash(password),
+            password=hash_password(password),  # PASSWORD_HASH_METHOD
             role=role
         )
         db.session.add(user)
@@ -28,7 +29,7 @@ if __name__ == '__main__':
     parser = argparse.ArgumentParser(description='Create a new user.')
     parser.add_argument('username', help='Username')
     parser.add_argument('password', help='Password')
-    parser.add_argument('role', choices=['root', 'admin', 'user'], help='User role')
+    parser.add_argument('role', choices=ROLES, help='User role')
 
     args = parser.parse_args()
     create_user(args.username, args.password, args.role)
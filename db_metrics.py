@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+"""
+Счётчики SQL по запросам: сколько выражений и сколько времени в БД тратит каждый endpoint.
+
+- SQLAlchemy before/after_cursor_execute (на классе Engine — все движки, включая движок чтения
+  db_routing) считают выражения и время, но только внутри HTTP-запроса; фоновые потоки не трогаем.
+- Сигналы Flask request_started / request_finished открывают и закрывают счётчик запроса,
+  итог складывается в статистику endpoint'а (app.extensions["db_metrics"]).
+- Медленные выражения (дольше SLOW_QUERY_MS) — в лог; METRICS_SLOWEST самых медленных на endpoint — в /metrics/slow.
+- GET /metrics — текстовый формат Prometheus. Статистика своя у каждого процесса (воркера gunicorn).
+  Доступ: если задан METRICS_TOKEN — заголовок Authorization: Bearer <token> (для Prometheus),
+  иначе только вошедший root (в статистике — тексты SQL и имена маршрутов).
+- SERVER_TIMING=1 — заголовок Server-Timing (db;dur=..;desc="N queries", app;dur=..) для DevTools браузера.
+- count_queries() — счётчик для тестов и бенчмарков (см. фикстуру max_queries в tests/conftest.py).
+"""
+
+import heapq
+import hmac
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import abort, current_app, g, has_app_context, jsonify, request, request_finished, request_started
+from flask_login import current_user
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+import permissions
+
+_EXT_KEY = "db_metrics"
+_START_KEY = "_db_metrics_start"
+
+
+class EndpointStats:
+    __slots__ = ("requests", "queries", "db_seconds", "request_seconds", "max_queries", "slowest")
+
+    def __init__(self):
+        self.requests = 0
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.request_seconds = 0.0
+        self.max_queries = 0
+        self.slowest = []  # куча (сек, sql) — N самых медленных выражений
+
+
+class Metrics:
+    """Статистика процесса по endpoint'ам."""
+
+    def __init__(self, slowest: int = 5):
+        self.slowest_n = slowest
+        self.endpoints: dict[str, EndpointStats] = {}
+        self._lock = threading.Lock()
+
+    def record(self, endpoint: str, queries: int, db_seconds: float, request_seconds: float, statements) -> None:
+        with self._lock:
+            st = self.endpoints.get(endpoint)
+            if st is None:
+                st = self.endpoints[endpoint] = EndpointStats()
+            st.requests += 1
+            st.queries += queries
+            st.db_seconds += db_seconds
+            st.request_seconds += request_seconds
+            st.max_queries = max(st.max_queries, queries)
+            for item in statements:
+                if len(st.slowest) < self.slowest_n:
+                    heapq.heappush(st.slowest, item)
+                elif item[0] > st.slowest[0][0]:
+                    heapq.heapreplace(st.slowest, item)
+
+    def prometheus(self) -> str:
+        series = (
+            ("erp_http_requests_total", "counter", "HTTP requests handled", lambda s: s.requests),
+            ("erp_http_request_seconds_total", "counter", "Time spent handling requests", lambda s: s.request_seconds),
+            ("erp_db_queries_total", "counter", "SQL statements executed", lambda s: s.queries),
+            ("erp_db_seconds_total", "counter", "Time spent in SQL statements", lambda s: s.db_seconds),
+            ("erp_db_queries_per_request_max", "gauge", "Most SQL statements in one request", lambda s: s.max_queries),
+            ("erp_db_slowest_query_seconds", "gauge", "Slowest SQL statement seen",
+             lambda s: max((t for t, _ in s.slowest), default=0.0)),
+        )
+        with self._lock:
+            items = sorted(self.endpoints.items())
+            lines = []
+            for name, kind, help_text, value in series:
+                lines += [f"# HELP {name} {help_text}, by endpoint.", f"# TYPE {name} {kind}"]
+                lines += [f'{name}{{endpoint="{_label(ep)}"}} {value(st)}' for ep, st in items]
+        return "\n".join(lines) + "\n"
+
+    def slow_statements(self) -> dict:
+        with self._lock:
+            return {ep: [{"ms": round(t * 1000, 2), "sql": sql} for t, sql in sorted(st.slowest, reverse=True)]
+                    for ep, st in sorted(self.endpoints.items())}
+
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _stats():
+    return g.get("db_stats") if has_app_context() else None
+
+
+# ------------------------------ SQL ------------------------------ #
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _stats() is not None:
+        conn.info[_START_KEY] = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    t0 = conn.info.pop(_START_KEY, None)
+    stats = _stats()
+    if t0 is None or stats is None:
+        return
+    elapsed = time.perf_counter() - t0
+    stats["queries"] += 1
+    stats["db_seconds"] += elapsed
+    stats["statements"].append((elapsed, statement))
+    if elapsed * 1000 >= current_app.config.get("SLOW_QUERY_MS", 200):
+        current_app.logger.warning("slow query %.1f ms [%s]: %s", elapsed * 1000, request.endpoint, statement)
+
+
+# ------------------------------ запросы ------------------------------ #
+def _on_request_started(app, **_extra):
+    g.db_stats = {"queries": 0, "db_seconds": 0.0, "statements": [], "started": time.perf_counter()}
+
+
+def _on_request_finished(app, response, **_extra):
+    stats = g.pop("db_stats", None)
+    if stats is None:
+        return
+    elapsed = time.perf_counter() - stats["started"]
+    slowest = heapq.nlargest(app.extensions[_EXT_KEY].slowest_n, stats["statements"], key=lambda s: s[0])
+    app.extensions[_EXT_KEY].record(request.endpoint or "<unmatched>", stats["queries"], stats["db_seconds"],
+                                    elapsed, slowest)
+    if app.config.get("SERVER_TIMING"):
+        response.headers.add("Server-Timing", f'db;dur={stats["db_seconds"] * 1000:.1f};desc="{stats["queries"]} queries"')
+        response.headers.add("Server-Timing", f"app;dur={elapsed * 1000:.1f}")
+
+
+def metrics_view():
+    token = current_app.config.get("METRICS_TOKEN")
+    if token:
+        given = request.headers.get("Authorization", "")
+        if not hmac.compare_digest(given.encode(), f"Bearer {token}".encode()):
+            abort(403)
+    elif not current_user.is_authenticated:
+        return current_app.login_manager.unauthorized()
+    elif not permissions.can(f"role:{permissions.ROOT}"):
+        abort(403)
+    metrics = current_app.extensions[_EXT_KEY]
+    if request.path.endswith("/slow"):
+        return jsonify(metrics.slow_statements())
+    return metrics.prometheus(), 200, {"Content-Type": "text/plain; version=0.0.4; charset=utf-8"}
+
+
+def install(app) -> None:
+    """Счётчики и /metrics (METRICS_ENABLED)."""
+    if not app.config.get("METRICS_ENABLED", True):
+        return
+    app.extensions[_EXT_KEY] = Metrics(app.config.get("METRICS_SLOWEST", 5))
+    request_started.connect(_on_request_started, app)
+    request_finished.connect(_on_request_finished, app)
+    app.add_url_rule("/metrics", "metrics", metrics_view)
+    app.add_url_rule("/metrics/slow", "metrics_slow", metrics_view)
+
+
+# ------------------------------ тесты/бенчмарки ------------------------------ #
+class QueryCounter:
+    def __init__(self):
+        self.statements: list[str] = []
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+
+@contextmanager
+def count_queries():
+    """Все SQL-выражения внутри блока (любой движок, любой контекст)."""
+    counter = QueryCounter()
+
+    def _collect(conn, cursor, statement, *_args):
+        counter.statements.append(statement)
+
+    event.listen(Engine, "before_cursor_execute", _collect)
+    try:
+        yield counter
+    finally:
+        event.remove(Engine, "before_cursor_execute", _collect)
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""
+Профиль подключения к БД (DB_PROFILE в config.py).
+
+production:
+- SQLite (файл): WAL (читатели не блокируют писателя), synchronous=NORMAL, busy_timeout вместо
+  мгновенного «database is locked», большой page cache, mmap, temp_store=MEMORY; пул соединений.
+- SQLite (:memory:): только busy_timeout / cache_size / temp_store — WAL и mmap там не применимы.
+- PostgreSQL: размер пула, pre-ping, pool_recycle, statement_timeout и
+  idle_in_transaction_session_timeout на уровне соединения.
+default: настройки драйвера «как есть» (для сравнения в benchmarks/bench_db_profile.py).
+
+configure(app) вызывается ДО db.init_app (движки создаются там), install_hooks(app) — сразу после.
+Явно заданные в конфиге SQLALCHEMY_ENGINE_OPTIONS и dict-записи SQLALCHEMY_BINDS имеют приоритет.
+"""
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+from extensions import db
+
+
+def _is_sqlite(url) -> bool:
+    return url.get_backend_name() == "sqlite"
+
+
+def _is_memory(url) -> bool:
+    return url.database in (None, "", ":memory:")
+
+
+def engine_options(uri, config) -> dict:
+    """Параметры create_engine для одного URI по профилю из config."""
+    if (config.get("DB_PROFILE") or "default").lower() != "production":
+        return {}
+    url = make_url(uri)
+    if _is_sqlite(url):
+        if _is_memory(url):
+            return {}  # StaticPool ставит Flask-SQLAlchemy, параметры пула к нему не применимы
+        return {
+            "pool_size": config["DB_POOL_SIZE"],
+            "max_overflow": config["DB_MAX_OVERFLOW"],
+            # check_same_thread=False: соединение из пула может достаться другому потоку
+            "connect_args": {"timeout": config["SQLITE_BUSY_TIMEOUT_MS"] / 1000, "check_same_thread": False},
+        }
+    if url.get_backend_name() == "postgresql":
+        # через options, а не SET в connect-хуке: SET транзакционный и откатится при возврате в пул
+        opts = (f"-c statement_timeout={int(config['PG_STATEMENT_TIMEOUT_MS'])} "
+                f"-c idle_in_transaction_session_timeout={int(config['PG_IDLE_TX_TIMEOUT_MS'])}")
+        return {
+            "pool_size": config["DB_POOL_SIZE"],
+            "max_overflow": config["DB_MAX_OVERFLOW"],
+            "pool_recycle": config["DB_POOL_RECYCLE"],
+            "pool_pre_ping": True,
+            "connect_args": {"options": opts},
+        }
+    return {"pool_pre_ping": True, "pool_recycle": config["DB_POOL_RECYCLE"]}
+
+
+def sqlite_pragmas(url, config) -> list[str]:
+    if (config.get("DB_PROFILE") or "default").lower() != "production":
+        return []
+    pragmas = [
+        f"PRAGMA busy_timeout={int(config['SQLITE_BUSY_TIMEOUT_MS'])}",
+        f"PRAGMA cache_size=-{int(config['SQLITE_CACHE_SIZE_KB'])}",   # отрицательное — в КиБ
+        "PRAGMA temp_store=MEMORY",
+    ]
+    if not _is_memory(url):
+        pragmas = [
+            f"PRAGMA synchronous={config['SQLITE_SYNCHRONOUS']}",
+            f"PRAGMA mmap_size={int(config['SQLITE_MMAP_SIZE_MB']) * 1024 * 1024}",
+        ] + pragmas
+        if url.query.get("mode") != "ro":  # режим журнала меняет только пишущее соединение
+            pragmas.insert(0, "PRAGMA journal_mode=WAL")
+    return pragmas
+
+
+def configure(app) -> None:
+    """Заполнить SQLALCHEMY_ENGINE_OPTIONS и опции binds по профилю (до db.init_app)."""
+    cfg = app.config
+    uri = cfg.get("SQLALCHEMY_DATABASE_URI")
+    if uri:
+        cfg["SQLALCHEMY_ENGINE_OPTIONS"] = {**engine_options(uri, cfg), **(cfg.get("SQLALCHEMY_ENGINE_OPTIONS") or {})}
+    binds = {}
+    for key, value in (cfg.get("SQLALCHEMY_BINDS") or {}).items():
+        if isinstance(value, dict):
+            binds[key] = {**engine_options(value["url"], cfg), **value}
+        else:
+            binds[key] = {"url": value, **engine_options(value, cfg)}
+    cfg["SQLALCHEMY_BINDS"] = binds
+
+
+def attach_pragmas(engine, config) -> None:
+    """PRAGMA профиля на каждое новое соединение движка (если это SQLite)."""
+    if not _is_sqlite(engine.url):
+        return
+    pragmas = sqlite_pragmas(engine.url, config)
+    if not pragmas:
+        return
+
+    def _on_connect(dbapi_conn, _record):
+        cur = dbapi_conn.cursor()
+        for p in pragmas:
+            cur.execute(p)
+        cur.close()
+
+    event.listen(engine, "connect", _on_connect)
+
+
+def install_hooks(app) -> None:
+    """PRAGMA на соединения всех движков приложения (после db.init_app)."""
+    with app.app_context():
+        engines = dict(db.engines)
+    for engine in engines.values():
+        attach_pragmas(engine, app.config)
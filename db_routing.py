@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""
+Маршрутизация чтения: тяжёлые отчёты и выгрузки — на реплику, всё остальное — на основную базу.
+
+- Движок чтения: DATABASE_READONLY_URI (реплика PostgreSQL и т.п.), а если его нет и основная база —
+  SQLite-файл, то тот же файл, открытый отдельным пулом с mode=ro. Для :memory: маршрутизации нет.
+  Это не bind Flask-SQLAlchemy (его метаданные общие для всех app в процессе), а свой движок
+  в app.extensions с теми же настройками профиля (db_profile).
+- Вид, помеченный @read_only (или блок `with use_replica():`), читает через этот движок
+  всё, что иначе пошло бы в основную базу. Модели со своим bind_key (очередь событий) не трогаем.
+- Запись и «прочитать своё»: flush в этом запросе возвращает его на основную базу; после записи
+  клиент ещё READ_YOUR_WRITES_SECONDS читает с основной (отметка в сессии Flask) — на случай лага реплики.
+"""
+
+import os
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from flask import current_app, g, has_app_context, has_request_context, session
+from flask_sqlalchemy.session import Session as _FlaskSession
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session
+
+_EXT_KEY = "db_readonly_engine"
+_SESSION_KEY = "_db_primary_until"
+
+
+def readonly_uri(app) -> str | None:
+    """URI движка чтения (или None — маршрутизация выключена)."""
+    config = app.config
+    if not config.get("DB_READONLY_ROUTING", True):
+        return None
+    if config.get("DATABASE_READONLY_URI"):
+        return config["DATABASE_READONLY_URI"]
+    uri = config.get("SQLALCHEMY_DATABASE_URI")
+    if not uri:
+        return None
+    url = make_url(uri)
+    if url.get_backend_name() != "sqlite" or url.database in (None, "", ":memory:") or url.query.get("uri"):
+        return None
+    path = url.database if os.path.isabs(url.database) else os.path.join(app.instance_path, url.database)
+    return f"sqlite:///file:{path}?mode=ro&uri=true"
+
+
+def readonly_engine():
+    return current_app.extensions.get(_EXT_KEY)
+
+
+def install(app) -> None:
+    """Движок чтения + отметки «клиент только что писал» (после db.init_app)."""
+    import db_profile  # db_profile -> extensions -> db_routing: импорт здесь, не на уровне модуля
+
+    uri = readonly_uri(app)
+    if uri:
+        engine = create_engine(uri, **db_profile.engine_options(uri, app.config))
+        db_profile.attach_pragmas(engine, app.config)
+        app.extensions[_EXT_KEY] = engine
+
+    @app.before_request
+    def _reset_write_flag():
+        g.pop("db_wrote", None)
+
+    @app.after_request
+    def _remember_write(resp):
+        if g.get("db_wrote"):
+            session[_SESSION_KEY] = time.time() + app.config.get("READ_YOUR_WRITES_SECONDS", 5)
+        return resp
+
+
+# ------------------------------ разметка видов ------------------------------ #
+@contextmanager
+def use_replica():
+    prev = g.get("db_read_only", False)
+    g.db_read_only = True
+    try:
+        yield
+    finally:
+        g.db_read_only = prev
+
+
+def read_only(view):
+    """Вид только читает: запросы к основной базе уходят на движок чтения."""
+    @wraps(view)
+    def wrapped(*args, **kwargs):
+        with use_replica():
+            return view(*args, **kwargs)
+    return wrapped
+
+
+def _route_to_replica() -> bool:
+    if not has_app_context() or not g.get("db_read_only") or g.get("db_wrote"):
+        return False
+    if has_request_context() and session.get(_SESSION_KEY, 0) > time.time():
+        return False
+    return True
+
+
+class RoutingSession(_FlaskSession):
+    """db.session: в режиме read_only подменяет основной движок на движок чтения (если он настроен)."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        engine = super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+        if bind is not None or self._flushing or not _route_to_replica():
+            return engine
+        replica = readonly_engine()
+        if replica is not None and engine is self._db.engines.get(None):
+            return replica
+        return engine
+
+
+@event.listens_for(Session, "after_flush")
+def _mark_write(session_, flush_context):
+    if has_app_context():
+        g.db_wrote = True
@@ -1,10 +1,12 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
 
+from db_routing import RoutingSession
+
 # Инициализация расширений без привязки к конкретному приложению
 
-# База данных
-db = SQLAlchemy()
+# База данных (сессия умеет уводить чтение отчётов на реплику — см. db_routing.py)
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 
 # Авторизация и управление пользователями
 login_manager = LoginManager()
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+"""
+Проверки для балансировщика, systemd и мониторинга (без входа в систему, без кэша).
+
+- GET /healthz — процесс жив и отвечает (базу не трогает: медленная база не должна убивать воркеры).
+- GET /readyz  — готов принимать запросы: для каждой базы (основная + binds) одно соединение
+  и SELECT версии схемы; схема отстала от миграций или база недоступна — 503 и причина в JSON.
+  Писатель очереди оснастки (TOOLING_INGEST_WORKER=thread) должен быть жив, если он запущен в этом процессе.
+"""
+
+import os
+import time
+
+from flask import current_app, jsonify
+from sqlalchemy.exc import SQLAlchemyError
+
+from extensions import db
+
+
+def _no_store(resp):
+    resp.headers["Cache-Control"] = "no-store"
+    return resp
+
+
+def healthz():
+    return _no_store(jsonify(ok=True, pid=os.getpid()))
+
+
+def _check_database(bind_key, engine) -> dict:
+    import migrations
+
+    t0 = time.perf_counter()
+    try:
+        version = migrations.current_version(engine)
+    except SQLAlchemyError as e:
+        return {"ok": False, "error": str(e.__cause__ or e).splitlines()[0]}
+    need = migrations.head(bind_key)
+    out = {"ok": version >= need, "schema": version, "ms": round((time.perf_counter() - t0) * 1000, 2)}
+    if version < need:
+        out["error"] = f"schema {version} < {need}: run python migrate.py"
+    return out
+
+
+def readyz():
+    checks = {bind_key or "main": _check_database(bind_key, engine) for bind_key, engine in db.engines.items()}
+    worker = current_app.extensions.get("tooling_ingest")
+    if worker is not None:
+        checks["tooling_ingest"] = {"ok": worker.is_alive()}
+    ok = all(c["ok"] for c in checks.values())
+    return _no_store(jsonify(ok=ok, pid=os.getpid(), checks=checks)), 200 if ok else 503
+
+
+def install(app) -> None:
+    """/healthz и /readyz."""
+    app.add_url_rule("/healthz", "healthz", healthz)
+    app.add_url_rule("/readyz", "readyz", readyz)
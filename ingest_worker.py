@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+"""
+ingest_worker.py — отдельный писатель очереди событий Tooling (см. modules/tooling/ingest.py).
+
+Режимы:
+- python ingest_worker.py         → работать постоянно (веб-процессы запускать с TOOLING_INGEST_WORKER=external)
+- python ingest_worker.py --once  → разобрать то, что накопилось, и выйти
+
+Одновременно пишет только один процесс (файловая блокировка в instance/): второй постоянный экземпляр ждёт,
+--once при занятой блокировке выходит сразу (очередь разберёт тот, кто её держит).
+"""
+
+import argparse
+import sys
+
+from app import create_app
+from extensions import db
+from modules.tooling import ingest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply queued tooling events to the main database")
+    parser.add_argument("--once", action="store_true", help="разобрать очередь один раз и выйти")
+    args = parser.parse_args()
+
+    app = create_app({"TOOLING_INGEST_WORKER": "external"})
+    if args.once:
+        lock = ingest.writer_lock(ingest.lock_path(app))
+        if lock is None:
+            print("→ Очередь уже разбирает другой писатель — выходим.")
+            sys.exit(0)
+        total = 0
+        with lock, app.app_context():
+            while n := ingest.drain_queue():
+                total += n
+            db.session.remove()
+        print(f"✔ Обработано событий: {total}")
+        return
+
+    worker = ingest.IngestWorker(app, ingest.lock_path(app))
+    print("→ Писатель очереди Tooling запущен (Ctrl+C — остановить)")
+    try:
+        worker.run()
+    except KeyboardInterrupt:
+        print("✔ Остановлен.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""
+Окна истории: последние N строк + курсор на более старые (keyset-пагинация).
+
+Курсор — ключ сортировки последней показанной строки: «2024-03-01T08:00:00_1234» (дата/время + id)
+или просто id, если порядок — по id. Следующая страница —
+WHERE (date, id) < (:date, :id) ORDER BY date DESC, id DESC LIMIT N: индекс по (…, date, id) отдаёт её
+за одно и то же время, сколько бы лет истории ни было у станка/BATCH, в отличие от OFFSET,
+который перебирает все пропущенные строки.
+"""
+
+from datetime import datetime
+from typing import NamedTuple, Optional
+
+import sqlalchemy as sa
+
+
+class Page(NamedTuple):
+    items: list
+    next_cursor: Optional[str]   # None — старше ничего нет
+
+
+def encode_cursor(value: datetime, row_id: int) -> str:
+    return f"{value.isoformat()}_{row_id}"
+
+
+def decode_cursor(cursor: Optional[str]):
+    """'<дата/время>_<id>' -> (datetime, id); битый курсор — None (первая страница)."""
+    raw, _, row_id = (cursor or "").rpartition("_")
+    try:
+        return datetime.fromisoformat(raw), int(row_id)
+    except ValueError:
+        return None
+
+
+def decode_id(cursor: Optional[str]) -> Optional[int]:
+    try:
+        return int(cursor) if cursor else None
+    except ValueError:
+        return None
+
+
+def older_than(order_col, id_col, cursor):
+    """Условие «строка старше курсора» для ORDER BY order_col DESC, id DESC.
+
+    order_col должна быть NOT NULL (tooling_events.happened_at — с v0018): строка с NULL не меньше
+    никакого курсора и пропала бы со всех страниц, кроме первой.
+    """
+    value, row_id = cursor
+    return sa.tuple_(order_col, id_col) < sa.tuple_(value, row_id)   # row value — диапазон по индексу
+
+
+def window(rows, limit: int, cursor_of) -> Page:
+    """rows выбраны с LIMIT limit + 1: лишняя строка означает, что есть страница старше."""
+    rows = list(rows)
+    if len(rows) <= limit:
+        return Page(rows, None)
+    rows = rows[:limit]
+    return Page(rows, cursor_of(rows[-1]))
+
+
+def page_size(value, default: int, maximum: int = 500) -> int:
+    try:
+        return max(1, min(int(value), maximum))
+    except (TypeError, ValueError):
+        return default
@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+"""
+migrate.py — миграции схемы БД (см. migrations/__init__.py).
+
+Режимы:
+- python migrate.py           → применить недостающие миграции во всех базах (основная + binds)
+- python migrate.py --status  → показать версию каждой базы и последнюю известную миграцию
+
+При AUTO_MIGRATE=1 (по умолчанию) то же самое делает первый стартующий воркер;
+в проде можно выключить AUTO_MIGRATE и запускать этот скрипт при деплое.
+"""
+
+import argparse
+
+from app import create_app
+from extensions import db
+import migrations
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply database schema migrations")
+    parser.add_argument("--status", action="store_true", help="только показать версии")
+    args = parser.parse_args()
+
+    app = create_app({"SCHEMA_CHECK_ON_START": False, "TOOLING_INGEST_WORKER": "off"})
+    with app.app_context():
+        for bind_key in db.metadatas:
+            engine = db.engines[bind_key]
+            name = bind_key or "main"
+            if not args.status:
+                for m in migrations.upgrade(engine, bind_key):
+                    print(f"→ {name}: {m.version:04d}_{m.name}")
+            print(f"✔ {name}: версия {migrations.current_version(engine)} (последняя {migrations.head(bind_key)})")
+
+
+if __name__ == "__main__":
+    main()
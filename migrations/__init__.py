@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+"""
+Версионированные миграции схемы (вместо db.create_all() на каждом старте).
+
+- Миграции — модули migrations/versions/vNNNN_<name>.py с функцией upgrade(conn) и
+  необязательным BIND (bind key Flask-SQLAlchemy; None — основная база). Номера сквозные, порядок — по номеру.
+- В каждой базе — таблица schema_version с ОДНОЙ строкой (id=1): номер последней применённой миграции.
+  При старте воркер читает только её; если версия отстаёт — догоняет (AUTO_MIGRATE) или падает с подсказкой.
+- Каждая миграция идемпотентна (create ... checkfirst, add_column проверяет наличие колонки),
+  поэтому старые базы, созданные create_all() / SQL-скриптами без schema_version, просто «усыновляются».
+- Параллельный старт воркеров: миграция выполняется под блокировкой (SQLite — BEGIN IMMEDIATE,
+  PostgreSQL — pg_advisory_xact_lock), версия перечитывается уже под ней.
+
+CLI: python migrate.py [--status]
+"""
+
+import importlib
+import pkgutil
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime
+from functools import lru_cache
+from typing import Callable, Optional
+
+import sqlalchemy as sa
+from sqlalchemy.exc import OperationalError, ProgrammingError
+
+from extensions import db
+
+from . import versions
+
+_LOCK_ID = 7_311_001  # произвольная константа для pg_advisory_xact_lock
+
+# Модели всех модулей: схема одна на всё приложение, даже если часть модулей выключена (ENABLED_MODULES)
+MODEL_MODULES = (
+    "models",
+    "modules.spare_parts.models",
+    "modules.maintenance.models",
+    "modules.tooling.models",
+)
+
+_version_meta = sa.MetaData()
+schema_version = sa.Table(
+    "schema_version", _version_meta,
+    sa.Column("id", sa.Integer, primary_key=True),
+    sa.Column("version", sa.Integer, nullable=False),
+    sa.Column("name", sa.String(128)),
+    sa.Column("applied_at", sa.DateTime),
+)
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    name: str
+    bind: Optional[str]
+    upgrade: Callable
+
+
+@lru_cache(maxsize=None)
+def discover() -> tuple[Migration, ...]:
+    """Все миграции из migrations/versions по возрастанию номера."""
+    out = []
+    for info in pkgutil.iter_modules(versions.__path__):
+        if not (info.name.startswith("v") and info.name[1:5].isdigit()):
+            continue
+        mod = importlib.import_module(f"{versions.__name__}.{info.name}")
+        out.append(Migration(int(info.name[1:5]), info.name[6:], getattr(mod, "BIND", None), mod.upgrade))
+    out.sort(key=lambda m: m.version)
+    if len({m.version for m in out}) != len(out):
+        raise RuntimeError("Повторяющиеся номера миграций в migrations/versions")
+    return tuple(out)
+
+
+def load_models() -> None:
+    """Импорт моделей всех модулей — помощникам миграций нужны их таблицы в db.metadatas."""
+    for name in MODEL_MODULES:
+        importlib.import_module(name)
+
+
+def head(bind_key: Optional[str] = None) -> int:
+    return max((m.version for m in discover() if m.bind == bind_key), default=0)
+
+
+# ------------------------------- версия ------------------------------- #
+def _read_version(conn) -> int:
+    return conn.execute(sa.select(schema_version.c.version).where(schema_version.c.id == 1)).scalar() or 0
+
+
+def current_version(engine) -> int:
+    """Версия схемы базы (0 — таблицы schema_version ещё нет). Один SELECT по первичному ключу."""
+    with engine.connect() as conn:
+        try:
+            return _read_version(conn)
+        except (OperationalError, ProgrammingError):
+            return 0
+
+
+def _write_version(conn, m: Migration) -> None:
+    values = dict(version=m.version, name=m.name, applied_at=datetime.utcnow())
+    if not conn.execute(schema_version.update().where(schema_version.c.id == 1).values(**values)).rowcount:
+        conn.execute(schema_version.insert().values(id=1, **values))
+
+
+@contextmanager
+def _locked(engine):
+    """Транзакция, в которой миграцию выполняет только один процесс."""
+    if engine.dialect.name == "sqlite":
+        # pysqlite сам открывает транзакции только перед DML — берём управление на себя
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.exec_driver_sql("ROLLBACK")
+                raise
+            conn.exec_driver_sql("COMMIT")
+    else:
+        with engine.begin() as conn:
+            if engine.dialect.name == "postgresql":
+                conn.execute(sa.text("SELECT pg_advisory_xact_lock(:k)"), {"k": _LOCK_ID})
+            yield conn
+
+
+def upgrade(engine, bind_key: Optional[str] = None, reapply: bool = False) -> list[Migration]:
+    """
+    Применить недостающие миграции базы ``bind_key``. Каждая миграция — своя транзакция.
+    reapply=True — прогнать все заново (после seed_tooling.py --reset: таблицы удалены, версия осталась).
+    """
+    load_models()
+    applied = []
+    for m in discover():
+        if m.bind != bind_key:
+            continue
+        with _locked(engine) as conn:
+            schema_version.create(conn, checkfirst=True)
+            if not reapply and _read_version(conn) >= m.version:
+                continue
+            m.upgrade(conn)
+            _write_version(conn, m)
+        applied.append(m)
+    return applied
+
+
+def ensure_schema(app) -> None:
+    """Проверка при старте: по одной строке schema_version на базу; догнать схему, если нужно."""
+    engines = db.engines
+    for bind_key in dict.fromkeys(m.bind for m in discover()):
+        if bind_key not in engines:  # bind не настроен в этом приложении
+            continue
+        engine = engines[bind_key]
+        need = head(bind_key)
+        if current_version(engine) >= need:
+            continue
+        if not app.config.get("AUTO_MIGRATE", True):
+            raise RuntimeError(f"Схема базы {bind_key or 'main'} устарела (нужна версия {need}): "
+                               f"запустите python migrate.py")
+        for m in upgrade(engine, bind_key):
+            app.logger.info("schema migration %04d_%s applied (%s)", m.version, m.name, bind_key or "main")
+
+
+# ------------------------- помощники для миграций ------------------------- #
+def table(name: str, bind_key: Optional[str] = None) -> sa.Table:
+    """Таблица из текущих моделей."""
+    return db.metadatas[bind_key].tables[name]
+
+
+def create_tables(conn, *names: str, bind_key: Optional[str] = None) -> None:
+    """CREATE TABLE (и её индексы из модели), если таблицы ещё нет."""
+    for name in names:
+        table(name, bind_key).create(conn, checkfirst=True)
+
+
+def add_column(conn, table_name: str, column_name: str, bind_key: Optional[str] = None) -> None:
+    """ALTER TABLE ... ADD COLUMN по описанию колонки в модели, если колонки ещё нет."""
+    existing = {c["name"] for c in sa.inspect(conn).get_columns(table_name)}
+    if column_name in existing:
+        return
+    col = table(table_name, bind_key).c[column_name]
+    ddl = sa.schema.CreateColumn(col).compile(dialect=conn.dialect)
+    conn.exec_driver_sql(f"ALTER TABLE {conn.dialect.identifier_preparer.quote(table_name)} ADD COLUMN {ddl}")
+
+
+def create_indexes(conn, table_name: str, *index_names: str, bind_key: Optional[str] = None) -> None:
+    """CREATE INDEX из модели, если индекса ещё нет."""
+    indexes = {i.name: i for i in table(table_name, bind_key).indexes}
+    for name in index_names:
+        indexes[name].create(conn, checkfirst=True)
@@ -0,0 +1 @@
+"""Schema migrations, applied in order by ``migrations.upgrade`` (``vNNNN_<name>.py``)."""
@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+"""
+Исходная схема (то, что раньше создавал db.create_all()) + колонки, которые раньше добавлялись
+вручную скриптом migrations/20251021_tooling_full.sql, — в старых базах их может не быть.
+"""
+
+from migrations import add_column, create_tables
+
+TABLES = (
+    "users", "parts",
+    "equipment", "equipment_parts", "checklist_templates", "checklist_items",
+    "maintenance_plans", "workorders", "workorder_items", "workorder_attachments",
+    "tool_types", "tooling", "equipment_slots", "tooling_mounts", "tooling_events",
+)
+
+LEGACY_COLUMNS = {
+    "tooling": ("intended_role", "current_diameter", "min_diameter", "regrind_count"),
+    "tooling_events": ("slot_id", "shift", "dimension", "new_dimension", "note", "reason"),
+}
+
+
+def upgrade(conn):
+    create_tables(conn, *TABLES)
+    for table_name, columns in LEGACY_COLUMNS.items():
+        for column in columns:
+            add_column(conn, table_name, column)
@@ -0,0 +1,9 @@
+# -*- coding: utf-8 -*-
+"""Индексы горячих запросов tooling_events (история BATCH, отчёты по BM# и ACTION за период)."""
+
+from migrations import create_indexes
+
+
+def upgrade(conn):
+    create_indexes(conn, "tooling_events", "idx_events_tool_time", "idx_events_machine_time", "idx_events_action_time")
+    conn.exec_driver_sql("ANALYZE tooling_events")  # обновить статистику планировщика
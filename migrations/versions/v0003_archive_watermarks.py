@@ -0,0 +1,8 @@
+# -*- coding: utf-8 -*-
+"""Граница архива по таблицам (archive.py)."""
+
+from migrations import create_tables
+
+
+def upgrade(conn):
+    create_tables(conn, "archive_watermarks")
@@ -0,0 +1,8 @@
+# -*- coding: utf-8 -*-
+"""Справочники формы событий Tooling и их версия (modules/tooling/reference.py)."""
+
+from migrations import create_tables
+
+
+def upgrade(conn):
+    create_tables(conn, "tooling_reference_values", "tooling_reference_version")
@@ -0,0 +1,8 @@
+# -*- coding: utf-8 -*-
+"""Квитанции применённых событий из очереди (modules/tooling/ingest.py)."""
+
+from migrations import create_tables
+
+
+def upgrade(conn):
+    create_tables(conn, "tooling_ingest_receipts")
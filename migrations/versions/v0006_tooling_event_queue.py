@@ -0,0 +1,10 @@
+# -*- coding: utf-8 -*-
+"""Очередь событий Tooling — отдельная база (bind "tooling_queue")."""
+
+from migrations import create_tables
+
+BIND = "tooling_queue"
+
+
+def upgrade(conn):
+    create_tables(conn, "tooling_event_queue", bind_key=BIND)
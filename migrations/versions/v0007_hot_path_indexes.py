@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+"""
+Индексы горячих путей: список активных BATCH #, занятость слотов, списки и KPI work orders,
+генерация WO по планам, дочерние строки WO и чек-листов (SQLite не индексирует FK сам).
+"""
+
+from migrations import create_indexes
+
+INDEXES = {
+    "tooling": ("idx_tooling_active_updated",),
+    "tooling_mounts": ("idx_mounts_active",),
+    "workorders": ("idx_workorders_status_due", "idx_workorders_plan_status", "idx_workorders_equipment"),
+    "workorder_items": ("idx_workorder_items_wo",),
+    "workorder_attachments": ("idx_workorder_attachments_wo",),
+    "checklist_items": ("idx_checklist_items_template",),
+    "maintenance_plans": ("idx_plans_next_due",),
+}
+
+
+def upgrade(conn):
+    for table_name, names in INDEXES.items():
+        create_indexes(conn, table_name, *names)
@@ -0,0 +1,12 @@
+# -*- coding: utf-8 -*-
+"""
+Счётчики на карточках: WO станка по статусу и события BATCH по action считаются GROUP BY
+только по индексу, без чтения строк истории.
+"""
+
+from migrations import create_indexes
+
+
+def upgrade(conn):
+    create_indexes(conn, "workorders", "idx_workorders_equipment_status")
+    create_indexes(conn, "tooling_events", "idx_events_tool_action")
@@ -0,0 +1,8 @@
+# -*- coding: utf-8 -*-
+"""Счётчики изменений таблиц для кэша страниц (page_cache.py)."""
+
+from migrations import create_tables
+
+
+def upgrade(conn):
+    create_tables(conn, "table_versions")
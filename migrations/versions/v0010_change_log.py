@@ -0,0 +1,8 @@
+# -*- coding: utf-8 -*-
+"""Журнал изменений для живых экранов цеха (change_feed.py)."""
+
+from migrations import create_tables
+
+
+def upgrade(conn):
+    create_tables(conn, "change_log")
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""
+Взаимозаменяемость запчастей: индекс по parts.analog_group, явные связи part_equivalences и
+готовые классы эквивалентности part_analog_classes — сразу посчитанные по уже заполненным группам.
+
+Пересчёт классов — замороженная копия services.rebuild_classes на момент этой миграции:
+дальнейшие правки сервиса не должны менять то, что делает уже выпущенная миграция.
+"""
+
+import sqlalchemy as sa
+
+from migrations import create_indexes, create_tables, table
+
+
+def _rebuild_classes(conn) -> None:
+    """Классы по общему analog_group и связям part_equivalences (union-find), id класса — наименьший id части."""
+    parts, links, classes = table("parts"), table("part_equivalences"), table("part_analog_classes")
+    parent: dict[int, int] = {}
+
+    def find(x: int) -> int:
+        parent.setdefault(x, x)
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    def union(a: int, b: int) -> None:
+        ra, rb = find(a), find(b)
+        if ra != rb:
+            parent[max(ra, rb)] = min(ra, rb)   # корень — наименьший id: он же id класса
+
+    first: dict[str, int] = {}
+    has_group = parts.c.analog_group.is_not(None) & (parts.c.analog_group != "")
+    for part_id, group in conn.execute(sa.select(parts.c.id, parts.c.analog_group).where(has_group)):
+        union(first.setdefault(group, part_id), part_id)
+    for a, b in conn.execute(sa.select(links.c.part_id, links.c.analog_id)):
+        union(a, b)
+
+    members: dict[int, int] = {}
+    for x in parent:
+        root = find(x)
+        members[root] = members.get(root, 0) + 1
+    rows = [{"part_id": x, "class_id": find(x)} for x in parent if members[find(x)] > 1]
+    conn.execute(classes.delete())
+    if rows:
+        conn.execute(classes.insert(), rows)
+
+
+def upgrade(conn):
+    create_indexes(conn, "parts", "idx_parts_analog_group")
+    create_tables(conn, "part_equivalences", "part_analog_classes")
+    _rebuild_classes(conn)
@@ -0,0 +1,8 @@
+# -*- coding: utf-8 -*-
+"""Складской учёт запчастей: журнал движений stock_transactions и остатки stock_balances."""
+
+from migrations import create_tables
+
+
+def upgrade(conn):
+    create_tables(conn, "stock_balances", "stock_transactions")
@@ -0,0 +1,8 @@
+# -*- coding: utf-8 -*-
+"""Точки заказа запчастей: результаты ночного расчёта part_reorder_levels."""
+
+from migrations import create_tables
+
+
+def upgrade(conn):
+    create_tables(conn, "part_reorder_levels")
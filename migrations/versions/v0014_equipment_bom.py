@@ -0,0 +1,16 @@
+# -*- coding: utf-8 -*-
+"""
+Спецификации оборудования (BOM): индексы equipment_parts для «где используется» и станков по участку.
+Связи, записанные раньше текстом в parts.equipment_code (ровно код станка), переносятся в equipment_parts.
+"""
+
+from migrations import create_indexes
+
+
+def upgrade(conn):
+    create_indexes(conn, "equipment_parts", "idx_equipment_parts_part")
+    create_indexes(conn, "equipment", "idx_equipment_location")
+    conn.exec_driver_sql(
+        "INSERT INTO equipment_parts (equipment_id, part_id, quantity) "
+        "SELECT e.id, p.id, 1 FROM parts p JOIN equipment e ON e.code = p.equipment_code "
+        "WHERE NOT EXISTS (SELECT 1 FROM equipment_parts ep WHERE ep.equipment_id = e.id AND ep.part_id = p.id)")
@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+"""
+Значения справочников формы событий Tooling по умолчанию (modules/tooling/reference.py DEFAULTS)
+для каждого kind, у которого в базе ещё нет ни одной строки. Раньше их дописывало чтение справочника
+(commit посреди чужой транзакции) — теперь чтение только читает.
+"""
+
+import sqlalchemy as sa
+
+from migrations import table
+
+
+def upgrade(conn):
+    from modules.tooling.reference import DEFAULTS
+
+    values = table("tooling_reference_values")
+    present = set(conn.execute(sa.select(values.c.kind).distinct()).scalars())
+    rows = [{"kind": kind, "value": value, "sort_order": order, "is_active": True}
+            for kind, defaults in DEFAULTS.items() if kind not in present
+            for order, value in enumerate(defaults, start=1)]
+    if rows:
+        conn.execute(values.insert(), rows)
@@ -0,0 +1,11 @@
+# -*- coding: utf-8 -*-
+"""BATCH # в очереди событий Tooling: отклонённые писателем события показываются на карточке BATCH."""
+
+from migrations import add_column, create_indexes
+
+BIND = "tooling_queue"
+
+
+def upgrade(conn):
+    add_column(conn, "tooling_event_queue", "batch_no", bind_key=BIND)
+    create_indexes(conn, "tooling_event_queue", "idx_queue_batch_status", bind_key=BIND)
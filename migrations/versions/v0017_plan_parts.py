@@ -0,0 +1,12 @@
+# -*- coding: utf-8 -*-
+"""
+Плановый расход запчастей: запчасти шаблонов ТО (checklist_template_parts) и их копии у планов (plan_parts).
+Выдача со склада помнит WO (stock_transactions.workorder_id), чтобы расход по планам не считался дважды.
+"""
+
+from migrations import add_column, create_tables
+
+
+def upgrade(conn):
+    create_tables(conn, "checklist_template_parts", "plan_parts")
+    add_column(conn, "stock_transactions", "workorder_id")
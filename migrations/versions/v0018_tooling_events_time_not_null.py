@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""
+tooling_events.happened_at NOT NULL: курсор истории BATCH (keyset.py) — пара (happened_at, id),
+строка с NULL выпадала бы из всех страниц после первой.
+
+Старые события без времени (базы, заполненные SQL-скриптами) получают время предыдущего события
+того же BATCH (порядок по id), а если его нет — 1970-01-01: в истории они остаются там же, где были.
+SQLite не умеет ALTER COLUMN — таблица пересоздаётся по модели (один раз: если колонка уже NOT NULL,
+пересборки нет).
+"""
+
+from datetime import datetime
+
+import sqlalchemy as sa
+
+from migrations import create_tables, table
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def _backfill(conn, ev) -> None:
+    prev = ev.alias("prev")
+    earlier = (sa.select(sa.func.max(prev.c.happened_at))
+               .where(prev.c.tool_id == ev.c.tool_id, prev.c.id < ev.c.id, prev.c.happened_at.is_not(None))
+               .scalar_subquery())
+    conn.execute(ev.update().where(ev.c.happened_at.is_(None))
+                 .values(happened_at=sa.func.coalesce(earlier, sa.literal(_EPOCH, sa.DateTime))))
+
+
+def _rebuild_sqlite(conn, ev) -> None:
+    """Старую таблицу — в сторону, новую — по модели (с индексами), строки — обратно."""
+    insp = sa.inspect(conn)
+    columns = [c["name"] for c in insp.get_columns(ev.name) if c["name"] in ev.c]
+    for index in insp.get_indexes(ev.name):
+        conn.exec_driver_sql(f'DROP INDEX "{index["name"]}"')
+    conn.exec_driver_sql(f'ALTER TABLE "{ev.name}" RENAME TO "{ev.name}__old"')
+    create_tables(conn, ev.name)
+    names = ", ".join(f'"{c}"' for c in columns)
+    conn.exec_driver_sql(f'INSERT INTO "{ev.name}" ({names}) SELECT {names} FROM "{ev.name}__old"')
+    conn.exec_driver_sql(f'DROP TABLE "{ev.name}__old"')
+
+
+def upgrade(conn):
+    ev = table("tooling_events")
+    column = next(c for c in sa.inspect(conn).get_columns(ev.name) if c["name"] == "happened_at")
+    if not column["nullable"]:
+        return
+    _backfill(conn, ev)
+    if conn.dialect.name == "sqlite":
+        _rebuild_sqlite(conn, ev)
+    else:
+        conn.exec_driver_sql(f'ALTER TABLE "{ev.name}" ALTER COLUMN happened_at SET NOT NULL')
@@ -1,8 +1,12 @@
 """Shared SQLAlchemy models."""
 
+from datetime import datetime
+
 from flask_login import UserMixin
+from sqlalchemy.orm import validates
 
 from extensions import db
+from permissions import check_role
 
 
 class User(UserMixin, db.Model):
@@ -15,5 +19,66 @@ class User(UserMixin, db.Model):
     password = db.Column(db.String(150), nullable=False)
     role = db.Column(db.String(50), nullable=False)  # user, admin, root
 
+    @validates("role")
+    def _validate_role(self, _key: str, role: str) -> str:
+        return check_role(role)
+
     def __repr__(self) -> str:  # pragma: no cover - debug helper
         return f"<User {self.username}>"
+
+
+class ArchiveWatermark(db.Model):
+    """Archiving boundary of a hot table (see ``archive.py``).
+
+    Rows dated before ``archived_before`` may live in the per-year archive
+    tables listed in ``years``; newer rows are always in the hot table.
+    """
+
+    __tablename__ = "archive_watermarks"
+
+    table_name = db.Column(db.String(64), primary_key=True)
+    archived_before = db.Column(db.DateTime, nullable=False)
+    years = db.Column(db.String(255), nullable=False, default="")  # "2022,2023"
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    @property
+    def year_list(self) -> list[int]:
+        return sorted(int(y) for y in (self.years or "").split(",") if y)
+
+
+class TableVersion(db.Model):
+    """Write counter of a table (see ``page_cache.py``).
+
+    Bumped in the same transaction as every ORM write to a table that a
+    cached page depends on, so any worker can tell a cached page is stale
+    with a single SELECT.
+    """
+
+    __tablename__ = "table_versions"
+
+    table_name = db.Column(db.String(64), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+
+class ChangeLogEntry(db.Model):
+    """One insert/update/delete of a watched table (see ``change_feed.py``).
+
+    ``seq`` is never reused (AUTOINCREMENT), so a client that remembers the last
+    ``seq`` it saw can ask for everything newer. Rows can become visible out of
+    ``seq`` order on PostgreSQL; the change hub waits for gaps to settle.
+    """
+
+    __tablename__ = "change_log"
+
+    seq = db.Column(db.Integer, primary_key=True)
+    table_name = db.Column(db.String(64), nullable=False)
+    row_id = db.Column(db.Integer, nullable=False)
+    op = db.Column(db.String(8), nullable=False)          # insert | update | delete
+    changed_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    data = db.Column(db.Text)                             # JSON of the row (None for delete)
+
+    __table_args__ = (
+        db.Index("idx_change_log_changed_at", "changed_at"),   # обрезка старых записей
+        {"sqlite_autoincrement": True},
+    )
@@ -1,3 +1,35 @@
-"""Domain modules for the ERP application."""
+"""Domain modules for the ERP application.
+
+Each module is a package exposing a ``bp`` blueprint. Only the modules listed in
+``ENABLED_MODULES`` are imported and registered by :func:`app.create_app`;
+:func:`resolve` adds the modules they depend on.
+"""
 
 __all__ = ["maintenance", "spare_parts", "tooling"]
+
+# module -> modules it imports (tooling uses Equipment, maintenance uses User/Part)
+DEPENDENCIES = {
+    "spare_parts": (),
+    "maintenance": ("spare_parts",),
+    "tooling": ("maintenance",),
+}
+CORE = "spare_parts"  # login, users and the user loader live here
+
+
+def resolve(names) -> list[str]:
+    """Enabled module names (comma-separated string or iterable) plus dependencies, in registration order."""
+    if isinstance(names, str):
+        names = names.split(",")
+    requested = {n.strip() for n in (names or ()) if n and n.strip()}
+    unknown = requested - DEPENDENCIES.keys()
+    if unknown:
+        raise ValueError(f"Unknown modules in ENABLED_MODULES: {', '.join(sorted(unknown))}")
+
+    enabled = {CORE}
+    stack = list(requested)
+    while stack:
+        name = stack.pop()
+        if name not in enabled:
+            enabled.add(name)
+        stack.extend(d for d in DEPENDENCIES[name] if d not in enabled)
+    return [name for name in DEPENDENCIES if name in enabled]
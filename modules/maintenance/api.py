@@ -0,0 +1,42 @@
+"""Maintenance resources of the JSON API (see ``rest_api.py``)."""
+
+from flask_login import current_user
+
+from rest_api import ApiError, Resource, register
+
+from . import services
+from .models import Equipment, MaintenancePlan, WorkOrder
+
+
+def _stamp_creator(workorders) -> None:
+    for wo in workorders:
+        if wo.created_by is None:
+            wo.created_by = getattr(current_user, "id", None)
+
+
+def _fill_plan_parts(plans) -> None:
+    services.fill_plan_parts(p.id for p in plans)   # шаблон мог смениться — расход запчастей заново
+
+
+# done ставит только форма заполнения чек-листа (closed_at, результаты пунктов)
+API_STATUSES = ("open", "in_progress", "rejected")
+
+
+def _check_workorder(wo, values, i) -> None:
+    status = values.get("status")
+    if status is not None and status not in API_STATUSES:
+        raise ApiError(f"items[{i}].status: expected one of {', '.join(API_STATUSES)}; "
+                       "work orders are closed through the checklist form")
+    if wo is not None and wo.status == "done" and status is not None:
+        values["closed_at"] = None   # переоткрытие — как /workorders/<id>/reopen
+
+
+register(Resource("equipment", Equipment, "maintenance", create_cap="equipment_create", update_cap="equipment_edit",
+                  read_only_fields=("id", "photo_path")))
+register(Resource("plans", MaintenancePlan, "maintenance", create_cap="plan_create", update_cap="plan_edit",
+                  read_only_fields=("id", "last_completed_at"), on_create=_fill_plan_parts,
+                  on_update=_fill_plan_parts))
+# Закрытие WO с чек-листом — только через форму заполнения; API меняет статус/срок/исполнителя
+register(Resource("workorders", WorkOrder, "maintenance", create_cap="wo_create_quick", update_cap="wo_reopen",
+                  read_only_fields=("id", "created_at", "created_by", "closed_at"), on_create=_stamp_creator,
+                  check=_check_workorder))
@@ -26,6 +26,9 @@ USER_TBL = getattr(User, "__tablename__", "user")     # 'user' или 'users'
 # ========== EQUIPMENT ==========
 class Equipment(db.Model):
     __tablename__ = "equipment"
+    __table_args__ = (
+        db.Index("idx_equipment_location", "location", "code"),   # BOM линии: станки участка по коду
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     code = db.Column(db.String(64), unique=True, nullable=False)   # BM-01
@@ -61,7 +64,9 @@ EquipmentParts = Table(
     Column("part_id", Integer,
            ForeignKey(f"{PART_TBL}.id", ondelete="CASCADE"),
            primary_key=True),
-    Column("quantity", Integer, default=1)
+    Column("quantity", Integer, default=1),
+    # PK (equipment_id, part_id) ведёт BOM станка; обратный индекс — «где используется» запчасть
+    db.Index("idx_equipment_parts_part", "part_id", "equipment_id"),
 )
 
 # Если у модели Part нет обратной связи — добавим её динамически
@@ -111,6 +116,23 @@ class ChecklistItem(db.Model):
 
     template = relationship("ChecklistTemplate", back_populates="items")
 
+    __table_args__ = (
+        db.Index("idx_checklist_items_template", "template_id", "order_index"),
+    )
+
+
+# Запчасти, которые расходует одно выполнение шаблона ТО (строки «SAP; кол-во» в форме шаблона)
+ChecklistTemplateParts = Table(
+    "checklist_template_parts", db.metadata,
+    Column("template_id", Integer,
+           ForeignKey("checklist_templates.id", ondelete="CASCADE"),
+           primary_key=True),
+    Column("part_id", Integer,
+           ForeignKey(f"{PART_TBL}.id", ondelete="CASCADE"),
+           primary_key=True),
+    Column("quantity", Integer, nullable=False, default=1),
+)
+
 
 # ========== MAINTENANCE PLANS ==========
 class MaintenancePlan(db.Model):
@@ -134,6 +156,10 @@ class MaintenancePlan(db.Model):
     template = relationship("ChecklistTemplate", back_populates="plans")
     workorders = relationship("WorkOrder", back_populates="plan")
 
+    __table_args__ = (
+        db.Index("idx_plans_next_due", "next_due_date"),   # генерация WO по сроку
+    )
+
     def compute_next_due(self, from_date=None):
         from datetime import date
         base = from_date or date.today()
@@ -150,6 +176,20 @@ class MaintenancePlan(db.Model):
         return base + timedelta(days=7)
 
 
+# Расход запчастей на одно выполнение плана ТО: копия запчастей его шаблона (services.fill_plan_parts).
+# По нему — плановая потребность в reorder.py (а не по всему BOM станка)
+PlanParts = Table(
+    "plan_parts", db.metadata,
+    Column("plan_id", Integer,
+           ForeignKey("maintenance_plans.id", ondelete="CASCADE"),
+           primary_key=True),
+    Column("part_id", Integer,
+           ForeignKey(f"{PART_TBL}.id", ondelete="CASCADE"),
+           primary_key=True),
+    Column("quantity", Integer, nullable=False, default=1),
+)
+
+
 # ========== WORK ORDERS ==========
 class WorkOrder(db.Model):
     __tablename__ = "workorders"
@@ -182,6 +222,13 @@ class WorkOrder(db.Model):
     attachments = relationship("WorkOrderAttachment", back_populates="workorder",
                                cascade="all, delete-orphan")
 
+    __table_args__ = (
+        db.Index("idx_workorders_status_due", "status", "due_date"),   # список WO по статусу, KPI «просрочено»
+        db.Index("idx_workorders_plan_status", "plan_id", "status"),   # «по плану уже есть открытый WO?»
+        db.Index("idx_workorders_equipment", "equipment_id"),
+        db.Index("idx_workorders_equipment_status", "equipment_id", "status"),   # счётчики WO станка по статусу
+    )
+
 
 class WorkOrderItem(db.Model):
     __tablename__ = "workorder_items"
@@ -202,6 +249,10 @@ class WorkOrderItem(db.Model):
     workorder = relationship("WorkOrder", back_populates="items")
     checklist_item = relationship("ChecklistItem")
 
+    __table_args__ = (
+        db.Index("idx_workorder_items_wo", "workorder_id"),
+    )
+
 
 class WorkOrderAttachment(db.Model):
     __tablename__ = "workorder_attachments"
@@ -213,3 +264,7 @@ class WorkOrderAttachment(db.Model):
     path = db.Column(db.String(255), nullable=False)
 
     workorder = relationship("WorkOrder", back_populates="attachments")
+
+    __table_args__ = (
+        db.Index("idx_workorder_attachments_wo", "workorder_id"),
+    )
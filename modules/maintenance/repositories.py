@@ -1,4 +1,72 @@
-"""Repository layer placeholder for maintenance domain."""
+"""Repository layer for the maintenance domain."""
 
-# Complex data access will be extracted from the handlers into dedicated
-# repository functions in the next iteration of the refactor.
+from typing import Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import joinedload
+
+from extensions import db
+from keyset import Page, window
+
+from modules.spare_parts.models import Part
+
+from .models import Equipment, EquipmentParts, MaintenancePlan, WorkOrder
+
+
+def equipment_plans(equipment_id: int) -> list[MaintenancePlan]:
+    """Plans of a machine with their templates in one statement."""
+    return (MaintenancePlan.query.options(joinedload(MaintenancePlan.template))
+            .filter_by(equipment_id=equipment_id)
+            .order_by(MaintenancePlan.next_due_date, MaintenancePlan.id)
+            .all())
+
+
+def workorder_window(equipment_id: int, before_id: Optional[int] = None, limit: int = 50) -> Page:
+    """Newest work orders of a machine, ``limit`` at a time; the cursor is the last id shown."""
+    stmt = (select(WorkOrder.id, WorkOrder.status, WorkOrder.due_date, WorkOrder.closed_at)
+            .where(WorkOrder.equipment_id == equipment_id))
+    if before_id is not None:
+        stmt = stmt.where(WorkOrder.id < before_id)
+    rows = db.session.execute(stmt.order_by(WorkOrder.id.desc()).limit(limit + 1)).all()
+    return window(rows, limit, lambda r: str(r.id))
+
+
+def workorder_counts(equipment_id: int) -> dict[str, int]:
+    """Work orders of a machine by status (index-only GROUP BY on idx_workorders_equipment_status)."""
+    stmt = (select(WorkOrder.status, func.count())
+            .where(WorkOrder.equipment_id == equipment_id)
+            .group_by(WorkOrder.status))
+    return {status or "": n for status, n in db.session.execute(stmt)}
+
+
+def bom_lines(equipment_id: Optional[int] = None, location: Optional[str] = None) -> list:
+    """BOM of one machine or of every machine on a line (``Equipment.location``): one joined SELECT,
+    rows ordered by machine code, then SAP code."""
+    stmt = (select(Equipment.id.label("equipment_id"), Equipment.code.label("equipment_code"),
+                   Equipment.name.label("equipment_name"), Equipment.location,
+                   Part.id.label("part_id"), Part.sap_code, Part.part_number, Part.name, Part.manufacturer,
+                   func.coalesce(EquipmentParts.c.quantity, 1).label("quantity"))
+            .join(EquipmentParts, EquipmentParts.c.equipment_id == Equipment.id)
+            .join(Part, Part.id == EquipmentParts.c.part_id))
+    if equipment_id is not None:
+        stmt = stmt.where(Equipment.id == equipment_id)
+    if location is not None:
+        stmt = stmt.where(Equipment.location == location)
+    return db.session.execute(stmt.order_by(Equipment.code, Part.sap_code)).all()
+
+
+def where_used(part_id: int) -> list:
+    """Machines whose BOM contains the part, with quantities (idx_equipment_parts_part)."""
+    return db.session.execute(
+        select(Equipment.id, Equipment.code, Equipment.name, Equipment.location,
+               func.coalesce(EquipmentParts.c.quantity, 1).label("quantity"))
+        .join(EquipmentParts, EquipmentParts.c.equipment_id == Equipment.id)
+        .where(EquipmentParts.c.part_id == part_id)
+        .order_by(Equipment.code)).all()
+
+
+def lines() -> list[tuple[str, int]]:
+    """(location, machines) for every line that has machines (GROUP BY on idx_equipment_location)."""
+    return [tuple(r) for r in db.session.execute(
+        select(Equipment.location, func.count()).where(Equipment.location.is_not(None))
+        .group_by(Equipment.location).order_by(Equipment.location))]
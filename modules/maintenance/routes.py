@@ -1,26 +1,42 @@
 """HTTP routes for the maintenance domain."""
 
+import csv
 from datetime import date, datetime
 
-from flask import render_template, request, redirect, url_for, flash
+from flask import abort, current_app, jsonify, render_template, request, redirect, url_for, flash
 from flask_login import login_required, current_user
+from sqlalchemy import delete
+from sqlalchemy.orm import joinedload
 
+import archive
+from db_routing import read_only
 from extensions import db
+from keyset import decode_id, page_size
+from modules.spare_parts.models import Part
+from modules.spare_parts.services import read_import_file
+from page_cache import cached_page
 from permissions import require_role
+from utils import allowed_file, handle_file_upload
 
 from . import bp
 from .models import (
     Equipment,
     ChecklistTemplate,
     ChecklistItem,
+    ChecklistTemplateParts,
     MaintenancePlan,
+    PlanParts,
     WorkOrder,
+    WorkOrderAttachment,
     WorkOrderItem,
 )
+from . import services
+from .repositories import bom_lines, equipment_plans, lines, where_used, workorder_counts, workorder_window
 
 # =================== EQUIPMENT ===================
 @bp.route("/equipment")
 @login_required
+@cached_page("equipment")
 def equipment_list():
     q = request.args.get("q", "").strip()
     query = Equipment.query
@@ -50,6 +66,7 @@ def equipment_add():
             sap_number=request.form.get("sap_number") or None,
             notes=request.form.get("notes") or None
         )
+        _save_equipment_photo(eq)
         db.session.add(eq)
         db.session.commit()
         flash("Equipment created", "success")
@@ -60,7 +77,24 @@ def equipment_add():
 @login_required
 def equipment_view(eid: int):
     eq = Equipment.query.get_or_404(eid)
-    return render_template("maintenance/equipment_view.html", item=eq)
+    # последние N WO + курсор на более старые: стоимость карточки не растёт с возрастом станка
+    page = workorder_window(eid, limit=current_app.config.get("HISTORY_PAGE_SIZE", 50))
+    return render_template("maintenance/equipment_view.html", item=eq,
+                           plans=equipment_plans(eid), workorders=page.items, next_cursor=page.next_cursor,
+                           wo_counts=workorder_counts(eid))
+
+@bp.route("/equipment/<int:eid>/workorders.json")
+@login_required
+def equipment_workorders_json(eid: int):
+    """Более старые WO станка для бесконечной прокрутки: ?before=<курсор>&limit=N."""
+    limit = page_size(request.args.get("limit"), current_app.config.get("HISTORY_PAGE_SIZE", 50))
+    page = workorder_window(eid, before_id=decode_id(request.args.get("before")), limit=limit)
+    return jsonify(items=[{
+        "id": w.id,
+        "status": w.status,
+        "due_date": w.due_date.isoformat() if w.due_date else None,
+        "url": url_for("maintenance.workorder_view", wid=w.id),
+    } for w in page.items], next=page.next_cursor)
 
 @bp.route("/equipment/<int:eid>/edit", methods=["GET", "POST"])
 @login_required
@@ -71,11 +105,17 @@ def equipment_edit(eid: int):
         for f in ["code", "name", "category", "location",
                   "vendor", "model", "serial_number", "sap_number", "notes"]:
             setattr(eq, f, request.form.get(f) or None)
+        _save_equipment_photo(eq)
         db.session.commit()
         flash("Equipment updated", "success")
         return redirect(url_for("maintenance.equipment_view", eid=eq.id))
     return render_template("maintenance/equipment_form.html", item=eq)
 
+def _save_equipment_photo(eq: Equipment) -> None:
+    photo = request.files.get("photo")
+    if photo and allowed_file(photo.filename):
+        eq.photo_path = handle_file_upload(photo, current_app.config["UPLOAD_FOLDER"])
+
 @bp.route("/equipment/<int:eid>/delete", methods=["POST"])
 @login_required
 @require_role("root")
@@ -86,13 +126,87 @@ def equipment_delete(eid: int):
     flash("Equipment deleted", "success")
     return redirect(url_for("maintenance.equipment_list"))
 
+# =================== BOM (equipment_parts) ===================
+def _bom_filter():
+    """?equipment=<id> — один станок, ?location=<участок> — вся линия."""
+    return request.args.get("equipment", type=int), request.args.get("location") or None
+
+@bp.route("/bom")
+@login_required
+@cached_page("equipment_parts", "equipment", "parts")
+def bom():
+    eid, location = _bom_filter()
+    if eid is None and location is None:
+        return render_template("maintenance/bom.html", lines=lines(), rows=None, item=None, location=None)
+    item = Equipment.query.get_or_404(eid) if eid is not None else None
+    return render_template("maintenance/bom.html", lines=None, rows=bom_lines(eid, location), item=item,
+                           location=location)
+
+@bp.route("/bom.json")
+@login_required
+@read_only
+def bom_json():
+    eid, location = _bom_filter()
+    if eid is None and location is None:
+        return jsonify(ok=False, error="equipment or location required"), 400
+    machines = {}
+    for r in bom_lines(eid, location):
+        m = machines.setdefault(r.equipment_id, {"id": r.equipment_id, "code": r.equipment_code,
+                                                 "name": r.equipment_name, "location": r.location, "parts": []})
+        m["parts"].append({"id": r.part_id, "sap_code": r.sap_code, "part_number": r.part_number, "name": r.name,
+                           "manufacturer": r.manufacturer, "quantity": r.quantity})
+    return jsonify(ok=True, items=list(machines.values()))
+
+@bp.route("/where-used/<int:part_id>")
+@login_required
+def part_where_used(part_id: int):
+    part = Part.query.get_or_404(part_id)
+    return render_template("maintenance/where_used.html", part=part, rows=where_used(part_id))
+
+@bp.route("/where-used/<int:part_id>.json")
+@login_required
+@read_only
+def part_where_used_json(part_id: int):
+    return jsonify(ok=True, part_id=part_id, items=[
+        {"id": r.id, "code": r.code, "name": r.name, "location": r.location, "quantity": r.quantity}
+        for r in where_used(part_id)])
+
+@bp.route("/bom/import", methods=["GET", "POST"])
+@login_required
+@require_role("admin", "root")
+def bom_import():
+    if request.method == "POST":
+        upload = request.files.get("file")
+        if not upload or not upload.filename:
+            flash("Choose a file to import.", "warning")
+            return render_template("maintenance/bom_import.html")
+        try:
+            rows = read_import_file(upload.filename, upload.read())
+        except (ValueError, UnicodeDecodeError, csv.Error) as e:
+            flash(f"Cannot read {upload.filename}: {e}", "danger")
+            return render_template("maintenance/bom_import.html")
+        result = services.import_bom(rows, replace=bool(request.form.get("replace")))
+        db.session.commit()
+        flash(f"BOM imported: {result['added']} added, {result['updated']} updated, {result['removed']} removed, "
+              f"{result['skipped']} skipped; {result['untouched']} machines left as they were (bad rows); "
+              f"unknown machines: {result['unknown_equipment']}, "
+              f"unknown parts: {result['unknown_parts']}.", "success")
+        return redirect(url_for("maintenance.bom"))
+    return render_template("maintenance/bom_import.html")
+
 # =================== CHECKLIST TEMPLATES ===================
 @bp.route("/checklists/templates")
 @login_required
+@cached_page("checklist_templates")
 def checklist_templates_list():
     items = ChecklistTemplate.query.order_by(ChecklistTemplate.code.asc()).all()
     return render_template("maintenance/checklist_templates_list.html", items=items)
 
+def _save_template_parts(template_id: int) -> None:
+    bad = services.set_template_parts(template_id, request.form.get("parts_raw", ""))
+    if bad:
+        flash(f"Parts not saved (unknown SAP code or bad quantity): {', '.join(bad)}", "warning")
+
 @bp.route("/checklists/templates/add", methods=["GET", "POST"])
 @login_required
 @require_role("root", "admin")
@@ -130,6 +244,7 @@ def checklist_template_add():
             ))
             order += 1
 
+        _save_template_parts(tmpl.id)
         db.session.commit()
         flash("Checklist Template created", "success")
         return redirect(url_for("maintenance.checklist_templates_list"))
@@ -172,6 +287,7 @@ def checklist_template_edit(tid: int):
             ))
             order += 1
 
+        _save_template_parts(tmpl.id)
         db.session.commit()
         flash("Checklist Template updated", "success")
         return redirect(url_for("maintenance.checklist_templates_list"))
@@ -180,7 +296,7 @@ def checklist_template_edit(tid: int):
     for it in tmpl.items:
         raw.append(f"{it.text_en} | {it.text_ru} | {it.field_type} | {it.options or ''}")
     return render_template("maintenance/checklist_template_form.html",
-                           item=tmpl, items_raw="\n".join(raw))
+                           item=tmpl, items_raw="\n".join(raw), parts_raw=services.template_parts_raw(tmpl.id))
 
 @bp.route("/checklists/templates/<int:tid>/delete", methods=["POST"])
 @login_required
@@ -188,6 +304,7 @@ def checklist_template_edit(tid: int):
 def checklist_template_delete(tid: int):
     tmpl = ChecklistTemplate.query.get_or_404(tid)
     ChecklistItem.query.filter_by(template_id=tmpl.id).delete()
+    db.session.execute(delete(ChecklistTemplateParts).where(ChecklistTemplateParts.c.template_id == tmpl.id))
     db.session.delete(tmpl)
     db.session.commit()
     flash("Checklist Template deleted", "success")
@@ -196,8 +313,11 @@ def checklist_template_delete(tid: int):
 # =================== MAINTENANCE PLANS ===================
 @bp.route("/plans")
 @login_required
+@cached_page("maintenance_plans", "equipment", "checklist_templates")
 def maintenance_plans_list():
-    items = MaintenancePlan.query.order_by(MaintenancePlan.id.desc()).all()
+    items = (MaintenancePlan.query
+             .options(joinedload(MaintenancePlan.equipment), joinedload(MaintenancePlan.template))
+             .order_by(MaintenancePlan.id.desc()).all())
     return render_template("maintenance/maintenance_plans_list.html", items=items)
 
 @bp.route("/plans/add", methods=["GET", "POST"])
@@ -214,6 +334,8 @@ def maintenance_plan_add():
                           if request.form.get("next_due_date") else date.today()
         )
         db.session.add(mp)
+        db.session.flush()
+        services.fill_plan_parts([mp.id])   # расход запчастей — из шаблона
         db.session.commit()
         flash("Maintenance Plan created", "success")
         return redirect(url_for("maintenance.maintenance_plans_list"))
@@ -229,11 +351,15 @@ def maintenance_plan_edit(pid: int):
     mp = MaintenancePlan.query.get_or_404(pid)
     if request.method == "POST":
         mp.equipment_id = int(request.form["equipment_id"])
-        mp.template_id  = int(request.form["template_id"])
+        template_id = int(request.form["template_id"])
         mp.frequency    = request.form.get("frequency") or mp.frequency
         mp.grace_days   = int(request.form.get("grace_days") or 0)
         if request.form.get("next_due_date"):
             mp.next_due_date = date.fromisoformat(request.form.get("next_due_date"))
+        if template_id != mp.template_id:
+            mp.template_id = template_id
+            db.session.flush()
+            services.fill_plan_parts([mp.id])
         db.session.commit()
         flash("Maintenance Plan updated", "success")
         return redirect(url_for("maintenance.maintenance_plans_list"))
@@ -247,6 +373,7 @@ def maintenance_plan_edit(pid: int):
 @require_role("root")
 def maintenance_plan_delete(pid: int):
     mp = MaintenancePlan.query.get_or_404(pid)
+    db.session.execute(delete(PlanParts).where(PlanParts.c.plan_id == mp.id))
     db.session.delete(mp)
     db.session.commit()
     flash("Maintenance Plan deleted", "success")
@@ -289,9 +416,11 @@ def maintenance_schedule_run():
 # =================== WORK ORDERS ===================
 @bp.route("/workorders")
 @login_required
+@read_only
 def workorders_list():
     status = request.args.get("status")
-    query = WorkOrder.query
+    # equipment/template в той же выборке — без запроса на каждую строку списка
+    query = WorkOrder.query.options(joinedload(WorkOrder.equipment), joinedload(WorkOrder.template))
     if status:
         query = query.filter_by(status=status)
     items = query.all()
@@ -300,7 +429,9 @@ def workorders_list():
 @bp.route("/workorders/<int:wid>")
 @login_required
 def workorder_view(wid: int):
-    wo = WorkOrder.query.get_or_404(wid)
+    wo = db.session.get(WorkOrder, wid) or archive.find_workorder(wid)
+    if wo is None:
+        abort(404)
     return render_template("maintenance/workorder_view.html", wo=wo)
 
 @bp.route("/workorders/<int:wid>/fill", methods=["GET", "POST"])
@@ -325,6 +456,10 @@ def workorder_fill(wid: int):
                 item.is_ok = bool(item.value_select)
             else:  # text
                 item.value_text = request.form.get(field_name)
+        for photo in request.files.getlist("attachments"):
+            if photo and allowed_file(photo.filename):
+                path = handle_file_upload(photo, current_app.config["UPLOAD_FOLDER"])
+                wo.attachments.append(WorkOrderAttachment(path=path))
         wo.status = "done"
         if hasattr(wo, "closed_at"):
             wo.closed_at = datetime.utcnow()
@@ -1,5 +1,137 @@
-"""Service layer placeholder for maintenance domain."""
+"""Service layer for the maintenance domain.
+
+Most maintenance workflows still live in the routes; this module hosts the
+set-based operations that do not fit a single form post (BOM import, parts
+consumed by maintenance plans).
+"""
+
+from typing import Iterable
+
+from sqlalchemy import bindparam, delete, insert, select, update
+
+from extensions import db
+from modules.spare_parts.models import Part
+
+from .models import ChecklistTemplateParts, Equipment, EquipmentParts, MaintenancePlan, PlanParts
+
+_bom = EquipmentParts
+_tpl_parts, _plan_parts = ChecklistTemplateParts, PlanParts
+_CHUNK = 500   # значений в одном IN (...) — ниже лимита переменных SQLite
+
+
+def _ids(column, key, codes: Iterable[str]) -> dict[str, int]:
+    codes, out = sorted(set(codes)), {}
+    for i in range(0, len(codes), _CHUNK):
+        out.update(db.session.execute(select(column, key).where(column.in_(codes[i:i + _CHUNK]))).all())
+    return out
+
+
+def import_bom(rows: list[dict], replace: bool = False) -> dict:
+    """
+    Bulk BOM import: rows with ``equipment_code``, ``sap_code`` and an optional ``quantity`` (default 1).
+    Existing lines get the new quantity, new ones are inserted; with ``replace`` the lines of the
+    machines in the file that the file does not list are removed. A machine with any bad row (unknown
+    part, missing or invalid quantity) is left untouched in ``replace`` mode: otherwise its real lines
+    would be deleted. Caller commits.
+    """
+    wanted: dict[tuple[str, str], int] = {}
+    broken: set[str] = set()   # машины с плохими строками
+    skipped = 0
+    for r in rows:
+        code, sap = (r.get("equipment_code") or "").strip(), (r.get("sap_code") or "").strip()
+        try:
+            quantity = int(r.get("quantity") or 1)
+        except ValueError:
+            quantity = 0
+        if not code or not sap or quantity <= 0:
+            skipped += 1
+            if code:
+                broken.add(code)
+            continue
+        wanted[(code, sap)] = quantity   # повтор строки — последняя побеждает
+
+    machines = _ids(Equipment.code, Equipment.id, {c for c, _ in wanted} | broken)
+    parts = _ids(Part.sap_code, Part.id, (s for _, s in wanted))
+    broken.update(c for c, s in wanted if s not in parts)
+    untouched = {c for c in broken if c in machines} if replace else set()
+    if untouched:
+        machines = {c: e for c, e in machines.items() if c not in untouched}
+    lines = {(machines[c], parts[s]): q for (c, s), q in wanted.items() if c in machines and s in parts}
+
+    present: dict[tuple[int, int], int] = {}
+    ids = sorted({e for e, _ in lines} if not replace else set(machines.values()))
+    for i in range(0, len(ids), _CHUNK):
+        present.update(((e, p), q) for e, p, q in db.session.execute(
+            select(_bom.c.equipment_id, _bom.c.part_id, _bom.c.quantity)
+            .where(_bom.c.equipment_id.in_(ids[i:i + _CHUNK]))))
+
+    new = [{"equipment_id": e, "part_id": p, "quantity": q} for (e, p), q in sorted(lines.items())
+           if (e, p) not in present]
+    changed = [{"e": e, "p": p, "q": q} for (e, p), q in sorted(lines.items())
+               if (e, p) in present and present[(e, p)] != q]
+    gone = [{"e": e, "p": p} for e, p in sorted(present) if replace and (e, p) not in lines]
+    if new:
+        db.session.execute(insert(_bom), new)
+    if changed:
+        db.session.execute(update(_bom).where(_bom.c.equipment_id == bindparam("e"), _bom.c.part_id == bindparam("p"))
+                           .values(quantity=bindparam("q")), changed)
+    if gone:
+        db.session.execute(delete(_bom).where(_bom.c.equipment_id == bindparam("e"), _bom.c.part_id == bindparam("p")),
+                           gone)
+    return {"added": len(new), "updated": len(changed), "removed": len(gone), "skipped": skipped,
+            "untouched": len(untouched),
+            "unknown_equipment": len({c for c, _ in wanted if c not in machines and c not in untouched}),
+            "unknown_parts": len({s for _, s in wanted if s not in parts})}
+
+
+def template_parts_raw(template_id: int) -> str:
+    """Parts of a checklist template as form lines ``SAP; quantity``."""
+    return "\n".join(f"{sap}; {q}" for sap, q in db.session.execute(
+        select(Part.sap_code, _tpl_parts.c.quantity).join(_tpl_parts, _tpl_parts.c.part_id == Part.id)
+        .where(_tpl_parts.c.template_id == template_id).order_by(Part.sap_code)))
+
+
+def set_template_parts(template_id: int, raw: str) -> list[str]:
+    """
+    Replace the parts one run of a checklist template consumes (lines ``SAP; quantity``, quantity
+    defaults to 1) and copy them to the template's plans. Returns the lines that were not understood
+    (unknown SAP code, bad quantity). Caller commits.
+    """
+    wanted: dict[str, int] = {}
+    bad = []
+    for line in raw.splitlines():
+        sap, _, qty = (p.strip() for p in line.replace(",", ";").partition(";"))
+        if not sap:
+            continue
+        try:
+            quantity = int(qty or 1)
+        except ValueError:
+            quantity = 0
+        if quantity <= 0:
+            bad.append(line.strip())
+            continue
+        wanted[sap] = quantity
+    parts = _ids(Part.sap_code, Part.id, wanted)
+    bad += [sap for sap in wanted if sap not in parts]
+
+    db.session.execute(delete(_tpl_parts).where(_tpl_parts.c.template_id == template_id))
+    rows = [{"template_id": template_id, "part_id": parts[s], "quantity": q} for s, q in wanted.items() if s in parts]
+    if rows:
+        db.session.execute(insert(_tpl_parts), rows)
+    fill_plan_parts(db.session.scalars(select(MaintenancePlan.id).where(MaintenancePlan.template_id == template_id)))
+    return bad
+
+
+def fill_plan_parts(plan_ids: Iterable[int]) -> None:
+    """plan_parts of the given plans := the parts of their checklist templates (set-based). Caller commits."""
+    ids = sorted(set(plan_ids))
+    plans = MaintenancePlan.__table__
+    for i in range(0, len(ids), _CHUNK):
+        chunk = ids[i:i + _CHUNK]
+        db.session.execute(delete(_plan_parts).where(_plan_parts.c.plan_id.in_(chunk)))
+        db.session.execute(insert(_plan_parts).from_select(
+            ["plan_id", "part_id", "quantity"],
+            select(plans.c.id, _tpl_parts.c.part_id, _tpl_parts.c.quantity)
+            .join(_tpl_parts, _tpl_parts.c.template_id == plans.c.template_id)
+            .where(plans.c.id.in_(chunk))))
 
-# Legacy routes encapsulate the maintenance workflows today. This module is
-# ready to host cohesive service functions once the refactor reaches that
-# milestone.
@@ -0,0 +1,10 @@
+"""Spare parts resources of the JSON API (see ``rest_api.py``)."""
+
+from rest_api import Resource, register
+
+from .models import Part, StockTransaction
+
+register(Resource("parts", Part, "spare_parts", create_cap="parts_create", update_cap="parts_edit",
+                  read_only_fields=("id", "photo_path", "timestamp")))  # фото — только через форму (uploads.py)
+# Складской журнал только читается: проводки — через stock.py (остатки меняются в той же транзакции)
+register(Resource("stock_transactions", StockTransaction, "spare_parts"))
@@ -9,6 +9,7 @@ class Part(db.Model):
     """Represents a spare part item."""
 
     __tablename__ = "parts"
+    __table_args__ = (db.Index("idx_parts_analog_group", "analog_group"),)
 
     id = db.Column(db.Integer, primary_key=True)
     sap_code = db.Column(db.String(50), unique=True, nullable=False)
@@ -25,3 +26,103 @@ class Part(db.Model):
 
     def __repr__(self) -> str:  # pragma: no cover - debug helper
         return f"<Part {self.sap_code}: {self.name}>"
+
+
+class PartEquivalence(db.Model):
+    """Explicit interchangeability link between two parts (e.g. a cross-manufacturer reference).
+
+    Stored once per pair with ``part_id < analog_id``; the relation is symmetric.
+    """
+
+    __tablename__ = "part_equivalences"
+    __table_args__ = (
+        db.UniqueConstraint("part_id", "analog_id", name="uq_part_equivalences_pair"),
+        db.Index("idx_part_equivalences_analog", "analog_id"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    part_id = db.Column(db.Integer, db.ForeignKey("parts.id", ondelete="CASCADE"), nullable=False)
+    analog_id = db.Column(db.Integer, db.ForeignKey("parts.id", ondelete="CASCADE"), nullable=False)
+    source = db.Column(db.String(20), nullable=False, default="manual")   # manual | import
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+class PartAnalogClass(db.Model):
+    """Precomputed equivalence class of a part (see ``services.py``).
+
+    Only parts that have at least one analog get a row; ``class_id`` is the
+    smallest part id of the class, so all analogs of a part are one indexed join.
+    """
+
+    __tablename__ = "part_analog_classes"
+    __table_args__ = (db.Index("idx_part_analog_classes_class", "class_id"),)
+
+    part_id = db.Column(db.Integer, db.ForeignKey("parts.id", ondelete="CASCADE"), primary_key=True)
+    class_id = db.Column(db.Integer, nullable=False)
+
+
+class StockBalance(db.Model):
+    """On-hand quantity of a part at one location, maintained by ``stock.py``.
+
+    Updated in the same transaction as the ledger row that changes it, so reads
+    never sum ``stock_transactions``. ``version`` grows with every change
+    (optimistic check for stock counts).
+    """
+
+    __tablename__ = "stock_balances"
+    __table_args__ = (
+        db.CheckConstraint("on_hand >= 0", name="ck_stock_balances_on_hand"),
+        db.Index("idx_stock_balances_location", "location"),
+    )
+
+    part_id = db.Column(db.Integer, db.ForeignKey("parts.id", ondelete="CASCADE"), primary_key=True)
+    location = db.Column(db.String(50), primary_key=True)
+    on_hand = db.Column(db.Integer, nullable=False, default=0)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+class StockTransaction(db.Model):
+    """Append-only stock ledger row: a receipt, an issue or an adjustment.
+
+    ``quantity`` is the signed change (issues are negative), ``balance_after``
+    the on-hand quantity at the location right after it.
+    """
+
+    __tablename__ = "stock_transactions"
+    __table_args__ = (
+        db.Index("idx_stock_transactions_part", "part_id", "id"),
+        db.Index("idx_stock_transactions_created", "created_at"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    part_id = db.Column(db.Integer, db.ForeignKey("parts.id"), nullable=False)
+    location = db.Column(db.String(50), nullable=False)
+    kind = db.Column(db.String(10), nullable=False)            # receipt | issue | adjust
+    quantity = db.Column(db.Integer, nullable=False)
+    balance_after = db.Column(db.Integer, nullable=False)
+    reference = db.Column(db.String(100))                      # накладная, WO, акт инвентаризации
+    workorder_id = db.Column(db.Integer)                       # выдача на WO (без FK: maintenance может быть выключен)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    created_by = db.Column(db.Integer, db.ForeignKey("users.id"))
+
+
+class PartReorderLevel(db.Model):
+    """Nightly reorder calculation for one part (``reorder.py``), read by the "to order" report.
+
+    ``daily_usage`` is the issue history rate (without issues to planned work
+    orders) plus the rate of planned maintenance consumption; quantities are
+    summed over all locations.
+    """
+
+    __tablename__ = "part_reorder_levels"
+    __table_args__ = (db.Index("idx_part_reorder_levels_order", "order_qty"),)
+
+    part_id = db.Column(db.Integer, db.ForeignKey("parts.id", ondelete="CASCADE"), primary_key=True)
+    issued = db.Column(db.Integer, nullable=False, default=0)        # выдано за окно истории
+    planned = db.Column(db.Integer, nullable=False, default=0)       # нужно по планам ТО за горизонт
+    daily_usage = db.Column(db.Float, nullable=False, default=0)
+    on_hand = db.Column(db.Integer, nullable=False, default=0)
+    reorder_point = db.Column(db.Integer, nullable=False, default=0)
+    order_qty = db.Column(db.Integer, nullable=False, default=0)
+    computed_at = db.Column(db.DateTime, nullable=False)
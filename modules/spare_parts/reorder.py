@@ -0,0 +1,126 @@
+"""Reorder points and suggested order quantities for spare parts.
+
+A nightly batch (``reorder_parts.py``) recomputes every part at once and stores
+the result in ``part_reorder_levels``; the "to order" report only reads it.
+All inputs are fetched set-based (three grouped SELECTs), so the cost is a
+handful of statements whatever the number of parts:
+
+- issue history: issued quantity per part over ``REORDER_HISTORY_DAYS``, except
+  issues to work orders of maintenance plans (``stock_transactions.workorder_id``);
+- planned maintenance: occurrences of active plans (machine status ``active``) in
+  the lead + review horizon times the parts one run of the plan consumes
+  (``plan_parts``, copied from the plan's checklist template);
+- on hand: the maintained ``stock_balances`` summed per part.
+
+Planned consumption is left out of the history, so daily usage is the sum of the
+two rates. Then::
+
+    reorder point = ceil(usage * (lead time + safety days))
+    order qty     = reorder point + ceil(usage * review days) - on hand, if on hand <= reorder point
+"""
+
+import math
+import time
+from datetime import date, datetime, timedelta
+from typing import Optional
+
+from flask import current_app
+from sqlalchemy import delete, func, insert, or_, select
+
+from extensions import db
+
+from .models import Part, PartReorderLevel, StockBalance, StockTransaction
+
+# Как MaintenancePlan.compute_next_due: прочие частоты (by_hours) — раз в неделю
+PERIOD_DAYS = {"daily": 1, "weekly": 7, "monthly": 30, "quarterly": 90, "yearly": 365}
+DEFAULT_PERIOD_DAYS = 7
+ACTIVE_EQUIPMENT = "active"   # планы остальных станков (списан, в резерве) потребности не дают
+
+
+def _ceil(x: float) -> int:
+    return math.ceil(round(x, 6))   # 0.1 * 30 не должно стать 4
+
+
+def occurrences(next_due: date, period_days: int, start: date, end: date) -> int:
+    """Plan occurrences in ``[start, end)``; an overdue plan is due on ``start``."""
+    first = max(next_due, start)
+    if first >= end:
+        return 0
+    return ((end - first).days - 1) // period_days + 1
+
+
+def _planned_demand(conn, start: date, end: date) -> dict[int, int]:
+    """part id -> quantity needed by active maintenance plans in ``[start, end)``."""
+    tables = db.metadata.tables
+    plans, plan_parts, equipment = (tables.get(t) for t in ("maintenance_plans", "plan_parts", "equipment"))
+    if plans is None or plan_parts is None:   # модуль maintenance не подключён
+        return {}
+    rows = conn.execute(
+        select(plan_parts.c.part_id, plans.c.frequency, plans.c.next_due_date, func.sum(plan_parts.c.quantity))
+        .join(plans, plans.c.id == plan_parts.c.plan_id)
+        .join(equipment, equipment.c.id == plans.c.equipment_id)
+        .where(plans.c.next_due_date.is_not(None), plans.c.next_due_date < end,
+               or_(equipment.c.status == ACTIVE_EQUIPMENT, equipment.c.status.is_(None)))
+        .group_by(plan_parts.c.part_id, plans.c.frequency, plans.c.next_due_date))
+    demand: dict[int, int] = {}
+    for part_id, frequency, next_due, quantity in rows:
+        n = occurrences(next_due, PERIOD_DAYS.get(frequency, DEFAULT_PERIOD_DAYS), start, end)
+        if n:
+            demand[part_id] = demand.get(part_id, 0) + n * quantity
+    return demand
+
+
+def compute(conn, today: date, history_days: int, lead_days: int, review_days: int,
+            safety_days: int) -> list[dict]:
+    """Reorder rows for every part with issue history or planned demand."""
+    tx = StockTransaction.__table__
+    since = datetime.combine(today - timedelta(days=history_days), datetime.min.time())
+    stmt = (select(tx.c.part_id, -func.sum(tx.c.quantity))
+            .where(tx.c.kind == "issue", tx.c.created_at >= since)
+            .group_by(tx.c.part_id))
+    workorders = db.metadata.tables.get("workorders")
+    if workorders is not None:   # выдачи на WO плана уже сидят в плановой потребности
+        stmt = stmt.outerjoin(workorders, workorders.c.id == tx.c.workorder_id).where(workorders.c.plan_id.is_(None))
+    issued = dict(conn.execute(stmt).all())
+    horizon = lead_days + review_days
+    planned = _planned_demand(conn, today, today + timedelta(days=horizon))
+    bal = StockBalance.__table__
+    on_hand = dict(conn.execute(select(bal.c.part_id, func.sum(bal.c.on_hand)).group_by(bal.c.part_id)).all())
+    known = set(conn.execute(select(Part.__table__.c.id)).scalars())
+
+    now = datetime.utcnow()
+    rows = []
+    for part_id in sorted((issued.keys() | planned.keys()) & known):
+        used, need, have = issued.get(part_id, 0), planned.get(part_id, 0), on_hand.get(part_id, 0)
+        usage = (used / history_days if history_days else 0.0) + (need / horizon if horizon else 0.0)
+        point = _ceil(usage * (lead_days + safety_days))
+        order = max(point + _ceil(usage * review_days) - have, 0) if have <= point and usage else 0
+        rows.append({"part_id": part_id, "issued": used, "planned": need, "daily_usage": usage,
+                     "on_hand": have, "reorder_point": point, "order_qty": order, "computed_at": now})
+    return rows
+
+
+def recalculate(today: Optional[date] = None) -> dict:
+    """Recompute and replace all reorder levels (settings from ``REORDER_*``). Caller commits."""
+    cfg = current_app.config
+    started = time.perf_counter()
+    conn = db.session.connection(bind_arguments={"mapper": PartReorderLevel.__mapper__})
+    rows = compute(conn, today or date.today(), cfg["REORDER_HISTORY_DAYS"], cfg["REORDER_LEAD_TIME_DAYS"],
+                   cfg["REORDER_REVIEW_DAYS"], cfg["REORDER_SAFETY_DAYS"])
+    db.session.execute(delete(PartReorderLevel))   # через сессию: page_cache увидит запись в таблицу
+    if rows:
+        db.session.execute(insert(PartReorderLevel), rows)
+    return {"parts": len(rows), "to_order": sum(1 for r in rows if r["order_qty"]),
+            "seconds": round(time.perf_counter() - started, 3)}
+
+
+# ------------------------------ отчёт ------------------------------ #
+def to_order() -> list[tuple[Part, PartReorderLevel]]:
+    """Parts at or below their reorder point, by SAP code (index on ``order_qty``)."""
+    return [tuple(r) for r in db.session.execute(
+        select(Part, PartReorderLevel).join(PartReorderLevel, PartReorderLevel.part_id == Part.id)
+        .where(PartReorderLevel.order_qty > 0).order_by(Part.sap_code))]
+
+
+def computed_at() -> Optional[datetime]:
+    return db.session.scalar(select(func.max(PartReorderLevel.computed_at)))
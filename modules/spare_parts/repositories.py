@@ -1,4 +1,52 @@
 """Repository layer for spare parts data access."""
 
-# The repository layer will be populated as soon as the project introduces
-# dedicated query objects for the spare parts domain.
+from typing import Optional
+
+from sqlalchemy import func, or_, select
+from sqlalchemy.orm import aliased
+
+from extensions import db
+
+from .models import Part, PartAnalogClass, PartEquivalence
+
+
+def interchangeable_parts(part_id: int) -> list[Part]:
+    """Every other part of the same precomputed class (one indexed join)."""
+    mine = aliased(PartAnalogClass)
+    return list(db.session.execute(
+        select(Part)
+        .join(PartAnalogClass, PartAnalogClass.part_id == Part.id)
+        .join(mine, mine.class_id == PartAnalogClass.class_id)
+        .where(mine.part_id == part_id, Part.id != part_id)
+        .order_by(Part.manufacturer, Part.sap_code)).scalars())
+
+
+def analog_class_by_sap(sap_code: str) -> list[tuple]:
+    """(id, sap_code, part_number, name, manufacturer, location, class_id) of the class of ``sap_code``,
+    the part itself included; a part without analogs is returned alone with class_id None."""
+    own = aliased(Part)
+    mine = aliased(PartAnalogClass)
+    rows = db.session.execute(
+        select(Part.id, Part.sap_code, Part.part_number, Part.name, Part.manufacturer, Part.location,
+               PartAnalogClass.class_id)
+        .select_from(own)
+        .outerjoin(mine, mine.part_id == own.id)
+        .outerjoin(PartAnalogClass, PartAnalogClass.class_id == mine.class_id)
+        .join(Part, Part.id == func.coalesce(PartAnalogClass.part_id, own.id))
+        .where(own.sap_code == sap_code)
+        .order_by(Part.id)).all()
+    return [tuple(r) for r in rows]
+
+
+def linked_part_ids(part_id: int) -> set[int]:
+    """Parts linked to ``part_id`` explicitly (not through ``analog_group``)."""
+    rows = db.session.execute(select(PartEquivalence.part_id, PartEquivalence.analog_id).where(
+        or_(PartEquivalence.part_id == part_id, PartEquivalence.analog_id == part_id)))
+    return {b if a == part_id else a for a, b in rows}
+
+
+def neighbour_ids(part_id: int) -> tuple[Optional[int], Optional[int]]:
+    """Previous and next part id for the card navigation (two index lookups in one statement)."""
+    prev_id = select(func.max(Part.id)).where(Part.id < part_id).scalar_subquery()
+    next_id = select(func.min(Part.id)).where(Part.id > part_id).scalar_subquery()
+    return tuple(db.session.execute(select(prev_id, next_id)).one())
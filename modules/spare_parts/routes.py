@@ -1,7 +1,9 @@
 """HTTP routes for the spare parts domain."""
 
+import csv
+
 from flask import current_app
-from flask import render_template, redirect, url_for, request, flash, session
+from flask import render_template, redirect, url_for, request, flash, session, jsonify
 from flask_login import (
     UserMixin,
     current_user,
@@ -9,25 +11,26 @@ from flask_login import (
     login_user,
     logout_user,
 )
-from werkzeug.security import check_password_hash
 from sqlalchemy import or_
 
+import auth
+from db_routing import read_only
 from extensions import db, login_manager
-from models import User
 from modules.spare_parts.models import Part
-from permissions import require_role
+from page_cache import cached_page
+from permissions import can, require_role
 from utils import allowed_file, handle_file_upload
 
-from . import bp
+from . import bp, reorder, repositories, services, stock
 
 @login_manager.user_loader
-def load_user(user_id: str | None) -> User | UserMixin | None:
-    """Resolve a ``User`` instance for Flask-Login sessions."""
+def load_user(user_id: str | None) -> UserMixin | None:
+    """Resolve the current principal (id, username, role) for Flask-Login sessions."""
 
     if not user_id:
         return None
 
-    user = db.session.get(User, int(user_id))
+    user = auth.load_principal(int(user_id))  # кэш принципалов, без SELECT на каждом запросе
     if user is not None:
         return user
 
@@ -46,6 +49,7 @@ def load_user(user_id: str | None) -> User | UserMixin | None:
 
 @bp.route('/')
 @login_required
+@cached_page('parts')
 def index():
     parts = Part.query.all()
     count = Part.query.count()
@@ -56,10 +60,18 @@ def login():
     if request.method == 'POST':
         username = request.form['username']
         password = request.form['password']
-        user = User.query.filter_by(username=username).first()
-        if user and check_password_hash(user.password, password):
+        throttle = auth.login_throttle()
+        user_key, ip_key = auth.throttle_keys(username, request.remote_addr)
+        wait = throttle.retry_after(user_key, ip_key)
+        if wait > 0:
+            flash(f'Too many failed login attempts. Try again in {int(wait) + 1} s.')
+            return render_template('login.html'), 429
+        user = auth.authenticate(username, password)
+        if user:
+            throttle.reset(user_key)
             login_user(user)
             return redirect(url_for('main.index'))
+        throttle.failure(user_key, ip_key)
         flash('Invalid username or password')
     return render_template('login.html')
 
@@ -142,27 +154,126 @@ def edit_part(part_id):
 def view_part(part_id):
     part = Part.query.get_or_404(part_id)
 
-    analogs = []
-    if part.analog_group:
-        analogs = Part.query.filter(
-            Part.analog_group == part.analog_group,
-            Part.id != part.id
-        ).all()
-
-    all_ids = [p.id for p in Part.query.order_by(Part.id).all()]
-    current_index = all_ids.index(part.id)
-    prev_id = all_ids[current_index - 1] if current_index > 0 else None
-    next_id = all_ids[current_index + 1] if current_index < len(all_ids) - 1 else None
+    # аналоги — из готовых классов взаимозаменяемости (services.py), соседи — по индексу, без списка всех id
+    analogs = repositories.interchangeable_parts(part.id)
+    linked = repositories.linked_part_ids(part.id) if analogs else set()
+    prev_id, next_id = repositories.neighbour_ids(part.id)
+    # остатки — из таблицы балансов (PK-поиск), журнал — последние движения по индексу (part_id, id)
+    balances = stock.balances(part.id)
+    movements = stock.transactions(part.id)
 
     return render_template(
         'view_part.html',
         part=part,
         analogs=analogs,
+        linked=linked,
+        balances=balances,
+        movements=movements,
         user=current_user,
         prev_id=prev_id,
         next_id=next_id
     )
 
+STOCK_CAPS = {'receipt': 'stock_receive', 'issue': 'stock_issue', 'adjust': 'stock_adjust'}
+
+@bp.route('/part/<int:part_id>/stock', methods=['POST'])
+@login_required
+def post_stock(part_id):
+    part = Part.query.get_or_404(part_id)
+    kind = request.form.get('kind', '')
+    if not can(STOCK_CAPS.get(kind, 'stock_adjust')):
+        flash('You do not have permission for this stock movement.')
+        return redirect(url_for('main.view_part', part_id=part.id))
+    form = request.form
+    try:
+        if kind == 'adjust' and form.get('version', '') != '':   # инвентаризация: фактический остаток
+            stock.count(part.id, form.get('location'), form.get('quantity'), int(form['version']),
+                        form.get('reference'), current_user.id)
+        else:
+            workorder_id = int(form['workorder_id']) if form.get('workorder_id') and kind == 'issue' else None
+            stock.post(part.id, form.get('location'), kind, form.get('quantity'), form.get('reference'),
+                       current_user.id, workorder_id)
+        db.session.commit()
+        flash('Stock updated.')
+    except ValueError as e:   # StockError или испорченное поле version / workorder_id
+        db.session.rollback()
+        flash(f'Stock not changed: {e}')
+    return redirect(url_for('main.view_part', part_id=part.id))
+
+@bp.route('/stock/receipts', methods=['GET', 'POST'])
+@login_required
+@require_role('admin','root')
+def goods_receipt():
+    if request.method == 'POST':
+        reference = request.form.get('reference', '').strip()
+        try:
+            lines = stock.parse_receipt_lines(request.form.get('lines', ''))
+            posted = stock.post_receipts(lines, reference, current_user.id)
+        except stock.StockError as e:
+            db.session.rollback()
+            flash(f'Goods receipt not posted: {e}')
+            return render_template('goods_receipt.html', lines=request.form.get('lines', ''), reference=reference)
+        db.session.commit()
+        flash(f'Goods receipt {reference or ""} posted: {posted} lines.')
+        return redirect(url_for('main.goods_receipt'))
+    return render_template('goods_receipt.html', lines='', reference='')
+
+@bp.route('/stock/to-order')
+@login_required
+@cached_page('part_reorder_levels', 'parts')
+def to_order():
+    # результат ночного расчёта (reorder_parts.py) — отчёт ничего не пересчитывает
+    return render_template('to_order.html', rows=reorder.to_order(), computed_at=reorder.computed_at(),
+                           user=current_user)
+
+@bp.route('/stock/to-order/recalculate', methods=['POST'])
+@login_required
+@require_role('admin','root')
+def recalculate_reorder():
+    result = reorder.recalculate()
+    db.session.commit()
+    flash(f"Reorder levels recalculated: {result['parts']} parts with demand, {result['to_order']} to order "
+          f"({result['seconds']} s).")
+    return redirect(url_for('main.to_order'))
+
+@bp.route('/part/<int:part_id>/analogs', methods=['POST'])
+@login_required
+def link_analog(part_id):
+    part = Part.query.get_or_404(part_id)
+    if not can('analogs_edit'):
+        flash('You do not have permission to edit analogs.')
+        return redirect(url_for('main.view_part', part_id=part.id))
+    sap_code = request.form.get('sap_code', '').strip()
+    other = Part.query.filter_by(sap_code=sap_code).first() if sap_code else None
+    if other is None or other.id == part.id:
+        flash(f'Part {sap_code or "?"} not found.')
+    else:
+        services.link(part.id, other.id)
+        db.session.commit()
+        flash(f'{other.sap_code} marked as interchangeable.')
+    return redirect(url_for('main.view_part', part_id=part.id))
+
+@bp.route('/part/<int:part_id>/analogs/<int:analog_id>/delete', methods=['POST'])
+@login_required
+def unlink_analog(part_id, analog_id):
+    if not can('analogs_edit'):
+        flash('You do not have permission to edit analogs.')
+    elif services.unlink(part_id, analog_id):
+        db.session.commit()
+        flash('Link removed.')
+    return redirect(url_for('main.view_part', part_id=part_id))
+
+@bp.route('/analogs/<sap_code>.json')
+@login_required
+@read_only
+def analogs_json(sap_code):
+    rows = repositories.analog_class_by_sap(sap_code)
+    if not rows:
+        return jsonify(ok=False, error='not found'), 404
+    keys = ('id', 'sap_code', 'part_number', 'name', 'manufacturer', 'location')
+    return jsonify(ok=True, sap_code=sap_code, class_id=rows[0][-1],
+                   parts=[dict(zip(keys, r)) for r in rows])
+
 @bp.route('/delete/<int:part_id>', methods=['POST'])
 @login_required
 @require_role('root')
@@ -184,7 +295,21 @@ def export():
 @login_required
 @require_role('admin','root')
 def import_parts():
-    # свою реализацию импорта оставь/верни, доступ ограничен
+    if request.method == 'POST':
+        upload = request.files.get('file')
+        if not upload or not upload.filename:
+            flash('Choose a file to import.')
+            return render_template('import.html')
+        try:
+            rows = services.read_import_file(upload.filename, upload.read())
+        except (ValueError, UnicodeDecodeError, csv.Error) as e:
+            flash(f'Cannot read {upload.filename}: {e}')
+            return render_template('import.html')
+        result = services.import_parts(rows)   # классы аналогов пересчитываются один раз на весь файл
+        db.session.commit()
+        flash(f"Imported: {result['created']} new, {result['updated']} updated, {result['skipped']} skipped; "
+              f"{result['links']} analog links added.")
+        return redirect(url_for('main.index'))
     return render_template('import.html')
 
 @bp.route('/search', methods=['GET'])
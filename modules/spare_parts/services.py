@@ -1,5 +1,271 @@
-"""Service layer for spare parts operations."""
+"""Service layer for spare parts operations.
 
-# The service layer is intentionally empty because the legacy implementation
-# keeps the logic inside the Flask routes. It will be filled when business
-# use-cases are extracted from the handlers.
+Interchangeability: two parts are analogs when they share ``analog_group`` or are
+linked in ``part_equivalences`` (cross-manufacturer references), transitively.
+The classes are precomputed with union-find into ``part_analog_classes`` so the
+part card and ``/parts/analogs/<sap_code>.json`` read them with one indexed join:
+
+- ``rebuild_classes`` recomputes everything set-based (after imports; v0011 keeps its own copy);
+- form edits and API writes refresh only the classes they touch, in the same
+  transaction (``before_commit`` listener below).
+"""
+
+import csv
+import io
+from typing import Iterable, Iterator, Optional
+
+from sqlalchemy import delete, event, insert, or_, select, update
+from sqlalchemy import inspect as sa_inspect
+from sqlalchemy.orm import Session
+
+from extensions import db
+
+from .models import Part, PartAnalogClass, PartEquivalence
+
+_parts = Part.__table__
+_links = PartEquivalence.__table__
+_classes = PartAnalogClass.__table__
+_INFO_KEY = "analog_parts_touched"
+_CHUNK = 500   # id в одном IN (...) — ниже лимита переменных SQLite
+
+IMPORT_FIELDS = ("sap_code", "part_number", "name", "category", "equipment_code", "location",
+                 "manufacturer", "analog_group", "description")
+
+
+class DisjointSet:
+    """Union-find with path halving and union by size."""
+
+    def __init__(self):
+        self.parent: dict[int, int] = {}
+        self.size: dict[int, int] = {}
+
+    def find(self, x: int) -> int:
+        parent = self.parent
+        if x not in parent:
+            parent[x], self.size[x] = x, 1
+            return x
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    def union(self, a: int, b: int) -> None:
+        ra, rb = self.find(a), self.find(b)
+        if ra == rb:
+            return
+        if self.size[ra] < self.size[rb]:
+            ra, rb = rb, ra
+        self.parent[rb] = ra
+        self.size[ra] += self.size[rb]
+
+    def classes(self) -> dict[int, int]:
+        """part id -> class id (smallest id of its class), only for classes of two or more parts."""
+        members: dict[int, list[int]] = {}
+        for x in self.parent:
+            members.setdefault(self.find(x), []).append(x)
+        return {x: min(group) for group in members.values() if len(group) > 1 for x in group}
+
+
+def _chunks(ids: Iterable[int]) -> Iterator[list[int]]:
+    ids = sorted(ids)
+    for i in range(0, len(ids), _CHUNK):
+        yield ids[i:i + _CHUNK]
+
+
+def _has_group():
+    return (_parts.c.analog_group.is_not(None)) & (_parts.c.analog_group != "")
+
+
+def _union_groups(dsu: DisjointSet, rows) -> None:
+    first: dict[str, int] = {}
+    for part_id, group in rows:
+        dsu.find(part_id)
+        if group in first:
+            dsu.union(first[group], part_id)
+        else:
+            first[group] = part_id
+
+
+def _write(conn, classes: dict[int, int]) -> None:
+    if classes:
+        conn.execute(insert(_classes), [{"part_id": p, "class_id": c} for p, c in classes.items()])
+
+
+# ------------------------------ пересчёт ------------------------------ #
+def rebuild_classes(conn) -> int:
+    """Recompute every class from scratch (two SELECTs, one DELETE, one bulk INSERT). Returns parts in classes."""
+    dsu = DisjointSet()
+    _union_groups(dsu, conn.execute(select(_parts.c.id, _parts.c.analog_group).where(_has_group())))
+    for a, b in conn.execute(select(_links.c.part_id, _links.c.analog_id)):
+        dsu.union(a, b)
+    classes = dsu.classes()
+    conn.execute(delete(_classes))
+    _write(conn, classes)
+    return len(classes)
+
+
+def _component_graph(conn, seeds: set[int]) -> DisjointSet:
+    """Union-find over the whole components that contain ``seeds`` (breadth-first, set-based per level)."""
+    dsu, seen, groups_seen = DisjointSet(), set(), set()
+    frontier = set(seeds)
+    while frontier:
+        seen |= frontier
+        found: set[int] = set()
+        for chunk in _chunks(frontier):
+            groups = set(conn.execute(select(_parts.c.analog_group).where(_parts.c.id.in_(chunk), _has_group()))
+                         .scalars()) - groups_seen
+            if groups:
+                groups_seen |= groups
+                rows = conn.execute(select(_parts.c.id, _parts.c.analog_group)
+                                    .where(_parts.c.analog_group.in_(groups))).all()
+                _union_groups(dsu, rows)
+                found.update(r[0] for r in rows)
+            for a, b in conn.execute(select(_links.c.part_id, _links.c.analog_id)
+                                     .where(or_(_links.c.part_id.in_(chunk), _links.c.analog_id.in_(chunk)))):
+                dsu.union(a, b)
+                found.update((a, b))
+        frontier = found - seen
+    return dsu
+
+
+def refresh_classes(conn, part_ids: Iterable[int], deleted_ids: Iterable[int] = ()) -> None:
+    """Recompute only the classes that contain ``part_ids`` (before and after the change)."""
+    deleted = set(deleted_ids)
+    if deleted:
+        for chunk in _chunks(deleted):
+            conn.execute(delete(_links).where(or_(_links.c.part_id.in_(chunk), _links.c.analog_id.in_(chunk))))
+    touched = set(part_ids) | deleted
+    for chunk in _chunks(set(touched)):   # бывшие соседи по классу: класс мог распасться
+        old = select(_classes.c.class_id).where(_classes.c.part_id.in_(chunk)).scalar_subquery()
+        touched.update(conn.execute(select(_classes.c.part_id).where(_classes.c.class_id.in_(old))).scalars())
+
+    dsu = _component_graph(conn, touched - deleted)
+    for chunk in _chunks(touched | set(dsu.parent)):
+        conn.execute(delete(_classes).where(_classes.c.part_id.in_(chunk)))
+    _write(conn, dsu.classes())
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_touched_parts(session, flush_context):
+    touched = session.info.setdefault(_INFO_KEY, (set(), set()))
+    for obj in session.new:
+        if isinstance(obj, Part) and obj.analog_group:
+            touched[0].add(obj.id)
+        elif isinstance(obj, PartEquivalence):
+            touched[0].update((obj.part_id, obj.analog_id))
+    for obj in session.dirty:
+        if isinstance(obj, Part) and sa_inspect(obj).attrs.analog_group.history.has_changes():
+            touched[0].add(obj.id)
+    for obj in session.deleted:
+        if isinstance(obj, Part):
+            touched[1].add(obj.id)
+        elif isinstance(obj, PartEquivalence):
+            touched[0].update((obj.part_id, obj.analog_id))
+    if not any(touched):
+        session.info.pop(_INFO_KEY)
+
+
+@event.listens_for(Session, "before_commit")
+def _refresh_touched_classes(session):
+    session.flush()   # commit всё равно сбросит изменения — сделаем это раньше, чтобы они попали в пересчёт
+    touched = session.info.pop(_INFO_KEY, None)
+    if touched:
+        conn = session.connection(bind_arguments={"mapper": PartAnalogClass.__mapper__})
+        refresh_classes(conn, touched[0], touched[1])
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_touched_parts(session):
+    session.info.pop(_INFO_KEY, None)
+
+
+# ------------------------------ связи ------------------------------ #
+def link(part_id: int, analog_id: int, source: str = "manual") -> Optional[PartEquivalence]:
+    """Link two parts as interchangeable (no-op for the same part or an existing link). Caller commits."""
+    a, b = sorted((part_id, analog_id))
+    if a == b:
+        return None
+    existing = PartEquivalence.query.filter_by(part_id=a, analog_id=b).first()
+    if existing is not None:
+        return existing
+    row = PartEquivalence(part_id=a, analog_id=b, source=source)
+    db.session.add(row)
+    return row
+
+
+def unlink(part_id: int, analog_id: int) -> bool:
+    a, b = sorted((part_id, analog_id))
+    row = PartEquivalence.query.filter_by(part_id=a, analog_id=b).first()
+    if row is None:
+        return False
+    db.session.delete(row)
+    return True
+
+
+# ------------------------------ импорт ------------------------------ #
+def read_import_file(filename: str, data: bytes) -> list[dict]:
+    """Rows of a CSV (``,`` or ``;``) or .xlsx file as dicts with lower-case column names."""
+    if filename.lower().endswith(".xlsx"):
+        try:
+            from openpyxl import load_workbook
+        except ImportError:
+            raise ValueError("Excel import needs openpyxl: pip install openpyxl (or save the sheet as CSV)") from None
+        sheet = load_workbook(io.BytesIO(data), read_only=True, data_only=True).active
+        rows = sheet.iter_rows(values_only=True)
+        header = [str(h or "").strip().lower() for h in next(rows, ())]
+        return [{k: "" if v is None else str(v).strip() for k, v in zip(header, row)} for row in rows]
+    text = data.decode("utf-8-sig")
+    dialect = csv.Sniffer().sniff(text.split("\n", 1)[0], delimiters=",;")
+    return [{(k or "").strip().lower(): (v or "").strip() for k, v in row.items()}
+            for row in csv.DictReader(io.StringIO(text), dialect=dialect)]
+
+
+def _ids_by_sap(codes: Iterable[str]) -> dict[str, int]:
+    codes, out = sorted(set(codes)), {}
+    for i in range(0, len(codes), _CHUNK):
+        out.update(db.session.execute(select(Part.sap_code, Part.id).where(Part.sap_code.in_(codes[i:i + _CHUNK]))).all())
+    return out
+
+
+def import_parts(rows: list[dict]) -> dict:
+    """
+    Upsert parts by ``sap_code`` (bulk INSERT / UPDATE by primary key) and the optional
+    ``analogs`` column (SAP codes separated by ``;`` or ``|``) as links, then rebuild all
+    analog classes once. Caller commits.
+    """
+    valid = [r for r in rows if r.get("sap_code") and r.get("name")]
+    existing = _ids_by_sap(r["sap_code"] for r in valid)
+    new, changed, seen = [], [], set()
+    for r in valid:
+        if r["sap_code"] in seen:
+            continue
+        seen.add(r["sap_code"])
+        values = {f: r[f] or None for f in IMPORT_FIELDS if f in r}
+        values["sap_code"], values["name"] = r["sap_code"], r["name"]
+        if r["sap_code"] in existing:
+            changed.append({"id": existing[r["sap_code"]], **values})
+        else:
+            new.append(values)
+    if new:
+        db.session.execute(insert(Part), new)
+    if changed:
+        db.session.execute(update(Part), changed)
+
+    wanted = {(r["sap_code"], code.strip()) for r in valid
+              for code in r.get("analogs", "").replace("|", ";").split(";") if code.strip()}
+    ids = _ids_by_sap({c for pair in wanted for c in pair})
+    pairs = {tuple(sorted((ids[a], ids[b]))) for a, b in wanted if a in ids and b in ids and ids[a] != ids[b]}
+    present = set()
+    for chunk in _chunks({p for pair in pairs for p in pair}):
+        present.update(db.session.execute(select(_links.c.part_id, _links.c.analog_id)
+                                          .where(_links.c.part_id.in_(chunk))).all())
+    fresh = sorted(pairs - present)
+    if fresh:
+        db.session.execute(insert(PartEquivalence), [{"part_id": a, "analog_id": b, "source": "import"}
+                                                     for a, b in fresh])
+
+    conn = db.session.connection(bind_arguments={"mapper": PartAnalogClass.__mapper__})
+    in_classes = rebuild_classes(conn)
+    return {"created": len(new), "updated": len(changed), "skipped": len(rows) - len(valid),
+            "links": len(fresh), "unknown_analogs": sum(1 for _, b in wanted if b not in ids),
+            "parts_in_classes": in_classes}
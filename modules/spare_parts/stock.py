@@ -0,0 +1,217 @@
+"""Stock ledger for spare parts.
+
+Every movement is an append-only ``StockTransaction``; the ``StockBalance`` row
+of the same part and location is changed in the same transaction, so on-hand
+reads are primary-key lookups and never sum the ledger.
+
+Concurrency: a posting is one conditional ``UPDATE ... SET on_hand = on_hand + :delta
+WHERE ... AND on_hand + :delta >= 0``. The database applies it atomically under
+the row (PostgreSQL) or write (SQLite) lock, so two storekeepers issuing the
+same part can neither lose an update nor overdraw the bin. Stock counts use the
+balance ``version`` instead: a count entered against a balance that changed in
+the meantime is rejected.
+"""
+
+from datetime import datetime
+from typing import Iterable, Optional
+
+from sqlalchemy import bindparam, event, func, insert, select, update
+from sqlalchemy.orm import Session
+
+from extensions import db
+
+from .models import Part, StockBalance, StockTransaction
+
+KINDS = ("receipt", "issue", "adjust")
+_balances = StockBalance.__table__
+_CHUNK = 500
+
+
+class StockError(ValueError):
+    """A posting that cannot be applied (not enough stock, bad quantity, stale count)."""
+
+
+@event.listens_for(Session, "before_flush")
+def _ledger_is_append_only(session, flush_context, instances):
+    for obj in (*session.dirty, *session.deleted):
+        if isinstance(obj, StockTransaction) and (obj in session.deleted or session.is_modified(obj)):
+            raise StockError("stock ledger is append-only: post a correcting adjustment instead")
+
+
+def _conn():
+    return db.session.connection(bind_arguments={"mapper": StockBalance.__mapper__})
+
+
+def _key(part_id: int, location: str):
+    return (_balances.c.part_id == part_id) & (_balances.c.location == location)
+
+
+def _ensure_balances(conn, keys: Iterable[tuple[int, str]]) -> None:
+    """Zero balance rows for keys that have none yet (INSERT ... ON CONFLICT DO NOTHING)."""
+    rows = [{"part_id": p, "location": loc, "on_hand": 0, "version": 0} for p, loc in sorted(set(keys))]
+    if not rows:
+        return
+    if conn.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    conn.execute(dialect_insert(_balances).on_conflict_do_nothing(), rows)
+
+
+def _clean_location(location: Optional[str]) -> str:
+    location = (location or "").strip()
+    if not location:
+        raise StockError("location is required")
+    return location
+
+
+def _positive(quantity) -> int:
+    try:
+        quantity = int(quantity)
+    except (TypeError, ValueError):
+        raise StockError(f"invalid quantity: {quantity!r}") from None
+    if quantity <= 0:
+        raise StockError("quantity must be positive")
+    return quantity
+
+
+# ------------------------------ проводки ------------------------------ #
+def _apply(conn, part_id: int, location: str, delta: int) -> int:
+    """Atomically add ``delta`` to the balance; returns the new on-hand quantity."""
+    stmt = (update(_balances).where(_key(part_id, location), _balances.c.on_hand + delta >= 0)
+            .values(on_hand=_balances.c.on_hand + delta, version=_balances.c.version + 1,
+                    updated_at=datetime.utcnow()))
+    if conn.execute(stmt).rowcount:
+        return conn.execute(select(_balances.c.on_hand).where(_key(part_id, location))).scalar_one()
+    if delta < 0:
+        have = conn.execute(select(_balances.c.on_hand).where(_key(part_id, location))).scalar() or 0
+        raise StockError(f"not enough stock at {location}: {have} on hand, {-delta} requested")
+    _ensure_balances(conn, [(part_id, location)])
+    return _apply(conn, part_id, location, delta)
+
+
+def post(part_id: int, location: str, kind: str, quantity, reference: Optional[str] = None,
+         user_id: Optional[int] = None, workorder_id: Optional[int] = None) -> StockTransaction:
+    """
+    Post one movement. ``quantity`` is positive for receipts and issues, signed for adjustments;
+    ``workorder_id`` — the work order an issue goes to (see ``reorder.py``). Caller commits.
+    """
+    location = _clean_location(location)
+    if kind == "adjust":
+        try:
+            delta = int(quantity)
+        except (TypeError, ValueError):
+            raise StockError(f"invalid quantity: {quantity!r}") from None
+        if delta == 0:
+            raise StockError("adjustment must change the quantity")
+    elif kind in ("receipt", "issue"):
+        delta = _positive(quantity) * (-1 if kind == "issue" else 1)
+    else:
+        raise StockError(f"unknown movement: {kind}")
+    balance = _apply(_conn(), part_id, location, delta)
+    tx = StockTransaction(part_id=part_id, location=location, kind=kind, quantity=delta, balance_after=balance,
+                          reference=reference or None, created_by=user_id, workorder_id=workorder_id)
+    db.session.add(tx)
+    return tx
+
+
+def count(part_id: int, location: str, counted, version: int, reference: Optional[str] = None,
+          user_id: Optional[int] = None) -> Optional[StockTransaction]:
+    """Stock count: set the balance to ``counted`` if it is still at ``version`` (as shown to the counter)."""
+    location = _clean_location(location)
+    try:
+        counted = int(counted)
+    except (TypeError, ValueError):
+        raise StockError(f"invalid quantity: {counted!r}") from None
+    if counted < 0:
+        raise StockError("counted quantity cannot be negative")
+    conn = _conn()
+    _ensure_balances(conn, [(part_id, location)])
+    on_hand = conn.execute(select(_balances.c.on_hand).where(_key(part_id, location))).scalar_one()
+    res = conn.execute(update(_balances).where(_key(part_id, location), _balances.c.version == version)
+                       .values(on_hand=counted, version=_balances.c.version + 1, updated_at=datetime.utcnow()))
+    if not res.rowcount:
+        raise StockError(f"stock at {location} changed while counting: reload and count again")
+    if counted == on_hand:
+        return None
+    tx = StockTransaction(part_id=part_id, location=location, kind="adjust", quantity=counted - on_hand,
+                          balance_after=counted, reference=reference or "stock count", created_by=user_id)
+    db.session.add(tx)
+    return tx
+
+
+def post_receipts(lines: list[tuple[int, str, int]], reference: Optional[str] = None,
+                  user_id: Optional[int] = None) -> int:
+    """
+    Bulk goods receipt: (part_id, location, quantity) lines in one transaction, set-based —
+    one INSERT of missing balance rows, one executemany UPDATE, one bulk INSERT into the ledger.
+    Caller commits. Returns the number of ledger rows.
+    """
+    lines = [(p, _clean_location(loc), _positive(q)) for p, loc, q in lines]
+    if not lines:
+        return 0
+    totals: dict[tuple[int, str], int] = {}
+    for p, loc, q in lines:
+        totals[(p, loc)] = totals.get((p, loc), 0) + q
+    conn = _conn()
+    _ensure_balances(conn, totals)
+    now = datetime.utcnow()
+    conn.execute(update(_balances)
+                 .where(_balances.c.part_id == bindparam("p"), _balances.c.location == bindparam("loc"))
+                 .values(on_hand=_balances.c.on_hand + bindparam("delta"), version=_balances.c.version + 1,
+                         updated_at=now),
+                 [{"p": p, "loc": loc, "delta": q} for (p, loc), q in sorted(totals.items())])
+
+    after: dict[tuple[int, str], int] = {}   # остаток до этой пачки + приходы по порядку строк
+    part_ids = sorted({p for p, _ in totals})
+    for i in range(0, len(part_ids), _CHUNK):
+        for p, loc, on_hand in conn.execute(select(_balances.c.part_id, _balances.c.location, _balances.c.on_hand)
+                                            .where(_balances.c.part_id.in_(part_ids[i:i + _CHUNK]))):
+            if (p, loc) in totals:
+                after[(p, loc)] = on_hand - totals[(p, loc)]
+    rows = []
+    for p, loc, q in lines:
+        after[(p, loc)] += q
+        rows.append({"part_id": p, "location": loc, "kind": "receipt", "quantity": q,
+                     "balance_after": after[(p, loc)], "reference": reference or None,
+                     "created_at": now, "created_by": user_id})
+    db.session.execute(insert(StockTransaction), rows)
+    return len(rows)
+
+
+def parse_receipt_lines(text: str) -> list[tuple[int, str, int]]:
+    """``SAP;location;quantity`` per line (``,`` or tab also accepted) -> posting lines; unknown SAP codes raise."""
+    raw = []
+    for n, line in enumerate(text.splitlines(), start=1):
+        line = line.strip()
+        if not line:
+            continue
+        cells = [c.strip() for c in line.replace("\t", ";").replace(",", ";").split(";")]
+        if len(cells) != 3:
+            raise StockError(f"line {n}: expected SAP;location;quantity")
+        raw.append((n, *cells))
+    codes = sorted({sap for _, sap, _, _ in raw})
+    ids = {}
+    for i in range(0, len(codes), _CHUNK):
+        ids.update(db.session.execute(select(Part.sap_code, Part.id).where(Part.sap_code.in_(codes[i:i + _CHUNK]))).all())
+    unknown = [f"line {n}: {sap}" for n, sap, _, _ in raw if sap not in ids]
+    if unknown:
+        raise StockError("unknown SAP codes: " + ", ".join(unknown[:10]))
+    return [(ids[sap], loc, qty) for _, sap, loc, qty in raw]
+
+
+# ------------------------------ чтение ------------------------------ #
+def balances(part_id: int) -> list[StockBalance]:
+    return list(db.session.execute(select(StockBalance).where(StockBalance.part_id == part_id)
+                                   .order_by(StockBalance.location)).scalars())
+
+
+def on_hand_totals() -> dict[int, int]:
+    """part id -> on hand over all locations (GROUP BY over the balance rows, not the ledger)."""
+    return dict(db.session.execute(select(StockBalance.part_id, func.sum(StockBalance.on_hand))
+                                   .group_by(StockBalance.part_id)).all())
+
+
+def transactions(part_id: int, limit: int = 20) -> list[StockTransaction]:
+    return list(db.session.execute(select(StockTransaction).where(StockTransaction.part_id == part_id)
+                                   .order_by(StockTransaction.id.desc()).limit(limit)).scalars())
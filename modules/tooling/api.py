@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+"""Ресурсы Tooling в JSON API (см. rest_api.py)."""
+
+from datetime import datetime
+
+from flask_login import current_user
+
+from extensions import db
+from rest_api import Resource, register
+
+from .models import Tooling, ToolingEvent
+
+
+def _create_events(tools) -> None:
+    """Как форма «Новый BATCH #»: у новой оснастки сразу событие CREATE (STOCK)."""
+    user_name = getattr(current_user, "username", "system")
+    db.session.add_all([ToolingEvent(user_name=user_name, action="CREATE", to_status="STOCK", tool_id=t.id,
+                                     batch_no=t.tool_code, happened_at=datetime.utcnow(), role=t.intended_role,
+                                     dimension=t.current_diameter) for t in tools])
+
+
+register(Resource("tooling", Tooling, "tooling", create_cap="tooling_create", update_cap="tooling_edit",
+                  read_only_fields=("id", "created_at", "updated_at"), on_create=_create_events))
+# События только читаются: новые — через очередь POST /tooling/api/events (правила переходов в services.py)
+register(Resource("tooling_events", ToolingEvent, "tooling"))
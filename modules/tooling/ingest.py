@@ -0,0 +1,264 @@
+# -*- coding: utf-8 -*-
+"""
+Асинхронный приём событий Tooling (WASH / POLISH / INSPECT / MARK_READY приходят пачками со сканеров).
+
+- Приём: событие пишется одной вставкой в локальную очередь (bind "tooling_queue", отдельный
+  SQLite-файл, WAL — см. db_profile.py) и сразу подтверждается. Повтор с тем же ключом идемпотентности → та же запись.
+- Применение: ОДИН писатель (поток в процессе, держащем файловую блокировку, либо ingest_worker.py)
+  забирает до TOOLING_INGEST_BATCH событий и применяет их одной транзакцией основной базы
+  (group commit: один fsync на пачку вместо одного на событие).
+- Ровно один раз: вместе с событием в основной базе пишется IngestReceipt(key). Если процесс упал между
+  commit основной базы и отметкой в очереди, при следующем проходе событие просто помечается применённым.
+- Чтение «своей записи»: wait_applied(id) ждёт, пока писатель применит событие (list_tooling?after=<id>).
+- Отклонённые писателем события (status=failed, например недопустимый переход WASH/POLISH) видны оператору:
+  flash после формы, если писатель успел, и список rejected(batch_no) на карточке BATCH.
+- Писатель всегда один: поток IngestWorker и ingest_worker.py (в т.ч. --once) берут одну файловую
+  блокировку instance/tooling_ingest.lock (writer_lock).
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from datetime import datetime
+
+from flask import current_app, has_app_context
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+
+from extensions import db
+
+from .models import IngestReceipt, QueuedEvent
+from .services import EventRejected, apply_event
+
+try:  # блокировка «единственного писателя» между процессами (на Windows — без неё)
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
+
+log = logging.getLogger(__name__)
+
+QUEUE_BIND = "tooling_queue"
+FIELDS = ("batch_no", "action", "shift", "machine_id", "role", "position",
+          "reason", "note", "dimension", "new_dimension")
+
+_queue = QueuedEvent.__table__
+
+
+def _engine():
+    return db.engines[QUEUE_BIND]
+
+
+def worker_mode() -> str:
+    """thread — писатель внутри веб-процесса; external — отдельный ingest_worker.py; off — без очереди."""
+    return (current_app.config.get("TOOLING_INGEST_WORKER") or "off").lower()
+
+
+def worker_enabled() -> bool:
+    return worker_mode() in ("thread", "external")
+
+
+# ------------------------------ приём ------------------------------ #
+def _row(conn, **where):
+    col, value = next(iter(where.items()))
+    return conn.execute(select(_queue).where(_queue.c[col] == value)).first()
+
+
+def enqueue_event(data: dict, key: str | None = None, user_name: str | None = None, user_id: int | None = None):
+    """
+    Кладёт событие в очередь и возвращает (строка очереди, created).
+    created=False — событие с таким ключом уже было принято (повтор от сканера/браузера).
+    """
+    key = (key or "").strip()[:64] or uuid.uuid4().hex
+    payload = json.dumps({"data": {k: data.get(k) for k in FIELDS if data.get(k) not in (None, "")},
+                          "user_name": user_name, "user_id": user_id}, ensure_ascii=False)
+    batch_no = (data.get("batch_no") or "").strip()[:64] or None
+    created = True
+    with _engine().connect() as conn:
+        row = _row(conn, idempotency_key=key)
+        if row is None:
+            try:
+                conn.execute(_queue.insert().values(idempotency_key=key, payload=payload, status="pending",
+                                                    batch_no=batch_no, received_at=datetime.utcnow()))
+                conn.commit()
+            except IntegrityError:  # тот же ключ пришёл параллельно
+                conn.rollback()
+                created = False
+            row = _row(conn, idempotency_key=key)
+        else:
+            created = False
+    if created:
+        wake()
+    return row, created
+
+
+def get_queued(queue_id: int):
+    with _engine().connect() as conn:
+        return _row(conn, id=queue_id)
+
+
+def wait_applied(queue_id: int, timeout: float = 2.0, poll: float = 0.05):
+    """Ждёт, пока писатель обработает событие (или истечёт timeout). Возвращает строку очереди."""
+    deadline = time.monotonic() + max(timeout, 0)
+    while True:
+        row = get_queued(queue_id)
+        if row is None or row.status != "pending" or time.monotonic() >= deadline:
+            return row
+        time.sleep(poll)
+
+
+def rejected(batch_no: str, limit: int = 5) -> list[dict]:
+    """Последние события BATCH, которые писатель отклонил: received_at, action, error (новые первыми)."""
+    with _engine().connect() as conn:
+        rows = conn.execute(select(_queue).where(_queue.c.batch_no == batch_no, _queue.c.status == "failed")
+                            .order_by(_queue.c.id.desc()).limit(limit)).all()
+    return [{"received_at": r.received_at, "action": (json.loads(r.payload).get("data") or {}).get("action"),
+             "error": r.error} for r in rows]
+
+
+# ------------------------------ применение ------------------------------ #
+def _apply(row):
+    """Применяет одно событие в текущей транзакции. Возвращает (status, event_id, error)."""
+    payload = json.loads(row.payload)
+    try:
+        # время события — когда его приняли, а не когда до него дошёл писатель (очередь, рестарт, повтор)
+        ev, _ = apply_event(payload.get("data") or {}, user_name=payload.get("user_name"),
+                            user_id=payload.get("user_id"), happened_at=row.received_at)
+    except EventRejected as e:  # проверка не прошла — до записи дело не дошло
+        return "failed", None, str(e)
+    db.session.flush()
+    db.session.add(IngestReceipt(idempotency_key=row.idempotency_key, event_id=ev.id))
+    return "applied", ev.id, None
+
+
+def _mark(results: dict) -> None:
+    now = datetime.utcnow()
+    with _engine().begin() as conn:
+        for queue_id, (status, event_id, error) in results.items():
+            conn.execute(_queue.update().where(_queue.c.id == queue_id)
+                         .values(status=status, event_id=event_id, error=error, applied_at=now))
+
+
+def drain_queue(limit: int | None = None) -> int:
+    """Один проход писателя: применить до ``limit`` ожидающих событий. Возвращает число обработанных."""
+    limit = limit or current_app.config.get("TOOLING_INGEST_BATCH", 200)
+    with _engine().connect() as conn:
+        rows = conn.execute(select(_queue).where(_queue.c.status == "pending")
+                            .order_by(_queue.c.id).limit(limit)).all()
+    if not rows:
+        return 0
+
+    done = dict(db.session.execute(
+        select(IngestReceipt.idempotency_key, IngestReceipt.event_id)
+        .where(IngestReceipt.idempotency_key.in_([r.idempotency_key for r in rows]))).all())
+
+    results = {}
+    try:
+        for r in rows:
+            if r.idempotency_key in done:
+                results[r.id] = ("applied", done[r.idempotency_key], None)
+            else:
+                results[r.id] = _apply(r)
+        db.session.commit()  # group commit всей пачки
+    except Exception:
+        db.session.rollback()
+        log.exception("tooling ingest: batch failed, applying one by one")
+        results = {}
+        for r in rows:
+            if r.idempotency_key in done:
+                results[r.id] = ("applied", done[r.idempotency_key], None)
+                continue
+            try:
+                results[r.id] = _apply(r)
+                db.session.commit()
+            except Exception as e:  # noqa: BLE001 — событие помечаем failed, остальные идут дальше
+                db.session.rollback()
+                results[r.id] = ("failed", None, f"{type(e).__name__}: {e}")
+
+    _mark(results)
+    return len(rows)
+
+
+# ------------------------------ писатель ------------------------------ #
+def lock_path(app) -> str:
+    os.makedirs(app.instance_path, exist_ok=True)
+    return os.path.join(app.instance_path, "tooling_ingest.lock")
+
+
+def writer_lock(path: str, lock_file=None):
+    """
+    Взять блокировку единственного писателя без ожидания. Возвращает открытый файл (держать, пока пишем)
+    или None, если пишет другой процесс. lock_file — уже открытый файл для повторной попытки.
+    """
+    own = lock_file is None
+    if own:
+        lock_file = open(path, "a")  # noqa: SIM115 — держит вызывающий
+    if fcntl is None:
+        return lock_file
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return lock_file
+    except OSError:
+        if own:
+            lock_file.close()
+        return None
+
+
+class IngestWorker(threading.Thread):
+    """Фоновый писатель. Пишет только тот процесс, который держит файловую блокировку."""
+
+    def __init__(self, app, lock_path: str):
+        super().__init__(name="tooling-ingest", daemon=True)
+        self.app = app
+        self.lock_path = lock_path
+        self.idle = float(app.config.get("TOOLING_INGEST_IDLE", 1.0))
+        self.wakeup = threading.Event()
+        self._lock_file = None
+
+    def _acquire(self) -> bool:
+        if self._lock_file is None:
+            self._lock_file = open(self.lock_path, "a")  # noqa: SIM115 — держим всё время жизни процесса
+        return writer_lock(self.lock_path, self._lock_file) is not None
+
+    def run(self):
+        while not self._acquire():  # другой процесс уже пишет; подхватим, если он завершится
+            time.sleep(self.idle * 5)
+        while True:
+            with self.app.app_context():
+                try:
+                    n = drain_queue()
+                except Exception:  # noqa: BLE001 — писатель не должен умирать
+                    log.exception("tooling ingest: drain failed")
+                    n = 0
+                finally:
+                    db.session.remove()
+            if not n:
+                self.wakeup.wait(self.idle)
+                self.wakeup.clear()
+
+
+def wake() -> None:
+    """Разбудить писателя этого процесса (если он есть) — не ждать idle-интервал."""
+    if has_app_context():
+        worker = current_app.extensions.get("tooling_ingest")
+        if worker is not None:
+            worker.wakeup.set()
+
+
+def start_worker(app) -> IngestWorker:
+    worker = IngestWorker(app, lock_path(app))
+    app.extensions["tooling_ingest"] = worker
+    worker.start()
+    return worker
+
+
+def init_app(app) -> None:
+    """
+    Запуск писателя (TOOLING_INGEST_WORKER=thread). WAL для файла очереди включает db_profile.
+    SERVER_PRELOAD — приложение собирается в мастере gunicorn до fork: потоки не переживают fork,
+    писателя запускает serve.py в каждом воркере (пишет тот, кто взял блокировку).
+    """
+    if worker_mode() == "thread" and not app.testing and not app.config.get("SERVER_PRELOAD"):
+        start_worker(app)
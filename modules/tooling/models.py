@@ -11,11 +11,13 @@
 - ToolingMount     — активное/историческое монтирование инструмента в слот.
 - ToolingEvent     — Событие (ACTION) — как в твоём листе EVENTS.
 
-Справочники (в коде):
+Справочники (рабочие значения — в БД, таблица tooling_reference_values, см. reference.py;
+константы ниже — значения по умолчанию для первого заполнения):
 - ALLOWED_ACTIONS  — CREATE, INSTALL, REMOVE, WASH, POLISH, INSPECT, REPAIR, REGRIND, MARK_READY, MARK_DEFECTIVE, SCRAP
-- ALLOWED_SHIFTS   — TOOL ROOM, A, B, C (расширяемо)
+- ALLOWED_SHIFTS   — TOOL ROOM, A, B, C, D, ENGI (расширяемо)
 - ALLOWED_ROLES    — IRONING, REDRAW DIE, и т.п. (можно расширять)
 - ALLOWED_POSITIONS— '#1', '#2', '#3', ... (строки)
+- INSTALL_REASONS  — причины установки/снятия для INSTALL
 
 Авто-снятие:
 - при INSTALL перед установкой нового инструмента в слот снимаем старый (закрываем mount, событие для «старого» пишется).
@@ -26,20 +28,27 @@ from datetime import datetime
 from typing import Optional
 
 from flask_login import current_user
-from sqlalchemy import UniqueConstraint
+from sqlalchemy import Index, UniqueConstraint, text
 from extensions import db
 
-# ---------- Наборы значений (можно загрузить из БД, но пока — константы) ----------
+# ---------- Наборы значений по умолчанию (рабочие — в БД, см. reference.py) ----------
 ALLOWED_ACTIONS = [
     "CREATE", "INSTALL", "REMOVE",
     "WASH", "POLISH", "INSPECT", "REPAIR",
     "REGRIND", "MARK_READY", "MARK_DEFECTIVE",
     "SCRAP"
 ]
-ALLOWED_SHIFTS = ["TOOL ROOM", "A", "B", "C", "ENGI"]
+ALLOWED_SHIFTS = ["TOOL ROOM", "A", "B", "C", "D", "ENGI"]
 ALLOWED_ROLES  = ["IRONING", "REDRAW DIE", "REDRAW SLEEVE", "PUNCH", "NOSE", "DOME PLUG", "CLAMP RING"]    # добавляй свои
 ALLOWED_POSITIONS = ["#1", "#2", "#3"]        # можно руками ввести любую строку
 NEW_TRIAL_REASONS = {"NEW", "TRIAL"}          # ^ используем, чтобы отличать (новую/тестовую) установку
+INSTALL_REASONS = [
+    "Top wall variation","Top wall oversize","Short trim","Sensor short can","Sugar scoop","Short can",
+    "Die scratches","Die worn","Oval can","Progression","Mid wall below specification",
+    "Progression mark horizontal","Progression mark vertical","Top wall undersize","Defective die","Die damage",
+    "Trial","No reason","Pin hole","Pick up","Shadows","Roll back","Metal exposure","Chime smile","Dome depth",
+    "Wrinkled domes","Slivers","Burrs","Uneven trim","Trimmer jams","Split flanges","Scheduled change","New",
+]
 
 # ---------- МОДЕЛИ ----------
 
@@ -74,12 +83,17 @@ class Tooling(db.Model):
 
     type = db.relationship("ToolType")
 
+    __table_args__ = (
+        Index("idx_tooling_active_updated", "is_active", "updated_at"),   # список / экспорт активных
+    )
+
     # ------ Утилиты агрегирования (аналог твоего STOCK/PARTS листа) ------
     @property
     def last_event(self):
+        # порядок совпадает с индексом idx_events_tool_time → поиск без сортировки
         return (ToolingEvent.query
                 .filter_by(tool_id=self.id)
-                .order_by(ToolingEvent.happened_at.desc())
+                .order_by(ToolingEvent.happened_at.desc(), ToolingEvent.id.desc())
                 .first())
 
     def last_aggregate(self):
@@ -128,6 +142,10 @@ class ToolingMount(db.Model):
     ended_at = db.Column(db.DateTime)
     created_by_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
 
+    __table_args__ = (
+        Index("idx_mounts_active", "slot_id", "ended_at"),   # «кто сейчас стоит в слоте»
+    )
+
 class ToolingEvent(db.Model):
     """
     Событие — полностью повторяет структуру твоего листа EVENTS.
@@ -140,7 +158,7 @@ class ToolingEvent(db.Model):
     machine_id = db.Column(db.Integer, db.ForeignKey("equipment.id"))
     machine_name = db.Column(db.String(128))   # BM# (текстовое имя машины)
     shift = db.Column(db.String(16))           # SHIFT (A/B/C/TOOL ROOM)
-    happened_at = db.Column(db.DateTime, default=datetime.utcnow)  # DATE and TIME
+    happened_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)  # DATE and TIME; NOT NULL — v0018
 
     # Что сделали
     action = db.Column(db.String(32), nullable=False)  # ACTION
@@ -164,6 +182,74 @@ class ToolingEvent(db.Model):
     from_status = db.Column(db.String(32))
     to_status = db.Column(db.String(32))
 
+    # Индексы под горячие запросы (см. migrations/versions/v0002_tooling_events_indexes.py):
+    # - история/последнее событие BATCH: WHERE tool_id = ? ORDER BY happened_at DESC, id DESC
+    # - отчёты по машине и по ACTION за период
+    __table_args__ = (
+        Index("idx_events_tool_time", "tool_id", text("happened_at DESC"), text("id DESC")),
+        Index("idx_events_machine_time", "machine_id", "happened_at"),
+        Index("idx_events_action_time", "action", "happened_at"),
+        Index("idx_events_tool_action", "tool_id", "action"),               # счётчики событий BATCH по action
+    )
+
+class ReferenceValue(db.Model):
+    """
+    Значение справочника формы событий: kind = actions / roles / positions / shifts / install_reasons.
+    Меняется без деплоя (PUT /tooling/api/reference/<kind>); отключённые значения не удаляем — is_active=False.
+    """
+    __tablename__ = "tooling_reference_values"
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(32), nullable=False)
+    value = db.Column(db.String(128), nullable=False)
+    sort_order = db.Column(db.Integer, default=0, nullable=False)
+    is_active = db.Column(db.Boolean, default=True, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint("kind", "value", name="uq_reference_kind_value"),
+    )
+
+class ReferenceVersion(db.Model):
+    """
+    Одна строка (id=1): версия справочников. Растёт при любом изменении ReferenceValue
+    или оборудования — по ней воркеры понимают, что in-process кэш устарел.
+    """
+    __tablename__ = "tooling_reference_version"
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, default=1, nullable=False)
+
+class QueuedEvent(db.Model):
+    """
+    Очередь входящих событий (см. ingest.py). Лежит в ОТДЕЛЬНОЙ базе (bind "tooling_queue",
+    по умолчанию отдельный SQLite-файл в WAL): приём события — одна короткая вставка,
+    которая не конкурирует с писателями основной базы.
+    """
+    __bind_key__ = "tooling_queue"
+    __tablename__ = "tooling_event_queue"
+    id = db.Column(db.Integer, primary_key=True)
+    idempotency_key = db.Column(db.String(64), unique=True, nullable=False)
+    payload = db.Column(db.Text, nullable=False)                       # JSON полей формы + user_name/user_id
+    status = db.Column(db.String(16), default="pending", nullable=False)  # pending | applied | failed
+    received_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    applied_at = db.Column(db.DateTime)
+    event_id = db.Column(db.Integer)   # id ToolingEvent в основной базе
+    error = db.Column(db.Text)
+    batch_no = db.Column(db.String(64))  # для списка отклонённых событий на карточке BATCH
+
+    __table_args__ = (
+        Index("idx_queue_status", "status", "id"),
+        Index("idx_queue_batch_status", "batch_no", "status"),
+    )
+
+class IngestReceipt(db.Model):
+    """
+    Квитанция «событие с таким ключом уже применено» — пишется в основную базу в той же транзакции,
+    что и само событие. Повторы от сканеров и повторный разбор очереди после сбоя не создают дублей.
+    """
+    __tablename__ = "tooling_ingest_receipts"
+    idempotency_key = db.Column(db.String(64), primary_key=True)
+    event_id = db.Column(db.Integer)
+    applied_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
 # ---------- Доменные операции ----------
 
 def ensure_slot(equipment, role: str, position: str) -> EquipmentSlot:
@@ -186,7 +272,13 @@ def active_mount_in_slot(slot_id: int) -> Optional[ToolingMount]:
             .filter_by(slot_id=slot_id, ended_at=None)
             .first())
 
-def uninstall_current_from_slot(slot: EquipmentSlot, reason: str = "Auto-uninstall (new INSTALL)") -> Optional[ToolingEvent]:
+def _actor_name(user_name: Optional[str] = None) -> str:
+    """Кто записал событие: явно переданное имя (фоновая очередь) или текущий пользователь."""
+    return user_name or getattr(current_user, "username", None) or "system"
+
+def uninstall_current_from_slot(slot: EquipmentSlot, reason: str = "Auto-uninstall (new INSTALL)",
+                                user_name: Optional[str] = None,
+                                happened_at: Optional[datetime] = None) -> Optional[ToolingEvent]:
     """
     Если слот занят — снимаем установленный инструмент.
     Создаём событие REMOVE для снятого инструмента.
@@ -195,15 +287,16 @@ def uninstall_current_from_slot(slot: EquipmentSlot, reason: str = "Auto-uninsta
     if not mount:
         return None
 
+    at = happened_at or datetime.utcnow()
     tool = Tooling.query.get(mount.tool_id)
-    mount.ended_at = datetime.utcnow()
+    mount.ended_at = at
     # событие для снятого
     ev = ToolingEvent(
-        user_name=(getattr(current_user, "username", None) or "system"),
+        user_name=_actor_name(user_name),
         machine_id=slot.equipment_id,
         machine_name=None,
         shift=None,
-        happened_at=datetime.utcnow(),
+        happened_at=at,
         action="REMOVE",
         reason=reason,
         note=None,
@@ -222,14 +315,18 @@ def uninstall_current_from_slot(slot: EquipmentSlot, reason: str = "Auto-uninsta
     return ev
 
 
-def install_tool(tool: Tooling, equipment, role: str, position: str, shift: str, reason: str, dim: Optional[float]):
+def install_tool(tool: Tooling, equipment, role: str, position: str, shift: str, reason: str, dim: Optional[float],
+                 user_name: Optional[str] = None, user_id: Optional[int] = None,
+                 happened_at: Optional[datetime] = None):
     """
     Установка с авто-снятием предыдущего инструмента из этого же слота.
     ВАЖНО:
     - Если REASON не NEW/TRIAL — она сохраняется в событии REMOVE у ПРЕЖНЕГО инструмента (автоснятие).
     - Если REASON = NEW/TRIAL — причина остаётся у INSTALL НОВОГО инструмента.
     - При передаче DIM — обновляем tool.current_diameter.
+    - happened_at — когда событие произошло (очередь: время приёма), по умолчанию сейчас.
     """
+    at = happened_at or datetime.utcnow()
     slot = ensure_slot(equipment, role, position)
 
     # Контроль DIM (если заданы пороги)
@@ -240,20 +337,21 @@ def install_tool(tool: Tooling, equipment, role: str, position: str, shift: str,
     # 1) авто-снять того, кто уже стоит
     #    Причина уходит в снятый инструмент, КРОМЕ NEW/TRIAL.
     remove_reason = None if (reason or "").upper() in NEW_TRIAL_REASONS else reason
-    uninstall_current_from_slot(slot, reason=remove_reason)
+    uninstall_current_from_slot(slot, reason=remove_reason, user_name=user_name, happened_at=at)
 
     # 2) создать mount для нового
-    mount = ToolingMount(tool_id=tool.id, slot_id=slot.id, created_by_id=getattr(current_user, "id", 1))
+    mount = ToolingMount(tool_id=tool.id, slot_id=slot.id, started_at=at,
+                         created_by_id=user_id or getattr(current_user, "id", 1))
     db.session.add(mount)
 
     # 3) событие INSTALL (причина только для NEW/TRIAL)
     install_reason = reason if (reason or "").upper() in NEW_TRIAL_REASONS else None
     ev = ToolingEvent(
-        user_name=(getattr(current_user, "username", None) or "system"),
+        user_name=_actor_name(user_name),
         machine_id=equipment.id,
         machine_name=getattr(equipment, "name", None) or getattr(equipment, "code", None),
         shift=shift,
-        happened_at=datetime.utcnow(),
+        happened_at=at,
         action="INSTALL",
         reason=install_reason,
         role=role,
@@ -277,20 +375,22 @@ def install_tool(tool: Tooling, equipment, role: str, position: str, shift: str,
 
     return ev
 
-def remove_tool(tool: Tooling, equipment, role: str, position: str, reason: str):
+def remove_tool(tool: Tooling, equipment, role: str, position: str, reason: str, user_name: Optional[str] = None,
+                happened_at: Optional[datetime] = None):
     """
     Снятие инструмента с указанного слота (если стоит).
     """
+    at = happened_at or datetime.utcnow()
     slot = ensure_slot(equipment, role, position)
     mount = active_mount_in_slot(slot.id)
     if mount and mount.tool_id == tool.id:
-        mount.ended_at = datetime.utcnow()
+        mount.ended_at = at
     ev = ToolingEvent(
-        user_name=(getattr(current_user, "username", None) or "system"),
+        user_name=_actor_name(user_name),
         machine_id=equipment.id,
         machine_name=getattr(equipment, "name", None) or getattr(equipment, "code", None),
         shift=None,
-        happened_at=datetime.utcnow(),
+        happened_at=at,
         action="REMOVE",
         reason=reason,
         role=role,
@@ -307,7 +407,8 @@ def remove_tool(tool: Tooling, equipment, role: str, position: str, reason: str)
     return ev
 
 
-def regrind_tool(tool: Tooling, dimension: Optional[float], new_dimension: Optional[float], reason: str, shift: Optional[str]):
+def regrind_tool(tool: Tooling, dimension: Optional[float], new_dimension: Optional[float], reason: str, shift: Optional[str],
+                 user_name: Optional[str] = None, happened_at: Optional[datetime] = None):
     """
     Перешлифовка:
     - увеличиваем счётчик,
@@ -319,11 +420,11 @@ def regrind_tool(tool: Tooling, dimension: Optional[float], new_dimension: Optio
         tool.current_diameter = new_dimension
 
     ev = ToolingEvent(
-        user_name=(getattr(current_user, "username", None) or "system"),
+        user_name=_actor_name(user_name),
         machine_id=None,
         machine_name=None,
         shift=shift,
-        happened_at=datetime.utcnow(),
+        happened_at=happened_at or datetime.utcnow(),
         action="REGRIND",
         reason=reason,
         role=None,
@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+"""
+Справочники формы событий Tooling: ACTION / ROLE / POSITION / SHIFT / REASON + список машин (BM#).
+
+- Храним в БД (ReferenceValue); значения по умолчанию из models.py записывает миграция v0015,
+  чтение справочника ничего не пишет (его зовут и посреди чужой транзакции — пачки очереди событий).
+- Отдаём из in-process кэша: списки — кортежами (порядок для <select>), проверки — по frozenset.
+- Кэш версионирован: ReferenceVersion растёт при изменении справочников или оборудования
+  (after_flush), свой воркер сбрасывает кэш сразу после commit, остальные — сверяют версию
+  не чаще раза в REFERENCE_CACHE_TTL секунд (один SELECT по первичному ключу).
+  Рендер формы таблицу equipment не трогает.
+"""
+
+import threading
+import time
+
+from flask import current_app, has_app_context
+from sqlalchemy import event, select, update
+from sqlalchemy.orm import Session
+
+from extensions import db
+from modules.maintenance.models import Equipment
+
+from .models import (
+    ALLOWED_ACTIONS,
+    ALLOWED_POSITIONS,
+    ALLOWED_ROLES,
+    ALLOWED_SHIFTS,
+    INSTALL_REASONS,
+    ReferenceValue,
+    ReferenceVersion,
+)
+
+DEFAULTS = {
+    "actions": ALLOWED_ACTIONS,
+    "roles": ALLOWED_ROLES,
+    "positions": ALLOWED_POSITIONS,
+    "shifts": ALLOWED_SHIFTS,
+    "install_reasons": INSTALL_REASONS,
+}
+KINDS = tuple(DEFAULTS)
+
+
+class ReferenceData:
+    """Неизменяемый снимок справочников одной версии."""
+
+    def __init__(self, version: int, lists: dict, machines: list):
+        self.version = version
+        self.lists = {k: tuple(v) for k, v in lists.items()}
+        self.sets = {k: frozenset(v) for k, v in lists.items()}
+        self.machines = tuple(machines)
+        self.machines_by_id = {m["id"]: m for m in machines}
+
+    def allowed(self, kind: str, value) -> bool:
+        return value in self.sets.get(kind, ())
+
+    def as_json(self) -> dict:
+        return {"version": self.version, **{k: list(v) for k, v in self.lists.items()},
+                "machines": list(self.machines)}
+
+
+class ReferenceCache:
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._data: ReferenceData | None = None
+        self._checked_at = 0.0
+
+    def invalidate(self) -> None:
+        self._data = None
+
+    def get(self) -> ReferenceData:
+        data = self._data
+        if data is not None and time.monotonic() - self._checked_at < self.ttl:
+            return data
+        with self._lock:
+            data = self._data
+            if data is not None and _db_version() == data.version:
+                self._checked_at = time.monotonic()
+                return data
+            data = _load()
+            self._data, self._checked_at = data, time.monotonic()
+            return data
+
+
+# ------------------------------ загрузка из БД ------------------------------ #
+def _db_version() -> int:
+    return db.session.execute(select(ReferenceVersion.version).where(ReferenceVersion.id == 1)).scalar() or 0
+
+
+def _load() -> ReferenceData:
+    version = _db_version()
+    lists = {k: [] for k in KINDS}
+    rows = db.session.execute(
+        select(ReferenceValue.kind, ReferenceValue.value)
+        .where(ReferenceValue.is_active.is_(True))
+        .order_by(ReferenceValue.kind, ReferenceValue.sort_order, ReferenceValue.id))
+    for kind, value in rows:
+        lists.setdefault(kind, []).append(value)
+    machines = [{"id": i, "name": name, "code": code} for i, name, code in db.session.execute(
+        select(Equipment.id, Equipment.name, Equipment.code).order_by(Equipment.name.asc()))]
+    return ReferenceData(version, lists, machines)
+
+
+def reference_data() -> ReferenceData:
+    """Справочники текущего приложения (кэш — свой у каждого app)."""
+    cache = current_app.extensions.get("tooling_reference")
+    if cache is None:
+        cache = current_app.extensions["tooling_reference"] = ReferenceCache(
+            ttl=current_app.config.get("REFERENCE_CACHE_TTL", 15))
+    return cache.get()
+
+
+def replace_values(kind: str, values: list[str]) -> None:
+    """
+    Новый список значений справочника (порядок = порядок в списке).
+    Пропавшие значения не удаляются, а выключаются — старые события ссылаются на них текстом.
+    """
+    if kind not in KINDS:
+        raise ValueError(f"Неизвестный справочник: {kind}")
+    clean = []
+    for v in values:
+        v = (v or "").strip()
+        if v and v not in clean:
+            clean.append(v)
+    if not clean:
+        raise ValueError("Справочник не может быть пустым")
+
+    existing = {rv.value: rv for rv in ReferenceValue.query.filter_by(kind=kind).all()}
+    for order, value in enumerate(clean, start=1):
+        rv = existing.pop(value, None)
+        if rv is None:
+            db.session.add(ReferenceValue(kind=kind, value=value, sort_order=order))
+        else:
+            rv.sort_order, rv.is_active = order, True
+    for rv in existing.values():
+        rv.is_active = False
+
+
+# --------------------------- версия и инвалидация --------------------------- #
+@event.listens_for(Session, "after_flush")
+def _bump_reference_version(session, flush_context):
+    touched = any(isinstance(obj, (ReferenceValue, Equipment))
+                  for obj in (*session.new, *session.dirty, *session.deleted))
+    if not touched:
+        return
+    conn = session.connection()
+    res = conn.execute(update(ReferenceVersion.__table__)
+                       .where(ReferenceVersion.__table__.c.id == 1)
+                       .values(version=ReferenceVersion.__table__.c.version + 1))
+    if not res.rowcount:
+        conn.execute(ReferenceVersion.__table__.insert().values(id=1, version=1))
+    session.info["reference_changed"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_reference_cache(session):
+    if session.info.pop("reference_changed", False) and has_app_context():
+        cache = current_app.extensions.get("tooling_reference")
+        if cache is not None:
+            cache.invalidate()
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_reference_change(session):
+    session.info.pop("reference_changed", None)
@@ -1,4 +1,62 @@
-"""Repository layer placeholder for tooling domain."""
+"""Repository layer for the tooling domain."""
 
-# Persistence abstractions will live here as soon as the legacy queries are
-# extracted from the Flask routes.
+from typing import Iterable, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import aliased
+
+import archive
+from extensions import db
+from keyset import Page, decode_cursor, encode_cursor, window
+
+from .models import Tooling, ToolingEvent
+
+
+def last_event_id(tool_id_col):
+    """Correlated subquery: id of the latest event of a tool (served by idx_events_tool_time)."""
+    ev = aliased(ToolingEvent)
+    return (select(ev.id)
+            .where(ev.tool_id == tool_id_col)
+            .order_by(ev.happened_at.desc(), ev.id.desc())
+            .limit(1)
+            .scalar_subquery())
+
+
+def tool_snapshots(tool_ids: Optional[Iterable[int]] = None, active_only: bool = True, order_by=None):
+    """Tool cards joined with their latest event in one statement (no per-tool queries)."""
+    stmt = (select(Tooling.id, Tooling.tool_code, Tooling.is_active,
+                   Tooling.current_diameter, Tooling.intended_role,
+                   ToolingEvent.action, ToolingEvent.to_status, ToolingEvent.machine_name,
+                   ToolingEvent.role.label("event_role"), ToolingEvent.position,
+                   ToolingEvent.dimension, ToolingEvent.new_dimension, ToolingEvent.happened_at)
+            .outerjoin(ToolingEvent, ToolingEvent.id == last_event_id(Tooling.id)))
+    if active_only:
+        stmt = stmt.where(Tooling.is_active.is_(True))
+    if tool_ids is not None:
+        stmt = stmt.where(Tooling.id.in_(list(tool_ids)))
+    if order_by is not None:
+        stmt = stmt.order_by(order_by)
+    return db.session.execute(stmt).all()
+
+
+def snapshot_aggregate(row) -> dict:
+    """The dict of Tooling.last_aggregate(), built from a tool_snapshots() row."""
+    has_event = row.action is not None
+    return {
+        "id": row.id,
+        "BATCH #": row.tool_code,
+        "LAST DATE": row.happened_at,
+        "LAST ACTION": row.action,
+        "STATUS": row.to_status if has_event else "STOCK",
+        "BM#": row.machine_name,
+        "ROLE": row.event_role if has_event else row.intended_role,
+        "POSITION": row.position,
+        "DIM": row.dimension,
+        "NEW DIM": row.new_dimension,
+    }
+
+
+def event_window(tool_id: int, cursor: Optional[str] = None, limit: int = 50, **filters) -> Page:
+    """Newest events of a tool, ``limit`` at a time (archive.tool_events filters pass through)."""
+    rows = archive.tool_events(tool_id, before=decode_cursor(cursor), limit=limit + 1, **filters)
+    return window(rows, limit, lambda r: encode_cursor(r.happened_at, r.id))
@@ -2,11 +2,12 @@
 # -*- coding: utf-8 -*-
 
 from datetime import datetime
-from decimal import Decimal, InvalidOperation
 import csv
 import io
+import uuid
 
 from flask import (
+    current_app,
     render_template,
     request,
     redirect,
@@ -16,102 +17,131 @@ from flask import (
     jsonify,
 )
 from flask_login import login_required, current_user
-from sqlalchemy import desc
+from sqlalchemy import desc, select, tuple_
 
+import archive
+from db_routing import read_only
 from extensions import db
-from modules.maintenance.models import Equipment
+from keyset import page_size
 from modules.tooling.models import (
     Tooling,
     ToolType,
     ToolingEvent,
-    ALLOWED_ACTIONS,
-    ALLOWED_ROLES,
-    ALLOWED_POSITIONS,
-    install_tool,
-    remove_tool,
-    regrind_tool,
 )
+from page_cache import cached_page
 from permissions import role_required
 
 from . import bp
-
-# ---------- Справочники для UI ----------
-SHIFT_CHOICES = ["Tooling room", "A", "B", "C", "D"]
-
-INSTALL_REASONS = [
-    "Top wall variation","Top wall oversize","Short trim","Sensor short can","Sugar scoop","Short can",
-    "Die scratches","Die worn","Oval can","Progression","Mid wall below specification",
-    "Progression mark horizontal","Progression mark vertical","Top wall undersize","Defective die","Die damage",
-    "Trial","No reason","Pin hole","Pick up","Shadows","Roll back","Metal exposure","Chime smile","Dome depth",
-    "Wrinkled domes","Slivers","Burrs","Uneven trim","Trimmer jams","Split flanges","Scheduled change","New",
-]
+from .reference import reference_data, replace_values
+from .repositories import event_window, snapshot_aggregate, tool_snapshots
+from . import ingest
+from .services import EventRejected, apply_event, parse_num, tool_code_index
 
 # ---------- Утилиты ----------
-def _parse_num(s: str | None):
+def _parse_date(s: str | None):
+    """YYYY-MM-DD из query string → datetime (или None)."""
     if not s:
         return None
-    s = s.replace(",", ".")
     try:
-        return Decimal(s)
-    except InvalidOperation:
+        return datetime.strptime(s.strip(), "%Y-%m-%d")
+    except ValueError:
         return None
 
 
 # ---------- Список агрегированный ----------
 @bp.route("/")
 @login_required
+@cached_page("tooling", "tooling_events", bypass_args=("after",))
 def list_tooling():
-    tools = Tooling.query.filter_by(is_active=True).order_by(desc(Tooling.updated_at)).all()
-    rows = []
-    for t in tools:
-        a = t.last_aggregate()
-        a["id"] = t.id
-        rows.append(a)
+    after = request.args.get("after", type=int)
+    if after:
+        # только что принятое в очередь событие должно быть видно в списке — ждём писателя (недолго)
+        row = ingest.wait_applied(after, timeout=current_app.config.get("TOOLING_INGEST_WAIT", 2.0))
+        if row is not None and row.status == "failed":
+            flash(f"Событие BATCH {row.batch_no or ''} не применено: {row.error}", "warning")
+    # одна выборка с последним событием вместо last_aggregate() на каждый BATCH
+    rows = [snapshot_aggregate(r) for r in tool_snapshots(order_by=desc(Tooling.updated_at))]
     return render_template("tooling/list_tooling.html", rows=rows)
 
 
 # ---------- Карточка BATCH ----------
+def _history_filters():
+    """Фильтры истории из query string: диапазон дат и нужен ли архив."""
+    date_from = _parse_date(request.args.get("from"))
+    date_to = _parse_date(request.args.get("to"))
+    show_all = request.args.get("all") == "1"
+    return dict(date_from=date_from, date_to=date_to, include_archive=show_all or date_from is not None)
+
+
+def _neighbours(item: Tooling):
+    """Соседи в списке активных (updated_at DESC, id DESC) — две выборки по индексу, без загрузки всего списка."""
+    if not item.is_active or item.updated_at is None:
+        return None, None
+    key = tuple_(Tooling.updated_at, Tooling.id)
+    cur = tuple_(item.updated_at, item.id)
+    base = select(Tooling.id).where(Tooling.is_active.is_(True))
+    prev_id = db.session.scalar(base.where(key > cur).order_by(Tooling.updated_at.asc(), Tooling.id.asc()).limit(1))
+    next_id = db.session.scalar(base.where(key < cur).order_by(Tooling.updated_at.desc(), Tooling.id.desc()).limit(1))
+    return prev_id, next_id
+
+
+def _event_json(e) -> dict:
+    return {
+        "happened_at": e.happened_at.strftime("%Y-%m-%d %H:%M:%S") if e.happened_at else "",
+        "action": e.action, "from_status": e.from_status, "to_status": e.to_status,
+        "machine_name": e.machine_name, "role": e.role, "position": e.position, "shift": e.shift,
+        "reason": e.reason, "dimension": e.dimension, "new_dimension": e.new_dimension,
+        "user_name": e.user_name, "note": e.note,
+    }
+
+
 @bp.route("/<int:tool_id>")
 @login_required
 def tooling_detail(tool_id: int):
     item = Tooling.query.get_or_404(tool_id)
-    events = (ToolingEvent.query
-              .filter_by(tool_id=tool_id)
-              .order_by(ToolingEvent.happened_at.desc())
-              .all())
 
-    ordered = Tooling.query.filter_by(is_active=True).order_by(desc(Tooling.updated_at)).all()
-    ids = [t.id for t in ordered]
-    idx = ids.index(tool_id) if tool_id in ids else -1
-    prev_id = ids[idx - 1] if idx > 0 else None
-    next_id = ids[idx + 1] if idx != -1 and idx < len(ids) - 1 else None
+    # По умолчанию — только горячая таблица; архив подмешиваем, если попросили
+    # всю историю (?all=1) или диапазон дат (?from=&to=) заходит за границу архива.
+    # Сразу — последние HISTORY_PAGE_SIZE событий, более старые — подгрузкой (events.json).
+    filters = _history_filters()
+    page = event_window(tool_id, limit=current_app.config.get("HISTORY_PAGE_SIZE", 50), **filters)
+    counts = archive.tool_event_counts(tool_id, include_archive=filters["include_archive"])
+    archived_before = None if filters["include_archive"] else archive.archived_before("tooling_events")
+    prev_id, next_id = _neighbours(item)
 
     return render_template("tooling/tooling_detail.html",
-                           item=item, events=events,
-                           prev_id=prev_id, next_id=next_id)
+                           item=item, events=page.items, next_cursor=page.next_cursor,
+                           event_counts=counts, rejected=ingest.rejected(item.tool_code),
+                           prev_id=prev_id, next_id=next_id,
+                           archived_before=archived_before)
+
+
+@bp.route("/<int:tool_id>/events.json")
+@login_required
+def tooling_events_json(tool_id: int):
+    """Более старые события BATCH для бесконечной прокрутки: ?before=<курсор>&limit=N (+ all/from/to)."""
+    limit = page_size(request.args.get("limit"), current_app.config.get("HISTORY_PAGE_SIZE", 50))
+    page = event_window(tool_id, cursor=request.args.get("before"), limit=limit, **_history_filters())
+    return jsonify(items=[_event_json(e) for e in page.items], next=page.next_cursor)
 
 
 # ---------- Отчёт: что сейчас установлено ----------
 @bp.route("/report/installed")
 @login_required
+@read_only
 def report_installed():
     """
     Информационный отчёт по текущим установленным инструментам.
-    Фильтрация по STATUS делается через агрегатор last_aggregate(),
-    т.к. в модели Tooling нет колонки 'status'.
+    Фильтрация по STATUS последнего события (в модели Tooling нет колонки 'status');
+    последние события всех BATCH берутся одной выборкой.
     """
-    tools = (Tooling.query
-             .filter_by(is_active=True)
-             .order_by(Tooling.tool_code.asc())
-             .all())
-
     rows = []
-    for t in tools:
-        agg = t.last_aggregate() or {}
+    for r in tool_snapshots(order_by=Tooling.tool_code.asc()):
+        agg = snapshot_aggregate(r)
         if agg.get("STATUS") == "INSTALLED":
             rows.append({
-                "id": t.id,
-                "batch": t.tool_code,
+                "id": r.id,
+                "batch": r.tool_code,
                 "bm": agg.get("BM#"),
                 "role": agg.get("ROLE"),
                 "pos": agg.get("POSITION"),
@@ -129,7 +159,7 @@ def tooling_new():
         code = (request.form.get("tool_code") or "").strip()
         type_code = (request.form.get("type_code") or "GENERIC").strip()
         role = (request.form.get("role") or "").strip() or None
-        dim = _parse_num(request.form.get("dimension"))
+        dim = parse_num(request.form.get("dimension"))
 
         if not code:
             flash("Укажи BATCH #.", "warning")
@@ -170,115 +200,43 @@ def tooling_new():
         flash("BATCH # создан.", "success")
         return redirect(url_for("tooling.list_tooling"))
 
-    return render_template("tooling/tooling_new.html", roles=ALLOWED_ROLES)
+    return render_template("tooling/tooling_new.html", roles=reference_data().lists["roles"])
 
 
 # ---------- Универсальная форма события ----------
 @bp.route("/event", methods=["GET", "POST"])
 @login_required
 def tooling_event():
-    machines = Equipment.query.order_by(Equipment.name.asc()).all()
+    ref = reference_data()   # справочники и список машин — из кэша, без запросов к equipment
 
     if request.method == "POST":
-        batch = (request.form.get("batch_no") or "").strip()
-        action = request.form.get("action")
-        shift = request.form.get("shift") or None
-        machine_id = request.form.get("machine_id")
-        role = request.form.get("role") or None
-        position = request.form.get("position") or None
-        reason = request.form.get("reason") or None
-        note = request.form.get("note") or None
-        dim = _parse_num(request.form.get("dimension"))
-        new_dim = _parse_num(request.form.get("new_dimension"))
-
-        if not batch or action not in ALLOWED_ACTIONS:
-            flash("Укажи BATCH # и корректный ACTION.", "warning")
-            return redirect(url_for("tooling.tooling_event"))
-
-        tool = Tooling.query.filter_by(tool_code=batch).first()
-        if not tool:
-            flash("Такого BATCH # нет. Сначала создай его через «Новый BATCH #».", "warning")
-            return redirect(url_for("tooling.tooling_new"))
-
-        equipment = Equipment.query.get(int(machine_id)) if machine_id else None
-
-        # --- INSTALL ---
-        if action == "INSTALL":
-            if not role:
-                flash("Для INSTALL необходимо указать ROLE.", "warning")
-                return redirect(url_for("tooling.tooling_event"))
-            if role == "IRONING" and not position:
-                flash("Для INSTALL с ROLE=IRONING необходимо указать POSITION.", "warning")
-                return redirect(url_for("tooling.tooling_event"))
-            if not equipment:
-                flash("Для INSTALL необходимо выбрать MACHINE (BM#).", "warning")
-                return redirect(url_for("tooling.tooling_event"))
-            if not shift or shift not in SHIFT_CHOICES:
-                flash("Для INSTALL необходимо выбрать SHIFT.", "warning")
-                return redirect(url_for("tooling.tooling_event"))
-            if dim is None:
-                flash("Для INSTALL необходимо указать DIM.", "warning")
-                return redirect(url_for("tooling.tooling_event"))
-            if not reason or reason not in INSTALL_REASONS:
-                flash("Для INSTALL необходимо выбрать REASON из списка.", "warning")
-                return redirect(url_for("tooling.tooling_event"))
-
-            install_tool(tool=tool, equipment=equipment, role=role, position=position,
-                         shift=shift, reason=reason, dim=float(dim))
-            db.session.commit()
-            flash("Установлено. Если слот был занят — предыдущий инструмент снят автоматически.", "success")
-            return redirect(url_for("tooling.list_tooling"))
-
-        # --- REMOVE ---
-        if action == "REMOVE":
-            if not (equipment and role and position):
-                flash("Для REMOVE обязательны: MACHINE, ROLE и POSITION.", "warning")
-                return redirect(url_for("tooling.tooling_event"))
-            remove_tool(tool, equipment, role, position, reason or "REMOVE")
-            db.session.commit()
-            flash("Снято.", "success")
-            return redirect(url_for("tooling.list_tooling"))
-
-        # --- REGRIND ---
-        if action == "REGRIND":
-            regrind_tool(tool,
-                         float(dim) if dim is not None else None,
-                         float(new_dim) if new_dim is not None else None,
-                         reason or "REGRIND", shift)
-            db.session.commit()
-            flash("Перешлифовка зафиксирована.", "success")
-            return redirect(url_for("tooling.list_tooling"))
-
-        # --- Прочие события ---
-        ev = ToolingEvent(
-            user_name=getattr(current_user, "username", "user"),
-            machine_id=equipment.id if equipment else None,
-            machine_name=(getattr(equipment, "name", None) or getattr(equipment, "code", None)) if equipment else None,
-            shift=shift, happened_at=datetime.utcnow(), action=action,
-            reason=reason, note=note, role=role, position=position, slot_id=None,
-            dimension=dim, new_dimension=new_dim, tool_id=tool.id, batch_no=tool.tool_code,
-            from_status=None,
-            to_status=("READY" if action == "MARK_READY"
-                       else "DEFECTIVE" if action == "MARK_DEFECTIVE"
-                       else "SCRAPPED" if action == "SCRAP"
-                       else None),
-        )
-        if action == "SCRAP":
-            tool.is_active = False
-
-        db.session.add(ev)
+        data = request.form.to_dict()
+        action = data.get("action")
+        if action in current_app.config.get("TOOLING_ASYNC_ACTIONS", ()) and ingest.worker_enabled():
+            # частые «короткие» события (сканеры в пиковые смены) — в очередь, ответ сразу
+            row, _ = ingest.enqueue_event(data, data.get("idempotency_key"),
+                                          user_name=getattr(current_user, "username", None),
+                                          user_id=getattr(current_user, "id", None))
+            flash(f"Событие {action} принято.", "success")
+            return redirect(url_for("tooling.list_tooling", after=row.id))
+        try:
+            _, message = apply_event(data)
+        except EventRejected as e:
+            flash(str(e), "warning")
+            return redirect(url_for(e.endpoint))
         db.session.commit()
-        flash(f"Событие {action} записано.", "success")
+        flash(message, "success")
         return redirect(url_for("tooling.list_tooling"))
 
     # GET
     return render_template("tooling/event_form.html",
-                           actions=ALLOWED_ACTIONS,
-                           roles=ALLOWED_ROLES,
-                           positions=ALLOWED_POSITIONS,
-                           shifts=SHIFT_CHOICES,
-                           machines=machines,
-                           reasons=INSTALL_REASONS)
+                           actions=ref.lists["actions"],
+                           roles=ref.lists["roles"],
+                           positions=ref.lists["positions"],
+                           shifts=ref.lists["shifts"],
+                           machines=ref.machines,
+                           reasons=ref.lists["install_reasons"],
+                           idempotency_key=uuid.uuid4().hex)
 
 # ---------- API: инфо по BATCH для автоподстановки DIM/ROLE ----------
 @bp.route("/api/tool/<string:batch_no>")
@@ -290,17 +248,108 @@ def api_tool_info(batch_no: str):
     return jsonify(ok=True, dim=tool.current_diameter, role=tool.intended_role)
 
 
+# ---------- API: справочники для форм (один кэшируемый JSON) ----------
+@bp.route("/api/reference")
+@login_required
+def api_reference():
+    ref = reference_data()
+    resp = jsonify(ok=True, **ref.as_json())
+    resp.set_etag(f"ref-{ref.version}")
+    resp.headers["Cache-Control"] = "private, max-age=60"
+    return resp.make_conditional(request)
+
+
+@bp.route("/api/reference/<string:kind>", methods=["PUT"])
+@role_required(["root"])
+def api_reference_update(kind: str):
+    """Замена списка справочника без деплоя: {"values": ["...", ...]} — порядок сохраняется."""
+    payload = request.get_json(silent=True) or {}
+    try:
+        replace_values(kind, payload.get("values") or [])
+    except ValueError as e:
+        return jsonify(ok=False, error=str(e)), 400
+    db.session.commit()
+    ref = reference_data()
+    return jsonify(ok=True, version=ref.version, values=list(ref.lists[kind]))
+
+
+# ---------- API: автодополнение BATCH # (ручные сканеры, каждое нажатие) ----------
+@bp.route("/api/autocomplete")
+@login_required
+def api_autocomplete():
+    """
+    Топ-N BATCH # по префиксу вместе со STATUS/DIM/ROLE — всё из in-process индекса,
+    без SQL на каждое нажатие.
+    """
+    q = (request.args.get("q") or "").strip()
+    limit = min(max(request.args.get("limit", 10, type=int), 1), 50)
+    return jsonify(ok=True, q=q, items=tool_code_index().search(q, limit))
+
+
+# ---------- API: приём событий пачками (сканеры) ----------
+def _queued_json(row):
+    return {"id": row.id, "key": row.idempotency_key, "status": row.status,
+            "event_id": row.event_id, "error": row.error}
+
+
+@bp.route("/api/events", methods=["POST"])
+@login_required
+def api_events_enqueue():
+    """
+    Приём событий: один объект (ключ — заголовок Idempotency-Key или поле "idempotency_key")
+    или {"events": [...]}. Ответ 202 сразу после записи в очередь; применяет их фоновый писатель.
+    """
+    payload = request.get_json(silent=True)
+    if isinstance(payload, dict) and isinstance(payload.get("events"), list):
+        items, single = payload["events"], False
+    elif isinstance(payload, dict):
+        items, single = [payload], True
+    else:
+        return jsonify(ok=False, error="ожидается JSON-объект или {\"events\": [...]}"), 400
+
+    user_name = getattr(current_user, "username", None)
+    user_id = getattr(current_user, "id", None)
+    out = []
+    for i, item in enumerate(items):
+        if not isinstance(item, dict):
+            return jsonify(ok=False, error=f"events[{i}]: ожидается объект"), 400
+        key = item.get("idempotency_key") or (request.headers.get("Idempotency-Key") if single else None)
+        row, created = ingest.enqueue_event(item, key, user_name=user_name, user_id=user_id)
+        out.append({**_queued_json(row), "duplicate": not created})
+
+    if not ingest.worker_enabled():  # очередь выключена — применяем сразу, в этом же запросе
+        while ingest.drain_queue():
+            pass
+        out = [{**_queued_json(ingest.get_queued(o["id"])), "duplicate": o["duplicate"]} for o in out]
+
+    if single:
+        return jsonify(ok=True, **out[0]), 202 if out[0]["status"] == "pending" else 200
+    return jsonify(ok=True, items=out), 202
+
+
+@bp.route("/api/events/<int:queue_id>")
+@login_required
+def api_events_status(queue_id: int):
+    """Статус события из очереди; ?wait=N — подождать до N секунд (макс. 10), пока его применят."""
+    wait = min(max(request.args.get("wait", 0, type=float), 0), 10)
+    row = ingest.wait_applied(queue_id, timeout=wait) if wait else ingest.get_queued(queue_id)
+    if row is None:
+        return jsonify(ok=False, error="not found"), 404
+    return jsonify(ok=True, **_queued_json(row))
+
+
 # ---------- Экспорт агрегированного списка ----------
 @bp.route("/export/csv")
 @role_required(["admin", "root"])
+@read_only
 def export_csv():
-    tools = Tooling.query.filter_by(is_active=True).order_by(desc(Tooling.updated_at)).all()
+    snapshots = tool_snapshots(order_by=desc(Tooling.updated_at))
     out = io.StringIO()
     writer = csv.writer(out, lineterminator="\n")
     header = ["BATCH #", "LAST DATE", "LAST ACTION", "STATUS", "BM#", "ROLE", "POSITION", "DIM", "NEW DIM"]
     writer.writerow(header)
-    for t in tools:
-        a = t.last_aggregate()
+    for r in snapshots:
+        a = snapshot_aggregate(r)
         writer.writerow([
             a["BATCH #"] or "",
             a["LAST DATE"].isoformat(sep=" ") if a["LAST DATE"] else "",
@@ -322,12 +371,14 @@ def export_csv():
 # ---------- Экспорт истории событий конкретного BATCH ----------
 @bp.route("/<int:tool_id>/export/events.csv")
 @login_required
+@read_only
 def export_tool_events(tool_id: int):
     tool = Tooling.query.get_or_404(tool_id)
-    events = (ToolingEvent.query
-              .filter_by(tool_id=tool_id)
-              .order_by(ToolingEvent.happened_at.asc())
-              .all())
+    # экспорт — вся история (или ?from=&to=), вместе с архивом
+    events = archive.tool_events(tool_id,
+                                 date_from=_parse_date(request.args.get("from")),
+                                 date_to=_parse_date(request.args.get("to")),
+                                 newest_first=False)
 
     out = io.StringIO()
     writer = csv.writer(out, lineterminator="\n")
@@ -392,8 +443,9 @@ def tooling_search():
 
     # Иначе — собираем агрегированные строки
     rows = []
+    aggregates = {r.id: snapshot_aggregate(r) for r in tool_snapshots([t.id for t in items])}
     for t in items:
-        a = t.last_aggregate() or {}
+        a = aggregates.get(t.id, {})
         rows.append({
             "id": t.id,
             "batch": t.tool_code,
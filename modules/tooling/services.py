@@ -1,4 +1,236 @@
-"""Service layer placeholder for tooling domain."""
+"""Service layer for the tooling domain."""
 
-# Tooling workflows remain in the HTTP handlers for now. Services will be
-# introduced as part of future clean architecture refinements.
+import threading
+import time
+from bisect import bisect_left
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from typing import Iterable, Optional
+
+from flask import current_app, has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from extensions import db
+from modules.maintenance.models import Equipment
+
+from .models import Tooling, ToolingEvent, _actor_name, install_tool, regrind_tool, remove_tool
+from .reference import reference_data
+from .repositories import tool_snapshots
+
+
+# ============================== ПРИМЕНЕНИЕ СОБЫТИЙ ============================== #
+class EventRejected(ValueError):
+    """Событие не прошло проверку; ``endpoint`` — куда вернуть пользователя формы."""
+
+    def __init__(self, message: str, endpoint: str = "tooling.tooling_event"):
+        super().__init__(message)
+        self.endpoint = endpoint
+
+
+def parse_num(s) -> Optional[Decimal]:
+    """'63,08' / '63.08' / 63.08 -> Decimal('63.08'); пусто или мусор -> None."""
+    if s is None:
+        return None
+    s = str(s).strip().replace(",", ".")
+    if not s:
+        return None
+    try:
+        return Decimal(s)
+    except InvalidOperation:
+        return None
+
+
+def apply_event(data: dict, user_name: Optional[str] = None, user_id: Optional[int] = None,
+                happened_at: Optional[datetime] = None):
+    """
+    Проверяет и записывает одно событие формы «Событие» (поля — как в форме: batch_no, action, ...).
+    Общая логика для POST /tooling/event и фоновой очереди (ingest.py). Commit не делает.
+    happened_at — время события; очередь передаёт время приёма (received_at), а не время применения.
+    Возвращает (ToolingEvent, текст для flash); при ошибке проверки — EventRejected.
+    """
+    at = happened_at or datetime.utcnow()
+    ref = reference_data()
+    batch = (data.get("batch_no") or "").strip()
+    action = data.get("action")
+    shift = data.get("shift") or None
+    machine_id = data.get("machine_id")
+    role = data.get("role") or None
+    position = data.get("position") or None
+    reason = data.get("reason") or None
+    note = data.get("note") or None
+    dim = parse_num(data.get("dimension"))
+    new_dim = parse_num(data.get("new_dimension"))
+
+    if not batch or not ref.allowed("actions", action):
+        raise EventRejected("Укажи BATCH # и корректный ACTION.")
+
+    tool = Tooling.query.filter_by(tool_code=batch).first()
+    if not tool:
+        raise EventRejected("Такого BATCH # нет. Сначала создай его через «Новый BATCH #».", "tooling.tooling_new")
+
+    equipment = db.session.get(Equipment, int(machine_id)) if machine_id else None
+
+    # --- INSTALL ---
+    if action == "INSTALL":
+        if not role:
+            raise EventRejected("Для INSTALL необходимо указать ROLE.")
+        if role == "IRONING" and not position:
+            raise EventRejected("Для INSTALL с ROLE=IRONING необходимо указать POSITION.")
+        if not equipment:
+            raise EventRejected("Для INSTALL необходимо выбрать MACHINE (BM#).")
+        if not shift or not ref.allowed("shifts", shift):
+            raise EventRejected("Для INSTALL необходимо выбрать SHIFT.")
+        if dim is None:
+            raise EventRejected("Для INSTALL необходимо указать DIM.")
+        if not reason or not ref.allowed("install_reasons", reason):
+            raise EventRejected("Для INSTALL необходимо выбрать REASON из списка.")
+
+        ev = install_tool(tool=tool, equipment=equipment, role=role, position=position,
+                          shift=shift, reason=reason, dim=float(dim), user_name=user_name, user_id=user_id,
+                          happened_at=at)
+        return ev, "Установлено. Если слот был занят — предыдущий инструмент снят автоматически."
+
+    # --- REMOVE ---
+    if action == "REMOVE":
+        if not (equipment and role and position):
+            raise EventRejected("Для REMOVE обязательны: MACHINE, ROLE и POSITION.")
+        ev = remove_tool(tool, equipment, role, position, reason or "REMOVE", user_name=user_name, happened_at=at)
+        return ev, "Снято."
+
+    # --- REGRIND ---
+    if action == "REGRIND":
+        ev = regrind_tool(tool,
+                          float(dim) if dim is not None else None,
+                          float(new_dim) if new_dim is not None else None,
+                          reason or "REGRIND", shift, user_name=user_name, happened_at=at)
+        return ev, "Перешлифовка зафиксирована."
+
+    # --- Прочие события ---
+    ev = ToolingEvent(
+        user_name=_actor_name(user_name),
+        machine_id=equipment.id if equipment else None,
+        machine_name=(getattr(equipment, "name", None) or getattr(equipment, "code", None)) if equipment else None,
+        shift=shift, happened_at=at, action=action,
+        reason=reason, note=note, role=role, position=position, slot_id=None,
+        dimension=dim, new_dimension=new_dim, tool_id=tool.id, batch_no=tool.tool_code,
+        from_status=None,
+        to_status=("READY" if action == "MARK_READY"
+                   else "DEFECTIVE" if action == "MARK_DEFECTIVE"
+                   else "SCRAPPED" if action == "SCRAP"
+                   else None),
+    )
+    if action == "SCRAP":
+        tool.is_active = False
+
+    db.session.add(ev)
+    return ev, f"Событие {action} записано."
+
+
+# ============================ BATCH # AUTOCOMPLETE ============================ #
+class ToolCodeIndex:
+    """
+    In-process sorted index of active BATCH # with their current status/DIM.
+
+    Keys are upper-cased tool codes kept in a sorted list, so a prefix lookup is
+    one ``bisect`` plus a short forward walk — no SQL per keystroke.
+
+    Freshness:
+    - writes made by this process (ORM flushes touching Tooling/ToolingEvent) mark
+      the affected tools dirty; they are re-read in one query on the next lookup;
+    - writes made by other workers are picked up by a full rebuild every ``ttl`` seconds.
+    """
+
+    def __init__(self, ttl: float = 30.0):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._keys: list[str] = []
+        self._entries: dict[str, dict] = {}
+        self._built_at: float | None = None
+        self._dirty: set[int] = set()
+
+    # ---- обслуживание ----
+    def invalidate(self) -> None:
+        self._built_at = None
+
+    def mark_dirty(self, tool_ids: Iterable[int]) -> None:
+        with self._lock:
+            self._dirty.update(i for i in tool_ids if i is not None)
+
+    @staticmethod
+    def _entry(row) -> dict:
+        return {
+            "id": row.id,
+            "batch": row.tool_code,
+            "status": row.to_status if row.action is not None else "STOCK",
+            "last_action": row.action,
+            "last_date": row.happened_at.isoformat(sep=" ") if row.happened_at else None,
+            "bm": row.machine_name,
+            "role": row.event_role if row.action is not None else row.intended_role,
+            "position": row.position,
+            "dim": row.current_diameter,
+            "intended_role": row.intended_role,
+        }
+
+    def _refresh(self) -> None:
+        with self._lock:
+            if self._built_at is None or time.monotonic() - self._built_at > self.ttl:
+                entries = {r.tool_code.upper(): self._entry(r) for r in tool_snapshots()}
+                self._built_at = time.monotonic()
+                self._dirty.clear()
+            elif self._dirty:
+                dirty, self._dirty = self._dirty, set()
+                entries = {k: v for k, v in self._entries.items() if v["id"] not in dirty}
+                for r in tool_snapshots(dirty, active_only=False):
+                    if r.is_active:
+                        entries[r.tool_code.upper()] = self._entry(r)
+            else:
+                return
+            # подменяем целиком — читатели без блокировки видят либо старый, либо новый снимок
+            self._entries, self._keys = entries, sorted(entries)
+
+    # ---- чтение ----
+    def search(self, prefix: str, limit: int = 10) -> list[dict]:
+        self._refresh()
+        keys, entries = self._keys, self._entries
+        prefix = (prefix or "").strip().upper()
+        if not prefix:
+            return []
+        out = []
+        for i in range(bisect_left(keys, prefix), len(keys)):
+            if len(out) >= limit or not keys[i].startswith(prefix):
+                break
+            out.append(entries[keys[i]])
+        return out
+
+
+def tool_code_index() -> ToolCodeIndex:
+    """Индекс текущего приложения (у каждого app — свой, тесты создают несколько)."""
+    idx = current_app.extensions.get("tool_code_index")
+    if idx is None:
+        idx = current_app.extensions["tool_code_index"] = ToolCodeIndex(
+            ttl=current_app.config.get("TOOLING_INDEX_TTL", 30))
+    return idx
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_dirty_tools(session, flush_context):
+    ids = session.info.setdefault("dirty_tool_ids", set())
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, Tooling):
+            ids.add(obj.id)
+        elif isinstance(obj, ToolingEvent):
+            ids.add(obj.tool_id)
+
+
+@event.listens_for(Session, "after_commit")
+def _mark_tools_dirty(session):
+    # только после commit: иначе параллельный запрос может перечитать ещё незакоммиченное состояние
+    ids = session.info.pop("dirty_tool_ids", None)
+    if ids and has_app_context() and "tool_code_index" in current_app.extensions:
+        current_app.extensions["tool_code_index"].mark_dirty(ids)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_dirty_tools(session):
+    session.info.pop("dirty_tool_ids", None)
@@ -0,0 +1,280 @@
+# -*- coding: utf-8 -*-
+"""
+Кэш страниц-списков с инвалидацией по записи.
+
+- @cached_page("equipment", ...) под @login_required: ответ GET кэшируется по ключу
+  endpoint + аргументы URL + query string + набор прав роли (permissions.capabilities()) —
+  операторы с одинаковыми правами получают один и тот же HTML, не выполняя выборок и рендера.
+- Устаревание — по счётчикам таблиц (TableVersion): любая запись ORM в таблицу, от которой зависит
+  страница (flush, а также Query.update/delete и session.execute(insert/update/delete)), увеличивает её
+  счётчик в той же транзакции. Перед отдачей из кэша — один SELECT счётчиков; не совпали — рендер заново.
+  Так видят изменения все воркеры сразу после commit, без TTL и рассылок.
+- Персональное в странице — только панель пользователя (_userbar.html между метками <!--userbar-->):
+  её рендерим на каждый запрос и вклеиваем в сохранённый HTML. Есть непоказанные flash-сообщения — кэш
+  не используется.
+- Условный GET: ETag = хэш (ключ, счётчики, пользователь), Last-Modified = время последней записи
+  в таблицы страницы. Совпал If-None-Match — 304 сразу после SELECT счётчиков.
+- Хранилище: LRU в памяти процесса (PAGE_CACHE_SIZE страниц); PAGE_CACHE_BACKEND=sqlite — вторым уровнем
+  общий SQLite-файл (PAGE_CACHE_DB), страницу, отрендеренную одним воркером, отдают и остальные.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import closing, contextmanager
+from datetime import datetime
+from functools import wraps
+from typing import NamedTuple, Optional
+
+from flask import current_app, make_response, render_template, request, session
+from flask_login import current_user
+from sqlalchemy import event, select, update
+from sqlalchemy.orm import Session
+
+import permissions
+from extensions import db
+from models import TableVersion
+
+_EXT_KEY = "page_cache"
+_INFO_KEY = "page_cache_tables"
+USERBAR_START, USERBAR_END = "<!--userbar-->", "<!--/userbar-->"
+
+WATCHED: set[str] = set()   # таблицы, от которых зависит хоть одна кэшируемая страница
+
+
+class Entry(NamedTuple):
+    versions: tuple          # ((таблица, счётчик), ...) на момент рендера
+    head: str                # HTML до панели пользователя
+    tail: Optional[str]      # HTML после неё (None — панели в странице нет)
+
+
+class MemoryStore:
+    """LRU в памяти процесса."""
+
+    def __init__(self, size: int):
+        self.size = size
+        self._items: OrderedDict[str, Entry] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Entry]:
+        with self._lock:
+            entry = self._items.get(key)
+            if entry is not None:
+                self._items.move_to_end(key)
+            return entry
+
+    def put(self, key: str, entry: Entry) -> None:
+        with self._lock:
+            self._items[key] = entry
+            self._items.move_to_end(key)
+            while len(self._items) > self.size:
+                self._items.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+
+class SqliteStore:
+    """Страницы в SQLite-файле — общие для всех воркеров хоста."""
+
+    PRUNE_EVERY = 64   # раз в столько записей — удалить самые старые сверх size
+
+    def __init__(self, size: int, path: str):
+        self.size = size
+        self.path = path
+        self._puts = 0
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS page_cache (key TEXT PRIMARY KEY, versions TEXT NOT NULL, "
+                         "head TEXT NOT NULL, tail TEXT, stored_at REAL NOT NULL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_page_cache_stored ON page_cache (stored_at)")
+
+    @contextmanager
+    def _connect(self):
+        with closing(sqlite3.connect(self.path, timeout=5)) as conn, conn:  # commit и close
+            yield conn
+
+    def get(self, key: str) -> Optional[Entry]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT versions, head, tail FROM page_cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        return Entry(tuple(tuple(v) for v in json.loads(row[0])), row[1], row[2])
+
+    def put(self, key: str, entry: Entry) -> None:
+        self._puts += 1
+        with self._connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO page_cache (key, versions, head, tail, stored_at) VALUES (?, ?, ?, ?, ?)",
+                         (key, json.dumps(entry.versions), entry.head, entry.tail, time.time()))
+            if self._puts % self.PRUNE_EVERY == 0:
+                conn.execute("DELETE FROM page_cache WHERE key NOT IN "
+                             "(SELECT key FROM page_cache ORDER BY stored_at DESC LIMIT ?)", (self.size,))
+
+    def clear(self) -> None:
+        with self._connect() as conn:
+            conn.execute("DELETE FROM page_cache")
+
+
+class PageCache:
+    """LRU процесса + необязательное общее хранилище вторым уровнем."""
+
+    def __init__(self, local: MemoryStore, shared: Optional[SqliteStore] = None):
+        self.local = local
+        self.shared = shared
+
+    def get(self, key: str, versions: tuple) -> Optional[Entry]:
+        entry = self.local.get(key)
+        if entry is not None and entry.versions == versions:
+            return entry
+        if self.shared is not None:
+            entry = self.shared.get(key)
+            if entry is not None and entry.versions == versions:
+                self.local.put(key, entry)
+                return entry
+        return None
+
+    def put(self, key: str, entry: Entry) -> None:
+        self.local.put(key, entry)
+        if self.shared is not None:
+            self.shared.put(key, entry)
+
+    def clear(self) -> None:
+        self.local.clear()
+        if self.shared is not None:
+            self.shared.clear()
+
+
+def page_cache() -> Optional[PageCache]:
+    if not current_app.config.get("PAGE_CACHE", True):
+        return None
+    return current_app.extensions.get(_EXT_KEY)
+
+
+# ------------------------------ счётчики таблиц ------------------------------ #
+def table_versions(tables) -> tuple[tuple, Optional[datetime]]:
+    """Счётчики таблиц ((имя, версия), ...) и время последней записи в них — один SELECT."""
+    rows = {name: (version, at) for name, version, at in db.session.execute(
+        select(TableVersion.table_name, TableVersion.version, TableVersion.updated_at)
+        .where(TableVersion.table_name.in_(tables)))}
+    versions = tuple((t, rows.get(t, (0, None))[0]) for t in tables)
+    last = max((at for _, at in rows.values() if at is not None), default=None)
+    return versions, last
+
+
+def _bump(session, tables) -> None:
+    tables = set(tables) - session.info.get(_INFO_KEY, set())   # в этой транзакции уже увеличен — хватит
+    if not tables:
+        return
+    conn = session.connection(bind_arguments={"mapper": TableVersion.__mapper__})
+    tv = TableVersion.__table__
+    now = datetime.utcnow()
+    for name in sorted(tables):  # один порядок во всех воркерах — без взаимных блокировок
+        res = conn.execute(update(tv).where(tv.c.table_name == name).values(version=tv.c.version + 1, updated_at=now))
+        if not res.rowcount:
+            conn.execute(tv.insert().values(table_name=name, version=1, updated_at=now))
+    session.info.setdefault(_INFO_KEY, set()).update(tables)
+
+
+@event.listens_for(Session, "after_flush")
+def _bump_flushed_tables(session, flush_context):
+    tables = {getattr(type(obj), "__tablename__", None) for obj in (*session.new, *session.dirty, *session.deleted)}
+    tables &= WATCHED
+    if tables:
+        _bump(session, tables)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _bump_bulk_tables(state):
+    """Query.update/delete и session.execute(insert/update/delete) идут мимо flush."""
+    if not (state.is_insert or state.is_update or state.is_delete):
+        return
+    name = getattr(getattr(state.statement, "table", None), "name", None)
+    if name in WATCHED:
+        _bump(state.session, {name})
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _forget_tables(session, transaction):
+    if transaction.parent is None:   # commit, rollback или close внешней транзакции
+        session.info.pop(_INFO_KEY, None)
+
+
+# ------------------------------ декоратор ------------------------------ #
+def page_key() -> str:
+    parts = (request.endpoint, sorted((request.view_args or {}).items()),
+             sorted(request.args.items(multi=True)), sorted(permissions.capabilities()))
+    return hashlib.sha1(repr(parts).encode()).hexdigest()
+
+
+def _split(html: str) -> Entry:
+    head, found, rest = html.partition(USERBAR_START)
+    if not found:
+        return Entry((), html, None)
+    return Entry((), head, rest.partition(USERBAR_END)[2])
+
+
+def _assemble(entry: Entry) -> str:
+    if entry.tail is None:
+        return entry.head
+    return entry.head + render_template("_userbar.html") + entry.tail
+
+
+def cached_page(*tables: str, bypass_args: tuple = ()):
+    """
+    Кэшировать GET-страницу, зависящую от ``tables``. ``bypass_args`` — параметры query string,
+    при которых страница всегда рендерится заново (например, ?after= у списка оснастки).
+    """
+    tables = tuple(sorted(tables))
+    WATCHED.update(tables)
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            cache = page_cache()
+            if (cache is None or request.method != "GET" or session.get("_flashes")
+                    or any(a in request.args for a in bypass_args)):
+                return view(*args, **kwargs)
+
+            key = page_key()
+            versions, last_modified = table_versions(tables)
+            etag = hashlib.sha1(f"{key}|{versions}|{current_user.get_id()}".encode()).hexdigest()[:32]
+            if request.if_none_match.contains(etag):
+                resp = current_app.response_class(status=304)
+                status = "revalidated"
+            else:
+                entry = cache.get(key, versions)
+                if entry is not None:
+                    resp, status = make_response(_assemble(entry)), "hit"
+                else:
+                    resp, status = make_response(view(*args, **kwargs)), "miss"
+                    if resp.status_code != 200 or resp.mimetype != "text/html":
+                        return resp
+                    cache.put(key, _split(resp.get_data(as_text=True))._replace(versions=versions))
+
+            resp.set_etag(etag)
+            if last_modified is not None:
+                resp.last_modified = last_modified
+            resp.cache_control.private = True
+            resp.cache_control.no_cache = True   # браузер каждый раз спрашивает, но получает 304
+            resp.headers["X-Page-Cache"] = status
+            return resp.make_conditional(request)
+        return wrapper
+    return decorator
+
+
+def install(app) -> None:
+    """Хранилище кэша страниц (PAGE_CACHE=0 — выключен: декоратор просто вызывает view)."""
+    if not app.config.get("PAGE_CACHE", True):
+        return
+    size = int(app.config.get("PAGE_CACHE_SIZE", 256))
+    shared = None
+    if (app.config.get("PAGE_CACHE_BACKEND") or "memory").lower() == "sqlite":
+        path = app.config.get("PAGE_CACHE_DB") or os.path.join(app.instance_path, "page_cache.db")
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        shared = SqliteStore(size, path)
+    app.extensions[_EXT_KEY] = PageCache(MemoryStore(size), shared)
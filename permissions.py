@@ -2,9 +2,16 @@
 # -*- coding: utf-8 -*-
 """
 RBAC для приложения.
-- role_required([...]) — основной декоратор на роуты (root всегда имеет доступ).
+- MATRIX — декларативная таблица «право → роли». При импорте компилируется в ROLE_CAPABILITIES:
+  frozenset прав на каждую роль (root получает все права).
+- capabilities() — набор прав текущего пользователя; считается один раз на запрос (кэш в g).
+  В шаблонах он доступен как ``caps``: ``{% if 'wo_fill' in caps %}`` — без вызова функции в цикле.
+- role_required([...]) — основной декоратор на роуты (root всегда имеет доступ), проверяет тот же набор.
 - require_role(*roles) — обратная совместимость (делает то же самое).
-- UI-хелперы can_* для шаблонов: возвращают True/False.
+- Роль не из ROLES: модель User такую не запишет (ValueError); если она уже лежит в базе —
+  у пользователя нет прав, и это пишется в лог (один раз на роль), а не проходит молча.
+- UI-хелперы can_<право>() для шаблонов: возвращают True/False; создаются по строкам MATRIX
+  (TEMPLATE_HELPERS, в глобальные имена модуля не пишутся), новое право = одна строка в MATRIX.
 
 Роли:
 - user   — базовые операции (ставить/снимать инструмент, сервисные операции, заполнение WO и т.п.)
@@ -12,12 +19,114 @@ RBAC для приложения.
 - root   — полный доступ, редактирование/удаление
 """
 
+import logging
 from functools import wraps
-from typing import Iterable, Set
+from typing import Iterable
 
-from flask import abort, flash, redirect, request, url_for
+from flask import abort, flash, g, has_request_context, redirect, request, url_for
 from flask_login import current_user, login_required
 
+log = logging.getLogger(__name__)
+
+ROLES = ("user", "admin", "root")
+ROOT = "root"
+
+# ================================ МАТРИЦА ПРАВ ================================ #
+# право -> роли, кроме root (root может всё). Пустой кортеж — только root.
+MATRIX: dict[str, tuple[str, ...]] = {
+    # ---- Spare parts ----
+    "parts_create": ("admin",),
+    "parts_edit":   ("admin",),
+    "parts_import": ("admin",),
+    "parts_export": ("admin",),
+    "parts_delete": (),
+    "analogs_edit": ("admin",),          # явные ссылки «взаимозаменяемы» на карточке запчасти
+    "stock_issue":   ("user", "admin"),  # выдача со склада (на WO, в цех)
+    "stock_receive": ("admin",),         # приход, в т.ч. пачкой по накладной
+    "stock_adjust":  ("admin",),         # корректировка и инвентаризация
+
+    # ---- Equipment (Maintenance) ----
+    "equipment_create": ("admin",),      # разрешим admin создавать
+    "equipment_edit":   ("admin",),      # и редактировать
+    "equipment_delete": (),              # удалять — только root
+
+    # ---- Checklist Templates ----
+    "tpl_create": ("admin",),
+    "tpl_edit":   ("admin",),
+    "tpl_delete": (),
+
+    # ---- Maintenance Plans ----
+    "plan_create":   ("admin",),
+    "plan_edit":     ("admin",),
+    "plan_delete":   (),
+    "run_scheduler": (),
+
+    # ---- Work Orders ----
+    "wo_fill":         ("user", "admin"),  # user/admin заполняют
+    "wo_reopen":       ("admin",),         # или root
+    "wo_create_quick": ("admin",),
+    "wo_delete":       (),
+
+    # ---- Tooling ----
+    "tooling_view":    ("user", "admin"),  # видеть список/карточку
+    "tooling_create":  ("admin",),         # новая оснастка (BATCH #) на склад
+    "tooling_import":  ("admin",),         # импорт/экспорт базы оснастки
+    "tooling_export":  ("admin",),
+    "tooling_operate": ("user", "admin"),  # ставить/снимать/сервисные действия
+    "tooling_edit":    (),                 # правки чувствительных полей
+    "tooling_delete":  (),                 # физическое/soft удаление
+    "tooling_scrap":   (),                 # списание SCRAP
+}
+
+NO_CAPABILITIES: frozenset[str] = frozenset()
+_warned_roles: set[str] = set()
+
+
+def check_role(role: str) -> str:
+    """Роль для записи в users.role; неизвестная — ValueError (иначе пользователь молча останется без прав)."""
+    if role not in ROLES:
+        raise ValueError(f"Unknown role {role!r}: expected one of {', '.join(ROLES)}")
+    return role
+
+
+def compile_matrix(matrix: dict[str, tuple[str, ...]]) -> dict[str, frozenset[str]]:
+    """Роль -> frozenset прав. Кроме прав из матрицы у каждой роли есть «role:<роль>» (для role_required)."""
+    for cap, roles in matrix.items():
+        unknown = set(roles) - set(ROLES)
+        if unknown:
+            raise ValueError(f"Unknown roles for {cap!r}: {', '.join(sorted(unknown))}")
+    compiled = {role: frozenset({f"role:{role}", *(cap for cap, roles in matrix.items() if role in roles)})
+                for role in ROLES}
+    compiled[ROOT] = frozenset({*matrix, *(f"role:{role}" for role in ROLES)})
+    return compiled
+
+
+ROLE_CAPABILITIES = compile_matrix(MATRIX)
+
+
+def capabilities() -> frozenset[str]:
+    """Права текущего пользователя. В пределах запроса считаются один раз (и заново после login/logout)."""
+    if not has_request_context():
+        return NO_CAPABILITIES
+    user = current_user._get_current_object()
+    role = getattr(user, "role", None) if user is not None and user.is_authenticated else None
+    cached = g.get("_capabilities")
+    if cached is not None and cached[0] is user and cached[1] == role:
+        return cached[2]
+    caps = ROLE_CAPABILITIES.get(role)
+    if caps is None:
+        if role is not None and role not in _warned_roles:
+            _warned_roles.add(role)
+            log.warning("user %s has unknown role %r (expected one of %s): no permissions granted",
+                        getattr(user, "id", "?"), role, ", ".join(ROLES))
+        caps = NO_CAPABILITIES
+    g._capabilities = (user, role, caps)
+    return caps
+
+
+def can(capability: str) -> bool:
+    return capability in capabilities()
+
 
 # ----------------------------- БАЗОВЫЙ ДЕКОРАТОР ----------------------------- #
 def role_required(allowed_roles: Iterable[str]):
@@ -32,20 +141,16 @@ def role_required(allowed_roles: Iterable[str]):
     - root имеет доступ всегда.
     - Если не хватает прав → 403 (API) или флеш + редирект на домашнюю (HTML).
     """
-    # нормализуем множество ролей
+    # нормализуем множество ролей в права вида role:<роль>; root есть всегда
     if isinstance(allowed_roles, str):
-        allowed: Set[str] = {allowed_roles}
-    else:
-        allowed = set(allowed_roles or [])
+        allowed_roles = [allowed_roles]
+    allowed = frozenset(f"role:{role}" for role in (*(allowed_roles or ()), ROOT))
 
     def decorator(view_func):
         @wraps(view_func)
         @login_required
         def wrapped(*args, **kwargs):
-            role = getattr(current_user, "role", None)
-
-            # root всегда может
-            if role == "root" or role in allowed:
+            if not allowed.isdisjoint(capabilities()):
                 return view_func(*args, **kwargs)
 
             # Выбираем поведение в зависимости от ожидаемого формата ответа
@@ -72,55 +177,24 @@ def require_role(*roles: str):
     return role_required(list(roles))
 
 
-# --------------------------- ВСПОМОГАТЕЛЬНЫЕ ФУНКЦИИ ------------------------ #
-def _is(*roles: str) -> bool:
-    """Удобный helper для шаблонов: проверка роли текущего пользователя."""
-    return bool(current_user.is_authenticated and getattr(current_user, "role", None) in roles or
-                (current_user.is_authenticated and getattr(current_user, "role", None) == "root"))
+# ================================ UI-ПРАВА ================================== #
+def _checker(capability: str):
+    def check() -> bool:
+        return capability in capabilities()
+    check.__name__ = f"can_{capability}"
+    return check
+
 
+# can_equipment_create(), can_wo_fill(), can_tooling_operate(), ... — по одной на строку MATRIX;
+# в шаблоны попадают через контекст-процессор (app.py), из Python — permissions.can_<право>()
+TEMPLATE_HELPERS = {f"can_{cap}": _checker(cap) for cap in MATRIX}
 
-# ================================ UI-ПРАВА ================================== #
-# ---- Equipment (Maintenance) ----
-def can_equipment_create(): return _is("admin")      # разрешим admin создавать
-def can_equipment_edit():   return _is("admin")      # и редактировать
-def can_equipment_delete(): return _is("root")       # удалять — только root
-
-# ---- Checklist Templates ----
-def can_tpl_create(): return _is("admin")
-def can_tpl_edit():   return _is("admin")
-def can_tpl_delete(): return _is("root")
-
-# ---- Maintenance Plans ----
-def can_plan_create():   return _is("admin")
-def can_plan_edit():     return _is("admin")
-def can_plan_delete():   return _is("root")
-def can_run_scheduler(): return _is("root")
-
-# ---- Work Orders ----
-def can_wo_fill():         return _is("user", "admin")  # user/admin заполняют
-def can_wo_reopen():       return _is("admin")          # или root, см. ниже
-def can_wo_create_quick(): return _is("admin")
-def can_wo_delete():       return _is("root")
-
-
-# =============================== TOOLING (НОВОЕ) ============================= #
-# Видеть список/карточку
-def can_tooling_view():     return _is("user", "admin")     # (root тоже по умолчанию)
-
-# Создавать новую оснастку (BATCH #) на склад
-def can_tooling_create():   return _is("admin")
-
-# Импорт/экспорт базы оснастки
-def can_tooling_import():   return _is("admin")
-def can_tooling_export():   return _is("admin")
-
-# Операции над оснасткой (ставить/снимать/сервисные действия)
-def can_tooling_operate():  return _is("user", "admin")
-
-# Редактирование карточки/жёсткие операции
-def can_tooling_edit():     return _is("root")              # правки чувствительных полей
-def can_tooling_delete():   return _is("root")              # физическое/soft удаление
-def can_tooling_scrap():    return _is("root")              # списание SCRAP
+
+def __getattr__(name: str):
+    try:
+        return TEMPLATE_HELPERS[name]
+    except KeyError:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
 
 
 # =========================== ДОПОЛНИТЕЛЬНЫЕ ШОРТКАТЫ ======================== #
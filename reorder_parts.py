@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+"""
+reorder_parts.py — ночной пересчёт точек заказа запчастей (см. modules/spare_parts/reorder.py).
+
+Режимы:
+- python reorder_parts.py                    → настройки из конфига (REORDER_*)
+- python reorder_parts.py --lead-time-days 45 → другой срок поставки на этот прогон
+
+Запускать по cron раз в сутки: все запчасти считаются разом, результат целиком заменяет
+прошлый (таблица part_reorder_levels), отчёт «К заказу» читает только её.
+"""
+
+import argparse
+
+from app import create_app
+from extensions import db
+from modules.spare_parts import reorder
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recompute spare part reorder points and order quantities")
+    parser.add_argument("--history-days", type=int, default=None, help="окно истории выдач (REORDER_HISTORY_DAYS)")
+    parser.add_argument("--lead-time-days", type=int, default=None, help="срок поставки (REORDER_LEAD_TIME_DAYS)")
+    args = parser.parse_args()
+
+    overrides = {}
+    if args.history_days is not None:
+        overrides["REORDER_HISTORY_DAYS"] = args.history_days
+    if args.lead_time_days is not None:
+        overrides["REORDER_LEAD_TIME_DAYS"] = args.lead_time_days
+    app = create_app(overrides)
+    with app.app_context():
+        result = reorder.recalculate()
+        db.session.commit()
+    print(f"→ запчастей с расходом: {result['parts']}, к заказу: {result['to_order']} ({result['seconds']} с)")
+    print("✔ Готово.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,316 @@
+# -*- coding: utf-8 -*-
+"""
+JSON API /api/v1 для HMI-панелей и MES: ресурсы модулей вместо разбора HTML-страниц.
+
+- Ресурс = модель + права на запись; объявляются в modules/<модуль>/api.py через register().
+  Ресурсы выключенного модуля (ENABLED_MODULES) не отдаются. GET /api/v1/ — список ресурсов и их полей.
+- Чтение (только выбранные колонки, без ORM-объектов: строки-кортежи сразу в JSON, на движке чтения):
+    GET /api/v1/<ресурс>?fields=id,code,status          — нужные поля (id есть всегда)
+        &status=open&due_date__lte=2024-06-01           — фильтры: поле, поле__in=a,b, __gt/__gte/__lt/__lte
+        &after=<курсор>&limit=200                        — keyset-страницы по id (курсор — из "next")
+        &format=rows                                     — {"fields": [...], "rows": [[...], ...]} вместо объектов
+    GET /api/v1/<ресурс>?ids=1,2,3                       — пачкой по списку id (до API_MAX_PAGE)
+    GET /api/v1/<ресурс>/<id>
+- Запись пачками, одна транзакция на пачку (всё или ничего), права — из MATRIX (permissions.py):
+    POST  /api/v1/<ресурс>  {"items": [{...}, ...]}          — создать; ответ — id в том же порядке
+    PATCH /api/v1/<ресурс>  {"items": [{"id": 1, ...}, ...]} — изменить (одна выборка на всю пачку)
+  Правила записи сверх типов колонок (допустимые статусы и т.п.) — в Resource.check.
+  Ошибки: 400 — неизвестное/битое поле (с номером элемента), 403 — нет права, 409 — конфликт в базе.
+"""
+
+from dataclasses import dataclass
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+from functools import cached_property
+from typing import Callable, Optional
+
+import sqlalchemy as sa
+from flask import current_app, jsonify, request
+from flask_login import login_required
+from sqlalchemy.exc import IntegrityError
+
+from db_routing import read_only
+from extensions import db
+from keyset import decode_id, page_size, window
+from permissions import capabilities
+
+PREFIX = "/api/v1"
+RESERVED_ARGS = {"fields", "after", "limit", "ids", "format"}
+FILTER_OPS = {
+    "": lambda col, v: col == v,
+    "gt": lambda col, v: col > v,
+    "gte": lambda col, v: col >= v,
+    "lt": lambda col, v: col < v,
+    "lte": lambda col, v: col <= v,
+}
+
+
+class ApiError(Exception):
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.status = status
+
+
+@dataclass
+class Resource:
+    name: str                                   # сегмент URL: /api/v1/<name>
+    model: type
+    module: str                                 # модуль из ENABLED_MODULES
+    create_cap: Optional[str] = None            # право на POST (None — ресурс только для чтения)
+    update_cap: Optional[str] = None            # право на PATCH
+    read_only_fields: tuple = ("id",)           # не принимаются в POST/PATCH
+    on_create: Optional[Callable] = None        # (созданные объекты) после flush — побочные записи
+    on_update: Optional[Callable] = None        # (изменённые объекты) после flush — то же для PATCH
+    check: Optional[Callable] = None            # (объект или None для POST, значения, номер) до записи; ApiError
+
+    @cached_property
+    def columns(self) -> dict:
+        """Поле -> атрибут модели (при первом запросе: к этому времени все модели уже импортированы)."""
+        return {attr.key: getattr(self.model, attr.key) for attr in sa.inspect(self.model).column_attrs}
+
+    @property
+    def writable(self) -> list[str]:
+        return [f for f in self.columns if f not in self.read_only_fields]
+
+
+REGISTRY: dict[str, Resource] = {}
+
+
+def register(resource: Resource) -> Resource:
+    REGISTRY[resource.name] = resource
+    return resource
+
+
+def _resource(name: str) -> Resource:
+    res = REGISTRY.get(name)
+    if res is None or res.module not in current_app.config.get("ENABLED_MODULES", ()):
+        raise ApiError(f"unknown resource: {name}", 404)
+    return res
+
+
+# ------------------------------ значения ------------------------------ #
+def _python_type(col):
+    try:
+        return col.type.python_type
+    except NotImplementedError:
+        return str
+
+
+def _dumper(col) -> Optional[Callable]:
+    """Преобразование значения колонки в JSON (None — как есть)."""
+    kind = _python_type(col)
+    if kind in (date, datetime):
+        return lambda v: v.isoformat() if v is not None else None
+    if kind is Decimal:
+        return lambda v: float(v) if v is not None else None
+    return None
+
+
+def _load(col, raw, name: str):
+    """JSON-значение или строка из query string -> значение для колонки."""
+    if raw is None or raw == "":
+        return None
+    kind = _python_type(col)
+    try:
+        if kind is bool:
+            return raw if isinstance(raw, bool) else str(raw).lower() in ("1", "true", "yes")
+        if kind is datetime:
+            return datetime.fromisoformat(raw)
+        if kind is date:
+            return date.fromisoformat(raw)
+        if kind is Decimal:
+            return Decimal(str(raw))
+        if kind is int and isinstance(raw, float) and not raw.is_integer():
+            raise ValueError(raw)   # int(2.5) молча дал бы 2
+        return kind(raw)
+    except (TypeError, ValueError, InvalidOperation):
+        raise ApiError(f"{name}: invalid value {raw!r}") from None
+
+
+# ------------------------------ чтение ------------------------------ #
+def _selected(res: Resource) -> list[str]:
+    raw = request.args.get("fields")
+    if not raw:
+        return list(res.columns)
+    names = ["id", *(f.strip() for f in raw.split(",") if f.strip() and f.strip() != "id")]
+    unknown = [f for f in names if f not in res.columns]
+    if unknown:
+        raise ApiError(f"unknown fields: {', '.join(unknown)}")
+    return list(dict.fromkeys(names))
+
+
+def _filters(res: Resource) -> list:
+    out = []
+    for key in request.args:
+        if key in RESERVED_ARGS:
+            continue
+        name, _, op = key.partition("__")
+        col = res.columns.get(name)
+        if col is None or (op and op != "in" and op not in FILTER_OPS):
+            raise ApiError(f"unknown filter: {key}")
+        if op == "in":
+            out.append(col.in_([_load(col, v, key) for v in request.args[key].split(",") if v]))
+        else:
+            out.append(FILTER_OPS[op](col, _load(col, request.args[key], key)))
+    return out
+
+
+def _dump_rows(dumpers: list, rows) -> list[list]:
+    if not any(dumpers):
+        return [list(r) for r in rows]
+    return [[d(v) if d else v for d, v in zip(dumpers, r)] for r in rows]
+
+
+def _respond(res: Resource, names: list[str], rows: list, **extra):
+    data = _dump_rows([_dumper(res.columns[n]) for n in names], rows)
+    if request.args.get("format") == "rows":
+        return jsonify(ok=True, fields=names, rows=data, **extra)
+    return jsonify(ok=True, items=[dict(zip(names, r)) for r in data], **extra)
+
+
+@login_required
+def api_index():
+    enabled = current_app.config.get("ENABLED_MODULES", ())
+    return jsonify(ok=True, version=1, resources={
+        r.name: {"fields": list(r.columns), "writable": r.writable if (r.create_cap or r.update_cap) else []}
+        for r in REGISTRY.values() if r.module in enabled})
+
+
+@login_required
+@read_only
+def api_list(name: str):
+    res = _resource(name)
+    names = _selected(res)
+    id_col = res.columns["id"]
+    stmt = sa.select(*(res.columns[n] for n in names)).where(*_filters(res)).order_by(id_col)
+    maximum = int(current_app.config.get("API_MAX_PAGE", 500))
+
+    if "ids" in request.args:
+        ids = [_load(id_col, v, "ids") for v in request.args["ids"].split(",") if v.strip()]
+        if len(ids) > maximum:
+            raise ApiError(f"ids: at most {maximum} per request")
+        return _respond(res, names, db.session.execute(stmt.where(id_col.in_(ids))).all())
+
+    limit = page_size(request.args.get("limit"), current_app.config.get("API_PAGE_SIZE", 100), maximum)
+    after = decode_id(request.args.get("after"))
+    if after is not None:
+        stmt = stmt.where(id_col > after)
+    page = window(db.session.execute(stmt.limit(limit + 1)).all(), limit, lambda r: str(r[0]))
+    return _respond(res, names, page.items, next=page.next_cursor)
+
+
+@login_required
+@read_only
+def api_get(name: str, item_id: int):
+    res = _resource(name)
+    names = _selected(res)
+    row = db.session.execute(sa.select(*(res.columns[n] for n in names)).where(res.columns["id"] == item_id)).first()
+    if row is None:
+        raise ApiError("not found", 404)
+    dumpers = [_dumper(res.columns[n]) for n in names]
+    return jsonify(ok=True, item=dict(zip(names, _dump_rows(dumpers, [row])[0])))
+
+
+# ------------------------------ запись ------------------------------ #
+def _items() -> list[dict]:
+    payload = request.get_json(silent=True)
+    items = payload.get("items") if isinstance(payload, dict) else None
+    if not isinstance(items, list) or not items:
+        raise ApiError('expected {"items": [...]}')
+    maximum = int(current_app.config.get("API_MAX_PAGE", 500))
+    if len(items) > maximum:
+        raise ApiError(f"items: at most {maximum} per request")
+    for i, item in enumerate(items):
+        if not isinstance(item, dict):
+            raise ApiError(f"items[{i}]: expected an object")
+    return items
+
+
+def _values(res: Resource, item: dict, i: int) -> dict:
+    unknown = [k for k in item if k not in res.columns or (k in res.read_only_fields and k != "id")]
+    if unknown:
+        raise ApiError(f"items[{i}]: unknown or read-only fields: {', '.join(unknown)}")
+    return {k: _load(res.columns[k], v, f"items[{i}].{k}") for k, v in item.items() if k != "id"}
+
+
+def _require(cap: Optional[str]) -> None:
+    if cap is None:
+        raise ApiError("resource is read-only", 405)
+    if cap not in capabilities():
+        raise ApiError("forbidden", 403)
+
+
+def _commit(after_flush: Optional[Callable] = None) -> None:
+    try:
+        db.session.flush()
+        if after_flush is not None:
+            after_flush()
+        db.session.commit()
+    except IntegrityError as e:
+        db.session.rollback()
+        raise ApiError(f"conflict: {e.orig}", 409) from None
+
+
+def _required(res: Resource) -> list[str]:
+    """Поля, без которых строку не вставить: NOT NULL без значения по умолчанию."""
+    return [k for k, attr in res.columns.items() if k not in res.read_only_fields
+            for col in attr.property.columns
+            if not col.nullable and col.default is None and col.server_default is None]
+
+
+@login_required
+def api_create(name: str):
+    res = _resource(name)
+    _require(res.create_cap)
+    required = _required(res)
+    objects = []
+    for i, item in enumerate(_items()):
+        values = _values(res, item, i)
+        missing = [k for k in required if values.get(k) is None]
+        if missing:
+            raise ApiError(f"items[{i}]: missing fields: {', '.join(missing)}")
+        if res.check:
+            res.check(None, values, i)
+        objects.append(res.model(**values))
+    db.session.add_all(objects)
+    _commit(after_flush=(lambda: res.on_create(objects)) if res.on_create else None)
+    return jsonify(ok=True, ids=[o.id for o in objects]), 201
+
+
+@login_required
+def api_update(name: str):
+    res = _resource(name)
+    _require(res.update_cap)
+    items = _items()
+    changes = []
+    for i, item in enumerate(items):
+        if not isinstance(item.get("id"), int):
+            raise ApiError(f"items[{i}]: id is required")
+        changes.append((item["id"], _values(res, item, i)))
+    found = {o.id: o for o in res.model.query.filter(res.columns["id"].in_([c[0] for c in changes]))}
+    missing = [str(i) for i, _ in changes if i not in found]
+    if missing:
+        raise ApiError(f"not found: {', '.join(missing)}", 404)
+    if res.check:   # вся пачка — до первого setattr: ошибка не оставляет полуизменённых объектов
+        for i, (item_id, values) in enumerate(changes):
+            res.check(found[item_id], values, i)
+    for item_id, values in changes:
+        for key, value in values.items():
+            setattr(found[item_id], key, value)
+    objects = [found[item_id] for item_id, _ in changes]
+    _commit(after_flush=(lambda: res.on_update(objects)) if res.on_update else None)
+    return jsonify(ok=True, ids=[c[0] for c in changes])
+
+
+def _api_error(e: ApiError):
+    return jsonify(ok=False, error=str(e)), e.status
+
+
+def install(app) -> None:
+    """Маршруты /api/v1; ресурсы регистрируют модули (modules/<модуль>/api.py)."""
+    app.add_url_rule(f"{PREFIX}/", "api_index", api_index)
+    app.add_url_rule(f"{PREFIX}/<name>", "api_list", api_list)
+    app.add_url_rule(f"{PREFIX}/<name>", "api_create", api_create, methods=["POST"])
+    app.add_url_rule(f"{PREFIX}/<name>", "api_update", api_update, methods=["PATCH"])
+    app.add_url_rule(f"{PREFIX}/<name>/<int:item_id>", "api_get", api_get)
+    app.register_error_handler(ApiError, _api_error)
@@ -5,6 +5,8 @@ set -e
 HOST="${HOST:-0.0.0.0}"
 PORT="${PORT:-8000}"
 FLASK_APP_PATH="${FLASK_APP_PATH:-app.py}"
+# SERVER=gunicorn — продакшн (serve.py: процессы x потоки, SIGHUP — мягкая перезагрузка); SERVER=dev — flask run
+SERVER="${SERVER:-gunicorn}"
 
 # ---- активируем venv (должен быть ./venv) ----
 if [ -f "venv/bin/activate" ]; then
@@ -21,7 +23,14 @@ if [ -f "requirements.txt" ]; then
   pip install -r requirements.txt
 fi
 
-# ---- запуск Flask ----
-export FLASK_APP="$FLASK_APP_PATH"
-echo "Starting Flask on ${HOST}:${PORT} ..."
-exec flask run --host="${HOST}" --port="${PORT}"
+export HOST PORT
+if [ "$SERVER" = "dev" ]; then
+  # ---- сервер разработки Flask ----
+  export FLASK_APP="$FLASK_APP_PATH"
+  echo "Starting Flask dev server on ${HOST}:${PORT} ..."
+  exec flask run --host="${HOST}" --port="${PORT}"
+fi
+
+# ---- продакшн: gunicorn (SERVER_WORKERS, SERVER_THREADS, SERVER_MAX_REQUESTS — см. config.py) ----
+echo "Starting gunicorn on ${HOST}:${PORT} ..."
+exec python serve.py
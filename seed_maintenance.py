@@ -1,13 +1,33 @@
 # seed_maintenance.py
-from datetime import date
+"""
+Demo data for the maintenance module.
+
+Modes:
+- python seed_maintenance.py          → BM-01 + BM-Daily checklist + daily plan (idempotent)
+- python seed_maintenance.py --bulk   → benchmark volumes in an EMPTY database: 100k parts,
+                                         2k equipment, 10k plans, 500k work orders (see --help)
+"""
+import argparse
+import random
+from datetime import date, datetime, timedelta
+
 from extensions import db
+from modules.spare_parts.models import Part
+from modules.spare_parts.services import rebuild_classes
 from modules.maintenance.models import (
     Equipment,
+    EquipmentParts,
     ChecklistTemplate,
     ChecklistItem,
     MaintenancePlan,
+    WorkOrder,
+    WorkOrderItem,
 )
 
+CHUNK = 50_000
+FREQUENCIES = ["daily", "weekly", "monthly", "quarterly", "yearly"]
+CATEGORIES = ["Bodymaker", "Trimmer", "Washer", "Printer", "Necker", "Palletizer"]
+
 def run():
     eq = Equipment.query.filter_by(code="BM-01").first()
     if not eq:
@@ -57,3 +77,119 @@ def run():
 
     db.session.commit()
     print("Seed OK: BM-01, BM-Daily, daily plan created.")
+
+
+# ---------- bulk volumes (benchmarks) ----------
+def _insert(table, rows) -> int:
+    """Core INSERT in chunks of CHUNK rows (no ORM objects)."""
+    conn = db.session.connection()
+    batch, n = [], 0
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= CHUNK:
+            conn.execute(table.insert(), batch)
+            n += len(batch)
+            batch.clear()
+    if batch:
+        conn.execute(table.insert(), batch)
+        n += len(batch)
+    return n
+
+
+def seed_equipment(count: int) -> None:
+    """Equipment BM-0001… with ids 1..count across six lines."""
+    _insert(Equipment.__table__, ({
+        "id": i, "code": f"BM-{i:04d}", "name": f"{CATEGORIES[i % len(CATEGORIES)]} {i}",
+        "category": CATEGORIES[i % len(CATEGORIES)], "location": f"Line {chr(ord('A') + i % 6)}",
+        "status": "active",
+    } for i in range(1, count + 1)))
+
+
+def seed_bulk(parts: int = 100_000, equipment: int = 2_000, plans: int = 10_000,
+              workorders: int = 500_000, templates: int = 50, filled: int = 1_000, seed: int = 42) -> dict:
+    """
+    Benchmark volumes with ids starting at 1. Work orders are spread over five years
+    (most of them done); only the latest ``filled`` get checklist items.
+    """
+    rnd = random.Random(seed)
+    today = date.today()
+
+    _insert(Part.__table__, ({
+        "id": i, "sap_code": f"SAP{i:07d}", "part_number": f"PN-{rnd.randint(10_000, 99_999)}-{i}",
+        "name": f"Part {i}", "category": CATEGORIES[i % len(CATEGORIES)],
+        "equipment_code": f"BM-{i % max(equipment, 1) + 1:04d}", "location": f"R{i % 40:02d}-S{i % 7}",
+        "manufacturer": f"Vendor {i % 25}", "analog_group": f"AG{i % 5_000:04d}" if i % 3 == 0 else None,
+        "timestamp": datetime.utcnow(),
+    } for i in range(1, parts + 1)))
+    rebuild_classes(db.session.connection())  # классы аналогов — один пересчёт после вставки
+
+    seed_equipment(equipment)
+    if parts:
+        _insert(EquipmentParts, ({"equipment_id": e, "part_id": p, "quantity": rnd.randint(1, 4)}
+                                 for e in range(1, equipment + 1)
+                                 for p in {rnd.randint(1, parts) for _ in range(10)}))
+
+    _insert(ChecklistTemplate.__table__, ({
+        "id": t, "code": f"TPL-{t:03d}", "name_en": f"Checklist {t}", "name_ru": f"Чек-лист {t}",
+        "category": CATEGORIES[t % len(CATEGORIES)], "default_frequency": FREQUENCIES[t % len(FREQUENCIES)],
+    } for t in range(1, templates + 1)))
+    items_per_template = 5
+    _insert(ChecklistItem.__table__, ({
+        "id": (t - 1) * items_per_template + k, "template_id": t, "order_index": k,
+        "text_en": f"Check {k}", "text_ru": f"Проверка {k}", "field_type": "checkbox",
+    } for t in range(1, templates + 1) for k in range(1, items_per_template + 1)))
+
+    _insert(MaintenancePlan.__table__, ({
+        "id": i, "equipment_id": i % equipment + 1, "template_id": i % templates + 1,
+        "frequency": FREQUENCIES[i % len(FREQUENCIES)], "grace_days": i % 3,
+        "next_due_date": today + timedelta(days=rnd.randint(-30, 60)),
+    } for i in range(1, plans + 1)))
+
+    span = 5 * 365
+
+    def _source(i):  # WO i is generated from plan i % plans + 1 (its equipment and template)
+        return i % plans + 1 if plans else i
+
+    def _workorder(i):
+        due = today - timedelta(days=span * (workorders - i) // max(workorders, 1))
+        status = "done" if due < today - timedelta(days=14) else rnd.choice(["open", "open", "in_progress", "done"])
+        plan_id = i % plans + 1 if plans else None
+        return {
+            "id": i, "equipment_id": _source(i) % equipment + 1, "template_id": _source(i) % templates + 1,
+            "plan_id": plan_id, "due_date": due, "status": status,
+            "created_at": datetime.combine(due, datetime.min.time()) - timedelta(days=1),
+            "closed_at": datetime.combine(due, datetime.min.time()) + timedelta(hours=8) if status == "done" else None,
+        }
+
+    _insert(WorkOrder.__table__, (_workorder(i) for i in range(1, workorders + 1)))
+    _insert(WorkOrderItem.__table__, ({
+        "workorder_id": i, "checklist_item_id": (_source(i) % templates) * items_per_template + k, "is_ok": True,
+    } for i in range(max(workorders - filled, 0) + 1, workorders + 1) for k in range(1, items_per_template + 1)))
+
+    db.session.commit()
+    return {"parts": parts, "equipment": equipment, "plans": plans, "workorders": workorders}
+
+
+def main():
+    from app import create_app
+
+    parser = argparse.ArgumentParser(description="Seed maintenance demo / benchmark data")
+    parser.add_argument("--bulk", action="store_true", help="benchmark volumes (empty database expected)")
+    parser.add_argument("--parts", type=int, default=100_000)
+    parser.add_argument("--equipment", type=int, default=2_000)
+    parser.add_argument("--plans", type=int, default=10_000)
+    parser.add_argument("--workorders", type=int, default=500_000)
+    args = parser.parse_args()
+
+    app = create_app({"TOOLING_INGEST_WORKER": "off"})
+    with app.app_context():
+        if args.bulk:
+            print("→ Seeding benchmark volumes …")
+            counts = seed_bulk(args.parts, args.equipment, args.plans, args.workorders)
+            print("✔ Готово: " + ", ".join(f"{k}={v}" for k, v in counts.items()))
+        else:
+            run()
+
+
+if __name__ == "__main__":
+    main()
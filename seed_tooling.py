@@ -3,17 +3,24 @@
 seed_tooling.py — утилита для инициализации таблиц модуля TOOLING.
 
 Режимы:
-- python seed_tooling.py --create    → создать НЕДОСТАЮЩИЕ таблицы (без потери данных)
-- python seed_tooling.py --reset     → удалить таблицы модуля и создать заново (ВНИМАНИЕ: данные по инструменту будут удалены)
+- python seed_tooling.py --create    → догнать схему миграциями (без потери данных; то же, что python migrate.py)
+- python seed_tooling.py --reset     → удалить таблицы модуля и прогнать миграции заново
+                                       (ВНИМАНИЕ: данные по инструменту будут удалены)
+- python seed_tooling.py --bulk      → объёмы для бенчмарков: 5k BATCH и 1M событий за 5 лет
+                                       (таблицы Tooling должны быть пустыми; --tools / --events / --machines)
 
 Работает как с SQLite, так и с PostgreSQL.
 """
 
 import argparse
-from sqlalchemy import text
+import random
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, text
 
 from app import create_app           # фабрика приложения (как в твоём проекте)
 from extensions import db
+import migrations
 
 # Импорт моделей, чтобы SQLAlchemy «знал» о таблицах
 import modules.tooling.models as TM  # noqa
@@ -23,6 +30,9 @@ def drop_tooling_tables():
     """Удаляем таблицы модуля в правильном порядке зависимостей."""
     # порядок важен: сначала события (ссылаются на всё), затем монтирования, затем слоты, потом сами инструменты и типы
     stmts = [
+        "DROP TABLE IF EXISTS tooling_ingest_receipts",
+        "DROP TABLE IF EXISTS tooling_reference_values",
+        "DROP TABLE IF EXISTS tooling_reference_version",
         "DROP TABLE IF EXISTS tooling_events",
         "DROP TABLE IF EXISTS tooling_mounts",
         "DROP TABLE IF EXISTS equipment_slots",
@@ -37,10 +47,71 @@ def drop_tooling_tables():
     db.session.commit()
 
 
-def create_missing_tables():
-    """Создаёт недостающие таблицы по текущим моделям (без ALTER уже существующих)."""
-    db.create_all()
+def create_missing_tables(reapply: bool = False):
+    """
+    Догоняет схему миграциями (migrations/versions). reapply=True — прогнать все миграции заново:
+    после DROP версия в schema_version осталась прежней, а таблиц уже нет (миграции идемпотентны).
+    """
+    db.session.commit()
+    for bind_key in db.metadatas:
+        for m in migrations.upgrade(db.engines[bind_key], bind_key, reapply=reapply):
+            print(f"  · {m.version:04d}_{m.name}")
+
+
+ACTIONS = ["INSTALL", "REMOVE", "WASH", "POLISH", "INSPECT", "MARK_READY", "REGRIND"]
+TO_STATUS = {"INSTALL": "INSTALLED", "REMOVE": "NEED_SERVICE", "MARK_READY": "READY", "REGRIND": "STOCK"}
+CHUNK = 50_000
+
+
+def seed_bulk(tools: int = 5_000, events: int = 1_000_000, machines: int = 20, seed: int = 42) -> dict:
+    """
+    Быстрый сев объёмов для бенчмарков (Core INSERT пачками, без ORM-объектов), id с 1.
+    Машины — существующее оборудование (seed_maintenance.py --bulk); если его нет — создаются BM-0001…
+    ``machines`` штук. Последнее событие каждого BATCH определяет статус; у ~20% это INSTALL на машину.
+    """
+    from modules.maintenance.models import Equipment
+    import seed_maintenance
+
+    conn = db.session.connection()
+    machine_rows = conn.execute(select(Equipment.id, Equipment.name).order_by(Equipment.id)).all()
+    if not machine_rows:
+        seed_maintenance.seed_equipment(machines)
+        machine_rows = conn.execute(select(Equipment.id, Equipment.name).order_by(Equipment.id)).all()
+
+    conn.execute(TM.ToolType.__table__.insert(), [{"id": 1, "code": "GENERIC", "name": "GENERIC"}])
+    conn.execute(TM.Tooling.__table__.insert(),
+                 [{"id": i, "tool_code": f"IH-{i:05d}", "tool_type_id": 1, "is_active": True,
+                   "current_diameter": 63.08, "updated_at": datetime.utcnow()} for i in range(1, tools + 1)])
+
+    rnd = random.Random(seed)
+    start = datetime.utcnow() - timedelta(days=5 * 365)
+    step = (5 * 365 * 24 * 3600) / max(events, 1)
+    table = TM.ToolingEvent.__table__
+    batch = []
+    for n in range(events):
+        tool_id = rnd.randint(1, tools)
+        machine_id, machine_name = machine_rows[rnd.randrange(len(machine_rows))]
+        action = "INSTALL" if rnd.random() < 0.2 else rnd.choice(ACTIONS)
+        batch.append({
+            "tool_id": tool_id,
+            "batch_no": f"IH-{tool_id:05d}",
+            "machine_id": machine_id,
+            "machine_name": machine_name,
+            "happened_at": start + timedelta(seconds=n * step),
+            "action": action,
+            "to_status": TO_STATUS.get(action),
+            "role": "IRONING",
+            "position": f"#{rnd.randint(1, 3)}",
+            "dimension": 63.08,
+            "user_name": "bench",
+        })
+        if len(batch) >= CHUNK:
+            conn.execute(table.insert(), batch)
+            batch.clear()
+    if batch:
+        conn.execute(table.insert(), batch)
     db.session.commit()
+    return {"tools": tools, "events": events, "machines": len(machine_rows)}
 
 
 def main():
@@ -48,6 +119,10 @@ def main():
     grp = parser.add_mutually_exclusive_group(required=True)
     grp.add_argument("--create", action="store_true", help="создать недостающие таблицы (без удаления)")
     grp.add_argument("--reset", action="store_true", help="удалить таблицы модуля и создать заново (данные будут потеряны)")
+    grp.add_argument("--bulk", action="store_true", help="объёмы для бенчмарков (пустые таблицы Tooling)")
+    parser.add_argument("--tools", type=int, default=5_000)
+    parser.add_argument("--events", type=int, default=1_000_000)
+    parser.add_argument("--machines", type=int, default=20, help="если оборудования в базе ещё нет")
 
     args = parser.parse_args()
 
@@ -57,8 +132,12 @@ def main():
             print("→ Dropping tooling tables …")
             drop_tooling_tables()
             print("→ Creating tables …")
-            create_missing_tables()
+            create_missing_tables(reapply=True)
             print("✔ Готово: таблицы модуля Tooling пересозданы с нуля.")
+        elif args.bulk:
+            print("→ Seeding benchmark volumes …")
+            counts = seed_bulk(args.tools, args.events, args.machines)
+            print("✔ Готово: " + ", ".join(f"{k}={v}" for k, v in counts.items()))
         elif args.create:
             print("→ Creating missing tables …")
             create_missing_tables()
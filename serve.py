@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""
+serve.py — продакшн-запуск: gunicorn, несколько процессов-воркеров с потоками (вместо `flask run`).
+
+    python serve.py                              # HOST/PORT из окружения (по умолчанию 0.0.0.0:8000)
+    python serve.py --workers 4 --threads 8
+    kill -HUP <pid мастера>                      # мягкая перезагрузка: новые воркеры, старые дорабатывают запросы
+
+- Приложение собирается ОДИН раз в мастере до fork (preload): проверка схемы/миграции, манифест статики,
+  импорт модулей, компиляция всех шаблонов (template_cache.py) — не в каждом воркере; память воркеров
+  общая (copy-on-write). Соединения с базой мастер закрывает до fork — у каждого воркера свой пул.
+- Воркеры gthread: SERVER_THREADS потоков на процесс — долгие соединения живых экранов
+  (/changes/stream, change_feed.py) не занимают весь процесс.
+- Воркер перезапускается после SERVER_MAX_REQUESTS запросов (+ случайно до SERVER_MAX_REQUESTS_JITTER,
+  чтобы не все сразу) — рост памяти ограничен.
+- SIGHUP: мастер заново собирает приложение (шаблоны, статика, миграции), поднимает новые воркеры и мягко
+  гасит старые. Новый Python-код и .env — только полным перезапуском (systemctl restart).
+- Потоки (писатель очереди оснастки) стартуют в каждом воркере после fork, не в мастере.
+- Готовность — GET /readyz (health.py), живость — GET /healthz.
+"""
+
+import argparse
+import os
+import sys
+
+from config import Config
+
+
+def options(args) -> dict:
+    """Настройки gunicorn из аргументов командной строки и SERVER_* (config.py)."""
+    return {
+        "bind": f"{args.host}:{args.port}",
+        "workers": args.workers,
+        "worker_class": "gthread",
+        "threads": args.threads,
+        "preload_app": True,
+        "max_requests": args.max_requests,
+        "max_requests_jitter": Config.SERVER_MAX_REQUESTS_JITTER,
+        "timeout": Config.SERVER_TIMEOUT,
+        "graceful_timeout": Config.SERVER_GRACEFUL_TIMEOUT,
+        "keepalive": Config.SERVER_KEEPALIVE,
+        "accesslog": Config.SERVER_ACCESS_LOG or None,
+        "post_fork": post_fork,
+    }
+
+
+def build_app():
+    """Приложение для мастера: без фоновых потоков и без открытых соединений (их унаследовали бы воркеры)."""
+    from app import create_app
+    from extensions import db
+
+    app = create_app({"SERVER_PRELOAD": True})
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose()
+    return app
+
+
+def post_fork(server, worker) -> None:
+    app = server.app.wsgi()
+    if "tooling" not in app.config["ENABLED_MODULES"]:
+        return
+    from modules.tooling import ingest
+
+    with app.app_context():
+        if ingest.worker_mode() == "thread":
+            ingest.start_worker(app)
+
+
+def run(opts: dict) -> None:
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        sys.exit("gunicorn не установлен: pip install -r requirements.txt (на Windows — python app.py)")
+
+    class Server(BaseApplication):
+        def load_config(self):
+            for key, value in opts.items():
+                if value is not None:
+                    self.cfg.set(key, value)
+
+        def load(self):
+            return build_app()
+
+        def reload(self):
+            self.callable = None   # SIGHUP: собрать приложение заново, а не отдать новым воркерам старое
+            super().reload()
+
+    Server().run()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the ERP under gunicorn (pre-fork, gthread workers)")
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=Config.SERVER_WORKERS)
+    parser.add_argument("--threads", type=int, default=Config.SERVER_THREADS)
+    parser.add_argument("--max-requests", type=int, default=Config.SERVER_MAX_REQUESTS)
+    run(options(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+"""
+Профиль старта приложения (STARTUP_PROFILE=1): сколько create_app() тратит на каждый шаг.
+
+Шаги — инициализация расширений, импорт и регистрация каждого модуля из ENABLED_MODULES,
+проверка схемы, фоновые потоки. Для шага пишется время и число модулей Python, импортированных
+впервые (импорт, который уже сделал предыдущий шаг, ничего не стоит следующему).
+Отчёт — в лог / stderr и в app.extensions["startup_profile"] (его читает benchmarks/bench_cold_start.py).
+"""
+
+import sys
+import time
+from contextlib import contextmanager
+
+
+class StartupProfile:
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.steps: list[tuple[str, float, int]] = []   # (шаг, мс, новых модулей)
+        self._t0 = time.perf_counter()
+
+    @contextmanager
+    def step(self, name: str):
+        if not self.enabled:
+            yield
+            return
+        modules_before = len(sys.modules)
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.steps.append((name, (time.perf_counter() - t0) * 1000, len(sys.modules) - modules_before))
+
+    @property
+    def total_ms(self) -> float:
+        return (time.perf_counter() - self._t0) * 1000
+
+    def report(self) -> str:
+        lines = [f"{'step':<28}{'ms':>9}{'imports':>9}"]
+        lines += [f"{name:<28}{ms:>9.1f}{n:>9}" for name, ms, n in self.steps]
+        lines.append(f"{'create_app total':<28}{self.total_ms:>9.1f}")
+        return "\n".join(lines)
+
+    def finish(self, app) -> None:
+        """Сохранить профиль в приложении и вывести отчёт."""
+        if not self.enabled:
+            return
+        app.extensions["startup_profile"] = self
+        print(self.report(), file=sys.stderr)
@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+"""
+Статика с отпечатками имён, предсжатием и отдачей через reverse proxy.
+
+- Манифест: при старте (или заранее — build_static.py) файлы из static/ (кроме uploads/) получают имя
+  с отпечатком содержимого: styles.css -> styles.1a2b3c4d5e6f.css. В шаблонах — asset_url('styles.css').
+  Новое содержимое = новое имя, поэтому GET /assets/<имя> отдаётся с max-age=STATIC_MAX_AGE, immutable:
+  браузер не перепроверяет файл при каждой загрузке страницы.
+- Предсжатие: текстовые файлы (css/js/svg/…) сжимаются один раз в gzip и, если установлен пакет brotli,
+  в br; варианты лежат в STATIC_BUILD_DIR под именем с отпечатком и пересчитываются только при изменении.
+  Вариант выбирается по Accept-Encoding (br > gzip > без сжатия), ответ с Vary: Accept-Encoding.
+- send_path() — общая отдача файла для /assets/ и /media/ (uploads.py): ETag и условные запросы
+  (If-None-Match/If-Modified-Since → 304), Range → 206. STATIC_SENDFILE:
+    ""          — файл отдаёт сам воркер (по умолчанию);
+    x-sendfile  — заголовок X-Sendfile (Apache mod_xsendfile, lighttpd);
+    x-accel     — X-Accel-Redirect: STATIC_ACCEL_PREFIX + путь от STATIC_ACCEL_ROOT (nginx), например
+                  location /_protected/ { internal; alias /srv/erp/; }
+  С прокси воркер не читает файл вовсе, Range и условные запросы обслуживает прокси.
+"""
+
+import gzip
+import hashlib
+import mimetypes
+import os
+
+from flask import abort, current_app, request, send_file, url_for
+
+try:  # brotli необязателен: без него только gzip
+    import brotli
+except ImportError:  # pragma: no cover - зависит от окружения
+    brotli = None
+
+_EXT_KEY = "static_assets"
+SKIP_DIRS = ("uploads",)                      # фото — отдельно, через /media/ (uploads.py)
+COMPRESSIBLE = {".css", ".js", ".mjs", ".svg", ".json", ".txt", ".html", ".map", ".xml", ".csv"}
+MIN_COMPRESS_SIZE = 256                       # мельче — выигрыш меньше заголовков
+ENCODINGS = ("br", "gzip")                    # порядок предпочтения
+_SUFFIX = {"br": ".br", "gzip": ".gz"}
+
+
+class Asset:
+    __slots__ = ("source", "name", "etag", "mimetype", "variants")
+
+    def __init__(self, source: str, name: str, etag: str, mimetype: str):
+        self.source = source          # абсолютный путь к исходному файлу
+        self.name = name              # имя с отпечатком (относительно static/)
+        self.etag = etag
+        self.mimetype = mimetype
+        self.variants: dict[str, str] = {}   # кодировка -> путь к сжатому файлу
+
+
+class Manifest:
+    def __init__(self):
+        self.by_source: dict[str, Asset] = {}
+        self.by_name: dict[str, Asset] = {}
+
+    def add(self, rel: str, asset: Asset) -> None:
+        self.by_source[rel] = asset
+        self.by_name[asset.name] = asset
+
+
+def _fingerprinted(rel: str, digest: str) -> str:
+    stem, ext = os.path.splitext(rel)
+    return f"{stem}.{digest}{ext}"
+
+
+def _compress(data: bytes, encoding: str) -> bytes:
+    if encoding == "gzip":
+        return gzip.compress(data, compresslevel=9, mtime=0)
+    return brotli.compress(data, quality=11)
+
+
+def build(static_folder: str, build_dir: str | None, precompress: bool = True) -> Manifest:
+    """Манифест static_folder; сжатые варианты — в build_dir (уже готовые не пересчитываются)."""
+    manifest = Manifest()
+    if not static_folder or not os.path.isdir(static_folder):
+        return manifest
+    encodings = [e for e in ENCODINGS if e == "gzip" or brotli is not None] if precompress and build_dir else []
+    for dirpath, dirnames, filenames in os.walk(static_folder):
+        if dirpath == static_folder:
+            dirnames[:] = [d for d in dirnames if d not in SKIP_DIRS]
+        for filename in filenames:
+            if filename.startswith("."):
+                continue
+            source = os.path.join(dirpath, filename)
+            rel = os.path.relpath(source, static_folder).replace(os.sep, "/")
+            with open(source, "rb") as f:
+                data = f.read()
+            digest = hashlib.sha256(data).hexdigest()[:12]
+            mimetype = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+            asset = Asset(source, _fingerprinted(rel, digest), digest, mimetype)
+
+            if len(data) >= MIN_COMPRESS_SIZE and os.path.splitext(filename)[1].lower() in COMPRESSIBLE:
+                for encoding in encodings:
+                    target = os.path.join(build_dir, asset.name + _SUFFIX[encoding])
+                    if not os.path.exists(target):  # имя с отпечатком: готовый файл всегда актуален
+                        packed = _compress(data, encoding)
+                        if len(packed) >= len(data):
+                            continue
+                        os.makedirs(os.path.dirname(target), exist_ok=True)
+                        with open(target + ".tmp", "wb") as f:
+                            f.write(packed)
+                        os.replace(target + ".tmp", target)
+                    asset.variants[encoding] = target
+            manifest.add(rel, asset)
+    return manifest
+
+
+def build_dir(app) -> str:
+    return app.config.get("STATIC_BUILD_DIR") or os.path.join(app.instance_path, "static_build")
+
+
+def manifest() -> Manifest:
+    return current_app.extensions.get(_EXT_KEY) or Manifest()
+
+
+# ------------------------------ отдача ------------------------------ #
+def send_path(path: str, *, mimetype: str | None = None, etag: str | bool = True, max_age: int | None = None,
+              immutable: bool = False, encoding: str | None = None, vary_encoding: bool = False):
+    """Отдать файл: сам воркер (ETag, 304, Range) или через X-Sendfile / X-Accel-Redirect."""
+    mode = (current_app.config.get("STATIC_SENDFILE") or "").lower()
+    if mode == "x-accel":
+        root = current_app.config.get("STATIC_ACCEL_ROOT") or current_app.root_path
+        prefix = (current_app.config.get("STATIC_ACCEL_PREFIX") or "/_protected").rstrip("/")
+        rel = os.path.relpath(os.path.abspath(path), os.path.abspath(root)).replace(os.sep, "/")
+        resp = current_app.response_class(mimetype=mimetype or mimetypes.guess_type(path)[0])
+        resp.headers["X-Accel-Redirect"] = f"{prefix}/{rel}"
+        if max_age is not None:
+            resp.cache_control.max_age = max_age
+    else:
+        # x-sendfile: send_file сам ставит X-Sendfile (USE_X_SENDFILE включает install())
+        resp = send_file(os.path.abspath(path), mimetype=mimetype, etag=etag, max_age=max_age, conditional=True)
+    if encoding:
+        resp.headers["Content-Encoding"] = encoding
+    if vary_encoding:
+        resp.vary.add("Accept-Encoding")
+    if immutable:
+        resp.cache_control.public = True
+        resp.cache_control.immutable = True
+    return resp
+
+
+def _negotiate(asset: Asset) -> tuple[str | None, str]:
+    accepted = request.accept_encodings
+    for encoding in ENCODINGS:
+        path = asset.variants.get(encoding)
+        if path and accepted[encoding] > 0:
+            return encoding, path
+    return None, asset.source
+
+
+def asset_view(filename: str):
+    asset = manifest().by_name.get(filename)
+    if asset is None:
+        abort(404)
+    encoding, path = _negotiate(asset)
+    return send_path(path, mimetype=asset.mimetype, etag=f"{asset.etag}-{encoding or 'identity'}",
+                     max_age=int(current_app.config.get("STATIC_MAX_AGE", 31536000)), immutable=True,
+                     encoding=encoding, vary_encoding=bool(asset.variants))
+
+
+def asset_url(filename: str) -> str:
+    """URL файла из static/ с отпечатком; файл не из манифеста — обычный /static/."""
+    asset = manifest().by_source.get(filename)
+    if asset is None:
+        return url_for("static", filename=filename)
+    return url_for("assets", filename=asset.name)
+
+
+def install(app) -> None:
+    """Манифест static/, GET /assets/<имя>, asset_url() в шаблонах."""
+    if (app.config.get("STATIC_SENDFILE") or "").lower() == "x-sendfile":
+        app.config["USE_X_SENDFILE"] = True   # и для /static/, и для send_path()
+    app.extensions[_EXT_KEY] = build(app.static_folder, build_dir(app),
+                                     precompress=app.config.get("STATIC_PRECOMPRESS", True))
+    app.add_url_rule("/assets/<path:filename>", "assets", asset_view)
+    app.add_template_global(asset_url)
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""
+Шаблоны Jinja без компиляции на первых запросах воркера.
+
+- install(app) — FileSystemBytecodeCache в TEMPLATE_CACHE_DIR (по умолчанию instance/jinja_cache):
+  скомпилированный байткод шаблонов лежит на диске, общий для всех воркеров и переживает перезапуск
+  (HUP, max_requests, деплой). Воркер на первом рендере читает готовый байткод вместо разбора исходника;
+  ключ — имя шаблона + контрольная сумма исходника, так что правка шаблона пересобирает только его.
+  Запись файла атомарная (Jinja пишет во временный и переименовывает) — воркеры не мешают друг другу.
+  Должен вызываться до первого обращения к app.jinja_env (add_template_global его создаёт).
+- warm_up(app) — загрузить все шаблоны приложения и включённых модулей в окружение Jinja (и в кэш на диске).
+  TEMPLATE_WARMUP=auto: прогрев в мастере gunicorn (serve.py, preload_app) — воркеры получают уже
+  скомпилированные шаблоны через fork; 1 — при каждом create_app(); 0 — никогда.
+- python build_templates.py — наполнить кэш на диске при деплое, до старта сервера.
+"""
+
+import logging
+import os
+
+from jinja2 import FileSystemBytecodeCache
+
+log = logging.getLogger(__name__)
+
+_EXT_KEY = "template_cache"
+
+
+def cache_dir(app) -> str | None:
+    value = app.config.get("TEMPLATE_CACHE_DIR")
+    if value == "off":
+        return None
+    return value or os.path.join(app.instance_path, "jinja_cache")
+
+
+def install(app) -> None:
+    """Байткод-кэш шаблонов на диске (TEMPLATE_CACHE_DIR=off — только в памяти процесса, как раньше)."""
+    path = cache_dir(app)
+    if path is None:
+        return
+    try:
+        os.makedirs(path, exist_ok=True)
+    except OSError as e:   # только для чтения — работаем без кэша на диске
+        log.warning("template bytecode cache disabled: %s", e)
+        return
+    app.jinja_options = {**app.jinja_options, "bytecode_cache": FileSystemBytecodeCache(path)}
+    app.extensions[_EXT_KEY] = path
+
+
+def warmup_enabled(app) -> bool:
+    value = app.config.get("TEMPLATE_WARMUP", "auto")
+    if isinstance(value, bool):
+        return value
+    if value == "auto":
+        return bool(app.config.get("SERVER_PRELOAD"))
+    return value == "1"
+
+
+def warm_up(app) -> int:
+    """Скомпилировать (или прочитать из кэша на диске) все .html-шаблоны; возвращает их число."""
+    env = app.jinja_env
+    names = env.list_templates(extensions=("html",))
+    for name in names:
+        env.get_template(name)
+    return len(names)
@@ -2,6 +2,8 @@
 # tests/conftest.py
 import os
 import sys
+from contextlib import contextmanager
+
 import pytest
 
 # чтобы import create_app работал при запуске из корня
@@ -10,22 +12,45 @@ if ROOT not in sys.path:
     sys.path.insert(0, ROOT)
 
 from app import create_app
+from db_metrics import count_queries
 from extensions import db
 
 
+# Общий конфиг тестовых приложений: база и очередь в памяти, всё, что пишет на диск, — во временный каталог
+TEST_CONFIG = dict(
+    TESTING=True,
+    SQLALCHEMY_DATABASE_URI="sqlite:///:memory:",
+    SQLALCHEMY_BINDS={"tooling_queue": "sqlite:///:memory:"},
+    TOOLING_INGEST_WORKER="off",  # очередь событий — синхронно; тесты очереди включают её сами
+    WTF_CSRF_ENABLED=False,
+    SECRET_KEY="test-secret",     # чтобы не ругался Flask-Login/сессии
+    TEMPLATE_CACHE_DIR="off",     # байткод шаблонов — в памяти, а не в instance/ репозитория
+)
+
+
+def authenticate(client, user_id: int = 1):
+    """Вход без формы логина: Flask-Login берёт пользователя из сессии. Возвращает тот же client."""
+    with client.session_transaction() as s:
+        s["_user_id"] = str(user_id)
+        s["_fresh"] = True
+    return client
+
+
 @pytest.fixture()
-def app():
-    app = create_app()
-    app.config.update(
-        TESTING=True,
-        SQLALCHEMY_DATABASE_URI="sqlite:///:memory:",
-        WTF_CSRF_ENABLED=False,
-        LOGIN_DISABLED=True,          # ← ключевая строка: отключаем логин в тестах
-        SECRET_KEY="test-secret",     # чтобы не ругался Flask-Login/сессии
-    )
+def make_app(tmp_path):
+    """make_app(**overrides) — своё приложение теста: TEST_CONFIG + overrides, загрузки — в tmp_path."""
+    def _make(**overrides):
+        # конфиг передаём в фабрику: движок БД создаётся в create_app(),
+        # поэтому SQLALCHEMY_DATABASE_URI после него уже ни на что не влияет
+        return create_app({**TEST_CONFIG, "UPLOAD_FOLDER": str(tmp_path / "uploads"), **overrides})
+    return _make
+
+
+@pytest.fixture()
+def app(make_app):
+    app = make_app(LOGIN_DISABLED=True)  # ← ключевая строка: отключаем логин в тестах
     with app.app_context():
-        db.create_all()
-        yield app
+        yield app  # схему уже создали миграции в create_app()
 
 
 @pytest.fixture()
@@ -40,3 +65,15 @@ def root_user():
         username = "root"
         role = "root"
     return U()
+
+
+@pytest.fixture()
+def max_queries():
+    """with max_queries(5): client.get(...) — падает, если внутри блока больше 5 SQL-выражений."""
+    @contextmanager
+    def _check(limit: int):
+        with count_queries() as counter:
+            yield counter
+        assert counter.count <= limit, (f"{counter.count} SQL statements (limit {limit}):\n"
+                                        + "\n".join(counter.statements))
+    return _check
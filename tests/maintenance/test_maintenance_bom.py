@@ -0,0 +1,73 @@
+from io import BytesIO
+
+import pytest
+from sqlalchemy import select
+
+from extensions import db
+from modules.maintenance.models import Equipment, EquipmentParts
+from modules.spare_parts.models import Part
+from tests.conftest import authenticate
+
+
+def _bom() -> set[tuple]:
+    return set(db.session.execute(select(Equipment.code, Part.sap_code, EquipmentParts.c.quantity)
+                                  .join(EquipmentParts, EquipmentParts.c.equipment_id == Equipment.id)
+                                  .join(Part, Part.id == EquipmentParts.c.part_id)).all())
+
+
+@pytest.fixture()
+def plant(app):
+    db.session.add_all([Equipment(code="BM-01", name="Bodymaker", location="Line A"),
+                        Equipment(code="BM-02", name="Bodymaker", location="Line A"),
+                        Equipment(code="CP-01", name="Cupper", location="Line B")])
+    db.session.add_all([Part(sap_code=code, name=f"Part {code}") for code in ("P1", "P2", "P3")])
+    db.session.commit()
+
+
+def _import(client, text: str, **form):
+    return client.post("/maintenance/bom/import", data={"file": (BytesIO(text.encode()), "bom.csv"), **form},
+                       content_type="multipart/form-data")
+
+
+def test_bom_import_upserts_and_replaces(client, root_user, plant):
+    authenticate(client, root_user.id)
+    resp = _import(client, "equipment_code;sap_code;quantity\n"
+                           "BM-01;P1;2\nBM-01;P2;\nBM-02;P1;4\nCP-01;P3;1\nXX-99;P1;1\nBM-01;ZZ;1\nBM-02;P2;-1\n")
+    assert resp.status_code == 302
+    assert _bom() == {("BM-01", "P1", 2), ("BM-01", "P2", 1), ("BM-02", "P1", 4), ("CP-01", "P3", 1)}
+
+    _import(client, "equipment_code,sap_code,quantity\nBM-01,P1,3\nBM-01,P3,1\n", replace="1")
+    assert _bom() == {("BM-01", "P1", 3), ("BM-01", "P3", 1), ("BM-02", "P1", 4), ("CP-01", "P3", 1)}
+
+    # replace: машина с опечаткой в коде запчасти или в количестве не теряет свои строки
+    _import(client, "equipment_code,sap_code,quantity\nBM-01,P2,1\nBM-01,P9,1\nBM-02,P2,x\nCP-01,P1,2\n",
+            replace="1")
+    assert _bom() == {("BM-01", "P1", 3), ("BM-01", "P3", 1), ("BM-02", "P1", 4), ("CP-01", "P1", 2)}
+
+
+def test_bom_by_machine_line_and_where_used(client, root_user, plant, max_queries):
+    authenticate(client, root_user.id)
+    _import(client, "equipment_code;sap_code;quantity\nBM-01;P1;2\nBM-01;P2;1\nBM-02;P1;4\nCP-01;P3;1\n")
+    bm1 = Equipment.query.filter_by(code="BM-01").one().id
+    p1 = Part.query.filter_by(sap_code="P1").one().id
+
+    with max_queries(3):  # строки BOM одним JOIN, принципал
+        line = client.get("/maintenance/bom.json?location=Line A").get_json()
+    assert [(m["code"], [(p["sap_code"], p["quantity"]) for p in m["parts"]]) for m in line["items"]] == \
+        [("BM-01", [("P1", 2), ("P2", 1)]), ("BM-02", [("P1", 4)])]
+    assert client.get(f"/maintenance/bom.json?equipment={bm1}").get_json()["items"][0]["code"] == "BM-01"
+    assert client.get("/maintenance/bom.json").status_code == 400
+
+    used = client.get(f"/maintenance/where-used/{p1}.json").get_json()["items"]
+    assert [(m["code"], m["quantity"]) for m in used] == [("BM-01", 2), ("BM-02", 4)]
+
+    html = client.get("/maintenance/bom?location=Line A").get_data(as_text=True)
+    assert "BM-02" in html and "Part P2" in html and "CP-01" not in html
+    assert "Line B" in client.get("/maintenance/bom").get_data(as_text=True)
+    assert "Total installed: 6" in client.get(f"/maintenance/where-used/{p1}").get_data(as_text=True)
+
+
+def test_where_used_uses_the_part_index(app, plant):
+    plan = db.session.execute(db.text(
+        "EXPLAIN QUERY PLAN SELECT equipment_id FROM equipment_parts WHERE part_id = 1")).all()
+    assert "idx_equipment_parts_part" in " ".join(str(r[-1]) for r in plan)
@@ -1,17 +1,13 @@
 from uuid import uuid4
-
-def _authenticate(client, user_id: int) -> None:
-    with client.session_transaction() as s:
-        s["_user_id"] = str(user_id)
-        s["_fresh"] = True
+from tests.conftest import authenticate
 
 def test_equipment_list_access(client, root_user):
-    _authenticate(client, root_user.id)
+    authenticate(client, root_user.id)
     resp = client.get("/maintenance/equipment")
     assert resp.status_code in (200, 302, 303)
 
 def test_equipment_creation(client, root_user):
-    _authenticate(client, root_user.id)
+    authenticate(client, root_user.id)
     uniq = uuid4().hex[:6]
     resp = client.post(
         "/maintenance/equipment/add",
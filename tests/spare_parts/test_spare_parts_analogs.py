@@ -0,0 +1,119 @@
+import random
+from io import BytesIO
+
+import pytest
+from sqlalchemy import select
+
+from extensions import db
+from modules.spare_parts import services
+from modules.spare_parts.models import Part, PartAnalogClass, PartEquivalence
+from tests.conftest import authenticate
+
+
+def _classes() -> dict[int, int]:
+    return dict(db.session.execute(select(PartAnalogClass.part_id, PartAnalogClass.class_id)).all())
+
+
+def _groups() -> set[frozenset]:
+    out: dict[int, set] = {}
+    for part_id, class_id in _classes().items():
+        out.setdefault(class_id, set()).add(part_id)
+    return {frozenset(g) for g in out.values()}
+
+
+@pytest.fixture()
+def parts(app):
+    rows = [("A", "G1"), ("B", "G1"), ("C", "G2"), ("D", None), ("E", None), ("F", "G2")]
+    db.session.add_all([Part(sap_code=code, name=f"Part {code}", analog_group=group) for code, group in rows])
+    db.session.commit()
+    return {p.sap_code: p.id for p in Part.query}
+
+
+def test_classes_follow_groups_and_links(parts):
+    a, b, c, d, e, f = (parts[k] for k in "ABCDEF")
+    assert _groups() == {frozenset({a, b}), frozenset({c, f})}
+
+    services.link(b, c)            # перекрёстная ссылка сливает два класса
+    services.link(e, d)
+    db.session.commit()
+    assert _groups() == {frozenset({a, b, c, f}), frozenset({d, e})}
+    assert db.session.execute(select(PartEquivalence.part_id, PartEquivalence.analog_id)
+                              .where(PartEquivalence.analog_id == e)).one() == (d, e)
+
+    db.session.get(Part, b).analog_group = None   # B держится только ссылкой на C
+    db.session.commit()
+    assert _groups() == {frozenset({b, c, f}), frozenset({d, e})}
+
+    services.unlink(c, b)
+    db.session.delete(db.session.get(Part, d))
+    db.session.commit()
+    assert _groups() == {frozenset({c, f})}
+    assert PartEquivalence.query.count() == 0
+
+
+def test_incremental_refresh_matches_full_rebuild(app):
+    rnd = random.Random(7)
+    db.session.add_all([Part(sap_code=f"P{i}", name="p", analog_group=rnd.choice([None, "G1", "G2", "G3"]))
+                        for i in range(40)])
+    db.session.commit()
+    ids = [p.id for p in Part.query]
+    for _ in range(60):
+        op = rnd.random()
+        if op < 0.4:
+            services.link(rnd.choice(ids), rnd.choice(ids))
+        elif op < 0.6:
+            link = PartEquivalence.query.order_by(db.func.random()).first()
+            if link is not None:
+                services.unlink(link.part_id, link.analog_id)
+        else:
+            db.session.get(Part, rnd.choice(ids)).analog_group = rnd.choice([None, "", "G1", "G2", "G3", "G4"])
+        db.session.commit()
+
+    incremental = _groups()
+    services.rebuild_classes(db.session.connection())
+    assert _groups() == incremental
+
+
+def test_migration_builds_the_same_classes(app, parts):
+    from migrations.versions.v0011_part_analogs import upgrade
+
+    services.link(parts["B"], parts["D"])
+    db.session.commit()
+    expected = _classes()
+    db.session.execute(PartAnalogClass.__table__.delete())
+    upgrade(db.session.connection())   # замороженная копия пересчёта
+    assert _classes() == expected
+
+
+def test_part_card_and_sap_lookup(app, client, root_user, parts, max_queries):
+    authenticate(client, root_user.id)
+    resp = client.post(f"/parts/part/{parts['A']}/analogs", data={"sap_code": "E"})
+    assert resp.status_code == 302
+
+    with max_queries(7):  # деталь, аналоги, явные ссылки, соседи, остатки, движения, принципал
+        html = client.get(f"/parts/part/{parts['A']}").get_data(as_text=True)
+    assert "Interchangeable parts (2)" in html and "cross-reference" in html and "group G1" in html
+
+    data = client.get("/parts/analogs/B.json").get_json()
+    assert [p["sap_code"] for p in data["parts"]] == ["A", "B", "E"] and data["class_id"] == parts["A"]
+    assert client.get("/parts/analogs/D.json").get_json()["parts"][0]["sap_code"] == "D"
+    assert client.get("/parts/analogs/ZZZ.json").status_code == 404
+
+    client.post(f"/parts/part/{parts['A']}/analogs/{parts['E']}/delete")
+    assert "Interchangeable parts (1)" in client.get(f"/parts/part/{parts['A']}").get_data(as_text=True)
+
+
+def test_import_upserts_parts_and_rebuilds_classes(app, client, root_user, parts):
+    authenticate(client, root_user.id)
+    csv_file = ("sap_code;name;manufacturer;analog_group;analogs\n"
+                "A;Part A v2;ACME;G1;X1\n"
+                "X1;Bearing;SKF;;X2|D\n"
+                "X2;Bearing;FAG;;\n"
+                ";no code;;;\n")
+    resp = client.post("/parts/import", data={"file": (BytesIO(csv_file.encode()), "parts.csv")},
+                       content_type="multipart/form-data")
+    assert resp.status_code == 302
+
+    x1, x2 = (Part.query.filter_by(sap_code=c).one().id for c in ("X1", "X2"))
+    assert db.session.get(Part, parts["A"]).name == "Part A v2"
+    assert frozenset({parts["A"], parts["B"], parts["D"], x1, x2}) in _groups()
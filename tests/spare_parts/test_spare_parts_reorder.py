@@ -0,0 +1,109 @@
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import select
+
+from extensions import db
+from modules.maintenance import services
+from modules.maintenance.models import (ChecklistTemplate, Equipment, EquipmentParts, MaintenancePlan, PlanParts,
+                                        WorkOrder)
+from modules.spare_parts import reorder, stock
+from modules.spare_parts.models import Part, PartReorderLevel
+from tests.conftest import authenticate
+
+
+@pytest.fixture()
+def plant(app):
+    today = date.today()
+    db.session.add_all([Part(sap_code=code, name=f"Part {code}") for code in "ABCDEF"])
+    db.session.add_all([Equipment(code="BM-01", name="Bodymaker"), Equipment(code="BM-02", name="Bodymaker"),
+                        Equipment(code="BM-03", name="Bodymaker", status="scrapped")])
+    db.session.add_all([ChecklistTemplate(code="BM-PM", name_en="PM", name_ru="ТО"),
+                        ChecklistTemplate(code="BM-PM2", name_en="PM2", name_ru="ТО2")])
+    db.session.flush()
+    ids = {p.sap_code: p.id for p in Part.query}
+    bm1, bm2, bm3 = (e.id for e in Equipment.query.order_by(Equipment.code))
+    tpl1, tpl2 = (t.id for t in ChecklistTemplate.query.order_by(ChecklistTemplate.code))
+    weekly = MaintenancePlan(equipment_id=bm1, template_id=tpl1, frequency="weekly", next_due_date=today)
+    db.session.add_all([
+        weekly,
+        MaintenancePlan(equipment_id=bm2, template_id=tpl2, frequency="monthly", next_due_date=today - timedelta(days=10)),
+        MaintenancePlan(equipment_id=bm2, template_id=tpl2, frequency="yearly", next_due_date=today + timedelta(days=200)),
+        MaintenancePlan(equipment_id=bm3, template_id=tpl1, frequency="weekly", next_due_date=today),  # списан
+    ])
+    db.session.flush()
+    # план расходует запчасти своего шаблона, а не весь BOM станка (D стоит на BM-01, но ТО её не меняет)
+    db.session.execute(EquipmentParts.insert(), [{"equipment_id": bm1, "part_id": ids["D"], "quantity": 4}])
+    assert services.set_template_parts(tpl1, "B; 2") == []
+    assert services.set_template_parts(tpl2, "C; 1\nE\nZZ; 2\nA; x") == ["A; x", "ZZ"]
+
+    planned_wo = WorkOrder(equipment_id=bm1, template_id=tpl1, plan_id=weekly.id, status="done")
+    quick_wo = WorkOrder(equipment_id=bm1, template_id=tpl1, status="done")
+    db.session.add_all([planned_wo, quick_wo])
+    db.session.flush()
+    stock.post(ids["A"], "W1", "receipt", 70)
+    stock.post(ids["A"], "W1", "issue", 60)
+    stock.post(ids["B"], "W1", "receipt", 30)
+    stock.post(ids["B"], "W1", "issue", 5, workorder_id=planned_wo.id)   # уже в плановой потребности
+    stock.post(ids["B"], "W1", "issue", 18)
+    stock.post(ids["C"], "W1", "receipt", 5)
+    stock.post(ids["F"], "W1", "receipt", 10)
+    stock.post(ids["F"], "W1", "issue", 3, workorder_id=quick_wo.id)     # WO без плана — обычный расход
+    db.session.commit()
+    return ids
+
+
+def test_reorder_levels_from_history_and_plans(plant):
+    result = reorder.recalculate()
+    db.session.commit()
+    assert (result["parts"], result["to_order"]) == (5, 3)
+
+    levels = {lv.part_id: lv for lv in PartReorderLevel.query}
+    a, b, c, e, f = (levels[plant[k]] for k in "ABCEF")
+    assert plant["D"] not in levels
+    # A: 60 за 180 дней = 1/3 в день; точка заказа ceil(44/3) = 15, заказ до 15 + 10
+    assert (a.issued, a.on_hand, a.reorder_point, a.order_qty) == (60, 10, 15, 15)
+    # B: еженедельное ТО с сегодняшнего дня, 9 раз за 60 дней по 2 шт. (план списанного BM-03 не в счёт);
+    # плюс внеплановый расход 18 за 180 дней: 0.3 + 0.1 в день, точка ceil(0.4 * 44) = 18
+    assert (b.issued, b.planned, b.on_hand, b.reorder_point, b.order_qty) == (18, 18, 7, 18, 23)
+    # C: просроченный ежемесячный план — сегодня и через 30 дней; на складе хватает
+    assert (c.planned, c.on_hand, c.reorder_point, c.order_qty) == (2, 5, 2, 0)
+    assert e.planned == 2   # количество в шаблоне не задано — одна штука
+    assert (f.issued, f.planned) == (3, 0)
+
+    assert [p.sap_code for p, _ in reorder.to_order()] == ["A", "B", "E"]
+
+
+def test_plan_parts_follow_the_template(plant):
+    plans = {p.id: p for p in MaintenancePlan.query}
+    rows = db.session.execute(select(PlanParts.c.plan_id, PlanParts.c.part_id, PlanParts.c.quantity)).all()
+    assert sorted((plans[p].template.code, q) for p, _, q in rows) == [
+        ("BM-PM", 2), ("BM-PM", 2), ("BM-PM2", 1), ("BM-PM2", 1), ("BM-PM2", 1), ("BM-PM2", 1)]
+
+    plan = next(p for p in plans.values() if p.template.code == "BM-PM")
+    plan.template_id = next(p.template_id for p in plans.values() if p.template.code == "BM-PM2")
+    db.session.flush()
+    services.fill_plan_parts([plan.id])
+    assert {r.part_id for r in db.session.execute(select(PlanParts).where(PlanParts.c.plan_id == plan.id))} == {
+        plant["C"], plant["E"]}
+
+
+def test_occurrences_in_horizon():
+    today = date(2024, 1, 1)
+    end = today + timedelta(days=60)
+    assert reorder.occurrences(today, 7, today, end) == 9
+    assert reorder.occurrences(today - timedelta(days=40), 30, today, end) == 2
+    assert reorder.occurrences(end, 1, today, end) == 0
+    assert reorder.occurrences(end - timedelta(days=1), 365, today, end) == 1
+
+
+def test_to_order_report(app, client, root_user, plant, max_queries):
+    authenticate(client, root_user.id)
+    assert "Not calculated yet" in client.get("/parts/stock/to-order").get_data(as_text=True)
+
+    resp = client.post("/parts/stock/to-order/recalculate")
+    assert resp.status_code == 302
+    client.get("/parts/stock/to-order")   # flash — мимо кэша
+    with max_queries(4):  # счётчики таблиц, строки отчёта, время расчёта, принципал
+        html = client.get("/parts/stock/to-order").get_data(as_text=True)
+    assert "Parts to Order (3)" in html and "Part B" in html and "Part C" not in html
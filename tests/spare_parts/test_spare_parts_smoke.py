@@ -1,13 +1,9 @@
 from uuid import uuid4
 from io import BytesIO
-
-def _authenticate(client, user_id: int) -> None:
-    with client.session_transaction() as s:
-        s["_user_id"] = str(user_id)
-        s["_fresh"] = True
+from tests.conftest import authenticate
 
 def test_add_part_flow(client, root_user):
-    _authenticate(client, root_user.id)
+    authenticate(client, root_user.id)
     uniq = uuid4().hex[:6]
     resp = client.post(
         "/parts/add",
@@ -0,0 +1,133 @@
+import threading
+
+import pytest
+from sqlalchemy import func, select
+
+from extensions import db
+from modules.spare_parts import stock
+from modules.spare_parts.models import Part, StockBalance, StockTransaction
+from tests.conftest import authenticate
+
+
+def _on_hand(part_id: int, location: str) -> int:
+    return db.session.get(StockBalance, (part_id, location)).on_hand
+
+
+@pytest.fixture()
+def parts(app):
+    db.session.add_all([Part(sap_code=code, name=f"Part {code}") for code in ("A", "B")])
+    db.session.commit()
+    return {p.sap_code: p.id for p in Part.query}
+
+
+def test_postings_keep_balance_and_ledger_in_step(parts):
+    a = parts["A"]
+    stock.post(a, "W1", "receipt", 10, "DN-1")
+    stock.post(a, "W1", "issue", 3, "WO-7")
+    stock.post(a, "W2", "adjust", 2)
+    db.session.commit()
+    assert (_on_hand(a, "W1"), _on_hand(a, "W2")) == (7, 2)
+    assert [(t.kind, t.quantity, t.balance_after) for t in stock.transactions(a)] == \
+        [("adjust", 2, 2), ("issue", -3, 7), ("receipt", 10, 10)]
+
+    with pytest.raises(stock.StockError, match="7 on hand"):
+        stock.post(a, "W1", "issue", 8)
+    with pytest.raises(stock.StockError):
+        stock.post(a, "W3", "issue", 1)       # нет строки баланса — тоже нечего выдавать
+    with pytest.raises(stock.StockError):
+        stock.post(a, "W1", "receipt", 0)
+    db.session.rollback()
+    assert _on_hand(a, "W1") == 7 and StockTransaction.query.count() == 3
+
+    tx = StockTransaction.query.first()
+    tx.quantity = 100
+    with pytest.raises(stock.StockError, match="append-only"):
+        db.session.flush()
+    db.session.rollback()
+
+
+def test_stock_count_rejects_a_stale_version(parts):
+    a = parts["A"]
+    stock.post(a, "W1", "receipt", 5)
+    db.session.commit()
+    seen = db.session.get(StockBalance, (a, "W1")).version
+    stock.post(a, "W1", "issue", 1)           # выдали, пока считали
+    db.session.commit()
+    with pytest.raises(stock.StockError, match="changed while counting"):
+        stock.count(a, "W1", 5, seen)
+    db.session.rollback()
+
+    tx = stock.count(a, "W1", 6, seen + 1, user_id=1)
+    db.session.commit()
+    assert (tx.quantity, tx.balance_after, _on_hand(a, "W1")) == (2, 6, 6)
+
+
+def test_bulk_receipt_is_set_based(parts, max_queries):
+    a, b = parts["A"], parts["B"]
+    stock.post(a, "W1", "receipt", 4)
+    db.session.commit()
+    lines = stock.parse_receipt_lines("A;W1;5\nB,W1,2\n\nA\tW1\t1\nA;W2;3\n")
+    with max_queries(4):   # вставка недостающих балансов, UPDATE пачкой, остатки, журнал
+        assert stock.post_receipts(lines, "DN-9", user_id=1) == 4
+    db.session.commit()
+    assert (_on_hand(a, "W1"), _on_hand(a, "W2"), _on_hand(b, "W1")) == (10, 3, 2)
+    assert [t.balance_after for t in stock.transactions(a)][:3] == [3, 10, 9]
+    assert stock.on_hand_totals() == {a: 13, b: 2}
+    with pytest.raises(stock.StockError, match="line 2: ZZ"):
+        stock.parse_receipt_lines("A;W1;1\nZZ;W1;1")
+
+
+def test_concurrent_issues_never_overdraw(make_app, tmp_path):
+    app = make_app(SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / 'main.db'}",
+                   SQLALCHEMY_BINDS={"tooling_queue": f"sqlite:///{tmp_path / 'queue.db'}"})
+    with app.app_context():
+        part = Part(sap_code="A", name="Bearing")
+        db.session.add(part)
+        db.session.flush()
+        stock.post(part.id, "W1", "receipt", 30)
+        db.session.commit()
+        part_id = part.id
+
+    start, issued, refused = threading.Barrier(8), [], []
+
+    def storekeeper():
+        start.wait()
+        for _ in range(6):
+            with app.app_context():
+                try:
+                    stock.post(part_id, "W1", "issue", 1)
+                    db.session.commit()
+                    issued.append(1)
+                except stock.StockError:
+                    db.session.rollback()
+                    refused.append(1)
+
+    threads = [threading.Thread(target=storekeeper) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    with app.app_context():
+        assert (len(issued), len(refused)) == (30, 18)
+        assert _on_hand(part_id, "W1") == 0
+        assert db.session.scalar(select(func.sum(StockTransaction.quantity))) == 0
+        assert sorted(db.session.scalars(select(StockTransaction.balance_after)
+                                         .where(StockTransaction.kind == "issue"))) == list(range(30))
+
+
+def test_part_card_posts_and_shows_stock(app, client, root_user, parts, max_queries):
+    authenticate(client, root_user.id)
+    a = parts["A"]
+    resp = client.post(f"/parts/part/{a}/stock", data={"kind": "receipt", "location": "W1", "quantity": "5"})
+    assert resp.status_code == 302
+    client.post(f"/parts/part/{a}/stock", data={"kind": "issue", "location": "W1", "quantity": "9"})
+    with max_queries(7):  # + балансы и последние движения
+        html = client.get(f"/parts/part/{a}").get_data(as_text=True)
+    assert "Stock (5 on hand)" in html and "not enough stock" in html
+
+    resp = client.post("/parts/stock/receipts", data={"reference": "DN-1", "lines": "A;W1;2\nB;W2;4"})
+    assert resp.status_code == 302
+    assert (_on_hand(a, "W1"), _on_hand(parts["B"], "W2")) == (7, 4)
+    rows = client.get("/api/v1/stock_transactions?reference=DN-1&fields=part_id,quantity").get_json()["items"]
+    assert sorted((r["part_id"], r["quantity"]) for r in rows) == [(a, 2), (parts["B"], 4)]
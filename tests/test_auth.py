@@ -0,0 +1,75 @@
+import pytest
+from werkzeug.security import generate_password_hash
+
+from db_metrics import count_queries
+from extensions import db
+from models import User
+
+
+@pytest.fixture()
+def auth_app(make_app, tmp_path):
+    app = make_app(PASSWORD_HASH_METHOD="pbkdf2:sha256:1000", LOGIN_MAX_FAILURES=3,
+                   LOGIN_THROTTLE_DB=str(tmp_path / "throttle.db"))
+    with app.app_context():
+        db.session.add(User(username="op1", password=generate_password_hash("pw", method="pbkdf2:sha256:2000"),
+                            role="user"))
+        db.session.commit()
+        yield app
+
+
+def _login(client, password="pw", username="op1"):
+    return client.post("/parts/login", data={"username": username, "password": password})
+
+
+def _user_selects(counter):
+    return [s for s in counter.statements if "FROM users" in s]
+
+
+def test_login_rehashes_and_principal_is_cached(auth_app):
+    client = auth_app.test_client()
+    assert _login(client).status_code == 302
+    assert User.query.filter_by(username="op1").one().password.startswith("pbkdf2:sha256:1000$")
+
+    client.get("/parts/login")  # первый запрос после входа кладёт пользователя в кэш
+    with count_queries() as counter:
+        assert client.get("/parts/").status_code == 200
+    assert _user_selects(counter) == []
+
+
+def test_role_change_invalidates_cached_principal(auth_app):
+    client = auth_app.test_client()
+    _login(client)
+    assert client.get("/parts/import").status_code == 302   # user — нет прав, редирект на домашнюю
+
+    User.query.filter_by(username="op1").one().role = "admin"
+    db.session.commit()
+    assert client.get("/parts/import").status_code == 200
+
+
+@pytest.mark.parametrize("backend", ["memory", "sqlite"])
+def test_login_is_throttled_after_failures(auth_app, backend):
+    auth_app.config["LOGIN_THROTTLE_BACKEND"] = backend
+    client = auth_app.test_client()
+    for _ in range(3):
+        assert _login(client, password="wrong").status_code == 200
+    resp = _login(client)  # даже верный пароль — до конца окна
+    assert resp.status_code == 429
+    assert "Too many failed login attempts" in resp.get_data(as_text=True)
+
+
+@pytest.mark.parametrize("backend", ["memory", "sqlite"])
+def test_shared_terminal_does_not_lock_out_other_users(auth_app, backend):
+    auth_app.config.update(LOGIN_THROTTLE_BACKEND=backend, LOGIN_MAX_FAILURES_PER_IP=5)
+    db.session.add(User(username="op2", password=generate_password_hash("pw2", method="pbkdf2:sha256:1000"),
+                        role="user"))
+    db.session.commit()
+    client = auth_app.test_client()  # оба с одного адреса 127.0.0.1
+    for _ in range(3):
+        assert _login(client, password="wrong").status_code == 200
+    assert _login(client).status_code == 429
+    assert _login(client, password="pw2", username="op2").status_code == 302
+
+    client.get("/parts/logout")
+    for _ in range(2):  # пятая неудача с адреса — закрыт и он, для любого имени
+        assert _login(client, password="wrong", username="op2").status_code == 200
+    assert _login(client, password="pw2", username="op2").status_code == 429
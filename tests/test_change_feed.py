@@ -0,0 +1,150 @@
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+import pytest
+
+import change_feed
+from extensions import db
+from models import ChangeLogEntry, User
+from modules.maintenance.models import ChecklistTemplate, Equipment, WorkOrder
+from tests.conftest import authenticate
+
+
+def _seed() -> None:
+    db.session.add_all([User(username="op", password="-", role="user"),
+                        Equipment(id=1, code="BM-01", name="BM"),
+                        ChecklistTemplate(id=1, code="TPL", name_en="t", name_ru="t")])
+    db.session.commit()
+
+
+def _add_workorder(status: str = "open") -> int:
+    wo = WorkOrder(equipment_id=1, template_id=1, status=status, due_date=date(2024, 1, 1))
+    db.session.add(wo)
+    db.session.commit()
+    return wo.id
+
+
+@pytest.fixture()
+def feed_app(make_app):
+    app = make_app(CHANGE_FEED_POLL=0)
+    with app.app_context():
+        _seed()
+    return app
+
+
+def test_writes_are_logged_and_polled(feed_app):
+    client = authenticate(feed_app.test_client())
+    start = client.get("/changes").get_json()["last"]
+
+    with feed_app.app_context():
+        wo_id = _add_workorder()
+        wo = db.session.get(WorkOrder, wo_id)
+        wo.status = "done"
+        db.session.commit()
+        assert wo.status == "done"
+        wo.status = "done"     # без фактического изменения — без записи в журнал
+        db.session.commit()
+        db.session.add(Equipment(code="BM-02", name="BM"))   # таблица не из ленты
+        db.session.commit()
+        assert ChangeLogEntry.query.count() == 2
+
+    data = client.get(f"/changes?since={start}").get_json()
+    assert [(c["op"], c["row"]["status"]) for c in data["items"]] == [("insert", "open"), ("update", "done")]
+    assert data["items"][0]["table"] == "workorders" and data["reset"] is False
+
+    assert client.get(f"/changes?since={data['last']}").get_json()["items"] == []
+    assert client.get(f"/changes?since={start}&tables=tooling_events").get_json() == {
+        "ok": True, "items": [], "last": data["last"], "reset": False}
+
+
+def test_cursor_waits_for_seq_gaps_to_settle(make_app):
+    # PostgreSQL: seq выдаётся при flush, и строка с большим seq может закоммититься раньше
+    app = make_app(CHANGE_FEED_POLL=0, CHANGE_FEED_SETTLE_SECONDS=5)
+    with app.app_context():
+        _seed()
+    client = authenticate(app.test_client())
+    start = client.get("/changes").get_json()["last"]
+
+    def log(seq, age=0):
+        with app.app_context():
+            db.session.execute(ChangeLogEntry.__table__.insert().values(
+                seq=seq, table_name="workorders", row_id=seq, op="insert",
+                changed_at=datetime.utcnow() - timedelta(seconds=age)))
+            db.session.commit()
+
+    log(start + 2)                                  # start + 1 ещё в чужой транзакции
+    assert client.get(f"/changes?since={start}").get_json()["items"] == []
+    log(start + 1)
+    data = client.get(f"/changes?since={start}").get_json()
+    assert [c["seq"] for c in data["items"]] == [start + 1, start + 2]
+
+    log(start + 4, age=10)                          # start + 3 так и не появился — откат
+    assert [c["seq"] for c in client.get(f"/changes?since={data['last']}").get_json()["items"]] == [start + 4]
+
+
+def test_client_behind_trimmed_log_gets_reset(feed_app):
+    client = authenticate(feed_app.test_client())
+    with feed_app.app_context():
+        _add_workorder()
+        _add_workorder()
+        last = client.get("/changes?since=0").get_json()["last"]
+        ChangeLogEntry.query.update({"changed_at": datetime.utcnow() - timedelta(days=30)})
+        db.session.commit()
+        assert change_feed.hub().trim() == 2
+        db.session.commit()
+        _add_workorder()
+        change_feed.hub().buffer.clear()   # буфер процесса тоже не покрывает since
+
+    assert client.get("/changes?since=0").get_json()["reset"] is True
+    assert [c["seq"] for c in client.get(f"/changes?since={last}").get_json()["items"]] == [last + 1]
+
+
+def test_stream_sends_changes_after_last_event_id(make_app):
+    app = make_app(CHANGE_FEED_POLL=0, CHANGE_FEED_STREAM_SECONDS=0.3, CHANGE_FEED_HEARTBEAT=0.1)
+    with app.app_context():
+        _seed()
+        first = _add_workorder()
+        _add_workorder()
+    client = authenticate(app.test_client())
+
+    resp = client.get("/changes/stream?tables=workorders", headers={"Last-Event-ID": "1"})
+    assert resp.mimetype == "text/event-stream" and resp.headers["Cache-Control"] == "no-cache"
+    body = resp.get_data(as_text=True)
+    assert [line for line in body.splitlines() if line.startswith("id:")] == ["id: 2"]
+    assert f'"id": {first + 1}' in body and ": ping" in body
+
+    assert "event: change" not in client.get("/changes/stream?tables=tooling_events&since=0").get_data(as_text=True)
+
+
+def _poll_queries(client) -> float:
+    """Сколько SQL выполнили запросы /changes этого процесса (счётчик db_metrics)."""
+    resp = client.get("/metrics", headers={"Authorization": "Bearer t"})
+    assert resp.status_code == 200
+    for line in resp.get_data(as_text=True).splitlines():
+        if line.startswith('erp_db_queries_total{endpoint="changes_poll"}'):
+            return float(line.rsplit(" ", 1)[1])
+    return 0.0
+
+
+def test_waiting_clients_run_no_sql(make_app, tmp_path):
+    app = make_app(SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / 'erp.db'}", CHANGE_FEED_POLL=5, METRICS_TOKEN="t")
+    with app.app_context():
+        _seed()
+    client = authenticate(app.test_client())
+    since = client.get("/changes").get_json()["last"]   # запускает поток хаба
+    before = _poll_queries(client)
+
+    def write_later():
+        time.sleep(0.2)
+        with app.app_context():
+            _add_workorder()   # commit в этом процессе будит поток, не дожидаясь 5 секунд
+
+    writer = threading.Thread(target=write_later)
+    writer.start()
+    started = time.monotonic()
+    data = client.get(f"/changes?since={since}&wait=3").get_json()
+    writer.join()
+    assert [c["op"] for c in data["items"]] == ["insert"]
+    assert time.monotonic() - started < 2
+    assert _poll_queries(client) == before   # ожидавший запрос SQL не выполнял: журнал читает поток хаба
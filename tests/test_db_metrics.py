@@ -0,0 +1,83 @@
+from datetime import date
+
+import pytest
+
+from extensions import db
+from models import User
+from modules.maintenance.models import ChecklistTemplate, Equipment, MaintenancePlan, WorkOrder
+from modules.tooling.models import ToolType, Tooling, ToolingEvent
+from tests.conftest import authenticate
+
+
+def _seed(n: int) -> None:
+    db.session.add(ToolType(code=f"T{n}"))
+    tpl = ChecklistTemplate(code=f"TPL{n}", name_en="t", name_ru="t")
+    db.session.add(tpl)
+    db.session.flush()
+    for i in range(n):
+        tool = Tooling(tool_code=f"IH-{n}-{i}", tool_type_id=1)
+        eq = Equipment(code=f"BM-{n}-{i}", name="BM")
+        db.session.add_all([tool, eq])
+        db.session.flush()
+        db.session.add_all([
+            ToolingEvent(tool_id=tool.id, batch_no=tool.tool_code, action="CREATE", to_status="STOCK"),
+            MaintenancePlan(equipment_id=eq.id, template_id=tpl.id, frequency="daily", next_due_date=date.today()),
+            WorkOrder(equipment_id=eq.id, template_id=tpl.id, status="open", due_date=date.today()),
+        ])
+    db.session.commit()
+
+
+@pytest.mark.parametrize("url, limit", [
+    ("/", 6),
+    ("/tooling/", 2),
+    ("/tooling/report/installed", 3),  # + курсор ленты изменений (живой экран)
+    ("/tooling/search?q=IH", 3),
+    ("/maintenance/workorders", 3),
+    ("/maintenance/plans", 2),
+])
+def test_query_count_does_not_grow_with_rows(app, client, root_user, max_queries, url, limit):
+    app.config["PAGE_CACHE"] = False  # считаем выборки самой страницы (кэш — tests/test_page_cache.py)
+    authenticate(client, root_user.id)
+    for n in (3, 30):
+        _seed(n)
+        with max_queries(limit):
+            assert client.get(url).status_code == 200
+
+
+def test_metrics_endpoint_reports_queries_per_endpoint(app, client, root_user):
+    app.config["PAGE_CACHE"] = False
+    authenticate(client, root_user.id)
+    _seed(3)
+    client.get("/tooling/")
+    client.get("/tooling/")
+
+    text = client.get("/metrics").get_data(as_text=True)
+    assert "# TYPE erp_db_queries_total counter" in text
+    assert 'erp_http_requests_total{endpoint="tooling.list_tooling"} 2' in text
+    assert 'erp_db_queries_per_request_max{endpoint="tooling.list_tooling"} 2' in text
+
+    slow = client.get("/metrics/slow").get_json()
+    assert slow["tooling.list_tooling"][0]["sql"].lstrip().upper().startswith("SELECT")
+
+
+def test_server_timing_and_metrics_token(make_app):
+    app = make_app(LOGIN_DISABLED=True, SERVER_TIMING=True, METRICS_TOKEN="s3cret")
+    client = app.test_client()
+    timing = client.get("/parts/").headers.getlist("Server-Timing")
+    assert timing[0].startswith("db;dur=") and 'queries"' in timing[0]
+    assert timing[1].startswith("app;dur=")
+
+    assert client.get("/metrics").status_code == 403
+    assert client.get("/metrics", headers={"Authorization": "Bearer s3cret"}).status_code == 200
+
+
+def test_metrics_without_token_are_for_root_only(make_app):
+    app = make_app()
+    with app.app_context():
+        db.session.add_all([User(id=1, username="root", password="-", role="root"),
+                            User(id=2, username="admin", password="-", role="admin")])
+        db.session.commit()
+    assert app.test_client().get("/metrics").status_code == 302   # на страницу входа
+    assert authenticate(app.test_client(), 2).get("/metrics/slow").status_code == 403
+    assert authenticate(app.test_client(), 1).get("/metrics").status_code == 200
+    assert authenticate(app.test_client(), 1).get("/metrics", headers={"Authorization": "Bearer x"}).status_code == 200
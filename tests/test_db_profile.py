@@ -0,0 +1,28 @@
+from sqlalchemy import text
+
+from extensions import db
+
+
+def _pragma(name, bind=None):
+    engine = db.engines[bind]
+    with engine.connect() as conn:
+        return conn.execute(text(f"PRAGMA {name}")).scalar()
+
+
+def test_production_profile_tunes_sqlite_files(make_app, tmp_path):
+    app = make_app(DB_PROFILE="production", SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / 'main.db'}",
+                   SQLALCHEMY_BINDS={"tooling_queue": f"sqlite:///{tmp_path / 'queue.db'}"})
+    with app.app_context():
+        for bind in (None, "tooling_queue"):
+            assert _pragma("journal_mode", bind) == "wal"
+            assert _pragma("synchronous", bind) == 1          # NORMAL
+            assert _pragma("busy_timeout", bind) == 5000
+            assert _pragma("temp_store", bind) == 2           # MEMORY
+        assert _pragma("cache_size") == -65536
+        assert db.engines[None].pool.size() == app.config["DB_POOL_SIZE"]
+
+
+def test_default_profile_leaves_driver_settings(make_app, tmp_path):
+    app = make_app(DB_PROFILE="default", SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / 'main.db'}")
+    with app.app_context():
+        assert _pragma("journal_mode") == "delete"
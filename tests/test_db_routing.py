@@ -0,0 +1,46 @@
+import pytest
+
+import db_routing
+from extensions import db
+from modules.tooling.models import ToolType, Tooling, ToolingEvent
+
+
+@pytest.fixture()
+def file_app(make_app, tmp_path):
+    return lambda **extra: make_app(LOGIN_DISABLED=True, SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / 'main.db'}",
+                                    **extra)
+
+
+def test_read_only_views_use_separate_read_only_pool(file_app):
+    app = file_app()
+    replica = app.extensions["db_readonly_engine"]
+    assert replica.url.query["mode"] == "ro"
+
+    with app.test_request_context("/"):
+        db.session.add(ToolType(id=1, code="GENERIC"))
+        db.session.add(Tooling(id=1, tool_code="IH-1", tool_type_id=1))
+        db.session.add(ToolingEvent(tool_id=1, batch_no="IH-1", action="WASH"))
+        db.session.commit()
+        assert db.session.get_bind(Tooling) is db.engine
+        db.session.remove()
+
+    with app.test_request_context("/"):
+        with db_routing.use_replica():
+            assert db.session.get_bind(Tooling) is replica
+            assert Tooling.query.count() == 1
+            db.session.add(ToolingEvent(tool_id=1, batch_no="IH-1", action="POLISH"))
+            db.session.commit()                               # запись всё равно уходит в основную базу
+            assert db.session.get_bind(Tooling) is db.engine  # …и дальше запрос читает своё с основной
+        db.session.remove()
+
+    client = app.test_client()
+    for url in ("/", "/tooling/report/installed", "/tooling/export/csv",
+                "/tooling/1/export/events.csv", "/maintenance/workorders"):
+        assert client.get(url, follow_redirects=True).status_code == 200, url
+    assert b"POLISH" in client.get("/tooling/1/export/events.csv").data
+
+
+def test_routing_disabled_for_memory_and_by_config(make_app, file_app):
+    assert db_routing.readonly_uri(make_app()) is None
+    app = file_app(DB_READONLY_ROUTING=False)
+    assert "db_readonly_engine" not in app.extensions
@@ -0,0 +1,42 @@
+from argparse import Namespace
+
+import pytest
+import sqlalchemy as sa
+
+import migrations
+import serve
+from extensions import db
+
+
+@pytest.fixture()
+def health_app(make_app):
+    return make_app()
+
+
+def test_liveness_and_readiness(health_app, max_queries):
+    client = health_app.test_client()
+    live = client.get("/healthz")
+    assert live.status_code == 200 and live.headers["Cache-Control"] == "no-store"
+
+    with max_queries(2):  # по одному SELECT версии схемы на базу
+        ready = client.get("/readyz")
+    data = ready.get_json()
+    assert ready.status_code == 200 and data["ok"] is True
+    assert data["checks"]["main"]["schema"] == migrations.head()
+    assert data["checks"]["tooling_queue"]["schema"] == migrations.head("tooling_queue")
+
+
+def test_not_ready_when_schema_lags(health_app):
+    with health_app.app_context():
+        db.session.execute(sa.update(migrations.schema_version).values(version=1))
+        db.session.commit()
+    resp = health_app.test_client().get("/readyz")
+    assert resp.status_code == 503
+    assert "migrate.py" in resp.get_json()["checks"]["main"]["error"]
+
+
+def test_server_options():
+    opts = serve.options(Namespace(host="127.0.0.1", port=8123, workers=3, threads=6, max_requests=500))
+    assert opts["bind"] == "127.0.0.1:8123" and opts["worker_class"] == "gthread"
+    assert (opts["workers"], opts["threads"], opts["max_requests"]) == (3, 6, 500)
+    assert opts["preload_app"] is True and opts["post_fork"] is serve.post_fork
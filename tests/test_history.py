@@ -0,0 +1,93 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+import sqlalchemy as sa
+
+from extensions import db
+from modules.maintenance.models import ChecklistTemplate, Equipment, WorkOrder
+from modules.tooling.models import ToolType, Tooling, ToolingEvent
+from tests.conftest import authenticate
+
+
+def _seed(n: int) -> None:
+    db.session.add_all([ToolType(id=1, code="T"), ChecklistTemplate(id=1, code="TPL", name_en="t", name_ru="t"),
+                        Equipment(id=1, code="BM-01", name="BM"), Tooling(id=1, tool_code="IH-1", tool_type_id=1)])
+    t0 = datetime(2020, 1, 1)
+    for i in range(n):
+        db.session.add(WorkOrder(equipment_id=1, template_id=1, status="done" if i % 3 else "open",
+                                 due_date=date(2020, 1, 1) + timedelta(days=i)))
+        db.session.add(ToolingEvent(tool_id=1, batch_no="IH-1", action="WASH" if i % 2 else "INSPECT",
+                                    happened_at=t0 + timedelta(hours=i // 2)))  # по два события на одно время
+    db.session.commit()
+
+
+def _walk(client, url, first_cursor):
+    seen, cursor = [], first_cursor
+    while cursor:
+        data = client.get(url, query_string={"before": cursor}).get_json()
+        seen += data["items"]
+        cursor = data["next"]
+    return seen
+
+
+def test_equipment_history_is_windowed(app, client, root_user):
+    app.config["HISTORY_PAGE_SIZE"] = 3
+    authenticate(client, root_user.id)
+    _seed(8)
+
+    html = client.get("/maintenance/equipment/1").get_data(as_text=True)
+    assert html.count("\">WO #") == 3 and ">WO #8<" in html and ">WO #5<" not in html
+    assert "Total: 8" in html and "done: 5" in html and "open: 3" in html
+
+    first = client.get("/maintenance/equipment/1/workorders.json").get_json()
+    rest = _walk(client, "/maintenance/equipment/1/workorders.json", first["next"])
+    assert [w["id"] for w in first["items"] + rest] == list(range(8, 0, -1))
+
+
+def test_tool_history_is_windowed(app, client, root_user):
+    app.config["HISTORY_PAGE_SIZE"] = 3
+    authenticate(client, root_user.id)
+    _seed(8)
+
+    html = client.get("/tooling/1").get_data(as_text=True)
+    assert html.count("<td>WASH</td>") + html.count("<td>INSPECT</td>") == 3
+    assert "Событий: 8" in html and "INSPECT: 4" in html and 'id="events-more"' in html
+
+    first = client.get("/tooling/1/events.json").get_json()
+    rest = _walk(client, "/tooling/1/events.json", first["next"])
+    stamps = [e["happened_at"] for e in first["items"] + rest]
+    assert len(stamps) == 8 and stamps == sorted(stamps, reverse=True)
+
+
+def test_events_without_time_are_not_lost_between_pages(app, client, root_user):
+    from migrations.versions.v0018_tooling_events_time_not_null import upgrade
+
+    app.config["HISTORY_PAGE_SIZE"] = 3
+    authenticate(client, root_user.id)
+    _seed(8)
+    conn = db.session.connection()
+    # база до v0018: happened_at допускал NULL (таблица без ограничений, как после SQL-скриптов)
+    conn.exec_driver_sql("ALTER TABLE tooling_events RENAME TO legacy_events")
+    conn.exec_driver_sql("CREATE TABLE tooling_events AS SELECT * FROM legacy_events")
+    conn.exec_driver_sql("DROP TABLE legacy_events")
+    conn.exec_driver_sql("INSERT INTO tooling_events (id, tool_id, batch_no, action, note) "
+                         "VALUES (9, 1, 'IH-1', 'WASH', 'no time')")
+    upgrade(conn)
+    db.session.commit()
+
+    columns = {c["name"]: c for c in sa.inspect(db.engine).get_columns("tooling_events")}
+    assert columns["happened_at"]["nullable"] is False
+    assert db.session.get(ToolingEvent, 9).happened_at == datetime(2020, 1, 1, 3)   # время предыдущего события
+
+    first = client.get("/tooling/1/events.json").get_json()
+    rest = _walk(client, "/tooling/1/events.json", first["next"])
+    events = first["items"] + rest
+    assert len(events) == 9 and [e["note"] for e in events].count("no time") == 1
+
+
+@pytest.mark.parametrize("url, limit", [("/maintenance/equipment/1", 5), ("/tooling/1", 9)])  # + отклонённые из очереди
+def test_detail_pages_cost_does_not_grow_with_history(client, root_user, max_queries, url, limit):
+    authenticate(client, root_user.id)
+    _seed(300)
+    with max_queries(limit):  # окно + счётчики, а не вся история
+        assert client.get(url).status_code == 200
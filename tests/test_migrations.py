@@ -0,0 +1,57 @@
+import pytest
+import sqlalchemy as sa
+from sqlalchemy.engine import Engine
+
+import migrations
+from extensions import db
+
+
+@pytest.fixture()
+def file_app(make_app, tmp_path):
+    return lambda: make_app(SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / 'main.db'}",
+                            SQLALCHEMY_BINDS={"tooling_queue": f"sqlite:///{tmp_path / 'queue.db'}"})
+
+
+def test_migrations_build_the_model_schema(file_app):
+    app = file_app()
+    with app.app_context():
+        for bind_key, metadata in db.metadatas.items():
+            engine = db.engines[bind_key]
+            assert migrations.current_version(engine) == migrations.head(bind_key)
+            insp = sa.inspect(engine)
+            for table in metadata.tables.values():
+                assert {c["name"] for c in insp.get_columns(table.name)} == set(table.c.keys()), table.name
+                assert {i.name for i in table.indexes} <= {i["name"] for i in insp.get_indexes(table.name)}, table.name
+
+
+def test_legacy_database_is_adopted(file_app, tmp_path):
+    engine = sa.create_engine(f"sqlite:///{tmp_path / 'main.db'}")
+    with engine.begin() as conn:  # «старая» база: таблица событий без поздних колонок, без schema_version
+        conn.exec_driver_sql("CREATE TABLE tooling_events (id INTEGER PRIMARY KEY, tool_id INTEGER, "
+                             "batch_no VARCHAR(128), user_name VARCHAR(128), machine_id INTEGER, machine_name VARCHAR(128), "
+                             "happened_at DATETIME, action VARCHAR(32), role VARCHAR(64), position VARCHAR(32), "
+                             "from_status VARCHAR(32), to_status VARCHAR(32))")
+        conn.exec_driver_sql("INSERT INTO tooling_events (tool_id, action) VALUES (1, 'WASH')")
+    engine.dispose()
+
+    app = file_app()
+    with app.app_context():
+        cols = {c["name"] for c in sa.inspect(db.engine).get_columns("tooling_events")}
+        assert {"note", "reason", "dimension", "slot_id"} <= cols
+        assert db.session.execute(sa.text("SELECT action FROM tooling_events")).scalar() == "WASH"
+        assert migrations.upgrade(db.engine) == []  # повторный прогон ничего не делает
+
+
+def test_warm_boot_reads_one_version_row_per_database(file_app):
+    file_app()
+    statements = []
+
+    def _count(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    sa.event.listen(Engine, "before_cursor_execute", _count)
+    try:
+        file_app()
+    finally:
+        sa.event.remove(Engine, "before_cursor_execute", _count)
+    assert len(statements) == 2 and all("schema_version" in s for s in statements)
@@ -0,0 +1,102 @@
+import pytest
+
+from extensions import db
+from models import User
+from modules.maintenance.models import ChecklistTemplate, Equipment
+from tests.conftest import authenticate
+
+
+def _seed() -> None:
+    db.session.add_all([User(username="op1", password="-", role="user"),
+                        User(username="op2", password="-", role="user"),
+                        User(username="boss", password="-", role="root"),
+                        Equipment(code="BM-01", name="BM"),
+                        ChecklistTemplate(code="TPL", name_en="t", name_ru="t")])
+    db.session.commit()
+
+
+@pytest.fixture()
+def cache_app(make_app):
+    app = make_app()
+    with app.app_context():
+        _seed()
+    return app  # без общего app context: у каждого запроса свой g (и свой current_user)
+
+
+def _write(app, fn) -> None:
+    with app.app_context():
+        fn()
+        db.session.commit()
+
+
+
+def test_page_is_shared_by_capability_set(cache_app, max_queries):
+    first = authenticate(cache_app.test_client(), 1).get("/maintenance/equipment")
+    assert first.headers["X-Page-Cache"] == "miss"
+
+    with max_queries(2):  # счётчики таблиц + принципал второго пользователя
+        second = authenticate(cache_app.test_client(), 2).get("/maintenance/equipment")
+    html = second.get_data(as_text=True)
+    assert second.headers["X-Page-Cache"] == "hit"
+    assert "BM-01" in html and ">op2<" in html and ">op1<" not in html  # панель пользователя — своя
+    assert second.headers["ETag"] != first.headers["ETag"]
+
+    boss = authenticate(cache_app.test_client(), 3).get("/maintenance/equipment")  # другие права — другая страница
+    assert boss.headers["X-Page-Cache"] == "miss" and "+ Add" in boss.get_data(as_text=True)
+    assert "+ Add" not in html
+
+
+def test_writes_invalidate_pages(cache_app):
+    client = authenticate(cache_app.test_client(), 1)
+    client.get("/maintenance/plans")
+    assert client.get("/maintenance/plans").headers["X-Page-Cache"] == "hit"
+
+    _write(cache_app, lambda: db.session.add(Equipment(code="BM-02", name="BM")))
+    resp = client.get("/maintenance/equipment")
+    assert resp.headers["X-Page-Cache"] == "miss" and "BM-02" in resp.get_data(as_text=True)
+    assert client.get("/maintenance/plans").headers["X-Page-Cache"] == "miss"  # план показывает оборудование
+
+    client.get("/maintenance/checklists/templates")
+    _write(cache_app, lambda: ChecklistTemplate.query.filter_by(code="TPL").delete())  # мимо flush
+    resp = client.get("/maintenance/checklists/templates")
+    assert resp.headers["X-Page-Cache"] == "miss" and "TPL" not in resp.get_data(as_text=True)
+
+
+def test_conditional_get(cache_app, max_queries):
+    client = authenticate(cache_app.test_client(), 1)
+    resp = client.get("/maintenance/equipment")
+    assert "no-cache" in resp.headers["Cache-Control"] and "private" in resp.headers["Cache-Control"]
+    with max_queries(1):
+        again = client.get("/maintenance/equipment", headers={"If-None-Match": resp.headers["ETag"]})
+    assert again.status_code == 304 and again.data == b""
+    assert client.get("/maintenance/equipment",
+                      headers={"If-Modified-Since": resp.headers["Last-Modified"]}).status_code == 304
+
+    _write(cache_app, lambda: db.session.add(Equipment(code="BM-02", name="BM")))
+    assert client.get("/maintenance/equipment", headers={"If-None-Match": resp.headers["ETag"]}).status_code == 200
+
+
+def test_pending_flash_bypasses_cache(cache_app):
+    client = authenticate(cache_app.test_client(), 1)
+    client.get("/maintenance/equipment")
+    with client.session_transaction() as s:
+        s["_flashes"] = [("message", "Equipment created")]
+    resp = client.get("/maintenance/equipment")
+    assert "X-Page-Cache" not in resp.headers and "Equipment created" in resp.get_data(as_text=True)
+    assert client.get("/maintenance/equipment").headers["X-Page-Cache"] == "hit"
+
+
+def test_sqlite_backend_is_shared_between_workers(make_app, tmp_path):
+    shared = dict(SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / 'erp.db'}", PAGE_CACHE_BACKEND="sqlite",
+                  PAGE_CACHE_DB=str(tmp_path / "page_cache.db"))
+    worker1, worker2 = make_app(**shared), make_app(**shared)
+    with worker1.app_context():
+        _seed()
+        assert authenticate(worker1.test_client(), 1).get("/maintenance/equipment").headers["X-Page-Cache"] == "miss"
+    with worker2.app_context():
+        assert authenticate(worker2.test_client(), 2).get("/maintenance/equipment").headers["X-Page-Cache"] == "hit"
+        db.session.add(Equipment(code="BM-02", name="BM"))
+        db.session.commit()
+    with worker1.app_context():  # запись во втором воркере видна первому сразу
+        resp = authenticate(worker1.test_client(), 1).get("/maintenance/equipment")
+        assert resp.headers["X-Page-Cache"] == "miss" and "BM-02" in resp.get_data(as_text=True)
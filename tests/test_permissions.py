@@ -0,0 +1,74 @@
+import pytest
+from flask_login import login_user, logout_user
+
+import permissions
+from auth import Principal
+from extensions import db
+from models import User
+from modules.spare_parts.models import Part
+from tests.conftest import authenticate
+
+
+@pytest.fixture()
+def rbac_app(make_app):
+    app = make_app()
+    with app.app_context():
+        db.session.add_all([User(username=r, password="-", role=r) for r in ("user", "admin", "root")])
+        db.session.add(Part(sap_code="S-1", name="Bearing", part_number="B-1"))
+        db.session.commit()
+        yield app
+
+
+def test_matrix_compiles_per_role():
+    caps = permissions.ROLE_CAPABILITIES
+    assert caps["root"] >= set(permissions.MATRIX)
+    assert "wo_fill" in caps["user"] and "wo_reopen" not in caps["user"]
+    assert caps["admin"] >= {"tooling_create", "tooling_import", "role:admin"}
+    assert "tooling_scrap" not in caps["admin"]
+    with pytest.raises(ValueError):
+        permissions.compile_matrix({"x": ("operator",)})
+
+
+def test_capabilities_follow_login_within_request(rbac_app):
+    with rbac_app.test_request_context():
+        assert permissions.capabilities() == permissions.NO_CAPABILITIES
+        login_user(Principal(2, "admin", "admin"))
+        assert permissions.capabilities() is permissions.ROLE_CAPABILITIES["admin"]
+        assert permissions.can_equipment_edit() and not permissions.can_equipment_delete()
+        logout_user()
+        assert not permissions.can_equipment_edit()
+
+
+@pytest.mark.parametrize("user_id, import_status, shows_delete", [(1, 302, False), (2, 200, False), (3, 200, True)])
+def test_routes_and_templates_use_capabilities(rbac_app, user_id, import_status, shows_delete):
+    client = rbac_app.test_client()
+    authenticate(client, user_id)
+    assert client.get("/parts/import").status_code == import_status
+    html = client.get("/tooling/").get_data(as_text=True)
+    assert ("New BATCH #" in html) is (user_id != 1)
+    assert ("Are you sure?" in client.get("/parts/").get_data(as_text=True)) is shows_delete
+
+
+@pytest.mark.parametrize("user_id, can_edit", [(1, False), (2, True)])
+def test_analog_links_need_analogs_edit(rbac_app, user_id, can_edit):
+    db.session.add(Part(sap_code="S-2", name="Bearing", part_number="B-2"))
+    db.session.commit()
+    client = rbac_app.test_client()
+    authenticate(client, user_id)
+    assert ("Add analog" in client.get("/parts/part/1").get_data(as_text=True)) is can_edit
+    client.post("/parts/part/1/analogs", data={"sap_code": "S-2"})
+    assert ("cross-reference" in client.get("/parts/part/1").get_data(as_text=True)) is can_edit
+    if can_edit:
+        client.post("/parts/part/1/analogs/2/delete")
+        assert "cross-reference" not in client.get("/parts/part/1").get_data(as_text=True)
+
+
+def test_unknown_roles_are_rejected_or_logged(rbac_app, caplog):
+    with pytest.raises(ValueError, match="operator"):
+        User(username="op", password="-", role="operator")
+    db.session.execute(User.__table__.insert().values(username="legacy", password="-", role="Admin"))  # старые данные
+    db.session.commit()
+    with rbac_app.test_request_context():
+        login_user(Principal(4, "legacy", "Admin"))
+        assert permissions.capabilities() == permissions.NO_CAPABILITIES
+    assert "unknown role 'Admin'" in caplog.text
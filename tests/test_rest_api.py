@@ -0,0 +1,113 @@
+from datetime import date, datetime
+
+import pytest
+
+from extensions import db
+from models import User
+from modules.maintenance.models import ChecklistTemplate, Equipment, WorkOrder
+from modules.tooling.models import ToolingEvent
+from tests.conftest import authenticate
+
+
+@pytest.fixture()
+def api_app(make_app):
+    app = make_app()
+    with app.app_context():
+        db.session.add_all([User(username=r, password="-", role=r) for r in ("user", "admin", "root")])
+        db.session.add(ChecklistTemplate(id=1, code="TPL", name_en="t", name_ru="t"))
+        for i in range(1, 8):
+            db.session.add(Equipment(id=i, code=f"BM-{i:02d}", name="BM", location="L1" if i % 2 else "L2"))
+            db.session.add(WorkOrder(equipment_id=i, template_id=1, status="open" if i < 4 else "done",
+                                     due_date=date(2024, 1, i)))
+        db.session.commit()
+    return app
+
+
+def test_list_selects_fields_filters_and_pages(api_app, max_queries):
+    client = authenticate(api_app.test_client(), 1)
+    with max_queries(2):  # выборка + принципал
+        first = client.get("/api/v1/workorders?fields=status,due_date&due_date__gte=2024-01-02&limit=3").get_json()
+    assert first["items"][0] == {"id": 2, "status": "open", "due_date": "2024-01-02"}
+    ids = [w["id"] for w in first["items"]]
+    cursor = first["next"]
+    while cursor:
+        page = client.get(f"/api/v1/workorders?fields=status&due_date__gte=2024-01-02&limit=3&after={cursor}").get_json()
+        ids += [w["id"] for w in page["items"]]
+        cursor = page["next"]
+    assert ids == [2, 3, 4, 5, 6, 7]
+
+    rows = client.get("/api/v1/equipment?fields=code&location=L2&format=rows").get_json()
+    assert rows["fields"] == ["id", "code"] and rows["rows"] == [[2, "BM-02"], [4, "BM-04"], [6, "BM-06"]]
+    assert [e["id"] for e in client.get("/api/v1/equipment?ids=5,1,9").get_json()["items"]] == [1, 5]
+    assert client.get("/api/v1/workorders?status__in=done&fields=id").get_json()["items"][0] == {"id": 4}
+    assert client.get("/api/v1/workorders/3").get_json()["item"]["status"] == "open"
+
+    assert client.get("/api/v1/workorders/99").status_code == 404
+    assert client.get("/api/v1/workorders?fields=secret").status_code == 400
+    assert client.get("/api/v1/workorders?due_date__gte=yesterday").status_code == 400
+    assert client.get("/api/v1/nothing").status_code == 404
+
+
+def test_batched_writes_are_all_or_nothing(api_app):
+    admin, user = authenticate(api_app.test_client(), 2), authenticate(api_app.test_client(), 1)
+    resp = admin.post("/api/v1/equipment", json={"items": [{"code": "BM-10", "name": "BM"},
+                                                           {"code": "BM-11", "name": "BM", "location": "L3"}]})
+    assert resp.status_code == 201 and resp.get_json()["ids"] == [8, 9]
+
+    bad = admin.post("/api/v1/equipment", json={"items": [{"code": "BM-12", "name": "BM"}, {"code": "BM-13"}]})
+    assert bad.status_code == 400 and "items[1]" in bad.get_json()["error"]
+    assert admin.post("/api/v1/equipment", json={"items": [{"code": "BM-14", "name": "BM"},
+                                                           {"code": "BM-01", "name": "dup"}]}).status_code == 409
+    assert user.post("/api/v1/equipment", json={"items": [{"code": "BM-15", "name": "BM"}]}).status_code == 403
+
+    resp = admin.patch("/api/v1/equipment", json={"items": [{"id": 8, "location": "L9"}, {"id": 9, "status": "down"}]})
+    assert resp.status_code == 200
+    assert admin.patch("/api/v1/equipment", json={"items": [{"id": 8, "photo_path": "x.jpg"}]}).status_code == 400
+    assert admin.patch("/api/v1/equipment", json={"items": [{"id": 99, "name": "x"}]}).status_code == 404
+
+    with api_app.app_context():
+        assert [e.code for e in Equipment.query.filter(Equipment.id > 7)] == ["BM-10", "BM-11"]
+        assert (db.session.get(Equipment, 8).location, db.session.get(Equipment, 9).status) == ("L9", "down")
+
+
+def test_workorders_are_not_closed_through_the_api(api_app):
+    admin = authenticate(api_app.test_client(), 2)
+    resp = admin.patch("/api/v1/workorders", json={"items": [{"id": 1, "due_date": "2024-02-01"},
+                                                             {"id": 2, "status": "done"}]})
+    assert resp.status_code == 400 and "items[1].status" in resp.get_json()["error"]
+    assert admin.patch("/api/v1/workorders", json={"items": [{"id": 1, "closed_at": "2024-02-01T10:00:00"}]}
+                       ).status_code == 400
+    assert admin.post("/api/v1/workorders", json={"items": [{"equipment_id": 1, "template_id": 1,
+                                                             "status": "done"}]}).status_code == 400
+    assert admin.patch("/api/v1/workorders", json={"items": [{"id": 1, "equipment_id": 2.5}]}).status_code == 400
+
+    with api_app.app_context():
+        db.session.get(WorkOrder, 4).closed_at = datetime(2024, 1, 5)
+        db.session.commit()
+    assert admin.patch("/api/v1/workorders", json={"items": [{"id": 4, "status": "open"},
+                                                             {"id": 1, "equipment_id": 3.0}]}).status_code == 200
+    with api_app.app_context():
+        assert db.session.get(WorkOrder, 1).due_date == date(2024, 1, 1)   # пачка с ошибкой не записалась
+        assert db.session.get(WorkOrder, 1).equipment_id == 3
+        assert (db.session.get(WorkOrder, 4).status, db.session.get(WorkOrder, 4).closed_at) == ("open", None)
+
+
+def test_tooling_resources(api_app):
+    admin = authenticate(api_app.test_client(), 2)
+    resp = admin.post("/api/v1/tooling", json={"items": [{"tool_code": "IH-1", "current_diameter": "12.5"}]})
+    assert resp.status_code == 201
+    tool = admin.get("/api/v1/tooling?fields=tool_code,current_diameter").get_json()["items"][0]
+    assert tool == {"id": 1, "tool_code": "IH-1", "current_diameter": 12.5}
+    with api_app.app_context():
+        assert [e.action for e in ToolingEvent.query.filter_by(tool_id=1)] == ["CREATE"]
+
+    events = admin.get("/api/v1/tooling_events?tool_id=1&fields=action,to_status").get_json()["items"]
+    assert events == [{"id": 1, "action": "CREATE", "to_status": "STOCK"}]
+    assert admin.post("/api/v1/tooling_events", json={"items": [{"action": "WASH"}]}).status_code == 405
+
+
+def test_disabled_module_resources_are_hidden(make_app):
+    app = make_app(ENABLED_MODULES="spare_parts", LOGIN_DISABLED=True)
+    client = app.test_client()
+    assert list(client.get("/api/v1/").get_json()["resources"]) == ["parts", "stock_transactions"]
+    assert client.get("/api/v1/equipment").status_code == 404
@@ -1,8 +1,9 @@
+from tests.conftest import authenticate
+
+
 def test_index_route(client, root_user):
     # авторизуем «псевдо-пользователя» в тестовом клиенте
-    with client.session_transaction() as session:
-        session["_user_id"] = str(root_user.id)
-        session["_fresh"] = True
+    authenticate(client, root_user.id)
 
     # важно: после логина может быть редирект — поэтому follow_redirects=True
     resp = client.get("/", follow_redirects=True)
@@ -0,0 +1,61 @@
+import subprocess
+import sys
+
+import pytest
+
+from modules import resolve
+from tests.conftest import ROOT, TEST_CONFIG
+
+
+def _file_config(tmp_path, **overrides) -> dict:
+    """Конфиг для create_app() в отдельном процессе: базы — файлы, созданные тёплым стартом в тесте."""
+    return {**TEST_CONFIG, "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'main.db'}",
+            "SQLALCHEMY_BINDS": {"tooling_queue": f"sqlite:///{tmp_path / 'queue.db'}"}, **overrides}
+
+
+def test_resolve_adds_dependencies_and_core():
+    assert resolve("tooling") == ["spare_parts", "maintenance", "tooling"]
+    assert resolve("") == ["spare_parts"]
+    with pytest.raises(ValueError):
+        resolve("spare_parts,warehouse")
+
+
+def test_disabled_modules_are_not_registered(make_app):
+    app = make_app(LOGIN_DISABLED=True, ENABLED_MODULES="spare_parts")
+    assert set(app.blueprints) == {"main", "ui"}
+    assert app.config["ENABLED_MODULES"] == ("spare_parts",)
+
+    html = app.test_client().get("/").get_data(as_text=True)
+    assert "/parts/" in html
+    assert "/maintenance/" not in html and "/tooling/" not in html
+    assert app.test_client().get("/tooling/").status_code == 404
+
+
+def test_startup_profile_records_steps(make_app, capsys):
+    app = make_app(STARTUP_PROFILE=True)
+    steps = [name for name, _ms, _imports in app.extensions["startup_profile"].steps]
+    assert steps[:4] == ["extensions", "module spare_parts", "module maintenance", "module tooling"]
+    assert "create_app total" in capsys.readouterr().err
+
+
+def test_disabled_modules_are_not_imported(make_app, tmp_path):
+    # миграции импортируют модели всех модулей, поэтому — тёплый старт на уже готовой базе
+    config = _file_config(tmp_path)
+    make_app(**config)
+    code = (f"import sys; from app import create_app; create_app({{**{config!r}, 'ENABLED_MODULES': 'spare_parts'}}); "
+            "print(sorted(m for m in sys.modules if m.startswith('modules.')))")
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True).stdout
+    assert "modules.spare_parts" in out
+    assert "modules.maintenance" not in out and "modules.tooling" not in out
+
+
+def test_switched_off_extensions_are_not_imported(make_app, tmp_path):
+    config = _file_config(tmp_path, METRICS_ENABLED=False, PAGE_CACHE=False, API_ENABLED=False, CHANGE_FEED=False,
+                          TEMPLATE_CACHE_DIR="off", TEMPLATE_WARMUP="0", ENABLED_MODULES="spare_parts")
+    make_app(**config)
+    code = (f"import sys; from app import create_app; app = create_app({config!r}); "
+            "print(sorted(m for m in sys.modules if m in "
+            "('db_metrics', 'rest_api', 'change_feed', 'template_cache', 'modules.spare_parts.api'))); "
+            "print(sorted(r.rule for r in app.url_map.iter_rules() if r.rule.startswith(('/api/v1', '/changes'))))")
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True).stdout
+    assert out.split("\n")[:2] == ["[]", "[]"]
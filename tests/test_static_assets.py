@@ -0,0 +1,64 @@
+import gzip
+import os
+
+import pytest
+
+import static_assets
+
+CSS = ".btn { color: red; }\n" * 100
+
+
+@pytest.fixture()
+def assets_app(make_app, tmp_path):
+    static = tmp_path / "static"
+    (static / "uploads").mkdir(parents=True)
+    (static / "app.css").write_text(CSS)
+    (static / "uploads" / "photo.jpg").write_bytes(b"x")
+    (tmp_path / "uploads").mkdir()
+    (tmp_path / "uploads" / "manual.pdf").write_bytes(bytes(range(256)) * 4)
+
+    app = make_app(LOGIN_DISABLED=True)   # UPLOAD_FOLDER — tmp_path / "uploads"
+    app.extensions["static_assets"] = static_assets.build(str(static), str(tmp_path / "build"))
+    return app
+
+
+def test_manifest_fingerprints_and_precompresses(assets_app, tmp_path):
+    manifest = assets_app.extensions["static_assets"]
+    assert list(manifest.by_source) == ["app.css"]  # uploads/ не входит
+    asset = manifest.by_source["app.css"]
+    assert asset.name.startswith("app.") and asset.name.endswith(".css") and asset.name != "app.css"
+    with open(asset.variants["gzip"], "rb") as f:
+        assert gzip.decompress(f.read()).decode() == CSS
+
+    mtime = os.path.getmtime(asset.variants["gzip"])
+    static_assets.build(str(tmp_path / "static"), str(tmp_path / "build"))  # второй старт не пересжимает
+    assert os.path.getmtime(asset.variants["gzip"]) == mtime
+
+
+def test_assets_are_immutable_negotiated_and_conditional(assets_app):
+    client = assets_app.test_client()
+    with assets_app.test_request_context():
+        url = static_assets.asset_url("app.css")
+        assert static_assets.asset_url("missing.css") == "/static/missing.css"
+
+    resp = client.get(url, headers={"Accept-Encoding": "gzip, deflate"})
+    assert resp.headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(resp.data).decode() == CSS
+    assert "immutable" in resp.headers["Cache-Control"] and "Accept-Encoding" in resp.headers["Vary"]
+
+    plain = client.get(url, headers={"Accept-Encoding": "identity"})
+    assert "Content-Encoding" not in plain.headers and plain.get_data(as_text=True) == CSS
+    assert plain.headers["ETag"] != resp.headers["ETag"]
+    assert client.get(url, headers={"If-None-Match": plain.headers["ETag"],
+                                    "Accept-Encoding": "identity"}).status_code == 304
+
+
+def test_media_supports_range_and_x_accel(assets_app):
+    client = assets_app.test_client()
+    resp = client.get("/media/manual.pdf", headers={"Range": "bytes=10-19"})
+    assert resp.status_code == 206 and resp.data == bytes(range(10, 20))
+    assert client.get("/media/manual.pdf", headers={"If-None-Match": resp.headers["ETag"]}).status_code == 304
+
+    assets_app.config.update(STATIC_SENDFILE="x-accel", STATIC_ACCEL_ROOT=assets_app.config["UPLOAD_FOLDER"])
+    resp = client.get("/media/manual.pdf")
+    assert resp.headers["X-Accel-Redirect"] == "/_protected/manual.pdf" and resp.data == b""
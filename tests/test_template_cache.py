@@ -0,0 +1,32 @@
+import os
+
+import pytest
+from jinja2 import FileSystemBytecodeCache
+
+import template_cache
+
+
+@pytest.fixture()
+def jinja_app(make_app, tmp_path):
+    return lambda **extra: make_app(**{"LOGIN_DISABLED": True, "TEMPLATE_CACHE_DIR": str(tmp_path / "jinja"), **extra})
+
+
+def test_warm_up_fills_the_shared_bytecode_cache(jinja_app, tmp_path):
+    app = jinja_app(TEMPLATE_WARMUP=True)
+    assert isinstance(app.jinja_env.bytecode_cache, FileSystemBytecodeCache)
+    names = app.jinja_env.list_templates(extensions=("html",))
+    assert {"base.html", "_sidebar_parts.html", "maintenance/bom.html", "tooling/report_installed.html"} <= set(names)
+    assert len(os.listdir(tmp_path / "jinja")) == len(names)
+    assert len(app.jinja_env.cache) == len(names)       # всё уже в памяти процесса — первый запрос не компилирует
+
+    second = jinja_app()                                # новый воркер: байткод с диска, без прогрева
+    assert len(second.jinja_env.cache) == 0
+    second.jinja_env.get_template("index.html")
+    assert len(os.listdir(tmp_path / "jinja")) == len(names)
+
+
+def test_warm_up_modes(jinja_app):
+    assert template_cache.warmup_enabled(jinja_app(SERVER_PRELOAD=True))   # auto: мастер serve.py
+    assert not template_cache.warmup_enabled(jinja_app())
+    app = jinja_app(TEMPLATE_CACHE_DIR="off", TEMPLATE_WARMUP="0")
+    assert app.jinja_env.bytecode_cache is None and len(app.jinja_env.cache) == 0
@@ -0,0 +1,77 @@
+import os
+from io import BytesIO
+
+import pytest
+from werkzeug.datastructures import FileStorage
+
+import uploads
+from extensions import db
+from models import User
+from modules.maintenance.models import Equipment
+from tests.conftest import authenticate
+
+
+@pytest.fixture()
+def upload_app(make_app):
+    app = make_app(UPLOAD_CHUNK_SIZE=4, UPLOAD_WORKERS=0)   # UPLOAD_FOLDER — tmp_path / "uploads"
+    with app.app_context():
+        db.session.add_all([User(username="root", password="-", role="root"), Equipment(code="BM-01", name="BM")])
+        db.session.commit()
+        yield app
+
+
+def _image(fmt="PNG"):
+    image = pytest.importorskip("PIL.Image")
+    buf = BytesIO()
+    image.new("RGB", (800, 600), (200, 30, 30)).save(buf, fmt)
+    return buf.getvalue()
+
+
+def test_uploads_are_named_by_content_and_deduplicated(upload_app):
+    with upload_app.test_request_context():
+        first = uploads.save_upload(FileStorage(BytesIO(b"same bytes"), "photo.jpg"))
+        second = uploads.save_upload(FileStorage(BytesIO(b"same bytes"), "other.JPEG"))
+        other = uploads.save_upload(FileStorage(BytesIO(b"other bytes"), "photo.jpg"))
+        assert uploads.save_upload(FileStorage(BytesIO(b"x"), "photo.exe")) is None
+
+    assert first == second != other
+    name = os.path.basename(first)
+    assert len(name) == len("x" * 64 + ".jpg") and os.path.basename(os.path.dirname(first)) == name[:2]
+    folder = upload_app.config["UPLOAD_FOLDER"]
+    assert sorted(os.listdir(folder)) == sorted({name[:2], os.path.basename(other)[:2]})  # временных файлов нет
+    assert os.stat(first).st_mode & 0o777 == uploads.FILE_MODE != 0o600   # читает и прокси (x-accel)
+
+
+def test_media_serves_hashed_files_with_immutable_cache(upload_app):
+    client = upload_app.test_client()
+    with upload_app.test_request_context():
+        path = uploads.save_upload(FileStorage(BytesIO(b"img"), "p.png"))
+        url = uploads.upload_url(path)
+    legacy = os.path.join(upload_app.config["UPLOAD_FOLDER"], "legacy.png")
+    with open(legacy, "wb") as f:
+        f.write(b"old")
+
+    resp = client.get(url)
+    assert resp.data == b"img"
+    assert "immutable" in resp.headers["Cache-Control"] and "max-age=31536000" in resp.headers["Cache-Control"]
+    assert "immutable" not in client.get("/media/legacy.png").headers.get("Cache-Control", "")
+    assert client.get("/media/../config.py").status_code == 404
+
+
+def test_equipment_photo_gets_thumbnail_variants(upload_app):
+    data = _image()
+    client = upload_app.test_client()
+    authenticate(client, 1)
+    resp = client.post("/maintenance/equipment/1/edit", content_type="multipart/form-data",
+                       data={"code": "BM-01", "name": "BM", "photo": (BytesIO(data), "bm.png")})
+    assert resp.status_code == 302
+
+    path = db.session.get(Equipment, 1).photo_path
+    from PIL import Image
+    with Image.open(uploads.variant_path(path, "thumb", "webp")) as thumb:
+        assert max(thumb.size) == upload_app.config["UPLOAD_THUMB_SIZE"]
+    assert os.path.exists(uploads.variant_path(path, "thumb", "png"))
+    assert os.path.exists(uploads.variant_path(path, None, "webp"))
+
+    html = client.get("/maintenance/equipment/1").get_data(as_text=True)
+    assert '.thumb.webp"' not in html and '.webp" type="image/webp"' in html  # страница карточки — полный размер
@@ -0,0 +1,95 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+import archive
+from extensions import db
+from modules.maintenance.models import ChecklistItem, ChecklistTemplate, Equipment, WorkOrder, WorkOrderItem
+from modules.tooling.models import ToolType, Tooling, ToolingEvent
+
+
+def _seed(now):
+    db.session.add(ToolType(id=1, code="GENERIC"))
+    tool = Tooling(id=1, tool_code="IH-1", tool_type_id=1)
+    db.session.add(tool)
+    for days in (1200, 800, 400, 10):
+        db.session.add(ToolingEvent(tool_id=1, batch_no="IH-1", action="WASH",
+                                    happened_at=now - timedelta(days=days)))
+    # единственное (и потому последнее) событие другого BATCH — не архивируется, даже старое
+    db.session.add(Tooling(id=2, tool_code="IH-2", tool_type_id=1))
+    db.session.add(ToolingEvent(tool_id=2, batch_no="IH-2", action="CREATE", to_status="STOCK",
+                                happened_at=now - timedelta(days=2000)))
+
+    eq = Equipment(id=1, code="BM-01", name="BM1")
+    tpl = ChecklistTemplate(id=1, code="T", name_en="T", name_ru="T")
+    db.session.add_all([eq, tpl, ChecklistItem(id=1, template_id=1, text_en="a", text_ru="a")])
+    wo = WorkOrder(id=1, equipment_id=1, template_id=1, status="done", closed_at=now - timedelta(days=900))
+    db.session.add_all([wo, WorkOrderItem(workorder_id=1, checklist_item_id=1, is_ok=True),
+                        WorkOrder(id=2, equipment_id=1, template_id=1, status="open")])
+    db.session.commit()
+
+
+@pytest.mark.parametrize("file_db", [False, True])
+def test_archive_moves_old_rows_and_reads_them_back(make_app, tmp_path, file_db):
+    uri = f"sqlite:///{tmp_path / 'hot.db'}" if file_db else "sqlite:///:memory:"
+    app = make_app(SQLALCHEMY_DATABASE_URI=uri, ARCHIVE_DIR=str(tmp_path / "arch"))
+    now = datetime(2026, 6, 1)
+    with app.app_context():
+        _seed(now)
+
+        moved = archive.archive_old_rows(horizon_days=365, now=now)
+        assert moved == {"tooling_events": 3, "workorders": 1, "workorder_items": 1}
+        assert ToolingEvent.query.count() == 2
+        assert db.session.get(Tooling, 2).last_aggregate()["STATUS"] == "STOCK"
+
+        # без архива — только горячая таблица; полная история — через UNION ALL
+        assert len(archive.tool_events(1, include_archive=False)) == 1
+        full = archive.tool_events(1)
+        assert [e.happened_at for e in full] == sorted((e.happened_at for e in full), reverse=True)
+        assert len(full) == 4
+        # окно истории идёт через границу архива без пропусков и повторов
+        first = archive.tool_events(1, limit=2)
+        rest = archive.tool_events(1, before=(first[-1].happened_at, first[-1].id), limit=10)
+        assert [e.id for e in first + rest] == [e.id for e in full]
+        assert archive.tool_event_counts(1) == {"WASH": 1}
+        assert archive.tool_event_counts(1, include_archive=True) == {"WASH": 4}
+        assert len(archive.tool_events(1, date_from=now - timedelta(days=500))) == 2
+
+        wo = archive.find_workorder(1)
+        assert wo.archived and wo.equipment.code == "BM-01" and len(wo.items) == 1
+        assert db.session.get(WorkOrder, 2) is not None
+
+        # повторный запуск ничего не дублирует
+        assert archive.archive_old_rows(horizon_days=365, now=now)["tooling_events"] == 0
+        assert len(archive.tool_events(1)) == 4
+
+    if file_db:
+        assert sorted(p.name for p in (tmp_path / "arch").iterdir()) == ["hot_2023.db", "hot_2024.db", "hot_2025.db"]
+
+
+def test_archive_survives_a_crash_between_files_and_pages_through_years(make_app, tmp_path, monkeypatch):
+    app = make_app(SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / 'hot.db'}", ARCHIVE_DIR=str(tmp_path / "arch"))
+    now = datetime(2026, 6, 1)
+    with app.app_context():
+        _seed(now)
+        ev = ToolingEvent.__table__
+        # упали после коммита в годовой файл, до DELETE из горячей таблицы
+        old = db.session.execute(db.select(ev).where(ev.c.tool_id == 1, ev.c.happened_at < datetime(2025, 1, 1))).all()
+        year = old[0].happened_at.year
+        archive._attach(db.session.connection(), [year])
+        archive.archive_table(ev, year).create(db.session.connection(), checkfirst=True)
+        db.session.execute(archive.archive_table(ev, year).insert(), [dict(old[0]._mapping)])
+        db.session.commit()
+
+        assert archive.archive_old_rows(horizon_days=365, now=now)["tooling_events"] == 3
+        assert ToolingEvent.query.count() == 2
+
+        monkeypatch.setattr(archive, "ATTACH_LIMIT", 2)   # три года архива — две пачки ATTACH
+        full = archive.tool_events(1)
+        assert len(full) == 4 and [e.happened_at for e in full] == sorted((e.happened_at for e in full), reverse=True)
+        assert [e.id for e in archive.tool_events(1, limit=3)] == [e.id for e in full[:3]]
+        assert archive.tool_event_counts(1, include_archive=True) == {"WASH": 4}
+        attached = [r[1] for r in db.session.connection().exec_driver_sql("PRAGMA database_list")]
+        assert sum(name.startswith("archive_") for name in attached) <= 2
+        with pytest.raises(ValueError, match="at most 2"):
+            archive._attach(db.session.connection(), [2021, 2022, 2023])
@@ -0,0 +1,26 @@
+from extensions import db
+from modules.tooling.models import ToolType, Tooling, ToolingEvent
+from tests.conftest import authenticate
+
+
+def test_autocomplete_prefix_status_and_refresh_on_write(app, client, root_user):
+    app.config["TOOLING_INDEX_TTL"] = 3600  # свежесть — только за счёт инвалидации на запись
+    db.session.add(ToolType(id=1, code="GENERIC"))
+    for code in ("IH-100", "IH-101", "IH-200", "RD-100"):
+        db.session.add(Tooling(tool_code=code, tool_type_id=1, current_diameter=63.08))
+    db.session.flush()
+    db.session.add(ToolingEvent(tool_id=1, batch_no="IH-100", action="CREATE", to_status="STOCK"))
+    db.session.commit()
+    authenticate(client, root_user.id)
+
+    data = client.get("/tooling/api/autocomplete?q=ih-1").get_json()
+    assert [it["batch"] for it in data["items"]] == ["IH-100", "IH-101"]
+    assert data["items"][0]["status"] == "STOCK"
+    assert float(data["items"][0]["dim"]) == 63.08
+
+    resp = client.post("/tooling/event", data={"batch_no": "IH-100", "action": "MARK_READY"})
+    assert resp.status_code in (302, 303)
+
+    data = client.get("/tooling/api/autocomplete?q=IH-100").get_json()
+    assert data["items"][0]["status"] == "READY"
+    assert data["items"][0]["last_action"] == "MARK_READY"
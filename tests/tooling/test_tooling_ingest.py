@@ -0,0 +1,112 @@
+from datetime import datetime, timedelta
+
+from extensions import db
+from modules.tooling import ingest
+from modules.tooling import models as tooling_models
+from modules.tooling import services as tooling_services
+from modules.tooling.models import IngestReceipt, QueuedEvent, ToolType, Tooling, ToolingEvent
+from modules.tooling.reference import replace_values
+from tests.conftest import authenticate
+
+
+def _seed_tool(code="IH-100"):
+    db.session.add(ToolType(id=1, code="GENERIC"))
+    db.session.add(Tooling(tool_code=code, tool_type_id=1))
+    db.session.commit()
+
+
+def test_api_event_is_idempotent(client, root_user):
+    _seed_tool()
+    authenticate(client, root_user.id)
+
+    body = {"batch_no": "IH-100", "action": "MARK_READY"}
+    resp = client.post("/tooling/api/events", json=body, headers={"Idempotency-Key": "scan-1"})
+    first = resp.get_json()
+    assert resp.status_code == 200 and first["status"] == "applied" and not first["duplicate"]
+
+    again = client.post("/tooling/api/events", json=body, headers={"Idempotency-Key": "scan-1"}).get_json()
+    assert again["duplicate"] and again["event_id"] == first["event_id"]
+    assert ToolingEvent.query.count() == 1
+
+
+def test_queued_form_events_are_group_committed_once(app, client, root_user):
+    app.config["TOOLING_INGEST_WORKER"] = "external"   # писатель — «другой процесс», разбираем вручную
+    app.config["TOOLING_INGEST_WAIT"] = 0
+    _seed_tool()
+    authenticate(client, root_user.id)
+
+    resp = client.post("/tooling/event", data={"batch_no": "IH-100", "action": "WASH", "idempotency_key": "f-1"})
+    assert resp.status_code in (302, 303) and "after=" in resp.headers["Location"]
+    client.post("/tooling/event", data={"batch_no": "IH-100", "action": "WASH", "idempotency_key": "f-1"})
+    client.post("/tooling/api/events", json={"events": [
+        {"batch_no": "IH-100", "action": "POLISH", "idempotency_key": "b-1"},
+        {"batch_no": "NOPE", "action": "POLISH", "idempotency_key": "b-2"},
+    ]})
+    assert ToolingEvent.query.count() == 0
+
+    assert ingest.drain_queue() == 3
+    statuses = {r.idempotency_key: r.status for r in db.session.query(QueuedEvent)}
+    assert statuses == {"f-1": "applied", "b-1": "applied", "b-2": "failed"}
+    assert [e.action for e in ToolingEvent.query.order_by(ToolingEvent.id)] == ["WASH", "POLISH"]
+
+    # падение между commit основной базы и отметкой в очереди: квитанция не даст применить повторно
+    db.session.query(QueuedEvent).filter_by(idempotency_key="b-1").update({"status": "pending"})
+    db.session.commit()
+    assert ingest.drain_queue() == 1
+    assert ToolingEvent.query.count() == 2
+    assert IngestReceipt.query.count() == 2
+
+    row = client.get("/tooling/api/events/1?wait=1").get_json()
+    assert row["status"] == "applied" and row["event_id"]
+
+
+def test_queued_events_keep_the_time_they_were_received(app, client, root_user, monkeypatch):
+    app.config["TOOLING_INGEST_WORKER"] = "external"
+    app.config["TOOLING_INGEST_WAIT"] = 0
+    _seed_tool()
+    authenticate(client, root_user.id)
+    client.post("/tooling/api/events", json={"events": [
+        {"batch_no": "IH-100", "action": "WASH", "idempotency_key": "t-1"},
+        {"batch_no": "IH-100", "action": "REGRIND", "new_dimension": "12.1", "idempotency_key": "t-2"},
+    ]})
+    received = {r.idempotency_key: r.received_at for r in db.session.query(QueuedEvent)}
+
+    class Later(datetime):   # писатель дошёл до очереди через два часа (рестарт, накопившийся хвост)
+        @classmethod
+        def utcnow(cls):
+            return datetime.utcnow() + timedelta(hours=2)
+
+    monkeypatch.setattr(tooling_services, "datetime", Later)
+    monkeypatch.setattr(tooling_models, "datetime", Later)
+    assert ingest.drain_queue() == 2
+    events = {e.action: e.happened_at for e in ToolingEvent.query}
+    assert events == {"WASH": received["t-1"], "REGRIND": received["t-2"]}
+
+
+def test_rejected_queued_events_are_shown_to_the_operator(app, client, root_user):
+    app.config["TOOLING_INGEST_WORKER"] = "external"
+    app.config["TOOLING_INGEST_WAIT"] = 0
+    _seed_tool()
+    authenticate(client, root_user.id)
+
+    resp = client.post("/tooling/event", data={"batch_no": "IH-100", "action": "WASH", "idempotency_key": "f-9"})
+    replace_values("actions", ["INSTALL", "REMOVE"])   # WASH выключили, пока событие ждало в очереди
+    db.session.commit()
+    assert ingest.drain_queue() == 1
+
+    html = client.get(resp.headers["Location"]).get_data(as_text=True)
+    assert "IH-100 не применено" in html
+    tool = Tooling.query.filter_by(tool_code="IH-100").one()
+    html = client.get(f"/tooling/{tool.id}").get_data(as_text=True)
+    assert "Не применены события из очереди" in html and "WASH: Укажи BATCH" in html
+
+
+def test_one_off_drain_respects_the_writer_lock(app, tmp_path):
+    path = str(tmp_path / "tooling_ingest.lock")
+    held = ingest.writer_lock(path)
+    assert held is not None
+    assert ingest.writer_lock(path) is None        # ingest_worker.py --once рядом с писателем — выходит
+    held.close()
+    again = ingest.writer_lock(path)
+    assert again is not None
+    again.close()
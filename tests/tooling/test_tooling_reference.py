@@ -0,0 +1,48 @@
+from sqlalchemy import delete
+
+from extensions import db
+from modules.maintenance.models import Equipment
+from modules.tooling.models import ReferenceValue
+from modules.tooling.reference import reference_data
+from tests.conftest import authenticate
+
+
+def test_reference_endpoint_is_cacheable_and_editable(client, root_user):
+    authenticate(client, root_user.id)
+
+    resp = client.get("/tooling/api/reference")
+    data = resp.get_json()
+    assert "INSTALL" in data["actions"]
+    assert data["shifts"][0] == "TOOL ROOM"
+    etag = resp.headers["ETag"]
+    assert client.get("/tooling/api/reference", headers={"If-None-Match": etag}).status_code == 304
+
+    resp = client.put("/tooling/api/reference/install_reasons", json={"values": ["Die worn", "Trial", "New"]})
+    assert resp.get_json()["values"] == ["Die worn", "Trial", "New"]
+
+    data = client.get("/tooling/api/reference").get_json()
+    assert data["install_reasons"] == ["Die worn", "Trial", "New"]
+    assert client.get("/tooling/api/reference", headers={"If-None-Match": etag}).status_code == 200
+
+
+def test_equipment_change_refreshes_machine_choices(client, root_user):
+    authenticate(client, root_user.id)
+    assert client.get("/tooling/api/reference").get_json()["machines"] == []
+
+    db.session.add(Equipment(code="BM-07", name="BM7"))
+    db.session.commit()
+
+    machines = client.get("/tooling/api/reference").get_json()["machines"]
+    assert [m["code"] for m in machines] == ["BM-07"]
+    assert b"BM7" in client.get("/tooling/event").data
+
+
+def test_reading_references_never_commits(app):
+    assert ReferenceValue.query.filter_by(kind="shifts").count() > 0   # значения по умолчанию — из миграции
+    db.session.execute(delete(ReferenceValue).where(ReferenceValue.kind == "shifts"))
+    db.session.add(Equipment(code="BM-09", name="BM9"))                 # чужая незакоммиченная работа
+
+    assert reference_data().lists["shifts"] == ()
+    db.session.rollback()
+    assert Equipment.query.count() == 0
+    assert ReferenceValue.query.filter_by(kind="shifts").count() > 0
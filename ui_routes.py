@@ -1,49 +1,45 @@
 # ui_routes.py — оболочка UI: домашняя страница-выбор и общие хелперы
-from flask import Blueprint, render_template
+from datetime import date
+
+from flask import Blueprint, current_app, render_template
 from flask_login import login_required
+from db_routing import read_only
 from extensions import db
 
-# Модели для KPI
-from modules.spare_parts.models import Part
-try:
-    from modules.maintenance.models import WorkOrder
-except Exception:  # pragma: no cover - optional dependency
-    WorkOrder = None
+ui = Blueprint("ui", __name__)
+
 
-# 🔹 Опционально импортируем модели оснастки (если модуль подключен)
-try:
-    from modules.tooling.models import Tooling, ToolStatus  # type: ignore[attr-defined]
-except Exception:  # pragma: no cover - optional dependency
-    Tooling = None
-    ToolStatus = None
+def module_enabled(name: str) -> bool:
+    """Модуль включён в ENABLED_MODULES (после create_app там уже полный список с зависимостями)."""
+    return name in current_app.config.get("ENABLED_MODULES", ())
 
-ui = Blueprint("ui", __name__)
 
 @ui.route("/")
 @login_required
+@read_only
 def home():
+    # Модели для KPI импортируются здесь: выключенный модуль не грузится вовсе
+    from modules.spare_parts.models import Part
+
     parts_count = db.session.query(Part).count()
 
     overdue_wos = 0
     open_wos = 0
-    if WorkOrder is not None:
-        from datetime import date
+    if module_enabled("maintenance"):
+        from modules.maintenance.models import WorkOrder
+
         open_wos = db.session.query(WorkOrder).filter(WorkOrder.status.in_(["open","in_progress"])).count()
         overdue_wos = db.session.query(WorkOrder).filter(WorkOrder.status=="open", WorkOrder.due_date < date.today()).count()
 
-    # 🔹 KPI по инструментальной оснастке (не упадёт, если модуль ещё не загружен)
+    # 🔹 KPI по инструментальной оснастке
     tooling_count = 0
     tooling_installed = 0
-    if Tooling is not None:
-        try:
-            tooling_count = db.session.query(Tooling).filter(Tooling.is_active.is_(True)).count()
-            if ToolStatus is not None:
-                tooling_installed = db.session.query(Tooling).filter(
-                    Tooling.is_active.is_(True),
-                    Tooling.status == ToolStatus.INSTALLED
-                ).count()
-        except Exception:
-            pass
+    if module_enabled("tooling"):
+        from modules.tooling.models import Tooling, ToolingMount
+
+        tooling_count = db.session.query(Tooling).filter(Tooling.is_active.is_(True)).count()
+        # установлено = открытый интервал монтажа (статуса-колонки у Tooling нет)
+        tooling_installed = db.session.query(ToolingMount).filter(ToolingMount.ended_at.is_(None)).count()
 
     return render_template(
         "home.html",
@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+"""
+Загрузка фото: Part.photo_path, Equipment.photo_path, WorkOrderAttachment.path.
+
+- Файл пишется на диск кусками по UPLOAD_CHUNK_SIZE (не целиком в память) во временный файл
+  рядом с целевым, попутно считается SHA-256. Имя — хэш содержимого: <UPLOAD_FOLDER>/ab/abcdef….jpg.
+  Одинаковые фото (одна и та же картинка у десятка запчастей) лежат на диске один раз,
+  одноимённые разные фото друг друга больше не затирают.
+- Варианты: миниатюра UPLOAD_THUMB_SIZE px (…thumb.jpg и …thumb.webp) и полноразмерный …webp.
+  Строятся в фоновом пуле потоков (UPLOAD_WORKERS, 0 — сразу в запросе), нужен Pillow;
+  без Pillow вариантов нет, страницы показывают оригинал.
+- GET /media/<path> отдаёт файлы из UPLOAD_FOLDER (static_assets.send_path: ETag, 304, Range, X-Accel-Redirect).
+  Имена по хэшу неизменяемы — для них Cache-Control: max-age=UPLOAD_CACHE_MAX_AGE, immutable;
+  старые файлы (исходное имя) — без долгого кэша.
+- В шаблонах: upload_url(path, 'thumb') и макрос templates/_photo.html (<picture> с WebP и JPEG).
+"""
+
+import hashlib
+import logging
+import os
+import re
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import abort, current_app, url_for
+from werkzeug.security import safe_join
+
+from static_assets import send_path
+
+try:  # Pillow необязателен: без него только оригиналы
+    from PIL import Image, ImageOps
+except ImportError:  # pragma: no cover - зависит от окружения
+    Image = None
+
+log = logging.getLogger(__name__)
+
+ALLOWED_EXTENSIONS = {"png", "jpg", "jpeg", "gif"}
+HASHED_NAME = re.compile(r"^[0-9a-f]{2}/[0-9a-f]{64}(\.[a-z0-9]+)+$")
+_EXT_KEY = "uploads"
+
+
+def _ext(filename: str) -> str | None:
+    if "." not in filename:
+        return None
+    ext = filename.rsplit(".", 1)[1].lower()
+    if ext not in ALLOWED_EXTENSIONS:
+        return None
+    return "jpg" if ext == "jpeg" else ext
+
+
+def upload_folder() -> str:
+    return current_app.config.get("UPLOAD_FOLDER") or os.path.join("static", "uploads")
+
+
+# ------------------------------ сохранение ------------------------------ #
+def _current_umask() -> int:
+    mask = os.umask(0)
+    os.umask(mask)
+    return mask
+
+
+# mkstemp создаёт файл 0600, os.replace права сохраняет — а файлы отдаёт и прокси под другим пользователем
+# (STATIC_SENDFILE=x-accel / x-sendfile). Права как у обычного open(): 0666 & ~umask. Umask — один раз при импорте.
+FILE_MODE = 0o666 & ~_current_umask()
+
+
+def save_upload(file, folder: str | None = None) -> str | None:
+    """Сохранить FileStorage; путь вида <folder>/ab/<sha256>.<ext> или None, если формат не разрешён."""
+    ext = _ext(getattr(file, "filename", None) or "")
+    if not file or ext is None:
+        return None
+    folder = folder or upload_folder()
+    chunk_size = int(current_app.config.get("UPLOAD_CHUNK_SIZE", 64 * 1024))
+    os.makedirs(folder, exist_ok=True)  # создаётся при первой загрузке, а не на старте воркера
+
+    digest = hashlib.sha256()
+    fd, tmp_path = tempfile.mkstemp(dir=folder, prefix=".upload-")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while chunk := file.stream.read(chunk_size):
+                digest.update(chunk)
+                out.write(chunk)
+        name = digest.hexdigest()
+        path = os.path.join(folder, name[:2], f"{name}.{ext}")
+        if os.path.exists(path):  # такое фото уже есть — берём его
+            os.unlink(tmp_path)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.chmod(tmp_path, FILE_MODE)
+            os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+    schedule_variants(path)
+    return path
+
+
+# ------------------------------ варианты ------------------------------ #
+def _thumb_format(path: str) -> str:
+    """Миниатюра для браузеров без WebP: PNG/GIF (прозрачность) -> png, остальное -> jpg."""
+    return "png" if path.lower().endswith((".png", ".gif")) else "jpg"
+
+
+def variant_path(path: str, variant: str | None, fmt: str | None = None) -> str:
+    """<hash>.jpg -> <hash>.thumb.webp / <hash>.thumb.jpg / <hash>.webp."""
+    stem, ext = os.path.splitext(path)
+    if variant:
+        stem = f"{stem}.{variant}"
+    return f"{stem}.{fmt or ext.lstrip('.')}"
+
+
+def make_variants(path: str, thumb_size: int, quality: int = 82) -> list[str]:
+    """Миниатюра (JPEG/PNG + WebP) и полноразмерный WebP рядом с оригиналом. Нужен Pillow."""
+    if Image is None:
+        return []
+    made = []
+    with Image.open(path) as src:
+        img = ImageOps.exif_transpose(src)  # фото с телефона: поворот по EXIF
+        if img.mode not in ("RGB", "RGBA"):
+            img = img.convert("RGBA" if "transparency" in img.info else "RGB")
+        full_webp = variant_path(path, None, "webp")
+        img.save(full_webp, "WEBP", quality=quality, method=4)
+        made.append(full_webp)
+
+        thumb = img.copy()
+        thumb.thumbnail((thumb_size, thumb_size))
+        out = variant_path(path, "thumb", "webp")
+        thumb.save(out, "WEBP", quality=quality)
+        made.append(out)
+        out = variant_path(path, "thumb", _thumb_format(path))
+        if out.endswith(".jpg"):
+            thumb.convert("RGB").save(out, "JPEG", quality=quality, optimize=True)
+        else:
+            thumb.save(out, "PNG", optimize=True)
+        made.append(out)
+    return made
+
+
+def _make_variants_logged(path: str, thumb_size: int) -> list[str]:
+    try:
+        return make_variants(path, thumb_size)
+    except Exception:  # битая картинка: оригинал остаётся, варианты — нет
+        log.warning("Could not build image variants for %s", path, exc_info=True)
+        return []
+
+
+def _pool(app) -> ThreadPoolExecutor:
+    pool = app.extensions.get(_EXT_KEY)
+    if pool is None:
+        pool = app.extensions[_EXT_KEY] = ThreadPoolExecutor(
+            max_workers=int(app.config.get("UPLOAD_WORKERS", 2)), thread_name_prefix="upload-variants")
+    return pool
+
+
+def schedule_variants(path: str):
+    """Построить варианты в фоне (UPLOAD_WORKERS > 0) или сразу. Возвращает Future или список файлов."""
+    if Image is None:
+        return []
+    app = current_app._get_current_object()
+    thumb_size = int(app.config.get("UPLOAD_THUMB_SIZE", 160))
+    if int(app.config.get("UPLOAD_WORKERS", 2)) <= 0:
+        return _make_variants_logged(path, thumb_size)
+    return _pool(app).submit(_make_variants_logged, path, thumb_size)
+
+
+# ------------------------------ отдача ------------------------------ #
+def _media_name(path: str) -> str:
+    return os.path.relpath(os.path.abspath(path), os.path.abspath(upload_folder())).replace(os.sep, "/")
+
+
+def upload_url(path: str | None, variant: str | None = None, fmt: str | None = None) -> str | None:
+    """URL файла или его варианта; если варианта (ещё) нет — URL оригинала."""
+    if not path:
+        return None
+    if variant or fmt:
+        candidate = variant_path(path, variant, fmt or _thumb_format(path))
+        if os.path.exists(candidate):
+            path = candidate
+        elif fmt:  # WebP-источник в <picture> без файла не нужен
+            return None
+    return url_for("media", filename=_media_name(path))
+
+
+def media_view(filename: str):
+    """Файл из UPLOAD_FOLDER: ETag/304, Range (вложения), при STATIC_SENDFILE — через прокси (static_assets.py)."""
+    if filename.startswith("."):  # временные файлы незавершённых загрузок
+        abort(404)
+    path = safe_join(os.path.abspath(upload_folder()), filename)
+    if path is None or not os.path.isfile(path):
+        abort(404)
+    if HASHED_NAME.match(filename):  # имя = содержимое: ETag — хэш, кэш без перепроверки
+        return send_path(path, etag=filename.split("/")[-1].split(".")[0],
+                         max_age=int(current_app.config.get("UPLOAD_CACHE_MAX_AGE", 31536000)), immutable=True)
+    return send_path(path)
+
+
+def install(app) -> None:
+    """GET /media/<path> и upload_url() в шаблонах."""
+    app.add_url_rule("/media/<path:filename>", "media", media_view)
+    app.add_template_global(upload_url)
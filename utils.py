@@ -1,19 +1,17 @@
-import os
-from werkzeug.utils import secure_filename
 from flask import flash
 
-ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
+import uploads
+
+ALLOWED_EXTENSIONS = uploads.ALLOWED_EXTENSIONS
 
 def allowed_file(filename):
     """Check if the file has an allowed extension."""
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
 def handle_file_upload(file, upload_folder):
-    """Save uploaded file to upload folder and return the file path, or None."""
-    if file and allowed_file(file.filename):
-        filename = secure_filename(file.filename)
-        filepath = os.path.join(upload_folder, filename)
-        file.save(filepath)
+    """Store an uploaded image under its content hash (see uploads.py) and return the file path, or None."""
+    filepath = uploads.save_upload(file, upload_folder)
+    if filepath:
         return filepath
     flash('Invalid file format. Allowed: png, jpg, jpeg, gif')
     return None